@@ -44,20 +44,25 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'retiros.middleware.InstrumentacionMiddleware',
+    'retiros.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'retiros.middleware.AuditoriaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'retiros.middleware.PerfiladorMiddleware',
 ]
 
 ROOT_URLCONF = 'gestpylab.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Backend de Django que además mide el tiempo de render (ver retiros.instrumentacion)
+        'BACKEND': 'retiros.instrumentacion.DjangoTemplatesInstrumentado',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,9 +89,50 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Reutiliza la conexión entre peticiones durante CONN_MAX_AGE segundos
+        # (0 = una conexión por petición, vacío = sin límite) y verifica que
+        # siga viva antes de reutilizarla
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=lambda v: int(v) if v else None),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
 
+# Pool de conexiones de psycopg 3 (requiere `pip install "psycopg[binary,pool]"`
+# en lugar de psycopg2). Con pool, cada petición toma y devuelve una conexión
+# del pool, por lo que Django exige CONN_MAX_AGE = 0.
+if config('DB_POOL', default=False, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+
+# Réplica de lectura opcional. Las vistas y servicios de solo lectura leen de
+# ella (ver retiros/routers.py); en los tests apunta a la base de prueba del
+# primario. Localmente puede ser otro archivo SQLite (copia de db.sqlite3).
+REPLICA_DB_ALIAS = 'replica'
+REPLICA_FIJAR_SEGUNDOS = config('DB_REPLICA_FIJAR_SEGUNDOS', default=5, cast=int)
+if config('DB_REPLICA_NAME', default=''):
+    DATABASES[REPLICA_DB_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME'),
+        'USER': config('DB_REPLICA_USER', default='') or DATABASES['default']['USER'],
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default='') or DATABASES['default']['PASSWORD'],
+        'HOST': config('DB_REPLICA_HOST', default='') or DATABASES['default']['HOST'],
+        'PORT': config('DB_REPLICA_PORT', default='') or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['retiros.routers.ReplicaRouter']
+
+# Los índices de EventoSolicitud cubren columnas extra con INCLUDE, que solo
+# existe en PostgreSQL; con SQLite (desarrollo, tests) se crean sin ellas
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,6 +182,60 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Instrumentación de peticiones (retiros.middleware.InstrumentacionMiddleware)
+INSTRUMENTACION_UMBRAL_LENTO_MS = config('INSTRUMENTACION_UMBRAL_LENTO_MS', default=1000, cast=int)
+INSTRUMENTACION_SERVER_TIMING = config('INSTRUMENTACION_SERVER_TIMING', default=True, cast=bool)
+
+# Perfilador opcional (retiros.middleware.PerfiladorMiddleware)
+PERFILADOR_HABILITADO = config('PERFILADOR_HABILITADO', default=False, cast=bool)
+PERFILADOR_MUESTREO = config('PERFILADOR_MUESTREO', default=0.0, cast=float)
+PERFILADOR_DIRECTORIO = BASE_DIR / config('PERFILADOR_DIRECTORIO', default='perfiles')
+
+# Archivo de solicitudes finalizadas antiguas (comando archivar_solicitudes)
+ARCHIVO_SOLICITUDES_DIAS = config('ARCHIVO_SOLICITUDES_DIAS', default=365, cast=int)
+ARCHIVO_SOLICITUDES_DIR = BASE_DIR / config('ARCHIVO_SOLICITUDES_DIR', default='archivo')
+
+# Geocodificación de direcciones (retiros.geocodificacion, comando geocodificar_direcciones)
+GEOCODIFICADOR = config('GEOCODIFICADOR', default='retiros.geocodificacion.GeocodificadorNulo')
+GEOCODIFICADOR_ARCHIVO = config('GEOCODIFICADOR_ARCHIVO', default='')
+GEOCODIFICADOR_AGENTE = config('GEOCODIFICADOR_AGENTE', default='GestPyLab')
+
+# Asignación automática: zonas vecinas (retiros.zonas)
+ZONAS_CACHE_SEGUNDOS = config('ZONAS_CACHE_SEGUNDOS', default=300, cast=int)
+ASIGNACION_DESBORDE_MINUTOS = config('ASIGNACION_DESBORDE_MINUTOS', default=60, cast=int)
+
+# Agenda de retiros con horario de atención (retiros.agenda)
+AGENDA_INICIO_JORNADA = config('AGENDA_INICIO_JORNADA', default='09:00')
+AGENDA_FIN_JORNADA = config('AGENDA_FIN_JORNADA', default='18:00')
+AGENDA_MINUTOS_RETIRO = config('AGENDA_MINUTOS_RETIRO', default=10, cast=float)
+AGENDA_VELOCIDAD_KMH = config('AGENDA_VELOCIDAD_KMH', default=25, cast=float)
+# Tiempos de viaje cuando alguna parada no tiene coordenadas
+AGENDA_MINUTOS_MISMA_ZONA = config('AGENDA_MINUTOS_MISMA_ZONA', default=5, cast=float)
+AGENDA_MINUTOS_ENTRE_ZONAS = config('AGENDA_MINUTOS_ENTRE_ZONAS', default=20, cast=float)
+
+# Código de país de los teléfonos sin él (retiros.normalizacion)
+TELEFONO_CODIGO_PAIS = config('TELEFONO_CODIGO_PAIS', default='56')
+
+# Calendario de disponibilidad de retiradores (retiros.disponibilidad)
+DISPONIBILIDAD_CACHE_SEGUNDOS = config('DISPONIBILIDAD_CACHE_SEGUNDOS', default=300, cast=int)
+
+# Caché de Django. Con varios procesos debe ser compartida (Redis, Memcached,
+# base de datos): retiros.autocompletado publica ahí sus invalidaciones
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Caché de autocompletado de solicitantes (retiros.autocompletado)
+AUTOCOMPLETADO_CACHE_SEGUNDOS = config('AUTOCOMPLETADO_CACHE_SEGUNDOS', default=60, cast=int)
+AUTOCOMPLETADO_MAX_CANDIDATOS = config('AUTOCOMPLETADO_MAX_CANDIDATOS', default=500, cast=int)
+
+# Búsqueda de solicitantes dentro del texto (?contiene=1), sin índice
+BUSQUEDA_CONTIENE_MIN_CARACTERES = config('BUSQUEDA_CONTIENE_MIN_CARACTERES', default=4, cast=int)
+BUSQUEDA_CONTIENE_LIMITE = config('BUSQUEDA_CONTIENE_LIMITE', default=5, cast=int)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -149,16 +249,23 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'retiros.log.FormateadorJSON',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        # Escritura en segundo plano (QueueHandler/QueueListener), una línea
+        # JSON por registro y rotación por tamaño
         'file': {
-            'class': 'logging.FileHandler',
+            '()': 'retiros.log.ColaHandler',
             'filename': BASE_DIR / 'logs' / 'gestpylab.log',
-            'formatter': 'verbose',
+            'max_bytes': config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int),
+            'backup_count': config('LOG_BACKUP_COUNT', default=5, cast=int),
+            'formatter': 'json',
         },
     },
     'loggers': {
@@ -1,29 +1,72 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Zona, Solicitante, Retirador, SolicitudRetiro
+from .auditoria import registrar
+from .estados import transicionar_lote
+from .forms import SolicitudRetiroAdminForm
+from .models import (
+    Zona, Solicitante, Retirador, SolicitudRetiro, EventoSolicitud, Manifiesto, ItemManifiesto,
+    DireccionGeocodificada, AdyacenciaZona, DisponibilidadRetirador,
+)
+from .normalizacion import clave_busqueda, es_telefono, filtro_telefono
+from .routers import solo_lectura
 import csv
 from datetime import datetime
 
+
+def contar_relacionados(queryset, campo):
+    """
+    Subconsulta correlacionada que cuenta las filas de `queryset` cuyo `campo`
+    apunta a la fila externa. Se evalúa solo para las filas de la página del
+    changelist, en lugar de una consulta COUNT por fila.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{campo: OuterRef('pk')})
+            .order_by()
+            .values(campo)
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        0,
+    )
+
+class AdyacenciaZonaInline(admin.TabularInline):
+    """Zonas vecinas (la adyacencia vale en ambos sentidos, ver zonas.py)"""
+    model = AdyacenciaZona
+    fk_name = 'origen'
+    extra = 1
+    autocomplete_fields = ['destino']
+
 @admin.register(Zona)
 class ZonaAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'total_solicitantes', 'total_retiradores']
     search_fields = ['nombre']
     ordering = ['nombre']
+    inlines = [AdyacenciaZonaInline]
+    
+    def get_queryset(self, request):
+        # Optimizado: contadores como subconsultas en lugar de un COUNT por fila
+        return super().get_queryset(request).annotate(
+            num_solicitantes=contar_relacionados(Solicitante.objects.all(), 'zona'),
+            num_retiradores=contar_relacionados(Retirador.zonas_preferidas.through.objects.all(), 'zona'),
+        )
     
     def total_solicitantes(self, obj):
         """Muestra el total de solicitantes en esta zona"""
-        count = obj.solicitante_set.count()
-        return format_html('<span style="font-weight: bold;">{}</span>', count)
+        return format_html('<span style="font-weight: bold;">{}</span>', obj.num_solicitantes)
     total_solicitantes.short_description = 'Total Solicitantes'
+    total_solicitantes.admin_order_field = 'num_solicitantes'
     
     def total_retiradores(self, obj):
         """Muestra el total de retiradores que cubren esta zona"""
-        count = obj.retirador_set.count()
-        return format_html('<span style="font-weight: bold;">{}</span>', count)
+        return format_html('<span style="font-weight: bold;">{}</span>', obj.num_retiradores)
     total_retiradores.short_description = 'Total Retiradores'
+    total_retiradores.admin_order_field = 'num_retiradores'
 
 @admin.register(Solicitante)
 class SolicitanteAdmin(admin.ModelAdmin):
@@ -40,10 +83,12 @@ class SolicitanteAdmin(admin.ModelAdmin):
     list_filter = [
         'tipo', 
         'zona',
+        'datos_completos',
         'email_desconocido',
         'direccion_desconocida'
     ]
-    search_fields = ['nombre', 'email', 'telefono', 'direccion_principal']
+    # Claves de búsqueda sin tildes ni mayúsculas (ver get_search_results)
+    search_fields = ['nombre_busqueda', 'email_busqueda', 'telefono', 'direccion_busqueda']
     ordering = ['nombre']
     
     fieldsets = (
@@ -56,8 +101,9 @@ class SolicitanteAdmin(admin.ModelAdmin):
             'description': 'Si el email es desconocido, marque la casilla y deje el campo vacío'
         }),
         ('Dirección', {
-            'fields': ('direccion_principal', 'direccion_desconocida'),
-            'description': 'Si la dirección es desconocida, marque la casilla y deje el campo vacío'
+            'fields': ('direccion_principal', 'direccion_desconocida', ('latitud', 'longitud')),
+            'description': 'Si la dirección es desconocida, marque la casilla y deje el campo vacío. '
+                           'Las coordenadas se obtienen con el comando geocodificar_direcciones'
         }),
         ('Horarios de Atención', {
             'fields': ('horario_atencion_inicio', 'horario_atencion_fin', 'comentarios_horario_retiro'),
@@ -66,8 +112,22 @@ class SolicitanteAdmin(admin.ModelAdmin):
         }),
     )
     
+    readonly_fields = ['latitud', 'longitud']
     actions = ['exportar_datos_faltantes', 'marcar_email_desconocido', 'marcar_direccion_desconocida']
     
+    def get_queryset(self, request):
+        # Optimizado: total de solicitudes como subconsulta en lugar de un COUNT por fila
+        return super().get_queryset(request).annotate(
+            num_solicitudes=contar_relacionados(SolicitudRetiro.objects.all(), 'solicitante'),
+        )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Un teléfono se busca por el índice del número normalizado (ver normalizacion.py)
+        if es_telefono(search_term):
+            return queryset.filter(filtro_telefono(search_term)), False
+        # El resto, en las claves de búsqueda con el término normalizado igual que ellas
+        return super().get_search_results(request, queryset, clave_busqueda(search_term))
+    
     def estado_email(self, obj):
         """Muestra el estado del email con iconos"""
         if obj.email_desconocido:
@@ -100,21 +160,24 @@ class SolicitanteAdmin(admin.ModelAdmin):
     
     def datos_completos_badge(self, obj):
         """Badge que indica si los datos están completos"""
-        if obj.tiene_datos_completos:
+        if obj.datos_completos:
             return format_html('<span style="background-color: #28a745; color: white; padding: 3px 8px; border-radius: 3px;">✓ Completo</span>')
         else:
             return format_html('<span style="background-color: #dc3545; color: white; padding: 3px 8px; border-radius: 3px;">⚠ Incompleto</span>')
     datos_completos_badge.short_description = 'Estado'
+    datos_completos_badge.admin_order_field = 'datos_completos'
     
     def total_solicitudes(self, obj):
         """Muestra el total de solicitudes del solicitante"""
-        count = obj.solicitudretiro_set.count()
+        count = obj.num_solicitudes
         if count > 0:
             url = reverse('admin:retiros_solicitudretiro_changelist') + f'?solicitante__id__exact={obj.id}'
             return format_html('<a href="{}" style="font-weight: bold;">{} solicitudes</a>', url, count)
         return format_html('<span style="color: gray;">0 solicitudes</span>')
     total_solicitudes.short_description = 'Solicitudes'
+    total_solicitudes.admin_order_field = 'num_solicitudes'
     
+    @solo_lectura()
     def exportar_datos_faltantes(self, request, queryset):
         """Exporta solicitantes con datos faltantes a CSV"""
         response = HttpResponse(content_type='text/csv; charset=utf-8')
@@ -124,19 +187,21 @@ class SolicitanteAdmin(admin.ModelAdmin):
         writer = csv.writer(response)
         writer.writerow(['Nombre', 'Tipo', 'Zona', 'Teléfono', 'Email Faltante', 'Dirección Faltante', 'Horario'])
         
-        for solicitante in queryset:
-            if not solicitante.tiene_datos_completos:
-                writer.writerow([
-                    solicitante.nombre,
-                    solicitante.get_tipo_display(),
-                    solicitante.zona.nombre,
-                    solicitante.telefono,
-                    'SÍ' if solicitante.email_desconocido else 'NO',
-                    'SÍ' if solicitante.direccion_desconocida else 'NO',
-                    solicitante.horario_completo
-                ])
+        exportados = 0
+        for solicitante in queryset.filter(datos_completos=False).select_related('zona'):
+            faltantes = solicitante.datos_faltantes()
+            writer.writerow([
+                solicitante.nombre,
+                solicitante.get_tipo_display(),
+                solicitante.zona.nombre,
+                solicitante.telefono,
+                'SÍ' if 'email' in faltantes else 'NO',
+                'SÍ' if 'dirección' in faltantes else 'NO',
+                solicitante.horario_completo
+            ])
+            exportados += 1
         
-        self.message_user(request, f'Se exportaron {queryset.filter(email_desconocido=True).count() + queryset.filter(direccion_desconocida=True).count()} solicitantes con datos faltantes.')
+        self.message_user(request, f'Se exportaron {exportados} solicitantes con datos faltantes.')
         return response
     exportar_datos_faltantes.short_description = '📥 Exportar datos faltantes a CSV'
     
@@ -158,13 +223,29 @@ class SolicitanteAdmin(admin.ModelAdmin):
             'all': ('admin/css/solicitante_admin.css',)
         }
 
+class DisponibilidadRetiradorInline(admin.TabularInline):
+    """Ausencias del retirador (ver disponibilidad.py)"""
+    model = DisponibilidadRetirador
+    fields = ['inicio', 'fin', 'motivo', 'observaciones']
+    extra = 0
+
 @admin.register(Retirador)
 class RetiradorAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'tipo', 'zonas_display', 'total_solicitudes_hoy']
+    list_display = ['nombre', 'tipo', 'zonas_display', 'capacidad_diaria', 'total_solicitudes_hoy']
     list_filter = ['tipo']
     search_fields = ['nombre']
     filter_horizontal = ['zonas_preferidas']
     ordering = ['nombre']
+    inlines = [DisponibilidadRetiradorInline]
+    
+    def get_queryset(self, request):
+        # Optimizado: zonas precargadas y solicitudes del día como subconsulta
+        from django.utils import timezone
+        hoy = timezone.now().date()
+        solicitudes_hoy = SolicitudRetiro.objects.filter(fecha_retiro=hoy, estado__in=['pendiente', 'asignado'])
+        return super().get_queryset(request).prefetch_related('zonas_preferidas').annotate(
+            num_solicitudes_hoy=contar_relacionados(solicitudes_hoy, 'retirador_asignado'),
+        )
     
     def zonas_display(self, obj):
         """Muestra las zonas del retirador"""
@@ -176,9 +257,7 @@ class RetiradorAdmin(admin.ModelAdmin):
     
     def total_solicitudes_hoy(self, obj):
         """Muestra el total de solicitudes del día"""
-        from django.utils import timezone
-        hoy = timezone.now().date()
-        count = obj.solicitudretiro_set.filter(fecha_retiro=hoy, estado__in=['pendiente', 'asignado']).count()
+        count = obj.num_solicitudes_hoy
         if count > 0:
             return format_html('<span style="background-color: #ffc107; color: black; padding: 3px 8px; border-radius: 3px; font-weight: bold;">{} hoy</span>', count)
         return format_html('<span style="color: gray;">0 hoy</span>')
@@ -186,6 +265,7 @@ class RetiradorAdmin(admin.ModelAdmin):
 
 @admin.register(SolicitudRetiro)
 class SolicitudRetiroAdmin(admin.ModelAdmin):
+    form = SolicitudRetiroAdminForm
     list_display = [
         'id',
         'solicitante_info',
@@ -209,7 +289,9 @@ class SolicitudRetiroAdmin(admin.ModelAdmin):
         'retirador_asignado__nombre'
     ]
     date_hierarchy = 'fecha_retiro'
-    readonly_fields = ['fecha_solicitud', 'hora_solicitud']
+    # Optimizado: solicitante_info y retirador_info acceden a estas relaciones en cada fila
+    list_select_related = ['solicitante__zona', 'retirador_asignado']
+    readonly_fields = ['fecha_solicitud', 'hora_solicitud', 'latitud', 'longitud']
     ordering = ['-fecha_retiro', '-hora_solicitud']
     
     fieldsets = (
@@ -217,7 +299,7 @@ class SolicitudRetiroAdmin(admin.ModelAdmin):
             'fields': ('solicitante',)
         }),
         ('Dirección de Retiro', {
-            'fields': ('usar_direccion_solicitante', 'direccion_retiro'),
+            'fields': ('usar_direccion_solicitante', 'direccion_retiro', ('latitud', 'longitud')),
             'description': 'Si usa la dirección del solicitante, se copiará automáticamente'
         }),
         ('Programación', {
@@ -279,21 +361,113 @@ class SolicitudRetiroAdmin(admin.ModelAdmin):
     
     def marcar_completado(self, request, queryset):
         """Marca solicitudes como completadas"""
-        updated = queryset.update(estado='completado')
+        updated = len(transicionar_lote(queryset, 'completado'))
         self.message_user(request, f'{updated} solicitud(es) marcada(s) como completada(s).')
+        self._avisar_omitidas(request, queryset, updated)
     marcar_completado.short_description = '✅ Marcar como completado'
     
     def marcar_cancelado(self, request, queryset):
         """Marca solicitudes como canceladas"""
-        updated = queryset.update(estado='cancelado')
+        updated = len(transicionar_lote(queryset, 'cancelado'))
         self.message_user(request, f'{updated} solicitud(es) marcada(s) como cancelada(s).')
+        self._avisar_omitidas(request, queryset, updated)
     marcar_cancelado.short_description = '❌ Marcar como cancelado'
     
+    def save_model(self, request, obj, form, change):
+        """Registra en el historial la creación y los cambios de estado o retirador"""
+        super().save_model(request, obj, form, change)
+        if not change:
+            registrar([(obj.pk, '', obj.retirador_asignado_id)], obj.estado, tipo='creada')
+        elif {'estado', 'retirador_asignado'} & set(form.changed_data):
+            registrar([(obj.pk, form.initial['estado'], obj.retirador_asignado_id)], obj.estado)
+    
+    def _avisar_omitidas(self, request, queryset, updated):
+        """Informa las solicitudes que ya estaban completadas o canceladas"""
+        omitidas = queryset.count() - updated
+        if omitidas:
+            self.message_user(
+                request,
+                f'{omitidas} solicitud(es) omitida(s): ya estaban completadas o canceladas.',
+                messages.WARNING,
+            )
+    
     def reasignar_retirador(self, request, queryset):
         """Permite reasignar retiradores (requiere implementación adicional)"""
         self.message_user(request, 'Funcionalidad de reasignación en desarrollo.')
     reasignar_retirador.short_description = '🔄 Reasignar retirador'
 
+@admin.register(EventoSolicitud)
+class EventoSolicitudAdmin(admin.ModelAdmin):
+    """Historial de solo lectura (los eventos se agregan desde auditoria.py)"""
+    list_display = ['fecha', 'solicitud_link', 'tipo', 'estado_anterior', 'estado_nuevo', 'retirador', 'usuario']
+    list_filter = ['tipo', 'fecha']
+    search_fields = ['=solicitud__id', 'usuario']
+    date_hierarchy = 'fecha'
+    list_select_related = ['retirador']
+    ordering = ['-fecha']
+    
+    def solicitud_link(self, obj):
+        """Link a la solicitud (sin JOIN: puede haber sido eliminada)"""
+        url = reverse('admin:retiros_solicitudretiro_change', args=[obj.solicitud_id])
+        return format_html('<a href="{}">#{}</a>', url, obj.solicitud_id)
+    solicitud_link.short_description = 'Solicitud'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(DireccionGeocodificada)
+class DireccionGeocodificadaAdmin(admin.ModelAdmin):
+    """Caché de geocodificación. Un resultado erróneo se corrige aquí."""
+    list_display = ['direccion', 'latitud', 'longitud', 'proveedor', 'fecha']
+    list_filter = ['proveedor']
+    search_fields = ['direccion']
+    ordering = ['direccion']
+
+@admin.register(DisponibilidadRetirador)
+class DisponibilidadRetiradorAdmin(admin.ModelAdmin):
+    """Calendario de ausencias; la asignación lo lee en memoria (disponibilidad.py)."""
+    list_display = ['retirador', 'motivo', 'inicio', 'fin', 'observaciones']
+    list_filter = ['motivo', 'inicio']
+    list_select_related = ['retirador']
+    search_fields = ['retirador__nombre', 'observaciones']
+    autocomplete_fields = ['retirador']
+    date_hierarchy = 'inicio'
+
+class ItemManifiestoInline(admin.TabularInline):
+    model = ItemManifiesto
+    fields = ['orden', 'solicitante', 'tipo', 'zona', 'direccion', 'telefono', 'notas', 'hora_solicitud']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(Manifiesto)
+class ManifiestoAdmin(admin.ModelAdmin):
+    """
+    Manifiestos precalculados (ver manifiestos.py). Solo lectura; eliminar uno
+    hace que el PDF del retirador vuelva a generarse al momento.
+    """
+    list_display = ['fecha', 'retirador', 'total', 'generado', 'pdf']
+    list_filter = ['fecha']
+    date_hierarchy = 'fecha'
+    list_select_related = ['retirador']
+    ordering = ['-fecha', 'retirador']
+    inlines = [ItemManifiestoInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # Personalización del sitio admin
 admin.site.site_header = "GestPyLab - Administración"
 admin.site.site_title = "GestPyLab Admin"
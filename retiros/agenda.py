@@ -0,0 +1,212 @@
+"""
+Agenda de retiros con horario de atención
+
+Cada solicitud es una parada con una ventana de atención, la del solicitante
+(``horario_atencion_inicio``/``horario_atencion_fin``) o la jornada completa
+si no la tiene. ``programar`` busca un orden de recorrido en que el retirador
+llegue a cada parada dentro de su ventana, esperando si llega antes de que
+abra, y marca las paradas a las que no alcanza a llegar a tiempo.
+
+Las horas de todo el recorrido se calculan sin bucles de Python: si la
+atención de la parada k empieza en ``a_k = max(a_{k-1} + tramo_k, abre_k)``,
+con ``C`` la suma acumulada de los tramos, ``a = C + max.accumulate(abre - C)``.
+Así cada orden candidato se evalúa con unas pocas operaciones de numpy.
+
+El orden se elige entre tres candidatos, por paradas fuera de horario y luego
+por hora de término: el recorrido más corto (``rutas.ordenar_paradas``) y dos
+recorridos voraces, uno que va a la parada que puede atender antes y otro a
+la que cierra antes. Después se intenta adelantar cada parada fuera de
+horario a una posición anterior. Todo es O(n²) operaciones vectorizadas, con
+un máximo de reubicaciones: un día completo se programa en milisegundos.
+
+Las horas son minutos desde la medianoche. Este módulo importa numpy: solo
+debe importarse dentro de las funciones que lo usan (ver ``retiros/rutas.py``).
+"""
+from datetime import time
+
+import numpy as np
+
+from .rutas import matriz_distancias, matriz_por_zona, ordenar_paradas
+
+MINUTOS_DIA = 24 * 60
+
+# Paradas fuera de horario que se intenta adelantar, como máximo
+MAX_REUBICACIONES = 10
+
+
+def minutos(hora):
+    """Minutos desde la medianoche de un ``datetime.time``."""
+    return hora.hour * 60 + hora.minute + hora.second / 60
+
+
+def hora(minutos_dia):
+    """``datetime.time`` de una hora en minutos (las que pasan de medianoche quedan en 23:59)."""
+    total = min(int(round(minutos_dia)), MINUTOS_DIA - 1)
+    return time(total // 60, total % 60)
+
+
+def ventanas(horarios, inicio_jornada, fin_jornada):
+    """
+    Ventanas de atención, acotadas a la jornada.
+
+    Args:
+        horarios: Iterable de (inicio, fin) ``datetime.time`` o None
+        inicio_jornada, fin_jornada: Minutos desde la medianoche
+
+    Returns:
+        tuple (abre, cierra) de ndarrays en minutos
+    """
+    horarios = list(horarios)
+    abre = np.full(len(horarios), float(inicio_jornada))
+    cierra = np.full(len(horarios), float(fin_jornada))
+    for i, horario in enumerate(horarios):
+        inicio, fin = horario or (None, None)
+        if inicio is not None and fin is not None:
+            abre[i] = max(abre[i], minutos(inicio))
+            cierra[i] = min(cierra[i], minutos(fin))
+    return abre, cierra
+
+
+def minutos_por_km(matriz_km, velocidad_kmh):
+    """Matriz de tiempos de viaje en minutos a partir de distancias en km."""
+    return matriz_km * (60.0 / velocidad_kmh)
+
+
+def minutos_por_zona(zonas, misma_zona, entre_zonas):
+    """Tiempos de viaje cuando solo se conoce la zona de cada parada."""
+    distintas = matriz_por_zona(zonas)
+    viaje = np.where(distintas > 0, float(entre_zonas), float(misma_zona))
+    np.fill_diagonal(viaje, 0.0)
+    return viaje
+
+
+def minutos_de_viaje(latitudes, longitudes, zonas, velocidad_kmh, misma_zona, entre_zonas):
+    """
+    Tiempos de viaje par a par: por distancia en km entre dos paradas con
+    coordenadas y por zona (``minutos_por_zona``) en los pares en que a
+    alguna le faltan. Una parada sin geocodificar no cambia el cálculo de las
+    demás.
+    """
+    viaje = minutos_por_zona(zonas, misma_zona, entre_zonas)
+    con_coordenadas = np.flatnonzero([
+        latitud is not None and longitud is not None for latitud, longitud in zip(latitudes, longitudes)
+    ])
+    if len(con_coordenadas):
+        km = matriz_distancias(
+            [latitudes[i] for i in con_coordenadas], [longitudes[i] for i in con_coordenadas]
+        )
+        viaje[np.ix_(con_coordenadas, con_coordenadas)] = minutos_por_km(km, velocidad_kmh)
+    return viaje
+
+
+def tiempos(orden, viaje, abre, cierra, servicio, inicio):
+    """
+    Horas de llegada y de inicio de atención de las paradas, en el orden del
+    recorrido. Se llega a la primera parada a la hora ``inicio``.
+
+    Returns:
+        tuple (llegada, atencion) de ndarrays, en el orden de ``orden``
+    """
+    orden = np.asarray(orden, dtype=np.intp)
+    if len(orden) == 0:
+        return np.empty(0), np.empty(0)
+    tramos = np.zeros(len(orden))
+    tramos[1:] = servicio + viaje[orden[:-1], orden[1:]]
+    acumulado = np.cumsum(tramos)
+    minimos = abre[orden].astype(float)
+    minimos[0] = max(minimos[0], inicio)
+    atencion = acumulado + np.maximum.accumulate(minimos - acumulado)
+    llegada = np.empty_like(atencion)
+    llegada[0] = inicio
+    llegada[1:] = atencion[:-1] + tramos[1:]
+    return llegada, atencion
+
+
+def _clave(orden, viaje, abre, cierra, servicio, inicio):
+    """(paradas fuera de horario, hora de término): menor es mejor."""
+    if not len(orden):
+        return 0, inicio
+    _, atencion = tiempos(orden, viaje, abre, cierra, servicio, inicio)
+    return int((atencion > cierra[orden]).sum()), float(atencion[-1] + servicio)
+
+
+def _voraz(viaje, abre, cierra, servicio, inicio, por_cierre):
+    n = len(viaje)
+    pendiente = np.ones(n, dtype=bool)
+    orden = []
+    reloj = inicio
+    desde = np.zeros(n)
+    for _ in range(n):
+        # Inicio de atención de cada parada si se fuera a ella ahora
+        atencion = np.maximum(reloj + desde, abre)
+        alcanzable = pendiente & (atencion <= cierra)
+        if not alcanzable.any():
+            break
+        # La que se atiende antes y, en empate, la que cierra antes (o al revés)
+        claves = (np.where(alcanzable, atencion, np.inf), np.where(alcanzable, cierra, np.inf))
+        siguiente = int(np.lexsort(claves if por_cierre else claves[::-1])[0])
+        orden.append(siguiente)
+        pendiente[siguiente] = False
+        reloj = atencion[siguiente] + servicio
+        desde = viaje[siguiente]
+    # Las que ya no se alcanzan quedan al final, en el orden recibido
+    return orden + np.flatnonzero(pendiente).tolist()
+
+
+def _reubicar_tardias(orden, viaje, abre, cierra, servicio, inicio, max_reubicaciones):
+    # Solo se acepta una reubicación que deje menos paradas fuera de horario:
+    # adelantar una que igual queda tarde no ayuda aunque termine antes
+    probadas = set()
+    mejor = _clave(orden, viaje, abre, cierra, servicio, inicio)
+    for _ in range(max_reubicaciones):
+        if mejor[0] == 0:
+            break
+        tardias_antes = mejor[0]
+        _, atencion = tiempos(orden, viaje, abre, cierra, servicio, inicio)
+        tardias = [orden[k] for k in np.flatnonzero(atencion > cierra[orden]) if orden[k] not in probadas]
+        if not tardias:
+            break
+        parada = tardias[0]
+        probadas.add(parada)
+        k = orden.index(parada)
+        resto = orden[:k] + orden[k + 1:]
+        for posicion in range(k):
+            candidato = resto[:posicion] + [parada] + resto[posicion:]
+            clave = _clave(candidato, viaje, abre, cierra, servicio, inicio)
+            if clave[0] < tardias_antes and clave < mejor:
+                mejor, orden = clave, candidato
+    return orden
+
+
+def programar(viaje, abre, cierra, servicio, inicio, max_reubicaciones=MAX_REUBICACIONES):
+    """
+    Orden de recorrido que respeta las ventanas de atención.
+
+    Args:
+        viaje: ndarray (n, n) de minutos de viaje entre paradas
+        abre, cierra: ndarrays (n,) con la ventana de cada parada, en minutos
+        servicio: Minutos que toma cada retiro
+        inicio: Hora de llegada a la primera parada, en minutos
+        max_reubicaciones: Paradas fuera de horario que se intenta adelantar
+
+    Returns:
+        tuple (orden, atencion, a_tiempo): list de índices en orden de
+        recorrido, hora de inicio de atención (minutos) y bool por parada,
+        ambos en el orden del recorrido
+    """
+    n = len(viaje)
+    if n == 0:
+        return [], np.empty(0), np.empty(0, dtype=bool)
+
+    argumentos = (viaje, abre, cierra, servicio, inicio)
+    candidatos = [
+        list(ordenar_paradas(viaje)),
+        _voraz(*argumentos, por_cierre=False),
+        _voraz(*argumentos, por_cierre=True),
+    ]
+    # En empates gana el primero: el recorrido más corto
+    orden = min(candidatos, key=lambda candidato: _clave(candidato, *argumentos))
+    orden = _reubicar_tardias(orden, *argumentos, max_reubicaciones)
+
+    _, atencion = tiempos(orden, *argumentos)
+    return orden, atencion, atencion <= cierra[orden]
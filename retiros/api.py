@@ -2,12 +2,20 @@
 API endpoints para búsqueda y funcionalidades AJAX
 """
 from django.http import JsonResponse
-from django.db.models import Q
-from .models import Solicitante
+from django.views.decorators.http import require_POST
+import json
+from .models import Retirador, Solicitante
+from .routers import solo_lectura
+from .normalizacion import es_telefono
+from . import autocompletado
+from .services import SincronizacionService, SolicitudService
+from .archivo import historial_solicitante as leer_historial
+from django.utils.dateparse import parse_date
 import logging
 
 logger = logging.getLogger(__name__)
 
+@solo_lectura()
 def buscar_solicitantes(request):
     """
     Endpoint para búsqueda dinámica de solicitantes.
@@ -22,47 +30,56 @@ def buscar_solicitantes(request):
                 'message': 'Ingrese al menos 2 caracteres para buscar'
             })
         
-        # Búsqueda optimizada con select_related
-        solicitantes = Solicitante.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(email__icontains=query) |
-            Q(telefono__icontains=query) |
-            Q(direccion_principal__icontains=query)
-        ).select_related('zona')[:10]  # Limitar a 10 resultados
-        
-        results = []
-        for s in solicitantes:
-            # Determinar si tiene datos completos
-            estado = '✓ Completo' if s.tiene_datos_completos else '⚠ Incompleto'
-            
-            results.append({
-                'id': s.id,
-                'nombre': s.nombre,
-                'tipo': s.get_tipo_display(),
-                'zona': s.zona.nombre,
-                'telefono': s.telefono,
-                'email': s.email if s.email else '(Desconocido)',
-                'direccion': s.direccion_principal if s.direccion_principal else '(Desconocida)',
-                'horario': s.horario_completo,
-                'estado': estado,
-                'tiene_datos_completos': s.tiene_datos_completos,
-                # Texto para mostrar en el select
-                'text': f"{s.nombre} - {s.get_tipo_display()} ({s.zona.nombre})"
-            })
+        # Un teléfono (o su terminación) se busca por el índice del número
+        # normalizado; el resto, por nombre, email o dirección, con la caché
+        # de autocompletado (autocompletado.py). Las coincidencias dentro del
+        # texto recorren la tabla: solo si se piden con ?contiene=1
+        contiene = request.GET.get('contiene') == '1'
+        results = autocompletado.buscar(query, _serializar_resultado, contiene=contiene)
         
         return JsonResponse({
             'results': results,
             'count': len(results),
-            'query': query
+            'query': query,
+            'busqueda': 'telefono' if es_telefono(query) else 'texto',
         })
     
     except Exception as e:
-        logger.error(f"Error en búsqueda de solicitantes: {str(e)}")
+        logger.error("Error en búsqueda de solicitantes: %s", e)
         return JsonResponse({
             'error': 'Error al realizar la búsqueda',
             'message': str(e)
         }, status=500)
 
+def _serializar_resultado(s):
+    # Determinar si tiene datos completos
+    estado = '✓ Completo' if s.datos_completos else '⚠ Incompleto'
+    
+    return {
+        'id': s.id,
+        'nombre': s.nombre,
+        'tipo': s.get_tipo_display(),
+        'zona': s.zona.nombre,
+        'telefono': s.telefono,
+        'email': s.email if s.email else '(Desconocido)',
+        'direccion': s.direccion_principal if s.direccion_principal else '(Desconocida)',
+        'horario': s.horario_completo,
+        'estado': estado,
+        'tiene_datos_completos': s.datos_completos,
+        # Texto para mostrar en el select
+        'text': f"{s.nombre} - {s.get_tipo_display()} ({s.zona.nombre})"
+    }
+
+def metricas_autocompletado(request):
+    """
+    Contadores de la caché de autocompletado de este proceso (aciertos,
+    filtrados en memoria, fallos y tasa de aciertos). Solo staff.
+    """
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({'error': 'Solo disponible para staff'}, status=403)
+    return JsonResponse(autocompletado.metricas())
+
+@solo_lectura()
 def obtener_solicitante(request, solicitante_id):
     """
     Obtiene los detalles completos de un solicitante específico.
@@ -88,7 +105,7 @@ def obtener_solicitante(request, solicitante_id):
             'horario_fin': solicitante.horario_atencion_fin.strftime('%H:%M') if solicitante.horario_atencion_fin else None,
             'comentarios_horario': solicitante.comentarios_horario_retiro,
             'horario_completo': solicitante.horario_completo,
-            'tiene_datos_completos': solicitante.tiene_datos_completos
+            'tiene_datos_completos': solicitante.datos_completos
         })
     
     except Solicitante.DoesNotExist:
@@ -97,8 +114,139 @@ def obtener_solicitante(request, solicitante_id):
         }, status=404)
     
     except Exception as e:
-        logger.error(f"Error al obtener solicitante {solicitante_id}: {str(e)}")
+        logger.error("Error al obtener solicitante %s: %s", solicitante_id, e)
         return JsonResponse({
             'error': 'Error al obtener los datos del solicitante',
             'message': str(e)
         }, status=500)
+
+
+@solo_lectura()
+def historial_solicitante(request, solicitante_id):
+    """
+    Historial de solicitudes de un solicitante, incluidas las archivadas.
+    Parámetros opcionales: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&limite=100 (entre 1 y 500)
+    """
+    try:
+        desde = parse_date(request.GET.get('desde', '')) if request.GET.get('desde') else None
+        hasta = parse_date(request.GET.get('hasta', '')) if request.GET.get('hasta') else None
+        limite = max(1, min(int(request.GET.get('limite', 100)), 500))
+    except ValueError:
+        return JsonResponse({
+            'error': 'Parámetros inválidos: desde/hasta en formato AAAA-MM-DD y limite numérico'
+        }, status=400)
+    
+    try:
+        filas = leer_historial(solicitante_id, desde, hasta, limite)
+        
+        return JsonResponse({
+            'solicitante_id': solicitante_id,
+            'solicitudes': [
+                {
+                    'id': fila['id'],
+                    'fecha_retiro': fila['fecha_retiro'].isoformat(),
+                    'direccion_retiro': fila['direccion_retiro'],
+                    'estado': fila['estado'],
+                    'retirador_asignado_id': fila['retirador_asignado_id'],
+                    'notas': fila['notas'],
+                    'archivada': fila['archivada'],
+                }
+                for fila in filas
+            ],
+            'count': len(filas),
+        })
+    
+    except Exception as e:
+        logger.error("Error al obtener historial del solicitante %s: %s", solicitante_id, e)
+        return JsonResponse({
+            'error': 'Error al obtener el historial',
+            'message': str(e)
+        }, status=500)
+
+
+def _serializar_solicitud(solicitud):
+    return {
+        'id': solicitud.id,
+        'solicitante': {
+            'id': solicitud.solicitante.id,
+            'nombre': solicitud.solicitante.nombre,
+            'tipo': solicitud.solicitante.get_tipo_display(),
+            'telefono': solicitud.solicitante.telefono,
+            'zona': solicitud.solicitante.zona.nombre,
+        },
+        'direccion_retiro': solicitud.direccion_retiro,
+        'fecha_retiro': solicitud.fecha_retiro.isoformat(),
+        'hora_solicitud': solicitud.hora_solicitud.strftime('%H:%M'),
+        'estado': solicitud.estado,
+        'notas': solicitud.notas,
+        'retirador_asignado_id': solicitud.retirador_asignado_id,
+        'secuencia': solicitud.secuencia,
+        'fecha_actualizacion': solicitud.fecha_actualizacion.isoformat(),
+    }
+
+@solo_lectura()
+def sincronizar_retirador(request, retirador_id):
+    """
+    Sincronización incremental de la lista de un retirador.
+    Con ?token=<token anterior> retorna solo lo que cambió desde entonces.
+    """
+    try:
+        retirador = Retirador.objects.get(id=retirador_id)
+        cambios = SincronizacionService.cambios_retirador(retirador, request.GET.get('token'))
+        
+        return JsonResponse({
+            'token': cambios['token'],
+            'completo': cambios['completo'],
+            'solicitudes': [_serializar_solicitud(s) for s in cambios['solicitudes']],
+            'eliminadas': cambios['eliminadas'],
+        })
+    
+    except Retirador.DoesNotExist:
+        return JsonResponse({
+            'error': 'Retirador no encontrado'
+        }, status=404)
+    
+    except Exception as e:
+        logger.error("Error al sincronizar retirador %s: %s", retirador_id, e)
+        return JsonResponse({
+            'error': 'Error al sincronizar la lista',
+            'message': str(e)
+        }, status=500)
+
+@require_POST
+def completar_lote(request):
+    """
+    Recibe un lote de cambios de estado hechos sin conexión por un retirador.
+    Cuerpo JSON: {"eventos": [{"id": 12, "estado": "completado", "fecha": "2025-10-20T12:41:00-03:00"}, ...]}
+    Requiere el token CSRF (cabecera X-CSRFToken).
+    """
+    try:
+        eventos = json.loads(request.body).get('eventos')
+    except (ValueError, AttributeError):
+        eventos = None
+
+    if not isinstance(eventos, list):
+        return JsonResponse({
+            'error': 'Se espera un objeto JSON con la lista "eventos"'
+        }, status=400)
+
+    if len(eventos) > SolicitudService.MAX_LOTE:
+        return JsonResponse({
+            'error': f'El lote no puede tener más de {SolicitudService.MAX_LOTE} eventos'
+        }, status=400)
+
+    try:
+        resultados = SolicitudService.aplicar_lote_estados(eventos)
+        
+        return JsonResponse({
+            'resultados': resultados,
+            'aplicados': sum(1 for r in resultados if r['resultado'] == 'aplicado'),
+            'conflictos': sum(1 for r in resultados if r['resultado'] == 'conflicto'),
+        })
+    
+    except Exception as e:
+        logger.error("Error al aplicar lote de estados: %s", e)
+        return JsonResponse({
+            'error': 'Error al aplicar el lote',
+            'message': str(e)
+        }, status=500)
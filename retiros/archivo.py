@@ -0,0 +1,164 @@
+"""
+Archivo de solicitudes antiguas
+
+``archivar_lote`` mueve solicitudes completadas o canceladas anteriores a una
+fecha de corte fuera de ``SolicitudRetiro``, a la tabla
+``SolicitudRetiroArchivada`` o a archivos JSONL comprimidos por mes
+(``solicitudes-AAAA-MM.jsonl.gz``). Cada lote es una transacción corta (un
+SELECT, un INSERT o una escritura de archivo y un DELETE), así el comando
+``archivar_solicitudes`` nunca bloquea la tabla por mucho tiempo.
+
+``historial_solicitante`` lee la tabla viva y el archivo como si fueran una
+sola, para las pantallas de historial.
+"""
+from pathlib import Path
+import gzip
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from .estados import ESTADOS_FINALES
+from .models import SolicitudRetiro, SolicitudRetiroArchivada
+
+logger = logging.getLogger(__name__)
+
+CAMPOS = [
+    'id', 'solicitante_id', 'usar_direccion_solicitante', 'direccion_retiro', 'fecha_solicitud',
+    'hora_solicitud', 'fecha_retiro', 'retirador_asignado_id', 'estado', 'notas', 'fecha_actualizacion',
+]
+
+
+def directorio_archivo():
+    return Path(getattr(settings, 'ARCHIVO_SOLICITUDES_DIR', Path(settings.BASE_DIR) / 'archivo'))
+
+
+def candidatas(corte):
+    """Solicitudes que se pueden archivar: finalizadas y con fecha de retiro anterior a ``corte``."""
+    return SolicitudRetiro.objects.filter(estado__in=ESTADOS_FINALES, fecha_retiro__lt=corte)
+
+
+def ruta_mes(directorio, anio, mes):
+    return Path(directorio) / f'solicitudes-{anio:04d}-{mes:02d}.jsonl.gz'
+
+
+def _escribir_jsonl(filas, directorio):
+    por_mes = {}
+    for fila in filas:
+        por_mes.setdefault((fila['fecha_retiro'].year, fila['fecha_retiro'].month), []).append(fila)
+    Path(directorio).mkdir(parents=True, exist_ok=True)
+    for (anio, mes), filas_mes in por_mes.items():
+        # 'at' agrega un miembro gzip nuevo: el archivo sigue siendo válido
+        with gzip.open(ruta_mes(directorio, anio, mes), 'at', encoding='utf-8') as archivo:
+            for fila in filas_mes:
+                archivo.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+
+
+def archivar_lote(corte, tamano=1000, directorio=None):
+    """
+    Mueve un lote de hasta ``tamano`` solicitudes archivables.
+
+    Args:
+        corte: Fecha; se archivan las de fecha_retiro anterior
+        tamano: Filas por lote (y por transacción)
+        directorio: Si se indica, archiva en JSONL comprimidos en lugar de la tabla
+
+    Returns:
+        int: número de solicitudes movidas (0 cuando no quedan)
+    """
+    with transaction.atomic():
+        filas = list(candidatas(corte).order_by('id').values(*CAMPOS)[:tamano])
+        if not filas:
+            return 0
+        ids = [fila['id'] for fila in filas]
+
+        if directorio is None:
+            SolicitudRetiroArchivada.objects.bulk_create(
+                [SolicitudRetiroArchivada(**fila) for fila in filas], ignore_conflicts=True
+            )
+        else:
+            # Si el DELETE fallara, el próximo lote vuelve a escribir estas
+            # filas; leer_archivo_mes descarta los ids repetidos
+            _escribir_jsonl(filas, directorio)
+
+        # DELETE directo, sin señales ni Collector: estas solicitudes ya no
+        # están en ninguna lista sincronizada (no necesitan BajaSolicitud) y
+        # nada las referencia con restricción de clave foránea
+        borradas = SolicitudRetiro.objects.filter(id__in=ids)
+        borradas._raw_delete(borradas.db)
+
+    logger.info("Archivadas %s solicitudes (ids %s a %s)", len(filas), ids[0], ids[-1])
+    return len(filas)
+
+
+def _parsear_fila(fila):
+    fila['fecha_solicitud'] = parse_datetime(fila['fecha_solicitud'])
+    fila['hora_solicitud'] = parse_time(fila['hora_solicitud'])
+    fila['fecha_retiro'] = parse_date(fila['fecha_retiro'])
+    fila['fecha_actualizacion'] = parse_datetime(fila['fecha_actualizacion'])
+    return fila
+
+
+def leer_archivo_mes(directorio, anio, mes, solicitante_id=None):
+    """Filas de un archivo mensual (sin ids repetidos), o [] si no existe."""
+    ruta = ruta_mes(directorio, anio, mes)
+    if not ruta.exists():
+        return []
+    filas = {}
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        for linea in archivo:
+            fila = json.loads(linea)
+            if solicitante_id is None or fila['solicitante_id'] == solicitante_id:
+                filas[fila['id']] = _parsear_fila(fila)
+    return list(filas.values())
+
+
+def _meses(desde, hasta):
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        yield anio, mes
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def historial_solicitante(solicitante_id, desde=None, hasta=None, limite=100):
+    """
+    Solicitudes de un solicitante, de la más reciente a la más antigua, de la
+    tabla viva y de la tabla de archivo en una sola consulta (UNION ALL).
+
+    Con ``desde`` y ``hasta`` también se leen los archivos JSONL de esos meses,
+    si existen (acotado para no recorrer todo el archivo).
+
+    Returns:
+        list de dicts con las columnas de CAMPOS y 'archivada'
+    """
+    filtros = {'solicitante_id': solicitante_id}
+    if desde:
+        filtros['fecha_retiro__gte'] = desde
+    if hasta:
+        filtros['fecha_retiro__lte'] = hasta
+
+    vivas = SolicitudRetiro.objects.filter(**filtros).values(
+        *CAMPOS, archivada=Value(False, output_field=BooleanField())
+    )
+    archivadas = SolicitudRetiroArchivada.objects.filter(**filtros).values(
+        *CAMPOS, archivada=Value(True, output_field=BooleanField())
+    )
+    filas = list(vivas.union(archivadas, all=True).order_by('-fecha_retiro', '-id')[:limite])
+
+    directorio = directorio_archivo()
+    if desde and hasta and directorio.exists():
+        ids = {fila['id'] for fila in filas}
+        for anio, mes in _meses(desde, hasta):
+            filas.extend(
+                dict(fila, archivada=True)
+                for fila in leer_archivo_mes(directorio, anio, mes, solicitante_id)
+                if fila['id'] not in ids and desde <= fila['fecha_retiro'] <= hasta
+            )
+        filas.sort(key=lambda fila: (fila['fecha_retiro'], fila['id']), reverse=True)
+        filas = filas[:limite]
+
+    return filas
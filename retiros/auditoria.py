@@ -0,0 +1,152 @@
+"""
+Registro de auditoría de SolicitudRetiro
+
+Cada creación, asignación, reasignación, completado o cancelación agrega un
+``EventoSolicitud`` (tabla de solo inserción). Los eventos no se escriben uno
+a uno: se acumulan durante la petición (``AuditoriaMiddleware``) o el bloque
+``agrupar_eventos`` y se guardan al final con un solo ``bulk_create``, así
+auditar cuesta un INSERT por petición, también en las acciones masivas.
+Fuera de un bloque, ``registrar`` escribe de inmediato.
+
+Los eventos se registran después de que la escritura tuvo éxito, y solo pasan
+al bloque cuando la transacción del cambio se confirma
+(``transaction.on_commit``): si se revierte, también un savepoint, sus eventos
+se descartan. El bloque se guarda también al confirmarse la transacción en la
+que termina (de inmediato fuera de ``atomic``), después de sus eventos: solo
+contiene cambios confirmados, así que se guarda aunque la petición falle
+después, y si esa transacción se revierte se descarta entero.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import COLUMNAS_HISTORIAL, EventoSolicitud
+
+logger = logging.getLogger(__name__)
+
+_pendientes = ContextVar('eventos_pendientes', default=None)
+
+# Estado destino -> tipo de evento (asignado depende del estado de origen)
+TIPO_POR_ESTADO = {
+    'completado': 'completada',
+    'cancelado': 'cancelada',
+    'pendiente': 'desasignada',
+}
+
+
+class EventosPendientes:
+    """
+    Eventos acumulados en la petición o bloque actual.
+
+    ``usuario`` puede ser un texto o una función; se evalúa solo al guardar y
+    solo si hay eventos (evita leer la sesión en peticiones que no escriben).
+    """
+
+    def __init__(self, usuario=''):
+        self.eventos = []
+        self.usuario = usuario
+
+
+def tipo_evento(desde, hacia):
+    """Tipo de evento de un cambio de estado (o de retirador, si el estado no cambia)."""
+    if hacia == 'asignado':
+        return 'reasignada' if desde == 'asignado' else 'asignada'
+    if hacia == desde:
+        return 'reasignada'
+    return TIPO_POR_ESTADO[hacia]
+
+
+def registrar(cambios, estado_nuevo, tipo=None):
+    """
+    Registra un evento por solicitud.
+
+    Args:
+        cambios: iterable de (solicitud_id, estado_anterior, retirador_id)
+        estado_nuevo: Estado después del cambio
+        tipo: Tipo de evento (por defecto se deduce de los estados)
+    """
+    ahora = timezone.now()
+    eventos = [
+        EventoSolicitud(
+            solicitud_id=solicitud_id,
+            tipo=tipo or tipo_evento(estado_anterior, estado_nuevo),
+            estado_anterior=estado_anterior or '',
+            estado_nuevo=estado_nuevo,
+            retirador_id=retirador_id,
+            fecha=ahora,
+        )
+        for solicitud_id, estado_anterior, retirador_id in cambios
+    ]
+    pendientes = _pendientes.get()
+    # Sin transacción se ejecuta de inmediato; dentro, al confirmarse
+    transaction.on_commit(lambda: _agregar(pendientes, eventos))
+
+
+def _agregar(pendientes, eventos):
+    if pendientes is None:
+        _guardar(eventos, '')
+    else:
+        pendientes.eventos.extend(eventos)
+
+
+def _cerrar(pendientes):
+    _guardar(pendientes.eventos, pendientes.usuario)
+
+
+def _guardar(eventos, usuario):
+    if not eventos:
+        return
+    try:
+        usuario = usuario() if callable(usuario) else usuario
+        for evento in eventos:
+            evento.usuario = usuario
+        EventoSolicitud.objects.bulk_create(eventos)
+    except Exception as e:
+        # El cambio ya está guardado: no se hace fallar la petición por la auditoría
+        logger.error("Error al guardar %s eventos de auditoría: %s", len(eventos), e)
+
+
+@contextmanager
+def agrupar_eventos(usuario=''):
+    """
+    Acumula los eventos registrados dentro del bloque y los guarda al salir
+    con un solo INSERT, cuando se confirma la transacción en la que termina.
+    Si ya hay un bloque activo, guarda el externo. Solo contiene eventos de
+    cambios confirmados, así que se guardan también si el bloque termina con
+    una excepción.
+
+        with agrupar_eventos(usuario='archivar_solicitudes'):
+            ...
+    """
+    externo = _pendientes.get()
+    if externo is not None:
+        yield externo
+        return
+
+    pendientes = EventosPendientes(usuario)
+    token = _pendientes.set(pendientes)
+    try:
+        yield pendientes
+    finally:
+        _pendientes.reset(token)
+        # Se registra después de los eventos del bloque: on_commit los ejecuta en orden
+        transaction.on_commit(lambda: _cerrar(pendientes))
+
+
+def historial(solicitud_id):
+    """Eventos de una solicitud, en orden (índice (solicitud, fecha))."""
+    return EventoSolicitud.objects.filter(solicitud_id=solicitud_id).order_by('fecha').values(
+        'fecha', *COLUMNAS_HISTORIAL
+    )
+
+
+def eventos_del_dia(dia):
+    """Eventos de un día local, en orden (índice por fecha)."""
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return EventoSolicitud.objects.filter(
+        fecha__gte=inicio, fecha__lt=inicio + timedelta(days=1)
+    ).order_by('fecha').values('fecha', 'solicitud', *COLUMNAS_HISTORIAL)
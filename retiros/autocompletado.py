@@ -0,0 +1,196 @@
+"""
+Caché de autocompletado de solicitantes
+
+El buscador del formulario consulta la API 300 ms después de cada tecla:
+"veter", "veteri" y "veterin" llegan como tres búsquedas seguidas, cada una
+más larga que la anterior. Los resultados se guardan por clave de búsqueda
+(``clave_busqueda``: sin tildes ni mayúsculas), así repetir una búsqueda no
+consulta la base de datos.
+
+Para una clave nueva se leen en una consulta, por el índice de cada clave,
+todos los solicitantes cuyo nombre, dirección o email empieza por ella (el
+conjunto de candidatos). Si son ``AUTOCOMPLETADO_MAX_CANDIDATOS`` o menos, el
+conjunto queda en memoria: todo solicitante que coincide con una búsqueda más
+larga también coincide con la más corta, así "veteri" y "veterin" se responden
+filtrando en memoria los candidatos de "veter", sin consultas. Con más
+candidatos (una búsqueda muy corta) se usa
+``SolicitanteService.buscar_solicitantes`` y se guarda solo su resultado. El
+orden es el mismo.
+
+Las búsquedas de teléfono no pasan por la caché: ya son una consulta exacta o
+un rango sobre el índice (normalizacion.py). Tampoco las que piden
+coincidencias dentro del texto (``contiene``), que van al servicio.
+
+La caché es del proceso, como el grafo de zonas (zonas.py). Cada cambio de un
+solicitante o una zona (señales de models.py y los cambios masivos de
+``SolicitanteQuerySet``) la descarta y abre una generación nueva: una lectura
+que empezó en la generación anterior no se guarda, aunque termine después.
+Los demás procesos la descartan al confirmarse la transacción, con el
+contador compartido de invalidacion.py. Además se descarta a los
+``AUTOCOMPLETADO_CACHE_SEGUNDOS``.
+"""
+from collections import OrderedDict
+import threading
+from time import monotonic
+
+from django.conf import settings
+
+from . import invalidacion
+from .models import Solicitante
+from .normalizacion import clave_busqueda, es_telefono, filtro_prefijo
+from .routers import leer_de_replica
+
+# Búsquedas distintas con resultado en memoria, como máximo (se descartan las más antiguas)
+MAX_RESULTADOS = 1000
+# Conjuntos de candidatos en memoria, como máximo
+MAX_CONJUNTOS = 64
+# Clave del contador de invalidaciones en la caché de Django
+CLAVE_GENERACION = 'retiros:autocompletado:generacion'
+
+_lock = threading.Lock()
+_cache = {
+    'generacion': 0,
+    'compartida': None,
+    'vence': 0.0,
+    'resultados': OrderedDict(),
+    'candidatos': OrderedDict(),
+}
+_metricas = {'aciertos': 0, 'filtrados': 0, 'fallos': 0, 'sin_cache': 0, 'invalidaciones': 0}
+
+
+def _guardar(cache, clave, valor, maximo):
+    cache[clave] = valor
+    cache.move_to_end(clave)
+    while len(cache) > maximo:
+        cache.popitem(last=False)
+
+
+def _buscar_en(clave, candidatos):
+    """
+    Candidatos que empiezan por ``clave`` en algún campo, en su orden
+    (clave del nombre, id, como los resultados del servicio).
+    """
+    return [c for c in candidatos if any(k.startswith(clave) for k in c[2])]
+
+
+def _vigente(compartida):
+    """
+    Descarta la caché si venció o si otro proceso publicó una invalidación
+    (``compartida`` distinta). Debe llamarse con ``_lock`` tomado.
+    """
+    if monotonic() >= _cache['vence'] or compartida != _cache['compartida']:
+        _cache['compartida'] = compartida
+        _cache['generacion'] += 1
+        _cache['resultados'].clear()
+        _cache['candidatos'].clear()
+        _cache['vence'] = monotonic() + getattr(settings, 'AUTOCOMPLETADO_CACHE_SEGUNDOS', 60)
+    return _cache['generacion']
+
+
+def _cargar_candidatos(clave, serializar):
+    """Candidatos de ``clave`` ordenados, o None si superan el máximo."""
+    maximo = getattr(settings, 'AUTOCOMPLETADO_MAX_CANDIDATOS', 500)
+    solicitantes = list(leer_de_replica(Solicitante.objects.filter(
+        filtro_prefijo('nombre_busqueda', clave) |
+        filtro_prefijo('email_busqueda', clave) |
+        filtro_prefijo('direccion_busqueda', clave)
+    ).select_related('zona'))[:maximo + 1])
+    if len(solicitantes) > maximo:
+        return None
+    return sorted(
+        (s.nombre_busqueda, s.id, (s.nombre_busqueda, s.direccion_busqueda, s.email_busqueda), serializar(s))
+        for s in solicitantes
+    )
+
+
+def buscar(query, serializar, limite=10, contiene=False):
+    """
+    Resultados de autocompletado de ``query``, los mismos que
+    ``SolicitanteService.buscar_solicitantes``.
+
+    Args:
+        query: Texto de búsqueda
+        serializar: Función que convierte un Solicitante en su resultado (se guarda ya convertido)
+        limite: Máximo de resultados
+        contiene: Incluir coincidencias dentro del texto (sin caché)
+
+    Returns:
+        list de resultados de ``serializar``
+    """
+    from .services import SolicitanteService
+
+    if contiene or es_telefono(query):
+        with _lock:
+            _metricas['sin_cache'] += 1
+        return [serializar(s) for s in SolicitanteService.buscar_solicitantes(query, limite, contiene)]
+
+    clave = clave_busqueda(query)
+    if not clave:
+        return []
+    llave = (clave, limite)
+    compartida = invalidacion.generacion(CLAVE_GENERACION)
+    with _lock:
+        generacion = _vigente(compartida)
+        resultados = _cache['resultados'].get(llave)
+        if resultados is not None:
+            _cache['resultados'].move_to_end(llave)
+            _metricas['aciertos'] += 1
+            return list(resultados)
+        # El conjunto de candidatos guardado de la búsqueda más larga que sea prefijo de esta
+        base = next(
+            (_cache['candidatos'][clave[:n]] for n in range(len(clave), 0, -1) if clave[:n] in _cache['candidatos']),
+            None,
+        )
+
+    if base is not None:
+        candidatos = _buscar_en(clave, base)
+        tipo = 'filtrados'
+    else:
+        candidatos = _cargar_candidatos(clave, serializar)
+        tipo = 'fallos'
+
+    if candidatos is None:
+        resultados = [serializar(s) for s in SolicitanteService.buscar_solicitantes(query, limite)]
+    else:
+        resultados = [c[3] for c in _buscar_en(clave, candidatos)[:limite]]
+
+    with _lock:
+        _metricas[tipo] += 1
+        if _cache['generacion'] == generacion:
+            if candidatos is not None:
+                _guardar(_cache['candidatos'], clave, candidatos, MAX_CONJUNTOS)
+            _guardar(_cache['resultados'], llave, resultados, MAX_RESULTADOS)
+    return list(resultados)
+
+
+def invalidar():
+    """
+    Descarta la caché y abre una generación nueva. Los demás procesos la
+    descartan cuando se confirma la transacción del cambio: antes leerían
+    los datos anteriores.
+    """
+    with _lock:
+        _cache['generacion'] += 1
+        _cache['resultados'].clear()
+        _cache['candidatos'].clear()
+        _metricas['invalidaciones'] += 1
+    invalidacion.publicar(CLAVE_GENERACION)
+
+
+def metricas():
+    """
+    Contadores de la caché desde que arrancó el proceso.
+
+    ``aciertos`` son búsquedas repetidas, ``filtrados`` las respondidas en
+    memoria con los candidatos de una búsqueda más corta y ``fallos`` las que
+    consultaron la base de datos. La tasa de aciertos cuenta las dos primeras.
+    """
+    with _lock:
+        datos = dict(_metricas)
+        datos['generacion'] = _cache['generacion']
+        datos['resultados_en_cache'] = len(_cache['resultados'])
+        datos['conjuntos_en_cache'] = len(_cache['candidatos'])
+    consultas = datos['aciertos'] + datos['filtrados'] + datos['fallos']
+    datos['consultas'] = consultas
+    datos['tasa_aciertos'] = round((datos['aciertos'] + datos['filtrados']) / consultas, 4) if consultas else None
+    return datos
@@ -0,0 +1,20 @@
+"""
+Benchmarks de rendimiento de GestPyLab
+
+Se ejecutan con `python manage.py benchmark` (sobre una base de datos de
+prueba desechable) o como parte de los tests (retiros/tests/test_benchmarks.py).
+"""
+from .arranque import MODULOS_PROHIBIDOS, comparar_arranque, formatear_arranque, medir_arranque
+from .conexiones import ahorro_por_peticion, es_bd_en_memoria, medir_conexiones
+from .datos import ESCALAS, sembrar_datos
+from .rutas import formatear_agenda, formatear_rutas, medir_agenda, medir_rutas
+from .suite import (
+    BASELINE_PATH,
+    CASOS,
+    BenchmarkError,
+    cargar_baseline,
+    comparar_con_baseline,
+    ejecutar_suite,
+    formatear_tabla,
+    guardar_baseline,
+)
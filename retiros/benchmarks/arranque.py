@@ -0,0 +1,133 @@
+"""
+Benchmark del arranque de un worker con ``python -X importtime``
+
+Cada medición lanza un intérprete nuevo que hace lo mismo que un worker de
+gunicorn al arrancar (``get_wsgi_application()``, que ejecuta ``django.setup()``
+y carga los middlewares) y resuelve una URL, lo que importa el urlconf y con
+él todas las vistas.
+"""
+from pathlib import Path
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Módulos pesados que solo deben cargarse cuando se usan (dentro de la vista
+# o del código que los necesita), nunca en el arranque
+MODULOS_PROHIBIDOS = ('reportlab', 'numpy', 'cProfile', 'pstats')
+
+SCRIPT_ARRANQUE = """
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import resolve
+resolve('/')
+"""
+
+_LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parsear_importtime(salida):
+    """
+    Parsea la salida de ``-X importtime``.
+
+    Returns:
+        dict modulo -> (propio_us, acumulado_us, nivel); nivel 0 son los
+        módulos importados directamente por el script
+    """
+    modulos = {}
+    for linea in salida.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            modulos[nombre] = (int(propio), int(acumulado), (len(sangria) - 1) // 2)
+    return modulos
+
+
+def _ejecutar_importtime():
+    entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT_ARRANQUE],
+        cwd=Path(settings.BASE_DIR),
+        env=entorno,
+        capture_output=True,
+        text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"El arranque falló:\n{proceso.stderr[-2000:]}")
+    return parsear_importtime(proceso.stderr)
+
+
+def medir_arranque(repeticiones=5):
+    """
+    Mide el tiempo de importación del arranque de un worker.
+
+    Se toma la mejor de ``repeticiones`` ejecuciones, ya que el ruido (caché
+    de disco, otros procesos) solo puede sumar tiempo.
+
+    Returns:
+        dict con ``total_ms``, ``modulos`` (cantidad importada),
+        ``prohibidos`` (módulos de MODULOS_PROHIBIDOS cargados) y ``retiros``
+        (ms acumulados por módulo de la app)
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        modulos = _ejecutar_importtime()
+        total = sum(propio for propio, _, _ in modulos.values())
+        if mejor is None or total < mejor[0]:
+            mejor = (total, modulos)
+
+    total, modulos = mejor
+    prohibidos = sorted(
+        nombre for nombre in modulos
+        if any(nombre == p or nombre.startswith(p + '.') for p in MODULOS_PROHIBIDOS)
+    )
+    return {
+        'total_ms': round(total / 1000, 1),
+        'modulos': len(modulos),
+        'prohibidos': prohibidos,
+        'retiros': {
+            nombre: round(acumulado / 1000, 1)
+            for nombre, (_, acumulado, _) in sorted(modulos.items())
+            if nombre == 'retiros' or nombre.startswith('retiros.')
+        },
+    }
+
+
+def comparar_arranque(resultado, baseline, tolerancia=0.25, margen_ms=2.0):
+    """
+    Regresiones del arranque: cualquier módulo prohibido cargado, o un tiempo
+    total mayor que ``baseline * (1 + tolerancia) + margen_ms``.
+
+    Returns:
+        list de mensajes, uno por regresión
+    """
+    regresiones = [
+        f"arranque: importa {nombre}; debe importarse de forma diferida"
+        for nombre in resultado['prohibidos']
+        if '.' not in nombre
+    ]
+    if baseline:
+        limite = baseline['total_ms'] * (1 + tolerancia) + margen_ms
+        if resultado['total_ms'] > limite:
+            regresiones.append(
+                f"arranque: {resultado['total_ms']:.1f} ms supera el límite de {limite:.1f} ms "
+                f"(baseline {baseline['total_ms']:.1f} ms)"
+            )
+    return regresiones
+
+
+def formatear_arranque(resultado, baseline=None):
+    """Resumen de texto del arranque con el tiempo acumulado de cada módulo de la app."""
+    lineas = [f"Importación total: {resultado['total_ms']:.1f} ms ({resultado['modulos']} módulos)"]
+    if baseline:
+        lineas[0] += f" | baseline {baseline['total_ms']:.1f} ms ({baseline['modulos']} módulos)"
+    ancho = max((len(nombre) for nombre in resultado['retiros']), default=0)
+    lineas.extend(
+        f"  {nombre.ljust(ancho)}  {ms:8.1f} ms"
+        for nombre, ms in sorted(resultado['retiros'].items(), key=lambda x: -x[1])
+    )
+    if resultado['prohibidos']:
+        lineas.append(f"Módulos prohibidos cargados: {', '.join(resultado['prohibidos'])}")
+    return '\n'.join(lineas)
@@ -0,0 +1,82 @@
+"""
+Benchmark del costo de abrir una conexión por petición
+
+Ejecuta el mismo caso (por defecto ``api_obtener_solicitante``, el endpoint más
+pequeño, donde la conexión pesa más) con una conexión nueva por petición
+(``CONN_MAX_AGE = 0``) y con la reutilización configurada en ``settings``.
+"""
+from django.db import close_old_connections, connection
+from django.test import Client
+
+from .suite import CASOS, Caso, medir_caso, sin_logs_info
+
+CASO_CONEXIONES = 'api_obtener_solicitante'
+
+
+def _modos():
+    """Modos a comparar: nombre -> CONN_MAX_AGE."""
+    configurado = connection.settings_dict['CONN_MAX_AGE']
+    if connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        # Con pool, cerrar la conexión la devuelve al pool: ambos modos lo usan
+        return {'pool': 0}
+    return {
+        'conexion_por_peticion': 0,
+        'persistente': configurado if configurado else None,
+    }
+
+
+def _como_en_produccion(caso):
+    """
+    El cliente de pruebas desconecta ``close_old_connections`` de las señales
+    request_started/request_finished; aquí se llama explícitamente antes y
+    después de cada petición, como hace el handler WSGI.
+    """
+    def preparar(ctx):
+        funcion = caso.preparar(ctx)
+
+        def peticion():
+            close_old_connections()
+            try:
+                return funcion()
+            finally:
+                close_old_connections()
+        return peticion
+    return Caso(caso.nombre, preparar, caso.status)
+
+
+def es_bd_en_memoria():
+    """Django nunca cierra una base SQLite en memoria; ahí el benchmark no mide nada."""
+    return connection.vendor == 'sqlite' and connection.is_in_memory_db()
+
+
+def medir_conexiones(ctx, iteraciones=20, caso=CASO_CONEXIONES):
+    """
+    Mide un caso con cada modo de conexión.
+
+    ``CONN_MAX_AGE`` se lee al abrir la conexión, así que se cambia en
+    ``settings_dict`` y se cierra la conexión actual antes de cada modo.
+
+    Returns:
+        dict modo -> resultados de medir_caso
+    """
+    caso = _como_en_produccion(next(c for c in CASOS if c.nombre == caso))
+    ctx = dict(ctx, client=Client())
+    original = connection.settings_dict['CONN_MAX_AGE']
+    resultados = {}
+    try:
+        with sin_logs_info():
+            for modo, max_age in _modos().items():
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                connection.close()
+                resultados[modo] = medir_caso(caso, ctx, iteraciones)
+    finally:
+        connection.settings_dict['CONN_MAX_AGE'] = original
+        connection.close()
+    return resultados
+
+
+def ahorro_por_peticion(resultados):
+    """Diferencia de p50 (ms) entre una conexión por petición y la reutilización."""
+    if 'conexion_por_peticion' not in resultados or 'persistente' not in resultados:
+        return None
+    return resultados['conexion_por_peticion']['p50_ms'] - resultados['persistente']['p50_ms']
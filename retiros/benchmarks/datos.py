@@ -0,0 +1,52 @@
+"""
+Dataset parametrizado para los benchmarks
+"""
+from ..generador import GeneradorDatos
+from ..models import marca_secuencia
+from ..services import SincronizacionService
+
+# Tamaños del dataset. 'pequena' es la que usan los tests; las demás
+# sirven para medir con el comando `benchmark --escala ...`
+ESCALAS = {
+    'pequena': {'zonas': 4, 'retiradores': 6, 'solicitantes': 200, 'solicitudes_dia': 40, 'dias_historial': 20},
+    'mediana': {'zonas': 10, 'retiradores': 30, 'solicitantes': 5000, 'solicitudes_dia': 300, 'dias_historial': 60},
+    'grande': {'zonas': 30, 'retiradores': 150, 'solicitantes': 50000, 'solicitudes_dia': 1500, 'dias_historial': 120},
+}
+
+# Término usado por el caso de búsqueda (coincide con parte de los nombres)
+TERMINO_BUSQUEDA = 'gonz'
+
+
+def sembrar_datos(escala='pequena', semilla=42):
+    """
+    Crea zonas, retiradores, solicitantes y solicitudes (del día y de historial)
+    con el generador de datos sintéticos.
+
+    Args:
+        escala: Clave de ESCALAS
+        semilla: Semilla del generador aleatorio (el dataset es determinista)
+
+    Returns:
+        dict con los ids que usan los casos del benchmark
+    """
+    params = ESCALAS[escala]
+    generador = GeneradorDatos(semilla=semilla)
+    creados = generador.generar(
+        zonas=params['zonas'],
+        retiradores=params['retiradores'],
+        solicitantes=params['solicitantes'],
+        solicitudes=params['solicitudes_dia'] * params['dias_historial'],
+        dias=params['dias_historial'],
+        solicitudes_hoy=params['solicitudes_dia'],
+    )
+
+    return {
+        'escala': escala,
+        'hoy': generador.hoy,
+        'zona_id': creados['zona_ids'][0],
+        'retirador_id': creados['retirador_ids'][1],
+        'solicitante_id': creados['solicitante_ids'][0],
+        'termino_busqueda': TERMINO_BUSQUEDA,
+        # Token de una sincronización ya hecha: el caso delta solo recibe cambios
+        'token_sincronizacion': SincronizacionService.generar_token(generador.hoy, marca_secuencia()),
+    }
@@ -0,0 +1,120 @@
+"""
+Benchmark del orden de recorrido (retiros/rutas.py)
+
+Sobre paradas sintéticas repartidas en el Gran Valparaíso, compara el largo
+del recorrido en el orden de ingreso (``hora_solicitud``, sin relación con la
+ubicación) con el de ``ordenar_paradas``, y mide cuánto tarda en ordenarlas.
+
+``medir_agenda`` agrega horarios de atención a parte de las paradas y compara
+cuántas quedan fuera de horario en el recorrido más corto y en el de
+``agenda.programar``, y cuánto tarda este.
+"""
+from time import perf_counter
+import random
+
+from .suite import percentil
+
+LATITUDES = (-33.10, -32.95)
+LONGITUDES = (-71.65, -71.40)
+
+# Jornada 09:00-18:00; una de cada tres paradas atiende solo 2 a 3 horas
+JORNADA = (9 * 60, 18 * 60)
+FRACCION_CON_HORARIO = 1 / 3
+
+
+def medir_rutas(paradas=200, repeticiones=20, semilla=42):
+    """
+    Returns:
+        dict con ``paradas``, ``p50_ms``, ``max_ms`` (tiempo de ordenar_paradas,
+        incluida la matriz), ``km_hora_solicitud`` y ``km_ruta`` (promedios) y
+        ``mejora`` (fracción del recorrido que se ahorra)
+    """
+    from ..rutas import costo, matriz_distancias, ordenar_paradas
+
+    rng = random.Random(semilla)
+    tiempos, km_hora, km_ruta = [], [], []
+    for _ in range(repeticiones):
+        latitudes = [rng.uniform(*LATITUDES) for _ in range(paradas)]
+        longitudes = [rng.uniform(*LONGITUDES) for _ in range(paradas)]
+
+        inicio = perf_counter()
+        matriz = matriz_distancias(latitudes, longitudes)
+        orden = ordenar_paradas(matriz)
+        tiempos.append((perf_counter() - inicio) * 1000)
+
+        km_hora.append(costo(matriz, range(paradas)))
+        km_ruta.append(costo(matriz, orden))
+
+    promedio_hora = sum(km_hora) / repeticiones
+    promedio_ruta = sum(km_ruta) / repeticiones
+    return {
+        'paradas': paradas,
+        'p50_ms': round(percentil(tiempos, 50), 3),
+        'max_ms': round(max(tiempos), 3),
+        'km_hora_solicitud': round(promedio_hora, 1),
+        'km_ruta': round(promedio_ruta, 1),
+        'mejora': round(1 - promedio_ruta / promedio_hora, 3) if promedio_hora else 0.0,
+    }
+
+
+def formatear_rutas(resultado):
+    return '\n'.join([
+        f"Orden de recorrido de {resultado['paradas']} paradas: "
+        f"p50 {resultado['p50_ms']:.2f} ms, máx {resultado['max_ms']:.2f} ms",
+        f"  por hora_solicitud  {resultado['km_hora_solicitud']:8.1f} km",
+        f"  ordenar_paradas     {resultado['km_ruta']:8.1f} km  (-{resultado['mejora']:.0%})",
+    ])
+
+
+def medir_agenda(paradas=200, repeticiones=20, semilla=42, velocidad_kmh=25, minutos_retiro=3):
+    """
+    Returns:
+        dict con ``paradas``, ``con_horario`` (promedio), ``p50_ms``, ``max_ms``
+        (tiempo de programar, incluida la matriz) y paradas fuera de horario
+        (promedios) en el recorrido más corto (``fuera_ruta``) y en el
+        programado (``fuera_agenda``)
+    """
+    import numpy as np
+
+    from ..agenda import minutos_por_km, programar, tiempos
+    from ..rutas import matriz_distancias, ordenar_paradas
+
+    rng = random.Random(semilla)
+    tiempos_ms, con_horario, fuera_ruta, fuera_agenda = [], [], [], []
+    for _ in range(repeticiones):
+        latitudes = [rng.uniform(*LATITUDES) for _ in range(paradas)]
+        longitudes = [rng.uniform(*LONGITUDES) for _ in range(paradas)]
+        abre, cierra = np.full(paradas, float(JORNADA[0])), np.full(paradas, float(JORNADA[1]))
+        for i in range(paradas):
+            if rng.random() < FRACCION_CON_HORARIO:
+                abre[i] = rng.randrange(JORNADA[0], JORNADA[1] - 180, 30)
+                cierra[i] = abre[i] + rng.choice((120, 180))
+        con_horario.append(int((cierra - abre < JORNADA[1] - JORNADA[0]).sum()))
+
+        inicio = perf_counter()
+        viaje = minutos_por_km(matriz_distancias(latitudes, longitudes), velocidad_kmh)
+        _, _, a_tiempo = programar(viaje, abre, cierra, minutos_retiro, JORNADA[0])
+        tiempos_ms.append((perf_counter() - inicio) * 1000)
+        fuera_agenda.append(int((~a_tiempo).sum()))
+
+        orden = ordenar_paradas(viaje)
+        _, atencion = tiempos(orden, viaje, abre, cierra, minutos_retiro, JORNADA[0])
+        fuera_ruta.append(int((atencion > cierra[orden]).sum()))
+
+    return {
+        'paradas': paradas,
+        'con_horario': round(sum(con_horario) / repeticiones, 1),
+        'p50_ms': round(percentil(tiempos_ms, 50), 3),
+        'max_ms': round(max(tiempos_ms), 3),
+        'fuera_ruta': round(sum(fuera_ruta) / repeticiones, 1),
+        'fuera_agenda': round(sum(fuera_agenda) / repeticiones, 1),
+    }
+
+
+def formatear_agenda(resultado):
+    return '\n'.join([
+        f"Agenda de {resultado['paradas']} paradas ({resultado['con_horario']:.0f} con horario): "
+        f"p50 {resultado['p50_ms']:.2f} ms, máx {resultado['max_ms']:.2f} ms",
+        f"  fuera de horario, recorrido más corto  {resultado['fuera_ruta']:6.1f}",
+        f"  fuera de horario, agenda.programar     {resultado['fuera_agenda']:6.1f}",
+    ])
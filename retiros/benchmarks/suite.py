@@ -0,0 +1,244 @@
+"""
+Casos del benchmark, medición de latencias y comparación con el baseline
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+import json
+import logging
+import math
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import autocompletado
+from ..models import SolicitudRetiro
+from ..services import EstadisticasService
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class BenchmarkError(Exception):
+    """Un caso del benchmark no respondió como se esperaba."""
+
+
+class Caso:
+    """
+    Un caso del benchmark.
+
+    ``preparar(ctx)`` se ejecuta fuera de la medición y retorna la función que
+    se mide. Si ``status`` no es None, la función debe retornar una respuesta
+    HTTP con ese código.
+    """
+
+    def __init__(self, nombre, preparar, status=200):
+        self.nombre = nombre
+        self.preparar = preparar
+        self.status = status
+
+
+def _get(nombre_url, *args, query=''):
+    def preparar(ctx):
+        url = reverse(nombre_url, args=[ctx[a] for a in args]) + query.format(**ctx)
+        return lambda: ctx['client'].get(url)
+    return preparar
+
+
+def _preparar_buscar_sin_cache(ctx):
+    # La caché de autocompletado se vacía antes de cada iteración, fuera de la medición
+    preparar = _get('api_buscar_solicitantes', query='?q={termino_busqueda}')
+    autocompletado.invalidar()
+    return preparar(ctx)
+
+
+def _preparar_agregar_post(ctx):
+    datos = {
+        'solicitante': ctx['solicitante_id'],
+        'usar_direccion_solicitante': 'on',
+        'direccion_retiro': 'Av. Libertad 123',
+        'fecha_retiro': ctx['hoy'].isoformat(),
+        'estado': 'pendiente',
+        'notas': 'Benchmark',
+    }
+    return lambda: ctx['client'].post(reverse('agregar_solicitud'), datos)
+
+
+def _preparar_marcar_completado(ctx):
+    # Cada iteración completa una solicitud distinta, creada fuera de la medición
+    solicitud = SolicitudRetiro.objects.filter(
+        fecha_retiro=ctx['hoy'], estado__in=['pendiente', 'asignado']
+    ).order_by('-id').first()
+    url = reverse('marcar_completado', args=[solicitud.id])
+    return lambda: ctx['client'].post(url)
+
+
+CASOS = [
+    # Con la caché de autocompletado caliente (búsqueda repetida) y vacía
+    Caso('api_buscar_solicitantes', _get('api_buscar_solicitantes', query='?q={termino_busqueda}')),
+    Caso('api_buscar_solicitantes_sin_cache', _preparar_buscar_sin_cache),
+    Caso('api_obtener_solicitante', _get('api_obtener_solicitante', 'solicitante_id')),
+    Caso('api_sincronizar_retirador', _get('api_sincronizar_retirador', 'retirador_id')),
+    Caso('api_sincronizar_retirador_delta',
+         _get('api_sincronizar_retirador', 'retirador_id', query='?token={token_sincronizacion}')),
+    Caso('home', _get('home')),
+    Caso('lista_pendientes', _get('lista_pendientes')),
+    Caso('lista_retirador', _get('lista_retirador', 'retirador_id')),
+    Caso('agregar_solicitud_get', _get('agregar_solicitud')),
+    Caso('agregar_solicitud_post', _preparar_agregar_post, status=302),
+    Caso('marcar_completado', _preparar_marcar_completado, status=302),
+    Caso('exportar_pdf_retirador', _get('exportar_pdf_retirador', 'retirador_id')),
+    Caso('exportar_pdf_general', _get('exportar_pdf_general')),
+    Caso('estadisticas_resumen_dashboard',
+         lambda ctx: lambda: EstadisticasService.obtener_resumen_dashboard(ctx['hoy']), status=None),
+    Caso('estadisticas_zona',
+         lambda ctx: lambda: EstadisticasService.obtener_estadisticas_zona(ctx['zona_id']), status=None),
+]
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) con interpolación lineal entre rangos."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    inferior, superior = math.floor(k), math.ceil(k)
+    if inferior == superior:
+        return ordenados[int(k)]
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+
+@contextmanager
+def sin_logs_info():
+    """Silencia los logs INFO (uno por petición instrumentada) mientras dura el bloque."""
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def medir_caso(caso, ctx, iteraciones=20, calentamiento=1):
+    """
+    Ejecuta un caso y retorna sus latencias (ms) y el número de consultas.
+
+    Las consultas se cuentan en la última iteración; todas las iteraciones
+    de un caso deberían ejecutar las mismas.
+    """
+    latencias = []
+    consultas = 0
+    for i in range(calentamiento + iteraciones):
+        funcion = caso.preparar(ctx)
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = perf_counter()
+            resultado = funcion()
+            duracion = perf_counter() - inicio
+
+        if caso.status is not None and resultado.status_code != caso.status:
+            raise BenchmarkError(
+                f"{caso.nombre}: status {resultado.status_code}, se esperaba {caso.status}"
+            )
+        if i >= calentamiento:
+            latencias.append(duracion * 1000)
+            consultas = len(capturadas)
+
+    resultado = {'iteraciones': iteraciones, 'consultas': consultas}
+    for p in PERCENTILES:
+        resultado[f'p{p}_ms'] = round(percentil(latencias, p), 3)
+    resultado['max_ms'] = round(max(latencias), 3)
+    return resultado
+
+
+def ejecutar_suite(ctx, iteraciones=20, casos=None):
+    """
+    Ejecuta los casos sobre un dataset ya sembrado (ver datos.sembrar_datos).
+
+    Args:
+        ctx: dict retornado por sembrar_datos
+        iteraciones: Iteraciones medidas por caso
+        casos: Nombres de casos a ejecutar (por defecto todos)
+
+    Returns:
+        dict nombre_caso -> resultados
+    """
+    ctx = dict(ctx, client=Client())
+    resultados = {}
+    with sin_logs_info():
+        for caso in CASOS:
+            if casos and caso.nombre not in casos:
+                continue
+            resultados[caso.nombre] = medir_caso(caso, ctx, iteraciones)
+    return resultados
+
+
+def cargar_baseline(path=BASELINE_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def guardar_baseline(escala, resultados, path=BASELINE_PATH):
+    """Guarda los resultados como baseline de la escala, conservando las demás."""
+    path = Path(path)
+    baseline = cargar_baseline(path)
+    baseline[escala] = resultados
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+
+
+def comparar_con_baseline(resultados, baseline, tolerancia=0.25, margen_ms=2.0, tiempos=True):
+    """
+    Compara resultados con el baseline de su escala.
+
+    Un caso es regresión si ejecuta más consultas que el baseline, o si su
+    p50 supera ``baseline * (1 + tolerancia) + margen_ms``. El margen absoluto
+    evita falsos positivos en casos de pocos milisegundos. Con ``tiempos``
+    en False solo se comparan las consultas (los tests: las latencias
+    dependen de la máquina y de su carga).
+
+    Returns:
+        list de mensajes, uno por regresión
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = baseline.get(nombre)
+        if base is None:
+            continue
+        if actual['consultas'] > base['consultas']:
+            regresiones.append(
+                f"{nombre}: {actual['consultas']} consultas (baseline {base['consultas']})"
+            )
+        if not tiempos:
+            continue
+        limite = base['p50_ms'] * (1 + tolerancia) + margen_ms
+        if actual['p50_ms'] > limite:
+            regresiones.append(
+                f"{nombre}: p50 {actual['p50_ms']:.2f} ms supera el límite de {limite:.2f} ms "
+                f"(baseline {base['p50_ms']:.2f} ms)"
+            )
+    return regresiones
+
+
+def formatear_tabla(resultados, baseline=None):
+    """Tabla de texto con percentiles, consultas y variación respecto al baseline."""
+    baseline = baseline or {}
+    columnas = ['caso', 'p50', 'p90', 'p95', 'p99', 'max', 'consultas', 'Δp50']
+    filas = []
+    for nombre, r in resultados.items():
+        base = baseline.get(nombre)
+        delta = f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:+.0f}%" if base and base['p50_ms'] else '-'
+        filas.append([
+            nombre,
+            *(f"{r[f'p{p}_ms']:.2f}" for p in PERCENTILES),
+            f"{r['max_ms']:.2f}",
+            str(r['consultas']),
+            delta,
+        ])
+    anchos = [max(len(str(x)) for x in col) for col in zip(columnas, *filas)]
+    lineas = ['  '.join(c.ljust(a) for c, a in zip(columnas, anchos))]
+    lineas.append('  '.join('-' * a for a in anchos))
+    lineas.extend('  '.join(c.ljust(a) for c, a in zip(fila, anchos)) for fila in filas)
+    return '\n'.join(lineas)
@@ -0,0 +1,180 @@
+"""
+Calendario de disponibilidad de retiradores
+
+``DisponibilidadRetirador`` guarda los intervalos en que un retirador no
+trabaja (días completos, medios días, un trámite). Para un día se leen de una
+vez los intervalos que lo tocan y se arma un índice en memoria: por
+retirador, sus intervalos fusionados y ordenados, en minutos desde la
+medianoche, con la suma acumulada de sus duraciones. Saber si un retirador
+trabaja a una hora es una búsqueda binaria (bisect) y los minutos libres de
+su jornada, dos; ninguna consulta por retirador.
+
+La jornada es la de la agenda (``AGENDA_INICIO_JORNADA`` a
+``AGENDA_FIN_JORNADA``). Un retirador sin minutos libres en ella está
+ausente; uno con parte de la jornada libre tiene la capacidad diaria
+reducida en la misma proporción.
+
+Los calendarios de cada día quedan en memoria del proceso, como el grafo de
+zonas (zonas.py): se descartan al guardar o eliminar un intervalo en este
+proceso y, en los demás, al confirmarse la transacción (invalidacion.py).
+Además se descartan a los ``DISPONIBILIDAD_CACHE_SEGUNDOS``.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+import math
+import threading
+from time import monotonic
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import invalidacion
+from .models import DisponibilidadRetirador
+
+# Días distintos que se mantienen en memoria, como máximo
+MAX_DIAS = 31
+# Clave del contador de invalidaciones en la caché de Django
+CLAVE_GENERACION = 'retiros:disponibilidad:generacion'
+
+_lock = threading.Lock()
+_cache = {'compartida': None, 'dias': {}}
+
+
+class CalendarioDia:
+    """
+    Índice en memoria de las ausencias de un día.
+
+    Args:
+        intervalos: Iterable de (retirador_id, inicio, fin) en minutos desde la medianoche
+        inicio_jornada, fin_jornada: Jornada en minutos desde la medianoche
+    """
+
+    def __init__(self, intervalos, inicio_jornada, fin_jornada):
+        self.inicio_jornada = inicio_jornada
+        self.fin_jornada = fin_jornada
+        fusionados = {}
+        for retirador_id, inicio, fin in sorted(intervalos):
+            tramos = fusionados.setdefault(retirador_id, [])
+            if tramos and inicio <= tramos[-1][1]:
+                tramos[-1][1] = max(tramos[-1][1], fin)
+            else:
+                tramos.append([inicio, fin])
+
+        # Por retirador: (inicios, fines, duración acumulada de los anteriores)
+        self._indice = {}
+        for retirador_id, tramos in fusionados.items():
+            acumulado = [0.0]
+            for inicio, fin in tramos:
+                acumulado.append(acumulado[-1] + fin - inicio)
+            self._indice[retirador_id] = ([t[0] for t in tramos], [t[1] for t in tramos], acumulado)
+
+    def disponible(self, retirador_id, minuto):
+        """True si el retirador trabaja en ``minuto`` (minutos desde la medianoche)."""
+        indice = self._indice.get(retirador_id)
+        if indice is None:
+            return True
+        inicios, fines, _ = indice
+        k = bisect_right(inicios, minuto) - 1
+        return k < 0 or fines[k] <= minuto
+
+    def minutos_ausente(self, retirador_id, desde, hasta):
+        """Minutos de ausencia del retirador entre ``desde`` y ``hasta``."""
+        indice = self._indice.get(retirador_id)
+        if indice is None or hasta <= desde:
+            return 0.0
+        inicios, fines, acumulado = indice
+        # Tramos que terminan después de ``desde`` y empiezan antes de ``hasta``
+        primero = bisect_right(fines, desde)
+        ultimo = bisect_left(inicios, hasta)
+        if primero >= ultimo:
+            return 0.0
+        total = acumulado[ultimo] - acumulado[primero]
+        # Sin lo que queda fuera del rango en los tramos de los extremos
+        total -= max(0.0, desde - inicios[primero])
+        total -= max(0.0, fines[ultimo - 1] - hasta)
+        return total
+
+    def fraccion_disponible(self, retirador_id):
+        """Fracción de la jornada en que el retirador trabaja (0 a 1)."""
+        largo = self.fin_jornada - self.inicio_jornada
+        if largo <= 0:
+            return 1.0
+        ausente = self.minutos_ausente(retirador_id, self.inicio_jornada, self.fin_jornada)
+        return max(0.0, 1.0 - ausente / largo)
+
+    def estado(self, retirador_id):
+        """'disponible', 'parcial' o 'ausente' en la jornada."""
+        fraccion = self.fraccion_disponible(retirador_id)
+        if fraccion <= 0:
+            return 'ausente'
+        return 'parcial' if fraccion < 1 else 'disponible'
+
+    def capacidad(self, retirador_id, capacidad_diaria):
+        """
+        Retiros que puede recibir en el día: 0 si está ausente, la capacidad
+        diaria en proporción a la jornada disponible, o None (sin límite).
+        """
+        fraccion = self.fraccion_disponible(retirador_id)
+        if fraccion <= 0:
+            return 0
+        if capacidad_diaria is None:
+            return None
+        return math.floor(capacidad_diaria * fraccion)
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute + hora.second / 60
+
+
+def _cargar(fecha):
+    zona_horaria = timezone.get_current_timezone()
+    medianoche = timezone.make_aware(datetime.combine(fecha, time.min), zona_horaria)
+    siguiente = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min), zona_horaria)
+    largo = (siguiente - medianoche).total_seconds() / 60
+    filas = DisponibilidadRetirador.objects.filter(
+        inicio__lt=siguiente, fin__gt=medianoche
+    ).values_list('retirador_id', 'inicio', 'fin')
+    intervalos = [
+        (
+            retirador_id,
+            max(0.0, (inicio - medianoche).total_seconds() / 60),
+            min(largo, (fin - medianoche).total_seconds() / 60),
+        )
+        for retirador_id, inicio, fin in filas
+    ]
+    jornada = [_minutos(time.fromisoformat(h)) for h in (settings.AGENDA_INICIO_JORNADA, settings.AGENDA_FIN_JORNADA)]
+    return CalendarioDia(intervalos, *jornada)
+
+
+def calendario(fecha):
+    """
+    Calendario de ausencias de ``fecha``. Una consulta la primera vez; luego
+    ninguna mientras la caché esté vigente.
+
+    Returns:
+        CalendarioDia
+    """
+    compartida = invalidacion.generacion(CLAVE_GENERACION)
+    with _lock:
+        dias = _cache['dias']
+        if compartida != _cache['compartida']:
+            # Otro proceso cambió la disponibilidad
+            dias.clear()
+            _cache['compartida'] = compartida
+        vigente = dias.get(fecha)
+        if vigente is None or monotonic() >= vigente[0]:
+            if len(dias) >= MAX_DIAS:
+                dias.clear()
+            vigente = (monotonic() + getattr(settings, 'DISPONIBILIDAD_CACHE_SEGUNDOS', 300), _cargar(fecha))
+            dias[fecha] = vigente
+        return vigente[1]
+
+
+def invalidar():
+    """
+    Descarta los calendarios: la próxima consulta los vuelve a leer. Los
+    demás procesos los descartan al confirmarse la transacción del cambio.
+    """
+    with _lock:
+        _cache['dias'].clear()
+    invalidacion.publicar(CLAVE_GENERACION)
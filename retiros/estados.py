@@ -0,0 +1,142 @@
+"""
+Transiciones de estado de SolicitudRetiro
+
+Todos los cambios de estado pasan por aquí. Cada solicitud tiene un número de
+``version`` que aumenta con cada escritura; ``transicionar`` actualiza con
+``UPDATE ... WHERE version = N`` (compare-and-swap), así dos escritores
+concurrentes no necesitan leer la fila con ``SELECT ... FOR UPDATE``: el que
+llega segundo no actualiza nada y recibe ``ConflictoVersion``. El UPDATE solo
+bloquea su propia fila; la secuencia de sincronización no agrega un bloqueo
+compartido en PostgreSQL (ver ``siguiente_secuencia``). En SQLite las
+escrituras se serializan de todos modos. Los cambios masivos usan
+``transicionar_lote``, un solo UPDATE que filtra por los estados de origen
+permitidos. Cada cambio aplicado queda en el historial (auditoria.py).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .auditoria import registrar
+from .models import SolicitudRetiro, siguiente_secuencia
+
+ESTADOS_ABIERTOS = ('pendiente', 'asignado')
+ESTADOS_FINALES = ('completado', 'cancelado')
+
+# Estado actual -> estados a los que se puede pasar. Completado y cancelado
+# son finales; 'asignado' -> 'asignado' es una reasignación.
+TRANSICIONES = {
+    'pendiente': {'asignado', 'completado', 'cancelado'},
+    'asignado': {'pendiente', 'asignado', 'completado', 'cancelado'},
+    'completado': set(),
+    'cancelado': set(),
+}
+
+
+class TransicionInvalida(Exception):
+    """El cambio de estado no está permitido desde el estado actual."""
+
+    def __init__(self, desde, hacia):
+        self.desde = desde
+        self.hacia = hacia
+        super().__init__(f"No se puede pasar de '{desde}' a '{hacia}'")
+
+
+class ConflictoVersion(Exception):
+    """La solicitud cambió desde que se leyó (otro usuario o proceso la modificó)."""
+
+    def __init__(self, solicitud_id):
+        self.solicitud_id = solicitud_id
+        super().__init__(f"La solicitud {solicitud_id} fue modificada por otro usuario")
+
+
+def puede_transicionar(desde, hacia):
+    return hacia in TRANSICIONES.get(desde, ())
+
+
+def origenes(hacia):
+    """Estados desde los que se puede llegar a ``hacia``."""
+    return [desde for desde, destinos in TRANSICIONES.items() if hacia in destinos]
+
+
+def transicionar(solicitud, estado, **campos):
+    """
+    Cambia el estado de una solicitud si nadie la modificó desde que se leyó.
+
+    Args:
+        solicitud: SolicitudRetiro leída de la base de datos
+        estado: Estado destino
+        **campos: Otros campos a escribir en el mismo UPDATE (ej: retirador_asignado)
+
+    Raises:
+        TransicionInvalida: si el estado actual no permite pasar a ``estado``
+        ConflictoVersion: si la versión en la base ya no es la leída
+
+    Returns:
+        La misma solicitud, con los campos y la versión actualizados
+    """
+    desde = solicitud.estado
+    if not puede_transicionar(desde, estado):
+        raise TransicionInvalida(desde, estado)
+
+    campos.update(estado=estado, version=solicitud.version + 1, fecha_actualizacion=timezone.now())
+    anterior = (desde, solicitud.retirador_asignado_id, solicitud.solicitante_id)
+    with transaction.atomic(savepoint=False):
+        filas = SolicitudRetiro.objects.filter(
+            pk=solicitud.pk, version=solicitud.version
+        ).actualizar_retornando(['secuencia'], **campos)
+        if filas:
+            campos['secuencia'], = filas[0]
+            for campo, valor in campos.items():
+                setattr(solicitud, campo, valor)
+            # Una reasignación la saca de la lista en la que estaba
+            solicitud.registrar_salida(*anterior)
+    if not filas:
+        raise ConflictoVersion(solicitud.pk)
+
+    registrar([(solicitud.pk, desde, solicitud.retirador_asignado_id)], estado)
+    return solicitud
+
+
+def transicionar_lote(queryset, estado, anteriores=None, **campos):
+    """
+    Cambia el estado de todas las solicitudes del queryset que lo permitan,
+    en un solo UPDATE. Las que están en un estado desde el que no se puede
+    pasar a ``estado`` (o cambiaron entre la lectura y el UPDATE) se omiten.
+
+    Args:
+        queryset: Solicitudes a cambiar
+        estado: Estado destino
+        anteriores: dict id -> (estado, retirador_id) si el llamador ya los
+            leyó; si no, se leen del queryset (para el historial)
+        **campos: Otros campos a escribir en el mismo UPDATE
+
+    Returns:
+        list: ids de las solicitudes actualizadas
+    """
+    permitidos = origenes(estado)
+    if anteriores is None:
+        anteriores = {
+            solicitud_id: (estado_actual, retirador_id)
+            for solicitud_id, estado_actual, retirador_id in queryset.filter(
+                estado__in=permitidos
+            ).values_list('id', 'estado', 'retirador_asignado_id')
+        }
+    if not anteriores:
+        return []
+
+    ids = list(anteriores)
+    with transaction.atomic(savepoint=False):
+        if 'secuencia' not in campos:
+            campos['secuencia'] = siguiente_secuencia()
+        actualizadas = SolicitudRetiro.objects.filter(
+            id__in=anteriores, estado__in=permitidos
+        ).update(estado=estado, **campos)
+
+        if actualizadas < len(ids):
+            # Otro escritor cambió alguna entre la lectura y el UPDATE. Dentro
+            # de la transacción: en PostgreSQL la secuencia es su id
+            ids = list(SolicitudRetiro.objects.filter(
+                id__in=ids, estado=estado, secuencia=campos['secuencia']
+            ).values_list('id', flat=True))
+
+    registrar([(solicitud_id, *anteriores[solicitud_id]) for solicitud_id in ids], estado)
+    return ids
@@ -1,4 +1,5 @@
 from django import forms
+from .estados import puede_transicionar
 from .models import SolicitudRetiro, Solicitante, Retirador
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -19,6 +20,8 @@ class SolicitudRetiroForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Optimizado: el label de cada opción (Solicitante.__str__) usa la zona
+        self.fields['solicitante'].queryset = Solicitante.objects.select_related('zona')
         # Autocompletado: Al elegir solicitante, podrías usar JS después, pero por ahora, el save maneja la dirección
         # Opciones para fecha_retiro: Hoy o mañana por defecto
         hoy = timezone.now().date()
@@ -30,4 +33,19 @@ class SolicitudRetiroForm(forms.ModelForm):
         now = timezone.now().time()
         if now.hour < 11 or now.hour > 14:
             raise forms.ValidationError("Solo se pueden agendar entre 11:00 y 14:00.")
-        return now
\ No newline at end of file
+        return now
+
+class SolicitudRetiroAdminForm(forms.ModelForm):
+    """Formulario del admin: valida el cambio de estado con las reglas de estados.py"""
+
+    class Meta:
+        model = SolicitudRetiro
+        fields = '__all__'
+
+    def clean_estado(self):
+        estado = self.cleaned_data['estado']
+        # Aquí la instancia aún tiene el estado guardado en la base
+        actual = self.instance.estado
+        if self.instance.pk and estado != actual and not puede_transicionar(actual, estado):
+            raise forms.ValidationError(f"No se puede pasar de '{actual}' a '{estado}'.")
+        return estado
@@ -0,0 +1,383 @@
+"""
+Generador determinista de datos sintéticos para GestPyLab
+Permite reproducir volúmenes de producción (pruebas de carga, benchmarks)
+"""
+from datetime import datetime, time, timedelta
+import random
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .geo import celda_de, distancia_km
+from .disponibilidad import invalidar as invalidar_disponibilidad
+from .models import AdyacenciaZona, DisponibilidadRetirador, Zona, Solicitante, Retirador, SolicitudRetiro
+from .zonas import invalidar as invalidar_grafo_zonas
+import logging
+
+logger = logging.getLogger(__name__)
+
+COMUNAS = [
+    'Valparaíso', 'Viña del Mar', 'Quilpué', 'Villa Alemana', 'Concón', 'Quillota', 'La Calera',
+    'Limache', 'Olmué', 'San Antonio', 'Los Andes', 'San Felipe', 'Casablanca', 'Quintero',
+    'Puchuncaví', 'La Ligua', 'Cabildo', 'Llay Llay', 'Nogales', 'Hijuelas', 'La Cruz',
+    'Algarrobo', 'El Quisco', 'El Tabo', 'Cartagena', 'Santo Domingo', 'Putaendo', 'Catemu',
+    'Panquehue', 'Rinconada', 'Calle Larga', 'San Esteban', 'Papudo', 'Zapallar', 'Petorca',
+]
+NOMBRES = [
+    'Ana', 'Carlos', 'Camila', 'Diego', 'Fernanda', 'Javier', 'Valentina', 'Matías', 'Sofía',
+    'Tomás', 'Catalina', 'Benjamín', 'Francisca', 'Vicente', 'Isidora', 'Joaquín', 'Martina',
+]
+APELLIDOS = [
+    'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez',
+    'Sepúlveda', 'Morales', 'Rodríguez', 'López', 'Fuentes', 'Hernández', 'Torres', 'Araya',
+]
+CALLES = [
+    'Av. Libertad', 'Av. España', 'Los Carrera', 'Álvarez', 'Av. Perú', 'Quillota', 'Valparaíso',
+    'Av. Argentina', 'Pedro Montt', 'Condell', 'Esmeralda', 'Blanco', 'Av. Francia', 'Uruguay',
+]
+CLINICAS = ['Veterinaria', 'Clínica Veterinaria', 'Centro Veterinario', 'Hospital Veterinario']
+NOTAS = ['', '', '', 'Canino', 'Felino', 'Urgente', 'Exótico', 'Equino', 'Retirar antes de las 15:00']
+
+# Rectángulo donde se ubican los centros de las zonas (Gran Valparaíso y
+# alrededores) y dispersión en grados de los puntos alrededor de su centro
+LATITUDES = (-33.15, -32.90)
+LONGITUDES = (-71.65, -71.30)
+DISPERSION_RETIRADOR = 0.01
+DISPERSION_SOLICITANTE = 0.02
+# Cada zona es vecina de sus ZONAS_VECINAS más cercanas (por centro), a esta velocidad
+ZONAS_VECINAS = 2
+VELOCIDAD_ENTRE_ZONAS_KMH = 25
+# Retiradores ausentes hoy todo el día y solo en la mañana
+TASA_AUSENCIA = 0.05
+TASA_MEDIO_DIA = 0.05
+
+# Distribución por tipo: (peso, tasa email desconocido, tasa dirección desconocida)
+PERFIL_TIPO = {
+    'veterinaria': (0.35, 0.05, 0.02),
+    'medico': (0.30, 0.08, 0.05),
+    'tecnico': (0.15, 0.15, 0.10),
+    'ayudante': (0.10, 0.25, 0.15),
+    'tutor': (0.10, 0.40, 0.20),
+}
+
+
+class InsercionMasiva:
+    """
+    INSERT multi-fila construido a partir de los metadatos del modelo.
+
+    bulk_create compila cada valor a través de su campo (~50 µs por fila de
+    SolicitudRetiro); para millones de filas eso domina el tiempo de carga.
+    Aquí las filas llegan como tuplas con valores ya adaptados a la base de
+    datos (ver adaptar) y se insertan tantas por sentencia como permita el
+    backend. Las columnas no indicadas reciben su valor por defecto.
+    """
+
+    def __init__(self, modelo, columnas, using='default'):
+        self.connection = connections[using]
+        ops = self.connection.ops
+        campos = {f.attname: f for f in modelo._meta.concrete_fields if not f.primary_key}
+        self.campos = campos
+        self._adaptados = {}
+
+        resto = [f for attname, f in campos.items() if attname not in columnas]
+        self.valores_resto = tuple(self._valor_por_defecto(f) for f in resto)
+        todas = [campos[c] for c in columnas] + resto
+
+        self.sql = 'INSERT INTO {} ({}) VALUES '.format(
+            ops.quote_name(modelo._meta.db_table),
+            ', '.join(ops.quote_name(f.column) for f in todas),
+        )
+        self.marcador = '(' + ', '.join(['%s'] * len(todas)) + ')'
+        self.filas_por_sentencia = max(1, ops.bulk_batch_size(todas, [None] * 100_000))
+
+    def _valor_por_defecto(self, campo):
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False):
+            return self.adaptar(campo.attname, timezone.now())
+        return campo.get_db_prep_save(campo.get_default(), self.connection)
+
+    def adaptar(self, attname, valor, memorizar=True):
+        """
+        Adapta un valor al formato de la base de datos. Con memorizar=True el
+        resultado se reutiliza para valores repetidos (fechas, horas).
+        """
+        if not memorizar:
+            return self.campos[attname].get_db_prep_save(valor, self.connection)
+        clave = (attname, valor)
+        try:
+            return self._adaptados[clave]
+        except KeyError:
+            adaptado = self.campos[attname].get_db_prep_save(valor, self.connection)
+            self._adaptados[clave] = adaptado
+            return adaptado
+
+    def insertar(self, filas):
+        resto = self.valores_resto
+        with self.connection.cursor() as cursor:
+            for inicio in range(0, len(filas), self.filas_por_sentencia):
+                lote = filas[inicio:inicio + self.filas_por_sentencia]
+                parametros = [v for fila in lote for v in fila + resto]
+                cursor.execute(self.sql + ', '.join([self.marcador] * len(lote)), parametros)
+
+
+class GeneradorDatos:
+    """
+    Genera zonas, retiradores, solicitantes e historial de solicitudes.
+
+    Todo se escribe en lotes (bulk_create, o InsercionMasiva para las
+    solicitudes), sin pasar por Solicitante.save ni su full_clean; los datos
+    se construyen ya válidos. Con la misma semilla y los mismos parámetros el
+    resultado es idéntico.
+    """
+
+    def __init__(self, semilla=42, batch_size=5000, hoy=None, progreso=None):
+        self.rnd = random.Random(semilla)
+        # Generador aparte para las coordenadas: no altera el resto del dataset
+        self.rnd_geo = random.Random(semilla)
+        self.rnd_disponibilidad = random.Random(semilla)
+        self.centros = {}
+        self.batch_size = batch_size
+        self.hoy = hoy or timezone.now().date()
+        # Callback opcional progreso(modelo, creados, total)
+        self.progreso = progreso
+
+    def generar(self, zonas=30, retiradores=300, solicitantes=200_000, solicitudes=1_000_000,
+                dias=3 * 365, solicitudes_hoy=None):
+        """
+        Genera el dataset completo.
+
+        Args:
+            zonas, retiradores, solicitantes: Cantidad de cada entidad
+            solicitudes: Total de solicitudes de historial (repartidas en `dias`)
+            dias: Días de historial hacia atrás desde hoy
+            solicitudes_hoy: Solicitudes pendientes/asignadas de hoy (por defecto el promedio diario)
+
+        Returns:
+            dict con las listas de ids creados
+        """
+        zona_ids = self.generar_zonas(zonas)
+        retirador_ids = self.generar_retiradores(retiradores, zona_ids)
+        self.generar_disponibilidades(retirador_ids)
+        solicitantes_creados = self.generar_solicitantes(solicitantes, zona_ids)
+        if solicitudes_hoy is None:
+            solicitudes_hoy = max(1, solicitudes // max(dias, 1))
+        total = self.generar_solicitudes(solicitudes, dias, solicitudes_hoy, solicitantes_creados, retirador_ids)
+        logger.info(
+            "Dataset sintético generado: %d zonas, %d retiradores, %d solicitantes, %d solicitudes",
+            len(zona_ids), len(retirador_ids), len(solicitantes_creados), total,
+        )
+        return {
+            'zona_ids': zona_ids,
+            'retirador_ids': retirador_ids,
+            'solicitante_ids': [s[0] for s in solicitantes_creados],
+            'solicitudes': total,
+        }
+
+    def generar_zonas(self, cantidad):
+        nombres = [
+            COMUNAS[i] if i < len(COMUNAS) else f'{COMUNAS[i % len(COMUNAS)]} {i // len(COMUNAS) + 1}'
+            for i in range(cantidad)
+        ]
+        zonas = Zona.objects.bulk_create([Zona(nombre=nombre) for nombre in nombres])
+        for zona in zonas:
+            self.centros[zona.id] = (self.rnd_geo.uniform(*LATITUDES), self.rnd_geo.uniform(*LONGITUDES))
+        self.generar_adyacencias([z.id for z in zonas])
+        return [z.id for z in zonas]
+
+    def generar_adyacencias(self, zona_ids):
+        """Une cada zona con sus ZONAS_VECINAS más cercanas (una fila por par)."""
+        pares = {}
+        for origen in zona_ids:
+            distancias = sorted(
+                (distancia_km(*self.centros[origen], *self.centros[destino]), destino)
+                for destino in zona_ids if destino != origen
+            )
+            for km, destino in distancias[:ZONAS_VECINAS]:
+                pares[min(origen, destino), max(origen, destino)] = max(1, round(km / VELOCIDAD_ENTRE_ZONAS_KMH * 60))
+        AdyacenciaZona.objects.bulk_create([
+            AdyacenciaZona(origen_id=origen, destino_id=destino, minutos=minutos)
+            for (origen, destino), minutos in pares.items()
+        ])
+        # bulk_create no envía señales: se descarta a mano el grafo en memoria
+        invalidar_grafo_zonas()
+
+    def _punto(self, centro, dispersion):
+        """(latitud, longitud, celda) de un punto al azar cerca de ``centro``."""
+        latitud = centro[0] + self.rnd_geo.uniform(-dispersion, dispersion)
+        longitud = centro[1] + self.rnd_geo.uniform(-dispersion, dispersion)
+        return latitud, longitud, celda_de(latitud, longitud)
+
+    def generar_retiradores(self, cantidad, zona_ids):
+        rnd = self.rnd
+        with transaction.atomic():
+            retiradores = []
+            for i in range(cantidad):
+                # Punto de partida cerca del centro de su zona base
+                latitud, longitud, celda = self._punto(self.centros[zona_ids[i % len(zona_ids)]], DISPERSION_RETIRADOR)
+                retiradores.append(Retirador(
+                    nombre=f'{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} (R{i + 1:03d})',
+                    tipo='fijo' if rnd.random() < 0.8 else 'complementario',
+                    latitud=latitud, longitud=longitud, celda=celda,
+                ))
+            retiradores = Retirador.objects.bulk_create(retiradores, batch_size=self.batch_size)
+
+            # Cada retirador cubre su zona base (repartidas en round-robin para
+            # que toda zona tenga al menos uno) y hasta dos zonas más
+            Through = Retirador.zonas_preferidas.through
+            relaciones = []
+            for i, retirador in enumerate(retiradores):
+                zonas = {zona_ids[i % len(zona_ids)]}
+                zonas.update(rnd.sample(zona_ids, min(len(zona_ids), rnd.randint(0, 2))))
+                relaciones.extend(Through(retirador_id=retirador.id, zona_id=z) for z in sorted(zonas))
+            Through.objects.bulk_create(relaciones, batch_size=self.batch_size)
+        return [r.id for r in retiradores]
+
+    def generar_disponibilidades(self, retirador_ids):
+        """Ausencias de hoy: día completo (TASA_AUSENCIA) o mañana (TASA_MEDIO_DIA)."""
+        rnd = self.rnd_disponibilidad
+        medianoche = timezone.make_aware(datetime.combine(self.hoy, time.min))
+        ausencias = []
+        for retirador_id in retirador_ids:
+            azar = rnd.random()
+            if azar < TASA_AUSENCIA:
+                ausencias.append(DisponibilidadRetirador(
+                    retirador_id=retirador_id, inicio=medianoche, fin=medianoche + timedelta(days=1),
+                ))
+            elif azar < TASA_AUSENCIA + TASA_MEDIO_DIA:
+                ausencias.append(DisponibilidadRetirador(
+                    retirador_id=retirador_id, motivo='medio_dia',
+                    inicio=medianoche + timedelta(hours=8), fin=medianoche + timedelta(hours=13, minutes=30),
+                ))
+        DisponibilidadRetirador.objects.bulk_create(ausencias, batch_size=self.batch_size)
+        # bulk_create no envía señales: se descartan a mano los calendarios en memoria
+        invalidar_disponibilidad()
+
+    def generar_solicitantes(self, cantidad, zona_ids):
+        """Retorna una lista de (id, direccion_principal, latitud, longitud, celda) de los solicitantes creados."""
+        rnd = self.rnd
+        tipos = list(PERFIL_TIPO)
+        pesos = [PERFIL_TIPO[t][0] for t in tipos]
+        creados = []
+
+        with transaction.atomic():
+            for inicio in range(0, cantidad, self.batch_size):
+                lote = []
+                for i in range(inicio, min(inicio + self.batch_size, cantidad)):
+                    tipo = rnd.choices(tipos, pesos)[0]
+                    _, tasa_email, tasa_direccion = PERFIL_TIPO[tipo]
+                    email_desconocido = rnd.random() < tasa_email
+                    direccion_desconocida = rnd.random() < tasa_direccion
+
+                    if tipo == 'veterinaria':
+                        nombre = f'{rnd.choice(CLINICAS)} {rnd.choice(APELLIDOS)} {i}'
+                    else:
+                        nombre = f'{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)} {i}'
+
+                    if rnd.random() < 0.6:
+                        apertura = rnd.choice([8, 9, 10])
+                        inicio_horario, fin_horario = time(apertura), time(apertura + rnd.choice([8, 9, 10]))
+                    else:
+                        inicio_horario = fin_horario = None
+
+                    zona_id = rnd.choice(zona_ids)
+                    if direccion_desconocida:
+                        latitud = longitud = None
+                        celda = ''
+                    else:
+                        latitud, longitud, celda = self._punto(self.centros[zona_id], DISPERSION_SOLICITANTE)
+
+                    lote.append(Solicitante(
+                        nombre=nombre,
+                        tipo=tipo,
+                        telefono=f'+56 9 {rnd.randint(1000, 9999)} {rnd.randint(1000, 9999)}',
+                        email=None if email_desconocido else f'contacto{i}@example.cl',
+                        email_desconocido=email_desconocido,
+                        horario_atencion_inicio=inicio_horario,
+                        horario_atencion_fin=fin_horario,
+                        comentarios_horario_retiro=rnd.choice(['', '', '', 'Colación 14-15 hrs', 'Desde las 12:00']),
+                        zona_id=zona_id,
+                        direccion_principal='' if direccion_desconocida else f'{rnd.choice(CALLES)} {rnd.randint(1, 3000)}',
+                        direccion_desconocida=direccion_desconocida,
+                        latitud=latitud,
+                        longitud=longitud,
+                        celda=celda,
+                    ))
+                Solicitante.objects.bulk_create(lote)
+                creados.extend((s.id, s.direccion_principal, s.latitud, s.longitud, s.celda) for s in lote)
+                self._informar(Solicitante, len(creados), cantidad)
+        return creados
+
+    def generar_solicitudes(self, cantidad, dias, cantidad_hoy, solicitantes, retirador_ids):
+        """
+        Genera `cantidad` solicitudes históricas (completadas/canceladas) repartidas
+        en los `dias` anteriores a hoy, con menos carga los fines de semana, más
+        `cantidad_hoy` solicitudes de hoy pendientes o asignadas.
+
+        Es el volumen dominante (millones de filas), así que no construye
+        instancias del modelo: genera tuplas y las inserta con InsercionMasiva.
+        """
+        rnd = self.rnd
+        tz = timezone.get_current_timezone()
+
+        fechas = [self.hoy - timedelta(days=d) for d in range(1, dias + 1)]
+        pesos = [0.3 if f.weekday() >= 5 else 1.0 for f in fechas]
+        fechas_historial = sorted(rnd.choices(fechas, pesos, k=cantidad)) if fechas else []
+        fechas_todas = fechas_historial + [self.hoy] * cantidad_hoy
+        total = len(fechas_todas)
+
+        insercion = InsercionMasiva(SolicitudRetiro, [
+            'solicitante_id', 'usar_direccion_solicitante', 'direccion_retiro', 'fecha_solicitud',
+            'hora_solicitud', 'fecha_retiro', 'retirador_asignado_id', 'estado', 'notas',
+            'latitud', 'longitud', 'celda',
+        ])
+        adaptar = insercion.adaptar
+        direcciones_alternativas = [f'{calle} {n}' for calle in CALLES for n in range(1, 3000, 7)]
+
+        creadas = 0
+        with transaction.atomic():
+            for inicio in range(0, total, self.batch_size):
+                fechas_lote = fechas_todas[inicio:inicio + self.batch_size]
+                n = len(fechas_lote)
+                elegidos = rnd.choices(solicitantes, k=n)
+                azar = [rnd.random() for _ in range(5 * n)]
+                filas = []
+                for k, fecha in enumerate(fechas_lote):
+                    solicitante_id, direccion, latitud, longitud, celda = elegidos[k]
+                    a_hora, a_retirador, a_estado, a_dia, a_direccion = azar[5 * k:5 * k + 5]
+                    # Las solicitudes se ingresan entre 11:00 y 14:00, el día anterior o el mismo día
+                    segundos = int(a_hora * 3 * 3600)
+                    hora = time(11 + segundos // 3600, segundos // 60 % 60, segundos % 60)
+                    dia_solicitud = fecha - timedelta(days=1) if a_dia < 0.3 else fecha
+
+                    if fecha == self.hoy:
+                        retirador_id = retirador_ids[int(a_estado * len(retirador_ids))] if a_retirador < 0.7 else None
+                        estado = 'asignado' if retirador_id else 'pendiente'
+                    else:
+                        retirador_id = retirador_ids[int(a_retirador * len(retirador_ids))]
+                        estado = 'completado' if a_estado < 0.92 else 'cancelado'
+
+                    usar_direccion = bool(direccion) and a_direccion < 0.85
+                    if not usar_direccion and latitud is not None:
+                        # Otra dirección: un punto cerca del solicitante
+                        latitud, longitud, celda = self._punto((latitud, longitud), DISPERSION_RETIRADOR)
+                    filas.append((
+                        solicitante_id,
+                        usar_direccion,
+                        direccion if usar_direccion else direcciones_alternativas[int(a_dia * len(direcciones_alternativas))],
+                        adaptar('fecha_solicitud', datetime.combine(dia_solicitud, hora, tzinfo=tz), memorizar=False),
+                        adaptar('hora_solicitud', hora),
+                        adaptar('fecha_retiro', fecha),
+                        retirador_id,
+                        estado,
+                        NOTAS[int(a_hora * 7919) % len(NOTAS)],
+                        latitud,
+                        longitud,
+                        celda,
+                    ))
+                insercion.insertar(filas)
+                creadas += n
+                self._informar(SolicitudRetiro, creadas, total)
+        return creadas
+
+    def _informar(self, modelo, creados, total):
+        if self.progreso:
+            self.progreso(modelo, creados, total)
@@ -0,0 +1,184 @@
+"""
+Coordenadas, celdas geohash y búsquedas por cercanía
+
+Solicitantes, solicitudes y retiradores guardan, junto a su latitud y
+longitud, la ``celda`` geohash de ese punto (``PRECISION_CELDA`` caracteres).
+Un geohash más corto es un prefijo del largo y cubre un rectángulo mayor, así
+que "todo lo que está en la celda X" es un rango ``X <= celda < X + '{'``
+sobre el índice de ``celda``. El rango supone orden byte a byte: la columna
+es un ``CharFieldBinario`` (COLLATE "C" en PostgreSQL).
+
+``en_radio`` busca en las 3x3 celdas que rodean un punto, con la precisión
+cuyo lado es al menos el radio pedido (todo punto a menos de ``radio_km``
+cae en ellas), y luego filtra por distancia exacta. ``mas_cercano`` repite la
+búsqueda ampliando el radio hasta encontrar algo.
+
+Sin dependencias de modelos: las funciones reciben QuerySets de cualquier
+modelo con campos ``latitud``, ``longitud`` y ``celda``.
+"""
+from functools import reduce
+import math
+import operator
+
+from django.db.models import Q
+
+from .normalizacion import clave_busqueda
+
+PRECISION_CELDA = 9  # ~5 m
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Siguiente carácter después de 'z': cota superior de los rangos por prefijo
+FIN_PREFIJO = '{'
+
+RADIO_TIERRA_KM = 6371.0
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+
+def geohash(latitud, longitud, precision=PRECISION_CELDA):
+    """Geohash de un punto."""
+    lat_min, lat_max, lng_min, lng_max = -90.0, 90.0, -180.0, 180.0
+    resultado = []
+    bits = valor = 0
+    par = True
+    while len(resultado) < precision:
+        if par:
+            medio = (lng_min + lng_max) / 2
+            if longitud >= medio:
+                valor = valor * 2 + 1
+                lng_min = medio
+            else:
+                valor *= 2
+                lng_max = medio
+        else:
+            medio = (lat_min + lat_max) / 2
+            if latitud >= medio:
+                valor = valor * 2 + 1
+                lat_min = medio
+            else:
+                valor *= 2
+                lat_max = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            resultado.append(BASE32[valor])
+            bits = valor = 0
+    return ''.join(resultado)
+
+
+def celda_de(latitud, longitud):
+    """Celda a guardar para un punto ('' si no tiene coordenadas)."""
+    if latitud is None or longitud is None:
+        return ''
+    return geohash(latitud, longitud)
+
+
+def limites(celda):
+    """(lat_min, lat_max, lng_min, lng_max) del rectángulo de una celda."""
+    lat_min, lat_max, lng_min, lng_max = -90.0, 90.0, -180.0, 180.0
+    par = True
+    for caracter in celda:
+        valor = BASE32.index(caracter)
+        for desplazamiento in range(4, -1, -1):
+            bit = (valor >> desplazamiento) & 1
+            if par:
+                medio = (lng_min + lng_max) / 2
+                lng_min, lng_max = (medio, lng_max) if bit else (lng_min, medio)
+            else:
+                medio = (lat_min + lat_max) / 2
+                lat_min, lat_max = (medio, lat_max) if bit else (lat_min, medio)
+            par = not par
+    return lat_min, lat_max, lng_min, lng_max
+
+
+def vecinas(celda):
+    """La celda y sus 8 vecinas, de la misma precisión."""
+    lat_min, lat_max, lng_min, lng_max = limites(celda)
+    alto, ancho = lat_max - lat_min, lng_max - lng_min
+    centro_lat, centro_lng = (lat_min + lat_max) / 2, (lng_min + lng_max) / 2
+    celdas = []
+    for i in (-1, 0, 1):
+        latitud = centro_lat + i * alto
+        if not -90 <= latitud <= 90:
+            continue
+        for j in (-1, 0, 1):
+            longitud = (centro_lng + j * ancho + 180) % 360 - 180
+            vecina = geohash(latitud, longitud, len(celda))
+            if vecina not in celdas:
+                celdas.append(vecina)
+    return celdas
+
+
+def lado_km(precision, latitud=0.0):
+    """(alto, ancho) en km de una celda de ``precision`` caracteres a esa latitud."""
+    bits = 5 * precision
+    alto = 180 / 2 ** (bits // 2) * KM_POR_GRADO
+    ancho = 360 / 2 ** ((bits + 1) // 2) * KM_POR_GRADO * math.cos(math.radians(latitud))
+    return alto, ancho
+
+
+def precision_para_radio(radio_km, latitud=0.0):
+    """Precisión más fina cuyas celdas miden al menos ``radio_km`` por lado."""
+    for precision in range(PRECISION_CELDA, 0, -1):
+        if min(lado_km(precision, latitud)) >= radio_km:
+            return precision
+    return 1
+
+
+def distancia_km(lat1, lng1, lat2, lng2):
+    """Distancia haversine en km."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def filtro_celdas(celdas, campo='celda'):
+    """
+    Q con un rango por celda: usa el índice de ``campo`` en cualquier motor.
+    ``campo`` debe compararse byte a byte (CharFieldBinario de models.py).
+    """
+    return reduce(operator.or_, (
+        Q(**{f'{campo}__gte': celda, f'{campo}__lt': celda + FIN_PREFIJO}) for celda in celdas
+    ))
+
+
+def en_radio(queryset, latitud, longitud, radio_km):
+    """
+    Objetos del queryset a ``radio_km`` o menos del punto, del más cercano
+    al más lejano. Una consulta (rangos sobre el índice de celda).
+
+    Returns:
+        list de (distancia_km, objeto)
+    """
+    precision = precision_para_radio(radio_km, latitud)
+    candidatos = queryset.filter(filtro_celdas(vecinas(geohash(latitud, longitud, precision))))
+    encontrados = []
+    for objeto in candidatos:
+        distancia = distancia_km(latitud, longitud, objeto.latitud, objeto.longitud)
+        if distancia <= radio_km:
+            encontrados.append((distancia, objeto))
+    encontrados.sort(key=lambda par: (par[0], par[1].pk))
+    return encontrados
+
+
+def mas_cercano(queryset, latitud, longitud, radio_km=2.0, radio_max_km=64.0):
+    """
+    Objeto del queryset más cercano al punto, o None si no hay ninguno a
+    ``radio_max_km`` o menos. Busca en radios crecientes (x4) desde ``radio_km``.
+    """
+    radio = radio_km
+    while True:
+        encontrados = en_radio(queryset, latitud, longitud, min(radio, radio_max_km))
+        if encontrados:
+            return encontrados[0][1]
+        if radio >= radio_max_km:
+            return None
+        radio *= 4
+
+
+def normalizar_direccion(direccion):
+    """
+    Clave de una dirección para el caché de geocodificación: minúsculas, sin
+    tildes, sin puntuación y con espacios simples ("Av. Brasil  #123" ->
+    "av brasil 123"). Es la misma clave de búsqueda de los solicitantes.
+    """
+    return clave_busqueda(direccion)
@@ -0,0 +1,209 @@
+"""
+Geocodificación de direcciones
+
+El geocodificador se elige con ``GEOCODIFICADOR`` (ruta a una clase):
+
+- ``GeocodificadorNulo`` (por defecto): no encuentra nada; sin red.
+- ``GeocodificadorLocal``: tabla dirección -> coordenadas, desde el archivo
+  JSON ``GEOCODIFICADOR_ARCHIVO`` o pasada al constructor (tests, desarrollo).
+- ``GeocodificadorNominatim``: OpenStreetMap Nominatim por HTTP.
+
+Cada dirección se consulta una sola vez: el resultado, encontrado o no, queda
+en ``DireccionGeocodificada`` con la dirección normalizada como clave. El
+comando ``geocodificar_direcciones`` completa en lotes las coordenadas de
+solicitantes y solicitudes abiertas.
+"""
+from functools import lru_cache
+import json
+import logging
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .estados import ESTADOS_ABIERTOS
+from .geo import celda_de, normalizar_direccion
+from .models import DireccionGeocodificada, Solicitante, SolicitudRetiro
+
+logger = logging.getLogger(__name__)
+
+
+class Geocodificador:
+    """Interfaz: ``geocodificar(direccion)`` retorna (latitud, longitud) o None."""
+
+    nombre = ''
+
+    def geocodificar(self, direccion):
+        raise NotImplementedError
+
+
+class GeocodificadorNulo(Geocodificador):
+    nombre = 'nulo'
+
+    def geocodificar(self, direccion):
+        return None
+
+
+class GeocodificadorLocal(Geocodificador):
+    """Tabla fija de direcciones; las claves se normalizan al cargarla."""
+
+    nombre = 'local'
+
+    def __init__(self, tabla=None):
+        if tabla is None:
+            archivo = getattr(settings, 'GEOCODIFICADOR_ARCHIVO', '')
+            tabla = {}
+            if archivo:
+                with open(archivo, encoding='utf-8') as f:
+                    tabla = json.load(f)
+        self.tabla = {normalizar_direccion(direccion): tuple(punto) for direccion, punto in tabla.items()}
+
+    def geocodificar(self, direccion):
+        return self.tabla.get(normalizar_direccion(direccion))
+
+
+class GeocodificadorNominatim(Geocodificador):
+    """
+    Nominatim (https://nominatim.org). El servicio público admite una consulta
+    por segundo y exige identificarse (``GEOCODIFICADOR_AGENTE``).
+    """
+
+    nombre = 'nominatim'
+
+    def __init__(self):
+        self.url = getattr(settings, 'GEOCODIFICADOR_URL', 'https://nominatim.openstreetmap.org/search')
+        self.agente = getattr(settings, 'GEOCODIFICADOR_AGENTE', 'GestPyLab')
+        self.region = getattr(settings, 'GEOCODIFICADOR_REGION', 'Región de Valparaíso, Chile')
+
+    def geocodificar(self, direccion):
+        import requests
+
+        respuesta = requests.get(
+            self.url,
+            params={'q': f'{direccion}, {self.region}', 'format': 'json', 'limit': 1},
+            headers={'User-Agent': self.agente},
+            timeout=10,
+        )
+        respuesta.raise_for_status()
+        resultados = respuesta.json()
+        if not resultados:
+            return None
+        return float(resultados[0]['lat']), float(resultados[0]['lon'])
+
+
+@lru_cache(maxsize=None)
+def obtener_geocodificador():
+    return import_string(getattr(settings, 'GEOCODIFICADOR', 'retiros.geocodificacion.GeocodificadorNulo'))()
+
+
+def geocodificar(direccion, geocodificador=None):
+    """
+    Coordenadas de una dirección, del caché o del geocodificador (y se
+    guardan en el caché, aunque no se encuentre).
+
+    Returns:
+        tuple (latitud, longitud) o None
+    """
+    clave = normalizar_direccion(direccion)
+    if not clave:
+        return None
+    guardada = DireccionGeocodificada.objects.filter(direccion=clave).values_list('latitud', 'longitud').first()
+    if guardada is not None:
+        return guardada if guardada[0] is not None else None
+
+    geocodificador = geocodificador or obtener_geocodificador()
+    try:
+        punto = geocodificador.geocodificar(direccion)
+    except Exception as e:
+        # Error del servicio: no se guarda, se reintenta en la próxima pasada
+        logger.error("Error al geocodificar '%s': %s", direccion, e)
+        return None
+
+    latitud, longitud = punto if punto else (None, None)
+    DireccionGeocodificada.objects.update_or_create(
+        direccion=clave,
+        defaults={'latitud': latitud, 'longitud': longitud, 'proveedor': geocodificador.nombre},
+    )
+    return punto
+
+
+def _coordenadas(latitud, longitud):
+    return {'latitud': latitud, 'longitud': longitud, 'celda': celda_de(latitud, longitud)}
+
+
+def _por_geocodificar(filas, limite, direccion):
+    """
+    Hasta ``limite`` filas de ``filas`` (values_list con el id primero),
+    recorridas por id en páginas, sin las que tienen una dirección guardada
+    como no encontrada: siguen sin coordenadas y, si no se saltaran, ocuparían
+    siempre los primeros lugares. ``direccion(fila)`` es la dirección a
+    geocodificar, o None si la fila no la necesita.
+    """
+    entregadas, ultimo = 0, None
+    while entregadas < limite:
+        pagina = filas.order_by('id')
+        if ultimo is not None:
+            pagina = pagina.filter(id__gt=ultimo)
+        pagina = list(pagina[:limite])
+        if not pagina:
+            return
+        ultimo = pagina[-1][0]
+        claves = [None if direccion(fila) is None else normalizar_direccion(direccion(fila)) for fila in pagina]
+        no_encontradas = set(DireccionGeocodificada.objects.filter(
+            direccion__in={clave for clave in claves if clave}, latitud__isnull=True
+        ).values_list('direccion', flat=True))
+        for fila, clave in zip(pagina, claves):
+            if clave is not None and (not clave or clave in no_encontradas):
+                continue
+            yield fila
+            entregadas += 1
+            if entregadas == limite:
+                return
+
+
+def geocodificar_pendientes(limite=500, geocodificador=None):
+    """
+    Completa las coordenadas de hasta ``limite`` solicitantes y ``limite``
+    solicitudes abiertas (de hoy en adelante) que no las tienen. Las
+    solicitudes con la dirección del solicitante copian sus coordenadas.
+    Se omiten las direcciones ya guardadas como no encontradas.
+
+    Returns:
+        dict con 'solicitantes' y 'solicitudes' actualizados
+    """
+    actualizados = {'solicitantes': 0, 'solicitudes': 0}
+
+    solicitantes = Solicitante.objects.filter(
+        latitud__isnull=True, direccion_desconocida=False
+    ).exclude(direccion_principal='').values_list('id', 'direccion_principal')
+    for solicitante_id, direccion in _por_geocodificar(solicitantes, limite, lambda fila: fila[1]):
+        punto = geocodificar(direccion, geocodificador)
+        if punto:
+            Solicitante.objects.filter(id=solicitante_id).update(**_coordenadas(*punto))
+            actualizados['solicitantes'] += 1
+
+    solicitudes = SolicitudRetiro.objects.filter(
+        latitud__isnull=True, estado__in=ESTADOS_ABIERTOS, fecha_retiro__gte=timezone.now().date()
+    ).values_list(
+        'id', 'direccion_retiro', 'usar_direccion_solicitante', 'solicitante__latitud', 'solicitante__longitud'
+    )
+    por_punto = {}
+
+    def direccion_retiro(fila):
+        # Las que copian las coordenadas del solicitante no se geocodifican
+        return None if fila[2] and fila[3] is not None else fila[1]
+
+    for solicitud_id, direccion, usar_solicitante, latitud, longitud in _por_geocodificar(
+        solicitudes, limite, direccion_retiro
+    ):
+        punto = (latitud, longitud) if usar_solicitante and latitud is not None else geocodificar(direccion, geocodificador)
+        if punto:
+            por_punto.setdefault(tuple(punto), []).append(solicitud_id)
+    for punto, ids in por_punto.items():
+        # Las coordenadas no cambian el estado de la solicitud: no se aumenta
+        # su versión (no invalida lo que otro usuario esté editando)
+        SolicitudRetiro.objects.filter(id__in=ids).update(**_coordenadas(*punto), version=F('version'))
+        actualizados['solicitudes'] += len(ids)
+
+    return actualizados
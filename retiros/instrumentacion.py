@@ -0,0 +1,117 @@
+"""
+Instrumentación por petición para GestPyLab
+Mide consultas SQL, tiempo de templates y tiempo de vista
+"""
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# Métricas de la petición en curso (None fuera de una petición instrumentada)
+_metricas_actuales = ContextVar('metricas_peticion', default=None)
+
+
+def metricas_actuales():
+    """Retorna las métricas de la petición en curso, o None si no hay ninguna."""
+    return _metricas_actuales.get()
+
+
+class MetricasPeticion:
+    """
+    Acumula las métricas de una petición.
+
+    La instancia es invocable con la firma de ``connection.execute_wrapper``,
+    de modo que se registra directamente como wrapper de cada conexión.
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_templates = 0.0
+        self.tiempo_vista = 0.0
+        self.tiempo_total = 0.0
+        self.inicio_vista = None
+        self.sql_contador = Counter()
+        self._profundidad_template = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_sql += perf_counter() - inicio
+            self.consultas += 1
+            # El SQL llega parametrizado, así que consultas iguales con
+            # distintos parámetros (el patrón típico de N+1) comparten clave
+            self.sql_contador[sql] += 1
+
+    @property
+    def duplicadas(self):
+        """Número de consultas que repiten un SQL ya ejecutado en la petición."""
+        return sum(n - 1 for n in self.sql_contador.values() if n > 1)
+
+    def sql_mas_repetidos(self, limite=3):
+        """Lista de (sql, repeticiones) de los SQL ejecutados más de una vez."""
+        return [(sql, n) for sql, n in self.sql_contador.most_common(limite) if n > 1]
+
+    def iniciar_template(self):
+        self._profundidad_template += 1
+        return perf_counter()
+
+    def terminar_template(self, inicio):
+        self._profundidad_template -= 1
+        # Solo se suma el render más externo; los includes anidados
+        # (p.ej. crispy forms) ya están contenidos en su tiempo
+        if self._profundidad_template == 0:
+            self.tiempo_templates += perf_counter() - inicio
+
+    def como_dict(self):
+        """Campos estructurados para logging (tiempos en milisegundos)."""
+        return {
+            'consultas': self.consultas,
+            'consultas_duplicadas': self.duplicadas,
+            'sql_ms': round(self.tiempo_sql * 1000, 2),
+            'templates_ms': round(self.tiempo_templates * 1000, 2),
+            'vista_ms': round(self.tiempo_vista * 1000, 2),
+            'total_ms': round(self.tiempo_total * 1000, 2),
+        }
+
+    def server_timing(self):
+        """Valor para la cabecera ``Server-Timing``."""
+        return ', '.join([
+            f'sql;dur={self.tiempo_sql * 1000:.2f};desc="{self.consultas} consultas"',
+            f'dup;desc="{self.duplicadas} duplicadas"',
+            f'tpl;dur={self.tiempo_templates * 1000:.2f}',
+            f'vista;dur={self.tiempo_vista * 1000:.2f}',
+            f'total;dur={self.tiempo_total * 1000:.2f}',
+        ])
+
+
+class TemplateInstrumentado(Template):
+    """Template que suma su tiempo de render a las métricas de la petición."""
+
+    def render(self, context=None, request=None):
+        metricas = _metricas_actuales.get()
+        if metricas is None:
+            return super().render(context, request)
+
+        inicio = metricas.iniciar_template()
+        try:
+            return super().render(context, request)
+        finally:
+            metricas.terminar_template(inicio)
+
+
+class DjangoTemplatesInstrumentado(DjangoTemplates):
+    """Backend de templates de Django que mide el tiempo de render."""
+
+    def from_string(self, template_code):
+        return TemplateInstrumentado(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TemplateInstrumentado(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
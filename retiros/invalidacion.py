@@ -0,0 +1,37 @@
+"""
+Invalidación de cachés de proceso entre procesos
+
+El autocompletado (autocompletado.py), el grafo de zonas (zonas.py) y los
+calendarios de disponibilidad (disponibilidad.py) quedan en memoria de cada
+proceso. Cuando uno de ellos descarta su caché por un cambio, incrementa un
+contador (la generación) en la caché de Django (``CACHES``, compartida en
+producción) al confirmarse la transacción: antes los demás procesos leerían
+los datos anteriores. Cada lectura compara la generación compartida con la
+que vio al llenar su caché y la descarta si cambió.
+"""
+from time import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def generacion(clave):
+    """Generación compartida de ``clave``; la crea si no existe."""
+    valor = cache.get(clave)
+    if valor is None:
+        # Primera vez o se perdió: un valor nuevo, distinto de los anteriores
+        cache.add(clave, int(time() * 1000), None)
+        valor = cache.get(clave)
+    return valor
+
+
+def _incrementar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        generacion(clave)
+
+
+def publicar(clave):
+    """Avisa a los demás procesos, al confirmarse la transacción, que descarten su caché."""
+    transaction.on_commit(lambda: _incrementar(clave))
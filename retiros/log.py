@@ -0,0 +1,111 @@
+"""
+Logging no bloqueante de GestPyLab
+
+``ColaHandler`` es un ``QueueHandler``: en el hilo de la petición solo encola
+el registro, y un ``QueueListener`` en segundo plano lo escribe en un archivo
+con rotación por tamaño. ``FormateadorJSON`` escribe una línea JSON por
+registro, incluyendo los campos pasados con ``extra=``.
+"""
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timezone
+from pathlib import Path
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+
+# Atributos propios de LogRecord; el resto viene de ``extra=``
+_ATRIBUTOS_RECORD = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos de ``extra=`` al mismo nivel."""
+
+    def format(self, record):
+        datos = {
+            'fecha': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'modulo': record.module,
+            'mensaje': record.getMessage(),
+            'proceso': record.process,
+            'hilo': record.threadName,
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        if record.stack_info:
+            datos['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    Encola los registros y los escribe desde un hilo en segundo plano en un
+    ``RotatingFileHandler`` (rotación por tamaño).
+
+    Se configura desde ``settings.LOGGING`` con ``'()': 'retiros.log.ColaHandler'``.
+    El listener se inicia con el primer registro de cada proceso, para que los
+    workers creados con fork (gunicorn ``--preload``) tengan su propio hilo, y
+    se detiene al salir vaciando la cola.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, encoding='utf-8'):
+        super().__init__(queue.SimpleQueue())
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        self.destino = RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True
+        )
+        self._listener = None
+        self._pid = None
+        self._lock_inicio = threading.Lock()
+
+    def setFormatter(self, fmt):
+        # El formato se aplica en el hilo del listener, no al encolar
+        self.destino.setFormatter(fmt)
+
+    def prepare(self, record):
+        # A diferencia de QueueHandler.prepare, no formatea el mensaje completo:
+        # solo lo interpola (para no enviar objetos a otro hilo) y conserva los
+        # campos de ``extra=`` y la traza como texto
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._iniciar()
+        super().emit(record)
+
+    def _iniciar(self):
+        with self._lock_inicio:
+            if self._pid == os.getpid():
+                return
+            self._listener = QueueListener(self.queue, self.destino, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._detener, self._listener)
+
+    @staticmethod
+    def _detener(listener):
+        # stop() espera a que el hilo escriba lo que queda en la cola
+        if listener._thread is not None:
+            listener.stop()
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._detener(self._listener)
+            self._listener = None
+            self._pid = None
+        self.destino.close()
+        super().close()
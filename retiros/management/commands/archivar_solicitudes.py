@@ -0,0 +1,66 @@
+"""
+Archiva solicitudes completadas o canceladas antiguas, en lotes.
+
+Ejemplos:
+    python manage.py archivar_solicitudes
+    python manage.py archivar_solicitudes --dias 180 --lote 500 --pausa 0.2
+    python manage.py archivar_solicitudes --destino archivo --directorio /var/archivo/gestpylab
+    python manage.py archivar_solicitudes --simular
+"""
+from datetime import timedelta
+from time import perf_counter, sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from retiros.archivo import archivar_lote, candidatas, directorio_archivo
+
+
+class Command(BaseCommand):
+    help = ('Mueve las solicitudes completadas o canceladas con más de N días a la tabla de archivo '
+            'o a archivos JSONL comprimidos por mes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=getattr(settings, 'ARCHIVO_SOLICITUDES_DIAS', 365),
+                            help='Antigüedad mínima (fecha de retiro) en días (por defecto: ARCHIVO_SOLICITUDES_DIAS)')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Solicitudes por lote y por transacción (por defecto: 1000)')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes, para no saturar la base (por defecto: 0)')
+        parser.add_argument('--destino', choices=['tabla', 'archivo'], default='tabla',
+                            help='tabla: SolicitudRetiroArchivada; archivo: JSONL comprimidos por mes')
+        parser.add_argument('--directorio', default=None,
+                            help='Directorio de los archivos (por defecto: ARCHIVO_SOLICITUDES_DIR)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo cuenta las solicitudes que se archivarían')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--dias y --lote deben ser mayores que 0')
+
+        corte = timezone.now().date() - timedelta(days=options['dias'])
+        if options['simular']:
+            total = candidatas(corte).count()
+            self.stdout.write(f"Se archivarían {total} solicitudes con fecha de retiro anterior a {corte}")
+            return
+
+        directorio = None
+        if options['destino'] == 'archivo':
+            directorio = options['directorio'] or directorio_archivo()
+
+        inicio = perf_counter()
+        total = 0
+        while True:
+            movidas = archivar_lote(corte, options['lote'], directorio)
+            if not movidas:
+                break
+            total += movidas
+            self.stdout.write(f"  {total} solicitudes archivadas")
+            if options['pausa']:
+                sleep(options['pausa'])
+
+        destino = directorio or 'la tabla de archivo'
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivadas {total} solicitudes anteriores a {corte} en {destino} ({perf_counter() - inicio:.1f} s)"
+        ))
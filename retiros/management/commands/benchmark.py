@@ -0,0 +1,164 @@
+"""
+Ejecuta la suite de benchmarks sobre una base de datos de prueba desechable.
+
+Ejemplos:
+    python manage.py benchmark
+    python manage.py benchmark --escala mediana --iteraciones 50
+    python manage.py benchmark --actualizar-baseline
+    python manage.py benchmark --arranque
+    python manage.py benchmark --conexiones
+    python manage.py benchmark --rutas --paradas 200
+    python manage.py benchmark --agenda --paradas 200
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from retiros.benchmarks import (
+    BASELINE_PATH,
+    CASOS,
+    ESCALAS,
+    ahorro_por_peticion,
+    cargar_baseline,
+    comparar_arranque,
+    comparar_con_baseline,
+    ejecutar_suite,
+    es_bd_en_memoria,
+    formatear_agenda,
+    formatear_arranque,
+    formatear_rutas,
+    formatear_tabla,
+    guardar_baseline,
+    medir_agenda,
+    medir_arranque,
+    medir_conexiones,
+    medir_rutas,
+    sembrar_datos,
+)
+
+
+class Command(BaseCommand):
+    help = 'Mide latencias (p50/p90/p95/p99) y consultas de endpoints y servicios, y las compara con el baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=sorted(ESCALAS), default='pequena',
+                            help='Tamaño del dataset sembrado (por defecto: pequena)')
+        parser.add_argument('--iteraciones', type=int, default=20,
+                            help='Iteraciones medidas por caso (por defecto: 20)')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--caso', action='append', dest='casos', choices=[c.nombre for c in CASOS],
+                            help='Ejecutar solo este caso (se puede repetir)')
+        parser.add_argument('--baseline', default=str(BASELINE_PATH),
+                            help='Archivo JSON de baseline')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento relativo de p50 tolerado antes de fallar (por defecto: 0.25)')
+        parser.add_argument('--margen-ms', type=float, default=2.0,
+                            help='Margen absoluto en ms sumado al límite de p50 (por defecto: 2)')
+        parser.add_argument('--actualizar-baseline', action='store_true',
+                            help='Guarda los resultados como nuevo baseline en lugar de comparar')
+        parser.add_argument('--arranque', action='store_true',
+                            help='Mide el tiempo de importación del arranque de un worker (-X importtime) '
+                                 'en lugar de los endpoints')
+        parser.add_argument('--conexiones', action='store_true',
+                            help='Compara una conexión nueva por petición con la reutilización configurada '
+                                 '(DB_CONN_MAX_AGE / DB_POOL)')
+        parser.add_argument('--rutas', action='store_true',
+                            help='Compara el orden de recorrido calculado con el orden por hora de solicitud')
+        parser.add_argument('--agenda', action='store_true',
+                            help='Mide la agenda con horarios de atención y cuántas paradas quedan fuera de horario')
+        parser.add_argument('--paradas', type=int, default=200,
+                            help='Paradas por recorrido en --rutas y --agenda (por defecto: 200)')
+
+    def handle(self, *args, **options):
+        if options['arranque']:
+            return self._benchmark_arranque(options)
+        if options['rutas']:
+            resultado = medir_rutas(paradas=options['paradas'], repeticiones=options['iteraciones'],
+                                    semilla=options['semilla'])
+            self.stdout.write(formatear_rutas(resultado))
+            return
+        if options['agenda']:
+            resultado = medir_agenda(paradas=options['paradas'], repeticiones=options['iteraciones'],
+                                     semilla=options['semilla'])
+            self.stdout.write(formatear_agenda(resultado))
+            return
+
+        escala = options['escala']
+
+        # Nunca se siembra sobre la base de datos real: se crea una de prueba
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment()
+        bases_originales = runner.setup_databases()
+        try:
+            self.stdout.write(f"Sembrando dataset '{escala}'...")
+            ctx = sembrar_datos(escala, semilla=options['semilla'])
+            if options['conexiones']:
+                return self._benchmark_conexiones(ctx, options)
+            resultados = ejecutar_suite(ctx, iteraciones=options['iteraciones'], casos=options['casos'])
+        finally:
+            runner.teardown_databases(bases_originales)
+            teardown_test_environment()
+
+        baseline = cargar_baseline(options['baseline']).get(escala, {})
+        self.stdout.write(formatear_tabla(resultados, baseline))
+
+        if options['actualizar_baseline']:
+            guardar_baseline(escala, resultados, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline '{escala}' guardado en {options['baseline']}"))
+            return
+
+        if not baseline:
+            self.stdout.write(self.style.WARNING(
+                f"No hay baseline para la escala '{escala}'. Use --actualizar-baseline para crearlo."
+            ))
+            return
+
+        regresiones = comparar_con_baseline(
+            resultados, baseline, tolerancia=options['tolerancia'], margen_ms=options['margen_ms']
+        )
+        if regresiones:
+            for regresion in regresiones:
+                self.stderr.write(self.style.ERROR(f"REGRESIÓN {regresion}"))
+            raise CommandError(f"{len(regresiones)} regresión(es) respecto al baseline")
+
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto al baseline'))
+
+    def _benchmark_conexiones(self, ctx, options):
+        if es_bd_en_memoria():
+            self.stdout.write(self.style.WARNING(
+                'La base de prueba es SQLite en memoria: Django nunca cierra su conexión, '
+                'así que ambos modos miden lo mismo. Use PostgreSQL para ver el ahorro.'
+            ))
+        resultados = medir_conexiones(ctx, iteraciones=options['iteraciones'])
+        self.stdout.write(formatear_tabla(resultados))
+
+        ahorro = ahorro_por_peticion(resultados)
+        if ahorro is not None:
+            self.stdout.write(f"Ahorro por petición al reutilizar la conexión (p50): {ahorro:.2f} ms")
+
+    def _benchmark_arranque(self, options):
+        resultado = medir_arranque(repeticiones=max(1, min(options['iteraciones'], 10)))
+        baseline = cargar_baseline(options['baseline']).get('arranque')
+        self.stdout.write(formatear_arranque(resultado, baseline))
+
+        if options['actualizar_baseline']:
+            if resultado['prohibidos']:
+                raise CommandError('No se guarda un baseline que carga módulos prohibidos')
+            guardar_baseline(
+                'arranque',
+                {'total_ms': resultado['total_ms'], 'modulos': resultado['modulos']},
+                options['baseline'],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Baseline 'arranque' guardado en {options['baseline']}"))
+            return
+
+        # Se escala el margen: el arranque mide cientos de ms, no unos pocos
+        regresiones = comparar_arranque(
+            resultado, baseline, tolerancia=options['tolerancia'], margen_ms=options['margen_ms'] * 10
+        )
+        if regresiones:
+            for regresion in regresiones:
+                self.stderr.write(self.style.ERROR(f"REGRESIÓN {regresion}"))
+            raise CommandError(f"{len(regresiones)} regresión(es) en el arranque")
+
+        self.stdout.write(self.style.SUCCESS('Sin regresiones en el arranque'))
@@ -0,0 +1,101 @@
+"""
+Genera un dataset sintético grande y determinista.
+
+Ejemplos:
+    python manage.py generar_datos
+    python manage.py generar_datos --solicitantes 20000 --solicitudes 100000 --dias 365
+    python manage.py generar_datos --limpiar --noinput
+"""
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, router
+
+from retiros import autocompletado, disponibilidad, zonas
+from retiros.generador import GeneradorDatos
+from retiros.models import (
+    AdyacenciaZona, BajaSolicitud, DireccionGeocodificada, DisponibilidadRetirador, EventoSolicitud,
+    ItemManifiesto, Manifiesto, Retirador, Solicitante, SolicitudRetiro, SolicitudRetiroArchivada, Zona,
+)
+
+# Todo lo que genera el comando o se deriva de ello. ContadorCambios no se
+# vacía: los tokens de sincronización ya entregados deben seguir siendo menores
+# que las secuencias nuevas.
+MODELOS_A_LIMPIAR = [
+    ItemManifiesto, Manifiesto, EventoSolicitud, BajaSolicitud, SolicitudRetiroArchivada,
+    SolicitudRetiro, DisponibilidadRetirador, Retirador.zonas_preferidas.through, Retirador,
+    Solicitante, DireccionGeocodificada, AdyacenciaZona, Zona,
+]
+
+
+class Command(BaseCommand):
+    help = 'Genera zonas, retiradores, solicitantes e historial de solicitudes sintéticos con bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--zonas', type=int, default=30)
+        parser.add_argument('--retiradores', type=int, default=300)
+        parser.add_argument('--solicitantes', type=int, default=200_000)
+        parser.add_argument('--solicitudes', type=int, default=1_000_000,
+                            help='Solicitudes de historial (por defecto: 1.000.000)')
+        parser.add_argument('--dias', type=int, default=3 * 365,
+                            help='Días de historial hacia atrás (por defecto: 3 años)')
+        parser.add_argument('--solicitudes-hoy', type=int, default=None,
+                            help='Solicitudes pendientes/asignadas para hoy (por defecto: promedio diario)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Elimina todos los datos de retiros antes de generar')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        if options['limpiar']:
+            if options['interactive']:
+                respuesta = input('Se eliminarán TODAS las zonas, retiradores, solicitantes y solicitudes. ¿Continuar? [s/N] ')
+                if respuesta.strip().lower() != 's':
+                    raise CommandError('Cancelado')
+            self._limpiar()
+        elif Zona.objects.exists():
+            raise CommandError('Ya existen datos. Use --limpiar para reemplazarlos.')
+
+        inicio = perf_counter()
+        generador = GeneradorDatos(
+            semilla=options['semilla'],
+            batch_size=options['batch_size'],
+            progreso=self._progreso,
+        )
+        resultado = generador.generar(
+            zonas=options['zonas'],
+            retiradores=options['retiradores'],
+            solicitantes=options['solicitantes'],
+            solicitudes=options['solicitudes'],
+            dias=options['dias'],
+            solicitudes_hoy=options['solicitudes_hoy'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generados {len(resultado['zona_ids'])} zonas, {len(resultado['retirador_ids'])} retiradores, "
+            f"{len(resultado['solicitante_ids'])} solicitantes y {resultado['solicitudes']} solicitudes "
+            f"en {perf_counter() - inicio:.1f} s"
+        ))
+
+    def _limpiar(self):
+        """
+        Vacía las tablas de retiros sin pasar por el Collector ni por señales:
+        TRUNCATE en PostgreSQL, DELETE por tabla en SQLite (sql_flush de Django).
+        Los cachés de proceso se invalidan a mano porque no hay señales.
+        """
+        conexion = connections[router.db_for_write(SolicitudRetiro)]
+        tablas = [modelo._meta.db_table for modelo in MODELOS_A_LIMPIAR]
+        conexion.ops.execute_sql_flush(conexion.ops.sql_flush(no_style(), tablas, reset_sequences=True))
+        for cache in (autocompletado, disponibilidad, zonas):
+            cache.invalidar()
+
+    def _progreso(self, modelo, creados, total):
+        # Un aviso cada 10% por modelo
+        decil = creados * 10 // max(total, 1)
+        if not hasattr(self, '_deciles'):
+            self._deciles = {}
+        if decil != self._deciles.get(modelo):
+            self._deciles[modelo] = decil
+            self.stdout.write(f"  {modelo._meta.verbose_name_plural}: {creados}/{total}")
@@ -0,0 +1,55 @@
+"""
+Precalcula los manifiestos (lista de retiros + PDF) de cada retirador.
+
+Se programa después del cierre del horario de recepción (14:00), por ejemplo
+con cron:
+    15 14 * * 1-5  python manage.py generar_manifiestos
+
+Ejemplos:
+    python manage.py generar_manifiestos
+    python manage.py generar_manifiestos --fecha 2025-03-14
+    python manage.py generar_manifiestos --todos
+"""
+from datetime import timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from retiros.manifiestos import actualizar_manifiesto
+from retiros.models import Retirador
+
+
+class Command(BaseCommand):
+    help = ('Genera los manifiestos de los retiradores para un día (por defecto mañana). '
+            'Solo regenera los que faltan o quedaron desactualizados')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', default=None,
+                            help='Fecha de retiro, AAAA-MM-DD (por defecto: mañana)')
+        parser.add_argument('--todos', action='store_true',
+                            help='Regenera todos los manifiestos, aunque estén al día')
+
+    def handle(self, *args, **options):
+        if options['fecha']:
+            fecha = parse_date(options['fecha'])
+            if fecha is None:
+                raise CommandError('--fecha debe tener el formato AAAA-MM-DD')
+        else:
+            fecha = timezone.now().date() + timedelta(days=1)
+
+        inicio = perf_counter()
+        generados = vigentes = 0
+        for retirador in Retirador.objects.order_by('id'):
+            manifiesto, generado = actualizar_manifiesto(retirador, fecha, forzar=options['todos'])
+            if generado:
+                generados += 1
+                self.stdout.write(f"  {retirador}: {manifiesto.total} retiros")
+            else:
+                vigentes += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Manifiestos del {fecha}: {generados} generados, {vigentes} ya estaban al día "
+            f"({perf_counter() - inicio:.1f} s)"
+        ))
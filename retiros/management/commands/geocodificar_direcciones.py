@@ -0,0 +1,34 @@
+"""
+Completa las coordenadas de solicitantes y solicitudes abiertas.
+
+Las direcciones ya consultadas se leen del caché (DireccionGeocodificada);
+solo las nuevas llegan al geocodificador configurado (GEOCODIFICADOR).
+
+Ejemplos:
+    python manage.py geocodificar_direcciones
+    python manage.py geocodificar_direcciones --limite 100
+"""
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from retiros.geocodificacion import geocodificar_pendientes, obtener_geocodificador
+
+
+class Command(BaseCommand):
+    help = 'Geocodifica las direcciones de solicitantes y solicitudes abiertas que no tienen coordenadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=500,
+                            help='Máximo de solicitantes y de solicitudes por ejecución (por defecto: 500)')
+
+    def handle(self, *args, **options):
+        if options['limite'] < 1:
+            raise CommandError('--limite debe ser mayor que 0')
+
+        inicio = perf_counter()
+        actualizados = geocodificar_pendientes(options['limite'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocodificados {actualizados['solicitantes']} solicitantes y {actualizados['solicitudes']} "
+            f"solicitudes con '{obtener_geocodificador().nombre}' ({perf_counter() - inicio:.1f} s)"
+        ))
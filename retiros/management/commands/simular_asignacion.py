@@ -0,0 +1,62 @@
+"""
+Compara estrategias de asignación reproduciendo el historial de solicitudes.
+
+Ejemplos:
+    python manage.py simular_asignacion
+    python manage.py simular_asignacion --desde 2025-01-01 --hasta 2025-06-30
+    python manage.py simular_asignacion --estrategia desborde --estrategia lote --capacidad 8
+"""
+from datetime import timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+class Command(BaseCommand):
+    help = ('Reproduce en memoria las solicitudes de un rango de fechas con cada estrategia de '
+            'asignación y compara balance de carga, sin asignar y km estimados')
+
+    def add_arguments(self, parser):
+        from retiros.simulacion import ESTRATEGIAS
+
+        parser.add_argument('--desde', default=None,
+                            help='Primera fecha de retiro, AAAA-MM-DD (por defecto: hace un año)')
+        parser.add_argument('--hasta', default=None,
+                            help='Última fecha de retiro, AAAA-MM-DD (por defecto: ayer)')
+        parser.add_argument('--estrategia', action='append', choices=list(ESTRATEGIAS),
+                            help='Estrategia a simular; se puede repetir (por defecto: todas)')
+        parser.add_argument('--capacidad', type=int, default=None,
+                            help='Capacidad diaria de los retiradores que no la tienen (por defecto: sin límite)')
+        parser.add_argument('--desborde-minutos', type=int, default=None,
+                            help='Límite del desborde a zonas vecinas (por defecto: ASIGNACION_DESBORDE_MINUTOS)')
+
+    def _fecha(self, valor, opcion, por_defecto):
+        if not valor:
+            return por_defecto
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f'{opcion} debe tener el formato AAAA-MM-DD')
+        return fecha
+
+    def handle(self, *args, **options):
+        from retiros.simulacion import ESTRATEGIAS, cargar_escenario, formatear_simulacion, simular
+
+        hasta = self._fecha(options['hasta'], '--hasta', timezone.now().date() - timedelta(days=1))
+        desde = self._fecha(options['desde'], '--desde', hasta - timedelta(days=364))
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+        max_minutos = options['desborde_minutos']
+        if max_minutos is None:
+            max_minutos = settings.ASIGNACION_DESBORDE_MINUTOS
+
+        inicio = perf_counter()
+        escenario = cargar_escenario(desde, hasta, max_minutos=max_minutos, capacidad=options['capacidad'])
+        self.stdout.write(
+            f"{len(escenario.dia)} solicitudes en {escenario.n_dias} días, "
+            f"{len(escenario.fijo)} retiradores (cargadas en {perf_counter() - inicio:.1f} s)"
+        )
+        resultados = [simular(escenario, nombre) for nombre in options['estrategia'] or ESTRATEGIAS]
+        self.stdout.write(formatear_simulacion(resultados))
@@ -0,0 +1,172 @@
+"""
+Manifiestos precalculados de retiradores
+
+Después del cierre del horario de recepción, el comando
+``generar_manifiestos`` calcula una sola vez la lista de retiros de cada
+retirador para el día siguiente y la guarda como filas (``ItemManifiesto``) y
+como PDF en ``MEDIA_ROOT/manifiestos/``. En la mañana ``exportar_pdf_retirador``
+entrega ese archivo tal cual, sin armar la lista ni generar el PDF, y
+``lista_retirador`` muestra las filas en su orden, sin volver a ordenar la ruta.
+
+Cada manifiesto guarda la marca de agua de la secuencia de cambios
+(``marca_secuencia``) con que se generó. Si después cambió una solicitud que le afecta (asignada al retirador, sin
+asignar en sus zonas o que ya estaba en la lista) o se eliminó una de sus
+solicitudes, queda desactualizado y se regenera solo ese manifiesto la
+próxima vez que se pide. Los cambios de zonas del retirador o de datos del
+solicitante no se detectan: para esos casos está ``generar_manifiestos --todos``.
+"""
+from io import BytesIO
+import logging
+
+from django.core.files.base import ContentFile
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BajaSolicitud, ItemManifiesto, Manifiesto, Retirador, SolicitudRetiro, marca_secuencia
+from .services import SolicitudService
+
+logger = logging.getLogger(__name__)
+
+
+def desactualizado(manifiesto, using=None):
+    """
+    True si alguna solicitud del manifiesto (o que debería estar en él)
+    cambió o se eliminó después de generarlo. Dos consultas EXISTS, en la
+    base ``using`` (por defecto, la que elija el router). Un cambio
+    concurrente con la generación puede dejarlo desactualizado de más (se
+    regenera una vez), nunca de menos.
+    """
+    items = ItemManifiesto.objects.using(using).filter(manifiesto=manifiesto).values('solicitud_id')
+    zonas = Retirador.zonas_preferidas.through.objects.using(using).filter(
+        retirador_id=manifiesto.retirador_id
+    ).values('zona_id')
+    cambios = SolicitudRetiro.objects.using(using).filter(secuencia__gte=manifiesto.secuencia).filter(
+        Q(fecha_retiro=manifiesto.fecha, retirador_asignado_id=manifiesto.retirador_id)
+        | Q(fecha_retiro=manifiesto.fecha, retirador_asignado__isnull=True, solicitante__zona__in=zonas)
+        # Sin filtrar por fecha: también las que se movieron a otro día
+        | Q(id__in=items)
+    )
+    if cambios.exists():
+        return True
+    return BajaSolicitud.objects.using(using).filter(
+        fecha_retiro=manifiesto.fecha, secuencia__gte=manifiesto.secuencia, solicitud_id__in=items
+    ).exists()
+
+
+def generar_manifiesto(retirador, fecha, manifiesto=None):
+    """
+    Calcula la lista de retiros de ``retirador`` para ``fecha`` y guarda sus
+    filas y su PDF, reemplazando los anteriores.
+
+    Args:
+        retirador: Objeto Retirador
+        fecha: Fecha de los retiros
+        manifiesto: Manifiesto existente (ya leído) o None
+
+    Returns:
+        Manifiesto
+    """
+    # ReportLab se importa solo aquí (ver retiros/pdf.py)
+    from .pdf import escribir_pdf_lista_retiros, fila_pdf, nombre_pdf
+
+    with transaction.atomic():
+        # La marca se lee antes que la lista: un cambio que llegue entre
+        # ambas lecturas tiene secuencia >= marca y deja el manifiesto desactualizado
+        secuencia = marca_secuencia()
+        solicitudes = SolicitudService.obtener_ruta_retirador(retirador, fecha)
+        filas = [fila_pdf(solicitud) for solicitud in solicitudes]
+
+        contenido = BytesIO()
+        escribir_pdf_lista_retiros(contenido, filas, retirador, fecha)
+
+        if manifiesto is None:
+            manifiesto = Manifiesto(retirador=retirador, fecha=fecha)
+        anterior = manifiesto.pdf.name
+        manifiesto.secuencia = secuencia
+        manifiesto.generado = timezone.now()
+        manifiesto.total = len(filas)
+        manifiesto.pdf.save(nombre_pdf(retirador), ContentFile(contenido.getvalue()), save=False)
+        manifiesto.save()
+
+        ItemManifiesto.objects.filter(manifiesto=manifiesto).delete()
+        ItemManifiesto.objects.bulk_create([
+            ItemManifiesto(
+                manifiesto=manifiesto, orden=orden, solicitud=solicitud,
+                hora_solicitud=solicitud.hora_solicitud, hora_estimada=solicitud.hora_estimada,
+                fuera_de_horario=solicitud.fuera_de_horario, **fila,
+            )
+            for orden, (solicitud, fila) in enumerate(zip(solicitudes, filas), 1)
+        ])
+
+        if anterior:
+            storage = manifiesto.pdf.storage
+            transaction.on_commit(lambda: storage.delete(anterior))
+
+    logger.info("Manifiesto generado: %s %s (%s retiros)", retirador, fecha, len(filas))
+    return manifiesto
+
+
+def actualizar_manifiesto(retirador, fecha, forzar=False):
+    """
+    Genera el manifiesto de ``retirador`` para ``fecha`` si no existe o está
+    desactualizado. Bloquea la fila, así dos peticiones simultáneas no lo
+    generan dos veces.
+
+    Returns:
+        tuple: (Manifiesto, bool generado)
+    """
+    with transaction.atomic():
+        manifiesto = Manifiesto.objects.select_for_update().filter(retirador=retirador, fecha=fecha).first()
+        if manifiesto is not None and manifiesto.pdf and not forzar and not desactualizado(manifiesto):
+            return manifiesto, False
+        return generar_manifiesto(retirador, fecha, manifiesto), True
+
+
+def manifiesto_vigente(retirador, fecha):
+    """
+    Manifiesto al día de ``retirador`` para ``fecha``, regenerado si quedó
+    desactualizado. None si no se precalculó ninguno para ese día.
+
+    Se lee del primario aunque se llame dentro de ``solo_lectura``: con la
+    réplica atrasada no se verían los últimos cambios y se entregaría un
+    manifiesto viejo.
+    """
+    primario = router.db_for_write(Manifiesto)
+    manifiesto = Manifiesto.objects.using(primario).filter(retirador=retirador, fecha=fecha).exclude(pdf='').first()
+    if manifiesto is None:
+        return None
+    if desactualizado(manifiesto, using=primario):
+        manifiesto, _ = actualizar_manifiesto(retirador, fecha)
+    return manifiesto
+
+
+def ruta_manifiesto(manifiesto):
+    """
+    Solicitudes de ``manifiesto`` en el orden de recorrido con que se generó,
+    con ``hora_estimada`` y ``fuera_de_horario`` como las dejó
+    ``SolicitudService.ordenar_ruta``. Dos consultas, en la base de la que se
+    leyó el manifiesto.
+
+    Returns:
+        list de SolicitudRetiro, o None si el manifiesto no guardó la agenda
+    """
+    using = manifiesto._state.db
+    items = list(ItemManifiesto.objects.using(using).filter(manifiesto=manifiesto).order_by('orden').values_list(
+        'solicitud_id', 'hora_estimada', 'fuera_de_horario'
+    ))
+    if any(hora is None for _, hora, _ in items):
+        return None
+    solicitudes = SolicitudRetiro.objects.using(using).select_related(
+        'solicitante', 'solicitante__zona', 'retirador_asignado'
+    ).in_bulk([solicitud_id for solicitud_id, _, _ in items])
+
+    ruta = []
+    for solicitud_id, hora, fuera in items:
+        # Eliminada después de revisar si estaba al día
+        solicitud = solicitudes.get(solicitud_id)
+        if solicitud is not None:
+            solicitud.hora_estimada = hora
+            solicitud.fuera_de_horario = fuera
+            ruta.append(solicitud)
+    return ruta
@@ -0,0 +1,253 @@
+"""
+Middlewares de GestPyLab
+"""
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+import io
+import random
+import re
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .auditoria import agrupar_eventos
+from .instrumentacion import MetricasPeticion, _metricas_actuales
+from .routers import EstadoPeticion, _estado_peticion, alias_replica
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentacionMiddleware:
+    """
+    Registra por petición el número de consultas, el tiempo SQL, las consultas
+    duplicadas (detección de N+1), el tiempo de templates y el de la vista.
+
+    Las métricas se envían en la cabecera ``Server-Timing`` y como campos
+    estructurados al logger ``retiros``: en DEBUG cada petición y como
+    warning, con los SQL más repetidos, las que superan
+    ``INSTRUMENTACION_UMBRAL_LENTO_MS``.
+
+    Debe ir al principio de ``MIDDLEWARE`` para que el tiempo total
+    incluya al resto de middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.umbral_lento = getattr(settings, 'INSTRUMENTACION_UMBRAL_LENTO_MS', 1000) / 1000
+        self.server_timing = getattr(settings, 'INSTRUMENTACION_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        metricas = MetricasPeticion()
+        token = _metricas_actuales.set(metricas)
+        inicio = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conexion in connections.all():
+                    stack.enter_context(conexion.execute_wrapper(metricas))
+                response = self.get_response(request)
+        finally:
+            _metricas_actuales.reset(token)
+
+        fin = perf_counter()
+        metricas.tiempo_total = fin - inicio
+        if metricas.inicio_vista is not None:
+            metricas.tiempo_vista = fin - metricas.inicio_vista
+
+        if self.server_timing:
+            response['Server-Timing'] = metricas.server_timing()
+
+        self._registrar(request, response, metricas)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metricas = _metricas_actuales.get()
+        if metricas is not None:
+            metricas.inicio_vista = perf_counter()
+        return None
+
+    def _registrar(self, request, response, metricas):
+        campos = metricas.como_dict()
+        campos.update({
+            'metodo': request.method,
+            'ruta': request.path,
+            'status': response.status_code,
+        })
+
+        logger.debug(
+            "%s %s %s total=%.1fms vista=%.1fms sql=%.1fms consultas=%d duplicadas=%d templates=%.1fms",
+            request.method, request.path, response.status_code,
+            campos['total_ms'], campos['vista_ms'], campos['sql_ms'],
+            campos['consultas'], campos['consultas_duplicadas'], campos['templates_ms'],
+            extra={'metricas': campos},
+        )
+
+        if metricas.tiempo_total >= self.umbral_lento:
+            repetidos = metricas.sql_mas_repetidos()
+            logger.warning(
+                "Petición lenta: %s %s tardó %.1fms (%d consultas, %d duplicadas). SQL más repetidos: %s",
+                request.method, request.path, campos['total_ms'],
+                campos['consultas'], campos['consultas_duplicadas'],
+                '; '.join(f'{n}x {sql[:200]}' for sql, n in repetidos) or 'ninguno',
+                extra={'metricas': campos, 'sql_repetidos': repetidos},
+            )
+
+
+class ReplicaMiddleware:
+    """
+    Lectura de lo propio escrito (read-your-writes) con la réplica de lectura.
+
+    Si la petición escribe en la base de datos, el resto de la petición lee
+    del primario (ver ``retiros.routers``) y la respuesta lleva una cookie que
+    fija al primario las peticiones siguientes durante
+    ``REPLICA_FIJAR_SEGUNDOS``, cubriendo el retraso de replicación.
+
+    Sin réplica configurada el middleware se desinstala al arrancar. Debe ir
+    antes de ``SessionMiddleware`` para que las escrituras de sesión también
+    fijen la petición.
+    """
+
+    COOKIE = 'fijar_primario'
+
+    def __init__(self, get_response):
+        if alias_replica() is None:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.segundos = getattr(settings, 'REPLICA_FIJAR_SEGUNDOS', 5)
+
+    def __call__(self, request):
+        estado = EstadoPeticion(fijado=self.COOKIE in request.COOKIES)
+        token = _estado_peticion.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado_peticion.reset(token)
+
+        if estado.escribio:
+            response.set_cookie(self.COOKIE, '1', max_age=self.segundos, httponly=True, samesite='Lax')
+        return response
+
+
+class AuditoriaMiddleware:
+    """
+    Agrupa los eventos de auditoría de la petición (ver ``retiros.auditoria``)
+    y los guarda con un solo INSERT al terminar, con el usuario autenticado.
+
+    Debe ir después de ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with agrupar_eventos(usuario=lambda: self._usuario(request)):
+            return self.get_response(request)
+
+    @staticmethod
+    def _usuario(request):
+        usuario = getattr(request, 'user', None)
+        if usuario is not None and usuario.is_authenticated:
+            return usuario.get_username()
+        return ''
+
+
+class PerfiladorMiddleware:
+    """
+    Perfilador opcional de peticiones con cProfile.
+
+    Se activa por petición para usuarios staff con la cabecera ``X-Perfilar: 1``
+    o el parámetro ``?perfilar=1``, o por muestreo aleatorio con
+    ``PERFILADOR_MUESTREO`` (fracción entre 0 y 1). Cada perfil se guarda en
+    ``PERFILADOR_DIRECTORIO`` como ``.prof`` (para snakeviz/pstats) junto a un
+    resumen ``.txt`` ordenado por tiempo acumulado.
+
+    Con ``PERFILADOR_HABILITADO=False`` el middleware se desinstala al arrancar,
+    y si está habilitado pero la petición no se perfila solo cuesta un par de
+    comprobaciones. Debe ir al final de ``MIDDLEWARE`` (después de
+    ``AuthenticationMiddleware``) para perfilar principalmente la vista.
+    """
+
+    CABECERA = 'X-Perfilar'
+    PARAMETRO = 'perfilar'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADOR_HABILITADO', False):
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'PERFILADOR_MUESTREO', 0.0)
+        self.directorio = Path(getattr(settings, 'PERFILADOR_DIRECTORIO', settings.BASE_DIR / 'perfiles'))
+        self.lineas_resumen = getattr(settings, 'PERFILADOR_LINEAS_RESUMEN', 40)
+        # cProfile no admite dos perfiladores activos a la vez en el mismo
+        # proceso; si ya hay una petición perfilándose, la siguiente no se perfila
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        if not self._debe_perfilar(request) or not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        # cProfile y pstats se importan solo al perfilar, para no cargarlos en
+        # el arranque de cada worker
+        import cProfile
+
+        try:
+            perfil = cProfile.Profile()
+            inicio = perf_counter()
+            perfil.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                perfil.disable()
+            duracion = perf_counter() - inicio
+        finally:
+            self._lock.release()
+
+        try:
+            nombre = self._guardar(perfil, request, response, duracion)
+        except OSError as e:
+            logger.error("No se pudo guardar el perfil de %s: %s", request.path, e)
+        else:
+            logger.info("Perfil de %s %s guardado en %s", request.method, request.path, nombre)
+            if self._es_staff(request):
+                response['X-Perfil'] = nombre
+        return response
+
+    def _debe_perfilar(self, request):
+        solicitado = (
+            request.headers.get(self.CABECERA) == '1'
+            or request.GET.get(self.PARAMETRO) == '1'
+        )
+        if solicitado and self._es_staff(request):
+            return True
+        return self.muestreo > 0 and random.random() < self.muestreo
+
+    @staticmethod
+    def _es_staff(request):
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_authenticated and user.is_staff
+
+    def _guardar(self, perfil, request, response, duracion):
+        import pstats
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        ruta = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'raiz'
+        nombre = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{request.method}_{ruta[:80]}"
+
+        perfil.dump_stats(self.directorio / f'{nombre}.prof')
+
+        resumen = io.StringIO()
+        resumen.write(f"{request.method} {request.get_full_path()}\n")
+        resumen.write(f"Status: {response.status_code}\n")
+        resumen.write(f"Duración: {duracion * 1000:.1f} ms\n")
+        resumen.write(f"Usuario: {getattr(request, 'user', 'anónimo')}\n\n")
+        stats = pstats.Stats(perfil, stream=resumen)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.lineas_resumen)
+        (self.directorio / f'{nombre}.txt').write_text(resumen.getvalue(), encoding='utf-8')
+
+        return nombre
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+def crear_contador(apps, schema_editor):
+    ContadorCambios = apps.get_model('retiros', 'ContadorCambios')
+    ContadorCambios.objects.using(schema_editor.connection.alias).get_or_create(nombre='solicitudes')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0004_alter_solicitante_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BajaSolicitud',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solicitud_id', models.BigIntegerField()),
+                ('fecha_retiro', models.DateField()),
+                ('secuencia', models.BigIntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Baja de solicitud',
+                'verbose_name_plural': 'Bajas de solicitudes',
+            },
+        ),
+        migrations.CreateModel(
+            name='ContadorCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de cambios',
+                'verbose_name_plural': 'Contadores de cambios',
+            },
+        ),
+        migrations.AddField(
+            model_name='solicitudretiro',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='solicitudretiro',
+            name='secuencia',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudretiro',
+            index=models.Index(fields=['fecha_retiro', 'secuencia'], name='retiros_sol_fecha_r_e8f8bc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bajasolicitud',
+            index=models.Index(fields=['fecha_retiro', 'secuencia'], name='retiros_baj_fecha_r_a60d40_idx'),
+        ),
+        migrations.RunPython(crear_contador, migrations.RunPython.noop),
+    ]
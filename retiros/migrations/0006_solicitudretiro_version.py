@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0005_bajasolicitud_contadorcambios_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudretiro',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
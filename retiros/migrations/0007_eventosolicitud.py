@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0006_solicitudretiro_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSolicitud',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('creada', 'Creada'), ('asignada', 'Asignada'), ('reasignada', 'Reasignada'), ('desasignada', 'Desasignada'), ('completada', 'Completada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('estado_anterior', models.CharField(blank=True, max_length=20)),
+                ('estado_nuevo', models.CharField(max_length=20)),
+                ('usuario', models.CharField(blank=True, max_length=150)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('retirador', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='retiros.retirador')),
+                ('solicitud', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='eventos', to='retiros.solicitudretiro')),
+            ],
+            options={
+                'verbose_name': 'Evento de solicitud',
+                'verbose_name_plural': 'Eventos de solicitudes',
+                'indexes': [models.Index(fields=['solicitud', 'fecha'], include=('tipo', 'estado_anterior', 'estado_nuevo', 'retirador', 'usuario'), name='evento_solicitud_fecha_idx'), models.Index(fields=['fecha'], include=('solicitud', 'tipo', 'estado_anterior', 'estado_nuevo', 'retirador', 'usuario'), name='evento_fecha_idx')],
+            },
+        ),
+    ]
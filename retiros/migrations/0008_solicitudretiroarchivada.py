@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0007_eventosolicitud'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudRetiroArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('usar_direccion_solicitante', models.BooleanField(default=True)),
+                ('direccion_retiro', models.TextField()),
+                ('fecha_solicitud', models.DateTimeField()),
+                ('hora_solicitud', models.TimeField()),
+                ('fecha_retiro', models.DateField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('asignado', 'Asignado'), ('completado', 'Completado'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('notas', models.TextField(blank=True)),
+                ('fecha_actualizacion', models.DateTimeField()),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+                ('retirador_asignado', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='retiros.retirador')),
+                ('solicitante', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='retiros.solicitante')),
+            ],
+            options={
+                'verbose_name': 'Solicitud archivada',
+                'verbose_name_plural': 'Solicitudes archivadas',
+                'indexes': [models.Index(fields=['solicitante', 'fecha_retiro'], name='retiros_sol_solicit_274b92_idx'), models.Index(fields=['fecha_retiro'], name='retiros_sol_fecha_r_0b498d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0008_solicitudretiroarchivada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Manifiesto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('secuencia', models.BigIntegerField()),
+                ('generado', models.DateTimeField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('pdf', models.FileField(blank=True, upload_to='manifiestos/%Y/%m/')),
+                ('retirador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifiestos', to='retiros.retirador')),
+            ],
+            options={
+                'verbose_name': 'Manifiesto',
+                'verbose_name_plural': 'Manifiestos',
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemManifiesto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField()),
+                ('solicitante', models.CharField(max_length=100)),
+                ('tipo', models.CharField(max_length=50)),
+                ('zona', models.CharField(max_length=50)),
+                ('direccion', models.TextField()),
+                ('telefono', models.CharField(max_length=20)),
+                ('notas', models.TextField(blank=True)),
+                ('hora_solicitud', models.TimeField()),
+                ('solicitud', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='retiros.solicitudretiro')),
+                ('manifiesto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='retiros.manifiesto')),
+            ],
+            options={
+                'verbose_name': 'Item de manifiesto',
+                'verbose_name_plural': 'Items de manifiestos',
+                'ordering': ['manifiesto', 'orden'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='manifiesto',
+            constraint=models.UniqueConstraint(fields=('retirador', 'fecha'), name='manifiesto_retirador_fecha_unico'),
+        ),
+        migrations.AddIndex(
+            model_name='itemmanifiesto',
+            index=models.Index(fields=['manifiesto', 'orden'], name='retiros_ite_manifie_cd8d2a_idx'),
+        ),
+    ]
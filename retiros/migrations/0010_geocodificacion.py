@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0009_manifiesto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DireccionGeocodificada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('direccion', models.CharField(help_text='Dirección normalizada', max_length=255, unique=True)),
+                ('latitud', models.FloatField(blank=True, null=True)),
+                ('longitud', models.FloatField(blank=True, null=True)),
+                ('proveedor', models.CharField(blank=True, max_length=50)),
+                ('fecha', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dirección geocodificada',
+                'verbose_name_plural': 'Direcciones geocodificadas',
+            },
+        ),
+        migrations.AddField(
+            model_name='retirador',
+            name='celda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='retirador',
+            name='latitud',
+            field=models.FloatField(blank=True, help_text='Punto de partida (opcional)', null=True),
+        ),
+        migrations.AddField(
+            model_name='retirador',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitante',
+            name='celda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='solicitante',
+            name='latitud',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitante',
+            name='longitud',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitudretiro',
+            name='celda',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='solicitudretiro',
+            name='latitud',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitudretiro',
+            name='longitud',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudretiro',
+            index=models.Index(fields=['fecha_retiro', 'celda'], name='retiros_sol_fecha_r_9add43_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0010_geocodificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='retirador',
+            name='capacidad_diaria',
+            field=models.PositiveIntegerField(blank=True, help_text='Retiros por día como máximo (vacío: sin límite)', null=True),
+        ),
+        migrations.CreateModel(
+            name='AdyacenciaZona',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minutos', models.PositiveIntegerField(help_text='Tiempo de viaje entre ambas zonas')),
+                ('destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='retiros.zona')),
+                ('origen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adyacencias', to='retiros.zona')),
+            ],
+            options={
+                'verbose_name': 'Zona vecina',
+                'verbose_name_plural': 'Zonas vecinas',
+                'constraints': [models.UniqueConstraint(fields=('origen', 'destino'), name='adyacencia_zona_unica'), models.CheckConstraint(condition=models.Q(('origen', models.F('destino')), _negated=True), name='adyacencia_zona_distinta')],
+            },
+        ),
+    ]
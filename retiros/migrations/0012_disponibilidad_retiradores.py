@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0011_zonas_vecinas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisponibilidadRetirador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField(help_text='Desde cuándo no está disponible')),
+                ('fin', models.DateTimeField(help_text='Hasta cuándo no está disponible')),
+                ('motivo', models.CharField(choices=[('ausencia', 'Ausencia'), ('medio_dia', 'Medio día'), ('vacaciones', 'Vacaciones'), ('licencia', 'Licencia médica')], default='ausencia', max_length=20)),
+                ('observaciones', models.CharField(blank=True, max_length=200)),
+                ('retirador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disponibilidades', to='retiros.retirador')),
+            ],
+            options={
+                'verbose_name': 'Ausencia de retirador',
+                'verbose_name_plural': 'Disponibilidad de retiradores',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['inicio', 'fin'], name='disponibilidad_intervalo')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('fin__gt', models.F('inicio'))), name='disponibilidad_fin_posterior')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:13
+
+from django.db import migrations, models
+
+
+def calcular_datos_completos(apps, schema_editor):
+    # Copia de REGLAS_DATOS_COMPLETOS a la fecha de la migración: un UPDATE
+    Solicitante = apps.get_model('retiros', 'Solicitante')
+    completos = (
+        ~models.Q(email__isnull=True) & ~models.Q(email='') & models.Q(email_desconocido=False)
+        & ~models.Q(direccion_principal='') & models.Q(direccion_desconocida=False)
+        & ~models.Q(telefono='')
+    )
+    Solicitante.objects.using(schema_editor.connection.alias).update(
+        datos_completos=models.ExpressionWrapper(completos, output_field=models.BooleanField())
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0012_disponibilidad_retiradores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitante',
+            name='datos_completos',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='solicitante',
+            index=models.Index(condition=models.Q(('datos_completos', False)), fields=['nombre'], name='solicitante_incompletos'),
+        ),
+        migrations.RunPython(calcular_datos_completos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:17
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalizar_telefono(telefono, codigo_pais):
+    # Copia de normalizacion.normalizar_telefono a la fecha de la migración
+    texto = (telefono or '').strip()
+    digitos = re.sub(r'\D', '', texto)
+    if not digitos:
+        return ''
+    if texto.startswith('+'):
+        pass
+    elif digitos.startswith('00'):
+        digitos = digitos[2:]
+    elif not (digitos.startswith(codigo_pais) and len(digitos) > 9):
+        digitos = codigo_pais + digitos.lstrip('0')
+    return digitos[:15]
+
+
+def normalizar_telefonos(apps, schema_editor):
+    Solicitante = apps.get_model('retiros', 'Solicitante')
+    solicitantes = Solicitante.objects.using(schema_editor.connection.alias)
+    codigo_pais = getattr(settings, 'TELEFONO_CODIGO_PAIS', '56')
+    lote = []
+    for pk, telefono in list(solicitantes.values_list('pk', 'telefono')):
+        normalizado = normalizar_telefono(telefono, codigo_pais)
+        lote.append(Solicitante(pk=pk, telefono_normalizado=normalizado, telefono_invertido=normalizado[::-1]))
+    solicitantes.bulk_update(lote, ['telefono_normalizado', 'telefono_invertido'], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0013_solicitante_datos_completos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitante',
+            name='telefono_invertido',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='solicitante',
+            name='telefono_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.RunPython(normalizar_telefonos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:19
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def clave_busqueda(texto):
+    # Copia de normalizacion.clave_busqueda a la fecha de la migración
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return ' '.join(texto.split())[:255]
+
+
+def calcular_claves(apps, schema_editor):
+    Solicitante = apps.get_model('retiros', 'Solicitante')
+    solicitantes = Solicitante.objects.using(schema_editor.connection.alias)
+    lote = [
+        Solicitante(
+            pk=pk,
+            nombre_busqueda=clave_busqueda(nombre),
+            direccion_busqueda=clave_busqueda(direccion),
+            email_busqueda=clave_busqueda(email),
+        )
+        for pk, nombre, direccion, email in list(
+            solicitantes.values_list('pk', 'nombre', 'direccion_principal', 'email')
+        )
+    ]
+    solicitantes.bulk_update(
+        lote, ['nombre_busqueda', 'direccion_busqueda', 'email_busqueda'], batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0014_solicitante_telefono_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitante',
+            name='direccion_busqueda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='solicitante',
+            name='email_busqueda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='solicitante',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(calcular_claves, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def reiniciar_secuencias(apps, schema_editor):
+    # Las secuencias guardadas eran valores de ContadorCambios; en PostgreSQL
+    # ahora son ids de transacción y no se pueden comparar. Con 0 cada
+    # manifiesto con solicitudes se regenera una vez al pedirlo.
+    Manifiesto = apps.get_model('retiros', 'Manifiesto')
+    Manifiesto.objects.using(schema_editor.connection.alias).update(secuencia=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0015_solicitante_claves_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(reiniciar_secuencias, migrations.RunPython.noop),
+    ]
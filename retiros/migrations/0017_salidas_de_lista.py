@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0016_manifiesto_marca_secuencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bajasolicitud',
+            name='retirador_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bajasolicitud',
+            name='zona_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='retirador',
+            name='zonas_secuencia',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
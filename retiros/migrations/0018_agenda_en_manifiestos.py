@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0017_salidas_de_lista'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemmanifiesto',
+            name='fuera_de_horario',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='itemmanifiesto',
+            name='hora_estimada',
+            field=models.TimeField(blank=True, null=True),
+        ),
+    ]
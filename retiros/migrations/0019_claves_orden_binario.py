@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:08
+
+import retiros.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retiros', '0018_agenda_en_manifiestos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='retirador',
+            name='celda',
+            field=retiros.models.CharFieldBinario(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='celda',
+            field=retiros.models.CharFieldBinario(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='direccion_busqueda',
+            field=retiros.models.CharFieldBinario(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='email_busqueda',
+            field=retiros.models.CharFieldBinario(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='nombre_busqueda',
+            field=retiros.models.CharFieldBinario(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='telefono_invertido',
+            field=retiros.models.CharFieldBinario(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.AlterField(
+            model_name='solicitudretiro',
+            name='celda',
+            field=retiros.models.CharFieldBinario(blank=True, editable=False, max_length=12),
+        ),
+    ]
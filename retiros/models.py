@@ -1,5 +1,33 @@
-from django.db import models
+import operator
+
+from django.db import connections, models, router, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+from django.db.models.sql import UpdateQuery
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.core.validators import MinLengthValidator
+from django.utils import timezone
+
+from .geo import celda_de
+from .normalizacion import campos_telefono, clave_busqueda
+
+
+class CharFieldBinario(models.CharField):
+    """
+    CharField que la base de datos compara byte a byte. Los rangos por
+    prefijo (``filtro_prefijo`` de normalizacion.py, ``filtro_celdas`` de
+    geo.py) necesitan ese orden: con la intercalación de un idioma
+    (es_CL.UTF-8) PostgreSQL ignora la puntuación y "abc{" queda antes que
+    "abcd". En PostgreSQL la columna se declara COLLATE "C" y su índice
+    también la usa; SQLite ya compara con BINARY.
+    """
+
+    def db_parameters(self, connection):
+        parametros = super().db_parameters(connection)
+        if connection.vendor == 'postgresql':
+            parametros['collation'] = 'C'
+        return parametros
 
 # Modelo para Zonas (predefinidas: las que mencionaste)
 class Zona(models.Model):
@@ -8,6 +36,168 @@ class Zona(models.Model):
     def __str__(self):
         return self.nombre
 
+# Zonas vecinas y tiempo de viaje entre ellas (ver zonas.py). La adyacencia
+# vale en ambos sentidos: basta una fila por par.
+class AdyacenciaZona(models.Model):
+    origen = models.ForeignKey(Zona, on_delete=models.CASCADE, related_name='adyacencias')
+    destino = models.ForeignKey(Zona, on_delete=models.CASCADE, related_name='+')
+    minutos = models.PositiveIntegerField(help_text="Tiempo de viaje entre ambas zonas")
+
+    class Meta:
+        verbose_name = "Zona vecina"
+        verbose_name_plural = "Zonas vecinas"
+        constraints = [
+            models.UniqueConstraint(fields=['origen', 'destino'], name='adyacencia_zona_unica'),
+            models.CheckConstraint(condition=~models.Q(origen=F('destino')), name='adyacencia_zona_distinta'),
+        ]
+
+    def __str__(self):
+        return f"{self.origen} - {self.destino} ({self.minutos} min)"
+
+# Caché de geocodificación por dirección normalizada (ver geocodificacion.py).
+# Una dirección no encontrada se guarda sin coordenadas para no consultarla
+# de nuevo; se puede corregir a mano desde el admin.
+class DireccionGeocodificada(models.Model):
+    direccion = models.CharField(max_length=255, unique=True, help_text="Dirección normalizada")
+    latitud = models.FloatField(null=True, blank=True)
+    longitud = models.FloatField(null=True, blank=True)
+    proveedor = models.CharField(max_length=50, blank=True)
+    fecha = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Dirección geocodificada"
+        verbose_name_plural = "Direcciones geocodificadas"
+
+    def __str__(self):
+        return self.direccion
+
+# Un solicitante tiene los datos completos si se conocen su email, su
+# dirección y su teléfono. Es la única definición: por campo, el dato que
+# falta si no se cumple, la condición en Python sobre su valor y la misma
+# condición en SQL. save(), los cambios masivos (SolicitanteQuerySet) y las
+# consultas de incompletos la usan a través de datos_completos.
+REGLAS_DATOS_COMPLETOS = {
+    'email': ('email', bool, ~models.Q(email__isnull=True) & ~models.Q(email='')),
+    'email_desconocido': ('email', operator.not_, models.Q(email_desconocido=False)),
+    'direccion_principal': ('dirección', bool, ~models.Q(direccion_principal='')),
+    'direccion_desconocida': ('dirección', operator.not_, models.Q(direccion_desconocida=False)),
+    'telefono': ('teléfono', bool, ~models.Q(telefono='')),
+}
+
+
+def condicion_datos_completos(valores=None):
+    """
+    Expresión SQL de ``datos_completos``. Los campos presentes en ``valores``
+    (los de un update masivo) se evalúan en Python; el resto, sobre sus
+    columnas.
+    """
+    valores = valores or {}
+    condicion = models.Q()
+    for campo, (_, regla, q) in REGLAS_DATOS_COMPLETOS.items():
+        if campo not in valores:
+            condicion &= q
+        elif not regla(valores[campo]):
+            return models.Value(False)
+    if not condicion:
+        return models.Value(True)
+    return models.ExpressionWrapper(condicion, output_field=models.BooleanField())
+
+
+# Claves de búsqueda sin tildes ni mayúsculas (normalizacion.py): campo -> clave
+CLAVES_BUSQUEDA = {
+    'nombre': 'nombre_busqueda',
+    'direccion_principal': 'direccion_busqueda',
+    'email': 'email_busqueda',
+}
+
+# Campos de Solicitante que se calculan de otros: origen -> calculados
+CAMPOS_CALCULADOS = {campo: ('datos_completos',) for campo in REGLAS_DATOS_COMPLETOS}
+CAMPOS_CALCULADOS['telefono'] = ('datos_completos', 'telefono_normalizado', 'telefono_invertido')
+for _campo, _clave in CLAVES_BUSQUEDA.items():
+    CAMPOS_CALCULADOS[_campo] = CAMPOS_CALCULADOS.get(_campo, ()) + (_clave,)
+# Las coordenadas son de la dirección: se borran si cambia o es desconocida
+# (las vuelve a obtener geocodificar_direcciones)
+COORDENADAS = ('latitud', 'longitud', 'celda')
+for _campo in ('direccion_principal', 'direccion_desconocida'):
+    CAMPOS_CALCULADOS[_campo] += COORDENADAS
+
+
+def calculados_de(campos):
+    """Campos calculados que cambian si cambian ``campos``."""
+    return {calculado for campo in campos for calculado in CAMPOS_CALCULADOS.get(campo, ())}
+
+
+class SolicitanteQuerySet(models.QuerySet):
+    """
+    Mantiene los campos calculados en los cambios que no pasan por save() y
+    descarta la caché de autocompletado, que no recibe señales de ellos. Un
+    cambio de zona también cambia las listas de sus solicitudes abiertas
+    (``SolicitudRetiroQuerySet.cambio_de_zona``).
+    """
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            if {'zona', 'zona_id'} & kwargs.keys():
+                SolicitudRetiro.objects.using(self.db).filter(solicitante__in=self).cambio_de_zona()
+            filas = self._actualizar(kwargs)
+        invalidar_autocompletado(self.model)
+        return filas
+
+    update.alters_data = True
+
+    def _actualizar(self, kwargs):
+        origen = CAMPOS_CALCULADOS.keys() & kwargs.keys()
+        if not origen or calculados_de(origen) & kwargs.keys():
+            return super().update(**kwargs)
+        if any(hasattr(kwargs[campo], 'resolve_expression') for campo in origen):
+            # Valores calculados en SQL: se recalcula después sobre las mismas filas
+            if 'direccion_principal' in kwargs:
+                kwargs.update(latitud=None, longitud=None, celda='')
+            with transaction.atomic(using=self.db, savepoint=False):
+                ids = list(self.values_list('pk', flat=True))
+                filas = super().update(**kwargs)
+                actualizados = self.model._default_manager.using(self.db).filter(pk__in=ids)
+                actualizados.bulk_update(list(actualizados), list(origen))
+                return filas
+        if REGLAS_DATOS_COMPLETOS.keys() & origen:
+            kwargs['datos_completos'] = condicion_datos_completos(kwargs)
+        if 'telefono' in kwargs:
+            kwargs.update(campos_telefono(kwargs['telefono']))
+        for campo, clave in CLAVES_BUSQUEDA.items():
+            if campo in kwargs:
+                kwargs[clave] = clave_busqueda(kwargs[campo])
+        if 'direccion_principal' in kwargs or kwargs.get('direccion_desconocida'):
+            kwargs.update(latitud=None, longitud=None, celda='')
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.calcular_campos()
+        creados = super().bulk_create(objs, *args, **kwargs)
+        invalidar_autocompletado(self.model)
+        return creados
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        calculados = calculados_de(fields)
+        if calculados:
+            objs = list(objs)
+            for obj in objs:
+                obj.calcular_campos()
+            fields = [*fields, *sorted(calculados - set(fields))]
+        with transaction.atomic(using=self.db, savepoint=False):
+            if {'zona', 'zona_id'} & set(fields):
+                objs = list(objs)
+                SolicitudRetiro.objects.using(self.db).filter(solicitante__in=objs).cambio_de_zona()
+            filas = super().bulk_update(objs, fields, *args, **kwargs)
+        invalidar_autocompletado(self.model)
+        return filas
+
+    bulk_update.alters_data = True
+
+
 # Modelo para Solicitantes (mejorado con campos opcionales y validaciones)
 class Solicitante(models.Model):
     TIPO_SOLICITANTE = [
@@ -61,6 +251,30 @@ class Solicitante(models.Model):
         help_text="Marque si la dirección no se conoce aún"
     )
     
+    # Coordenadas de direccion_principal (comando geocodificar_direcciones) y
+    # su celda geohash para búsquedas por cercanía (ver geo.py)
+    latitud = models.FloatField(null=True, blank=True, editable=False)
+    longitud = models.FloatField(null=True, blank=True, editable=False)
+    celda = CharFieldBinario(max_length=12, blank=True, editable=False, db_index=True)
+    
+    # Email, dirección y teléfono conocidos (REGLAS_DATOS_COMPLETOS). Se
+    # guarda para que contar y listar los incompletos use solo el índice
+    # parcial solicitante_incompletos
+    datos_completos = models.BooleanField(default=False, editable=False)
+    
+    # Teléfono en E.164 solo con dígitos y al revés, para buscar por número
+    # completo o por sus últimos dígitos con el índice (ver normalizacion.py)
+    telefono_normalizado = models.CharField(max_length=15, blank=True, editable=False, db_index=True)
+    telefono_invertido = CharFieldBinario(max_length=15, blank=True, editable=False, db_index=True)
+    
+    # Claves de búsqueda (CLAVES_BUSQUEDA): minúsculas y sin tildes, para
+    # buscar por prefijo con el índice (ver normalizacion.py)
+    nombre_busqueda = CharFieldBinario(max_length=255, blank=True, editable=False, db_index=True)
+    direccion_busqueda = CharFieldBinario(max_length=255, blank=True, editable=False, db_index=True)
+    email_busqueda = CharFieldBinario(max_length=255, blank=True, editable=False, db_index=True)
+    
+    objects = SolicitanteQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Solicitante"
         verbose_name_plural = "Solicitantes"
@@ -69,6 +283,9 @@ class Solicitante(models.Model):
             models.Index(fields=['nombre']),
             models.Index(fields=['tipo']),
             models.Index(fields=['zona']),
+            models.Index(
+                fields=['nombre'], condition=models.Q(datos_completos=False), name='solicitante_incompletos',
+            ),
         ]
     
     def clean(self):
@@ -98,10 +315,31 @@ class Solicitante(models.Model):
                 'horario_atencion_inicio': 'Debe especificar hora de inicio si hay hora de fin.'
             })
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._direccion_cargada = instancia.__dict__.get('direccion_principal')
+        instancia._zona_cargada = instancia.__dict__.get('zona_id')
+        return instancia
+    
     def save(self, *args, **kwargs):
         """Override save para ejecutar validaciones"""
         self.full_clean()
-        super().save(*args, **kwargs)
+        self.calcular_campos()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *calculados_de(update_fields)}
+        cambio_zona = (
+            not self._state.adding and self.zona_id != getattr(self, '_zona_cargada', self.zona_id)
+            and (update_fields is None or 'zona' in update_fields)
+        )
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            if cambio_zona:
+                SolicitudRetiro.objects.using(using).filter(solicitante=self).cambio_de_zona()
+            super().save(*args, **kwargs)
+        self._direccion_cargada = self.direccion_principal
+        self._zona_cargada = self.zona_id
     
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()}) - {self.zona.nombre}"
@@ -118,13 +356,35 @@ class Solicitante(models.Model):
             return self.comentarios_horario_retiro
         return "Horario no especificado"
     
+    def datos_faltantes(self):
+        """Datos que faltan ('email', 'dirección', 'teléfono'), sin repetir"""
+        faltantes = []
+        for campo, (dato, regla, _) in REGLAS_DATOS_COMPLETOS.items():
+            if not regla(getattr(self, campo)) and dato not in faltantes:
+                faltantes.append(dato)
+        return faltantes
+    
+    def calcular_datos_completos(self):
+        """Valor de datos_completos según los campos actuales (sin guardar)"""
+        return not self.datos_faltantes()
+    
+    def calcular_campos(self):
+        """Actualiza los campos calculados (CAMPOS_CALCULADOS), sin guardar"""
+        # Si cambió la dirección, las coordenadas ya no corresponden
+        cambio_direccion = not self._state.adding and self.direccion_principal != getattr(self, '_direccion_cargada', None)
+        if self.direccion_desconocida or cambio_direccion:
+            self.latitud = self.longitud = None
+        self.celda = celda_de(self.latitud, self.longitud)
+        self.datos_completos = self.calcular_datos_completos()
+        for campo, valor in campos_telefono(self.telefono).items():
+            setattr(self, campo, valor)
+        for campo, clave in CLAVES_BUSQUEDA.items():
+            setattr(self, clave, clave_busqueda(getattr(self, campo)))
+    
     @property
     def tiene_datos_completos(self):
-        """Verifica si el solicitante tiene todos los datos necesarios"""
-        return (
-            (self.email or self.email_desconocido) and
-            (self.direccion_principal or self.direccion_desconocida)
-        )
+        """Alias de datos_completos (el valor guardado)"""
+        return self.datos_completos
     
 # Modelo para Retiradores (fijos y complementarios)
 class Retirador(models.Model):
@@ -136,10 +396,281 @@ class Retirador(models.Model):
     nombre = models.CharField(max_length=100)
     tipo = models.CharField(max_length=20, choices=TIPO, default='fijo')
     zonas_preferidas = models.ManyToManyField(Zona, help_text="Zonas que suele cubrir")
+    capacidad_diaria = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Retiros por día como máximo (vacío: sin límite)"
+    )
+    # Punto de partida del retirador (opcional), para buscar el más cercano
+    latitud = models.FloatField(null=True, blank=True, help_text="Punto de partida (opcional)")
+    longitud = models.FloatField(null=True, blank=True)
+    celda = CharFieldBinario(max_length=12, blank=True, editable=False, db_index=True)
+    # Secuencia del último cambio de zonas_preferidas: la sincronización
+    # incremental no sabe qué había en las zonas anteriores y envía la lista
+    # completa (ver registrar_cambio_zonas)
+    zonas_secuencia = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        self.celda = celda_de(self.latitud, self.longitud)
+        super().save(*args, **kwargs)
+
+# Intervalos en que un retirador no trabaja (día completo, medio día, un
+# trámite). La asignación y el dashboard los consultan en memoria, ver
+# disponibilidad.py.
+class DisponibilidadRetirador(models.Model):
+    MOTIVO = [
+        ('ausencia', 'Ausencia'),
+        ('medio_dia', 'Medio día'),
+        ('vacaciones', 'Vacaciones'),
+        ('licencia', 'Licencia médica'),
+    ]
+
+    retirador = models.ForeignKey(Retirador, on_delete=models.CASCADE, related_name='disponibilidades')
+    inicio = models.DateTimeField(help_text="Desde cuándo no está disponible")
+    fin = models.DateTimeField(help_text="Hasta cuándo no está disponible")
+    motivo = models.CharField(max_length=20, choices=MOTIVO, default='ausencia')
+    observaciones = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        verbose_name = "Ausencia de retirador"
+        verbose_name_plural = "Disponibilidad de retiradores"
+        ordering = ['-inicio']
+        indexes = [
+            models.Index(fields=['inicio', 'fin'], name='disponibilidad_intervalo'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(fin__gt=F('inicio')), name='disponibilidad_fin_posterior'),
+        ]
+
+    def __str__(self):
+        return f"{self.retirador} - {self.get_motivo_display()} ({self.inicio:%d/%m/%Y %H:%M} a {self.fin:%d/%m/%Y %H:%M})"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.inicio and self.fin and self.fin <= self.inicio:
+            raise ValidationError({'fin': 'Debe ser posterior al inicio'})
+
+# Contador monótono de cambios (secuencia de sincronización en motores sin
+# ids de transacción, ver siguiente_secuencia)
+class ContadorCambios(models.Model):
+    nombre = models.CharField(max_length=50, unique=True)
+    valor = models.BigIntegerField(default=0)
+
+    SOLICITUDES = 'solicitudes'
+
+    class Meta:
+        verbose_name = "Contador de cambios"
+        verbose_name_plural = "Contadores de cambios"
+
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
+
+    @classmethod
+    def siguiente(cls, nombre=SOLICITUDES, using=None):
+        """
+        Incrementa el contador y retorna el nuevo valor.
+
+        Debe llamarse dentro de la transacción que escribe el cambio: el UPDATE
+        bloquea la fila hasta el commit, así las secuencias se confirman en
+        orden y un cliente que sincronizó hasta N nunca se salta un cambio <= N.
+        """
+        using = using or router.db_for_write(cls)
+        conexion = connections[using]
+        with transaction.atomic(using=using, savepoint=False):
+            if conexion.vendor == 'postgresql' or (
+                conexion.vendor == 'sqlite' and conexion.features.can_return_columns_from_insert
+            ):
+                # Una sola consulta con UPDATE ... RETURNING
+                with conexion.cursor() as cursor:
+                    cursor.execute(
+                        'UPDATE {tabla} SET {valor} = {valor} + 1 WHERE {nombre} = %s RETURNING {valor}'.format(
+                            tabla=conexion.ops.quote_name(cls._meta.db_table),
+                            valor=conexion.ops.quote_name('valor'),
+                            nombre=conexion.ops.quote_name('nombre'),
+                        ),
+                        [nombre],
+                    )
+                    fila = cursor.fetchone()
+                if fila:
+                    return fila[0]
+            else:
+                contadores = cls.objects.using(using).filter(nombre=nombre)
+                if contadores.update(valor=F('valor') + 1):
+                    return contadores.values_list('valor', flat=True).get()
+
+            # La fila se crea en la migración 0005; solo falta si se vació la tabla
+            cls.objects.using(using).get_or_create(nombre=nombre)
+            return cls.siguiente(nombre, using)
+
+    @classmethod
+    def actual(cls, nombre=SOLICITUDES, using=None):
+        """Último valor confirmado del contador (0 si aún no hay cambios)."""
+        contadores = cls.objects.using(using) if using else cls.objects
+        return contadores.filter(nombre=nombre).values_list('valor', flat=True).first() or 0
+
+
+def _usa_id_transaccion(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def siguiente_secuencia(using=None):
+    """
+    Valor de ``secuencia`` para un cambio de solicitud (o una baja).
+
+    En PostgreSQL es el id de la transacción que escribe (``txid_current()``),
+    una expresión que se evalúa dentro del mismo UPDATE o INSERT: sin consultas
+    extra y sin una fila que todos los escritores deban bloquear. Los cambios
+    de una misma transacción comparten el valor. En otros motores (SQLite, una
+    transacción de escritura a la vez) es el siguiente valor de ContadorCambios.
+    """
+    using = using or router.db_for_write(SolicitudRetiro)
+    if _usa_id_transaccion(using):
+        return RawSQL('txid_current()', [], output_field=models.BigIntegerField())
+    return ContadorCambios.siguiente(using=using)
+
+
+def marca_secuencia(using=None):
+    """
+    Marca de agua de la secuencia: todo cambio que aún pueda confirmarse tendrá
+    ``secuencia >= marca``. Leerla antes que las filas y pedir la próxima vez
+    ``secuencia >= marca`` no pierde cambios (puede repetir alguno).
+
+    En PostgreSQL es el ``xmin`` del snapshot: la transacción más antigua aún
+    en curso (las anteriores ya terminaron). Los ids de transacción no se
+    confirman en orden, así que no basta con el mayor visible. En otros motores
+    es el valor de ContadorCambios más uno.
+    """
+    using = using or router.db_for_read(SolicitudRetiro)
+    if _usa_id_transaccion(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+            return cursor.fetchone()[0]
+    return ContadorCambios.actual(using=using) + 1
+
+
+# Estados de las solicitudes que aparecen en la lista de un retirador
+ESTADOS_EN_LISTA = ('pendiente', 'asignado')
+# Columnas de SolicitudRetiro que identifican su lista (registrar_salidas)
+COLUMNAS_SALIDA = ('id', 'fecha_retiro', 'retirador_asignado_id', 'solicitante__zona_id')
+
+
+class SolicitudRetiroQuerySet(models.QuerySet):
+    def _con_secuencia(self, kwargs):
+        # Los cambios masivos (acciones del admin, etc.) también avanzan la
+        # secuencia y la fecha de actualización, que auto_now no cubre en update()
+        if 'secuencia' not in kwargs:
+            kwargs['secuencia'] = siguiente_secuencia(using=self.db)
+        kwargs.setdefault('fecha_actualizacion', timezone.now())
+        # Cualquier escritura invalida las lecturas previas (ver estados.py)
+        kwargs.setdefault('version', F('version') + 1)
+        return kwargs
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            kwargs = self._con_secuencia(kwargs)
+            if {'retirador_asignado', 'retirador_asignado_id'} & kwargs.keys():
+                self._registrar_reasignacion(kwargs)
+            return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def _registrar_reasignacion(self, kwargs):
+        # Las que cambian de retirador salen de la lista en la que estaban
+        retirador = kwargs.get('retirador_asignado', kwargs.get('retirador_asignado_id'))
+        salen = self.filter(estado__in=ESTADOS_EN_LISTA)
+        if not hasattr(retirador, 'resolve_expression'):
+            salen = salen.exclude(retirador_asignado=retirador)
+        registrar_salidas(salen.values_list(*COLUMNAS_SALIDA), kwargs['secuencia'], using=self.db)
+
+    def cambio_de_zona(self):
+        """
+        Las solicitudes del queryset cambian de zona (la de su solicitante).
+        Las abiertas sin retirador salen de la lista de su zona actual
+        (registrar_salidas) y todas las abiertas avanzan su secuencia, para
+        llegar a la de la zona nueva. Se llama antes de cambiar la zona, en
+        la misma transacción.
+        """
+        abiertas = self.filter(estado__in=ESTADOS_EN_LISTA)
+        secuencia = siguiente_secuencia(using=self.db)
+        registrar_salidas(
+            abiertas.filter(retirador_asignado=None).values_list(*COLUMNAS_SALIDA), secuencia, using=self.db
+        )
+        abiertas.update(secuencia=secuencia)
+
+    cambio_de_zona.alters_data = True
+
+    def delete(self):
+        """
+        Borra las solicitudes del queryset con un DELETE y registra sus bajas
+        (BajaSolicitud) con un INSERT ... SELECT y una sola secuencia. El
+        Collector de Django, por la señal post_delete, las borraría fila a
+        fila; la señal queda para ``SolicitudRetiro.delete()``. Nada referencia
+        a SolicitudRetiro con restricción de clave foránea (DO_NOTHING,
+        db_constraint=False), así que no hay cascadas.
+
+        Returns:
+            tuple (borradas, {modelo: borradas}), como QuerySet.delete()
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        with transaction.atomic(using=self.db, savepoint=False):
+            secuencia = siguiente_secuencia(using=self.db)
+            if not hasattr(secuencia, 'resolve_expression'):
+                secuencia = models.Value(secuencia, output_field=models.BigIntegerField())
+            # Solo anotaciones, en el orden de las columnas del INSERT
+            columnas = {
+                'solicitud_id': F('id'), 'fecha_retiro': F('fecha_retiro'),
+                'retirador_id': F('retirador_asignado_id'), 'zona_id': F('solicitante__zona_id'),
+                'secuencia': secuencia,
+                'fecha': models.Value(timezone.now(), output_field=models.DateTimeField()),
+            }
+            alias = {f'_{nombre}': valor for nombre, valor in columnas.items()}
+            bajas = self.order_by().annotate(**alias).values_list(*alias)
+            sql, params = bajas.query.get_compiler(self.db).as_sql()
+            conexion = connections[self.db]
+            with conexion.cursor() as cursor:
+                cursor.execute('INSERT INTO {tabla} ({columnas}) {sql}'.format(
+                    tabla=conexion.ops.quote_name(BajaSolicitud._meta.db_table),
+                    columnas=', '.join(conexion.ops.quote_name(c) for c in columnas),
+                    sql=sql,
+                ), params)
+            borradas = self._chain()._raw_delete(self.db)
+        return borradas, {self.model._meta.label: borradas}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def actualizar_retornando(self, columnas, **kwargs):
+        """
+        Como update(), pero retorna los valores de ``columnas`` de las filas
+        actualizadas, calculados en la base (``secuencia``, ``version``), con
+        UPDATE ... RETURNING en la misma consulta.
+
+        Returns:
+            list de tuplas, una por fila actualizada
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            kwargs = self._con_secuencia(kwargs)
+            conexion = connections[self.db]
+            if not conexion.features.can_return_columns_from_insert:
+                # Sin RETURNING: se bloquean las filas y se leen después del UPDATE
+                ids = list(self.select_for_update().values_list('pk', flat=True))
+                actualizadas = self.model._default_manager.using(self.db).filter(pk__in=ids)
+                super(SolicitudRetiroQuerySet, actualizadas).update(**kwargs)
+                return list(actualizadas.values_list(*columnas))
+            query = self.query.chain(UpdateQuery)
+            query.add_update_values(kwargs)
+            query.annotations = {}
+            sql, params = query.get_compiler(self.db).as_sql()
+            retorno = ', '.join(conexion.ops.quote_name(self.model._meta.get_field(c).column) for c in columnas)
+            with conexion.cursor() as cursor:
+                cursor.execute(f'{sql} RETURNING {retorno}', params)
+                return cursor.fetchall()
+
+    actualizar_retornando.alters_data = True
+
+
 # Modelo para Solicitudes de Retiro (agregamos lógica de dirección)
 class SolicitudRetiro(models.Model):
     ESTADO_CHOICES = [
@@ -158,10 +689,345 @@ class SolicitudRetiro(models.Model):
     retirador_asignado = models.ForeignKey(Retirador, on_delete=models.SET_NULL, null=True, blank=True)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
     notas = models.TextField(blank=True, help_text="Ej: Tipo de animal (canino, felino), urgencia")
+
+    # Sincronización incremental (api/sync/): cada cambio recibe un valor
+    # mayor que la marca de agua vigente (siguiente_secuencia)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
+    secuencia = models.BigIntegerField(default=0, editable=False)
+    # Control de concurrencia optimista: aumenta en cada escritura (estados.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Coordenadas de direccion_retiro y su celda geohash (ver geo.py)
+    latitud = models.FloatField(null=True, blank=True, editable=False)
+    longitud = models.FloatField(null=True, blank=True, editable=False)
+    celda = CharFieldBinario(max_length=12, blank=True, editable=False)
+
+    objects = SolicitudRetiroQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_retiro', 'secuencia']),
+            # Solicitudes de un día cerca de un punto (geo.en_radio)
+            models.Index(fields=['fecha_retiro', 'celda']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._direccion_cargada = instancia.__dict__.get('direccion_retiro')
+        instancia._lista_cargada = tuple(
+            instancia.__dict__.get(campo) for campo in ('estado', 'retirador_asignado_id', 'solicitante_id')
+        )
+        return instancia
+
     def save(self, *args, **kwargs):
         # Lógica automática: Si usas dirección del solicitante y tiene una, cópiala
         if self.usar_direccion_solicitante and self.solicitante.direccion_principal:
             self.direccion_retiro = self.solicitante.direccion_principal
-        super().save(*args, **kwargs)
+            self.latitud, self.longitud = self.solicitante.latitud, self.solicitante.longitud
+        elif not self._state.adding and self.direccion_retiro != getattr(self, '_direccion_cargada', None):
+            # Dirección nueva: la geocodifica geocodificar_direcciones
+            self.latitud = self.longitud = None
+        self.celda = celda_de(self.latitud, self.longitud)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        actualizando = not self._state.adding
+        if actualizando:
+            # Se incrementa en la base: un objeto leído antes de otro cambio no
+            # debe hacer retroceder la versión
+            self.version = F('version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'], 'version', 'secuencia', 'fecha_actualizacion',
+                }
+        with transaction.atomic(using=using, savepoint=False):
+            self.secuencia = siguiente_secuencia(using=using)
+            super().save(*args, **kwargs)
+            if actualizando and hasattr(self, '_lista_cargada'):
+                self.registrar_salida(*self._lista_cargada, using=using)
+        self._direccion_cargada = self.direccion_retiro
+        self._lista_cargada = (self.estado, self.retirador_asignado_id, self.solicitante_id)
+
+    def registrar_salida(self, estado, retirador_id, solicitante_id, using=None):
+        """
+        Registra la salida de la lista en la que estaba la solicitud antes de
+        un cambio (con ``estado``, ``retirador_id`` y ``solicitante_id``), si
+        cambió de retirador o de solicitante. Con otro solicitante no se sabe
+        la zona anterior y la salida se informa a todos. La lista actual queda
+        como la cargada, para el próximo save().
+        """
+        self._lista_cargada = (self.estado, self.retirador_asignado_id, self.solicitante_id)
+        if estado not in ESTADOS_EN_LISTA:
+            return
+        if (retirador_id, solicitante_id) == (self.retirador_asignado_id, self.solicitante_id):
+            return
+        zona_id = self.solicitante.zona_id if solicitante_id == self.solicitante_id else None
+        registrar_salidas([(self.pk, self.fecha_retiro, retirador_id, zona_id)], self.secuencia, using=using)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # La versión y la secuencia calculadas en la base vuelven en el mismo UPDATE
+        if not values:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        filas = type(self).objects.using(using).filter(pk=pk_val).actualizar_retornando(
+            ['version', 'secuencia'], **{campo.name: valor for campo, _, valor in values}
+        )
+        if not filas:
+            return False
+        self.version, self.secuencia = filas[0]
+        return True
+
+    def _do_insert(self, manager, using, fields, returning_fields, raw):
+        # Idem en el INSERT, si la secuencia es una expresión (siguiente_secuencia)
+        if not hasattr(self.secuencia, 'resolve_expression'):
+            return super()._do_insert(manager, using, fields, returning_fields, raw)
+        secuencia = self._meta.get_field('secuencia')
+        filas = super()._do_insert(manager, using, fields, [*returning_fields, secuencia], raw)
+        self.secuencia = filas[0][-1]
+        return filas
+
     def __str__(self):
         dir_str = self.direccion_retiro[:50] + "..." if len(self.direccion_retiro) > 50 else self.direccion_retiro
+        return f"{self.solicitante.nombre} - {dir_str} ({self.fecha_retiro})"
+
+
+# Registro de solicitudes que salieron de una lista (eliminadas, reasignadas o
+# cuyo solicitante cambió de zona), para informarlas en la sincronización
+class BajaSolicitud(models.Model):
+    solicitud_id = models.BigIntegerField()
+    fecha_retiro = models.DateField()
+    secuencia = models.BigIntegerField()
+    fecha = models.DateTimeField(auto_now_add=True)
+    # Lista de la que salió: la del retirador asignado o, sin retirador, la de
+    # la zona del solicitante. Sin ninguno de los dos se informa a todos.
+    retirador_id = models.BigIntegerField(null=True, blank=True)
+    zona_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Baja de solicitud"
+        verbose_name_plural = "Bajas de solicitudes"
+        indexes = [
+            models.Index(fields=['fecha_retiro', 'secuencia']),
+        ]
+
+    def __str__(self):
+        return f"Solicitud {self.solicitud_id} eliminada ({self.fecha_retiro})"
+
+
+# Solicitudes completadas o canceladas antiguas, movidas aquí por el comando
+# archivar_solicitudes (ver archivo.py). Conservan el id original.
+class SolicitudRetiroArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    # Sin restricción de clave foránea: el archivo no impide eliminar
+    # solicitantes o retiradores
+    solicitante = models.ForeignKey(
+        Solicitante, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    usar_direccion_solicitante = models.BooleanField(default=True)
+    direccion_retiro = models.TextField()
+    fecha_solicitud = models.DateTimeField()
+    hora_solicitud = models.TimeField()
+    fecha_retiro = models.DateField()
+    retirador_asignado = models.ForeignKey(
+        Retirador, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    estado = models.CharField(max_length=20, choices=SolicitudRetiro.ESTADO_CHOICES)
+    notas = models.TextField(blank=True)
+    fecha_actualizacion = models.DateTimeField()
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Solicitud archivada"
+        verbose_name_plural = "Solicitudes archivadas"
+        indexes = [
+            models.Index(fields=['solicitante', 'fecha_retiro']),
+            models.Index(fields=['fecha_retiro']),
+        ]
+
+    def __str__(self):
+        return f"Solicitud {self.id} archivada ({self.fecha_retiro})"
+
+
+# Columnas que leen las consultas del historial (auditoria.py)
+COLUMNAS_HISTORIAL = ['tipo', 'estado_anterior', 'estado_nuevo', 'retirador', 'usuario']
+
+
+# Historial de cambios de las solicitudes (solo se agregan filas, ver auditoria.py)
+class EventoSolicitud(models.Model):
+    TIPOS = [
+        ('creada', 'Creada'),
+        ('asignada', 'Asignada'),
+        ('reasignada', 'Reasignada'),
+        ('desasignada', 'Desasignada'),
+        ('completada', 'Completada'),
+        ('cancelada', 'Cancelada'),
+    ]
+
+    # Sin restricción de clave foránea: el historial se conserva aunque la
+    # solicitud o el retirador se eliminen, y el INSERT no valida contra ellos
+    solicitud = models.ForeignKey(
+        SolicitudRetiro, on_delete=models.DO_NOTHING, db_constraint=False, related_name='eventos'
+    )
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    estado_anterior = models.CharField(max_length=20, blank=True)
+    estado_nuevo = models.CharField(max_length=20)
+    retirador = models.ForeignKey(
+        Retirador, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    usuario = models.CharField(max_length=150, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Evento de solicitud"
+        verbose_name_plural = "Eventos de solicitudes"
+        # Índices que cubren las dos consultas del historial (include solo
+        # tiene efecto en PostgreSQL; en otros motores son índices normales)
+        indexes = [
+            models.Index(
+                fields=['solicitud', 'fecha'], include=COLUMNAS_HISTORIAL, name='evento_solicitud_fecha_idx'
+            ),
+            models.Index(
+                fields=['fecha'], include=['solicitud', *COLUMNAS_HISTORIAL], name='evento_fecha_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Solicitud {self.solicitud_id}: {self.get_tipo_display()} ({self.fecha:%Y-%m-%d %H:%M})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Los eventos de solicitud no se modifican")
+        super().save(*args, **kwargs)
+
+
+# Lista de retiros precalculada de un retirador para un día, con su PDF
+# (ver manifiestos.py)
+class Manifiesto(models.Model):
+    retirador = models.ForeignKey(Retirador, on_delete=models.CASCADE, related_name='manifiestos')
+    fecha = models.DateField()
+    # Marca de agua al generarlo (marca_secuencia): un cambio con secuencia
+    # igual o mayor que toque estas solicitudes lo deja desactualizado
+    secuencia = models.BigIntegerField()
+    generado = models.DateTimeField()
+    total = models.PositiveIntegerField(default=0)
+    pdf = models.FileField(upload_to='manifiestos/%Y/%m/', blank=True)
+
+    class Meta:
+        verbose_name = "Manifiesto"
+        verbose_name_plural = "Manifiestos"
+        constraints = [
+            models.UniqueConstraint(fields=['retirador', 'fecha'], name='manifiesto_retirador_fecha_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.retirador} - {self.fecha} ({self.total} retiros)"
+
+
+class ItemManifiesto(models.Model):
+    manifiesto = models.ForeignKey(Manifiesto, on_delete=models.CASCADE, related_name='items')
+    orden = models.PositiveIntegerField()
+    # Sin restricción de clave foránea: el manifiesto es una copia y no
+    # impide eliminar o archivar la solicitud
+    solicitud = models.ForeignKey(
+        SolicitudRetiro, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    # Columnas del PDF al momento de generar (pdf.fila_pdf)
+    solicitante = models.CharField(max_length=100)
+    tipo = models.CharField(max_length=50)
+    zona = models.CharField(max_length=50)
+    direccion = models.TextField()
+    telefono = models.CharField(max_length=20)
+    notas = models.TextField(blank=True)
+    hora_solicitud = models.TimeField()
+    # Agenda al generar (SolicitudService.ordenar_ruta); nula en manifiestos
+    # anteriores a que se guardara
+    hora_estimada = models.TimeField(null=True, blank=True)
+    fuera_de_horario = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Item de manifiesto"
+        verbose_name_plural = "Items de manifiestos"
+        ordering = ['manifiesto', 'orden']
+        indexes = [
+            models.Index(fields=['manifiesto', 'orden']),
+        ]
+
+    def __str__(self):
+        return f"{self.orden}. {self.solicitante}"
+
+
+def registrar_salidas(filas, secuencia, using=None):
+    """
+    Registra que solicitudes salieron de la lista en la que estaban, para
+    informarlas como eliminadas solo a quienes la tenían (BajaSolicitud).
+
+    Args:
+        filas: iterable de tuplas (solicitud_id, fecha_retiro, retirador_id, zona_id)
+        secuencia: La del cambio que las saca (misma transacción)
+    """
+    filas = list(filas)
+    if not filas:
+        return
+    BajaSolicitud.objects.using(using).bulk_create([
+        BajaSolicitud(
+            solicitud_id=solicitud_id, fecha_retiro=fecha_retiro,
+            retirador_id=retirador_id, zona_id=zona_id, secuencia=secuencia,
+        )
+        for solicitud_id, fecha_retiro, retirador_id, zona_id in filas
+    ])
+
+
+@receiver(post_delete, sender=SolicitudRetiro)
+def registrar_baja_solicitud(sender, instance, using, **kwargs):
+    BajaSolicitud.objects.using(using).create(
+        solicitud_id=instance.id,
+        fecha_retiro=instance.fecha_retiro,
+        retirador_id=instance.retirador_asignado_id,
+        zona_id=models.Subquery(
+            Solicitante.objects.using(using).filter(pk=instance.solicitante_id).values('zona_id')[:1]
+        ),
+        secuencia=siguiente_secuencia(using=using),
+    )
+
+
+@receiver(m2m_changed, sender=Retirador.zonas_preferidas.through)
+def registrar_cambio_zonas(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # Desde la zona (zona.retirador_set) se conocen los retiradores antes de
+    # vaciarla; desde el retirador, después
+    if reverse:
+        if action == 'pre_clear':
+            ids = list(instance.retirador_set.using(using).values_list('pk', flat=True))
+        elif action in ('post_add', 'post_remove'):
+            ids = pk_set
+        else:
+            return
+    elif action in ('post_add', 'post_remove', 'post_clear') and (pk_set is None or pk_set):
+        ids = [instance.pk]
+    else:
+        return
+    if ids:
+        Retirador.objects.using(using).filter(pk__in=ids).update(zonas_secuencia=siguiente_secuencia(using=using))
+
+
+@receiver(post_save, sender=Zona)
+@receiver(post_delete, sender=Zona)
+@receiver(post_save, sender=AdyacenciaZona)
+@receiver(post_delete, sender=AdyacenciaZona)
+def invalidar_grafo_zonas(sender, **kwargs):
+    from .zonas import invalidar
+    invalidar()
+
+
+@receiver(post_save, sender=DisponibilidadRetirador)
+@receiver(post_delete, sender=DisponibilidadRetirador)
+def invalidar_calendario_disponibilidad(sender, **kwargs):
+    from .disponibilidad import invalidar
+    invalidar()
+
+
+# Los resultados de autocompletado incluyen el nombre de la zona. Los cambios
+# masivos de solicitantes la llaman desde SolicitanteQuerySet.
+@receiver(post_save, sender=Solicitante)
+@receiver(post_delete, sender=Solicitante)
+@receiver(post_save, sender=Zona)
+@receiver(post_delete, sender=Zona)
+def invalidar_autocompletado(sender, **kwargs):
+    from .autocompletado import invalidar
+    invalidar()
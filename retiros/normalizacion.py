@@ -0,0 +1,103 @@
+"""
+Normalización de datos de solicitantes para búsquedas con índice
+
+Nombre, dirección y email se guardan también como clave de búsqueda
+(``clave_busqueda``): minúsculas, sin tildes ni puntuación, con espacios
+simples. "Viña del Mar" y "vina del  mar" tienen la misma clave, y una
+búsqueda es un rango por prefijo sobre el índice de la clave
+(``filtro_prefijo``) en cualquier motor de base de datos.
+
+Los teléfonos se guardan en varios formatos (``+56 9 1234 5678``,
+``912345678``, ``0056 9 ...``). ``normalizar_telefono`` los lleva a E.164 solo
+con dígitos (``56912345678``), que se guarda en ``telefono_normalizado``, y
+también al revés en ``telefono_invertido``: los últimos dígitos de un número
+son un prefijo del número invertido, así buscar por terminación es un rango
+sobre el índice (como las celdas de geo.py) y no un ``icontains`` que
+recorre la tabla.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Q
+
+# Largo de un número nacional sin código de país (Chile: 9 dígitos)
+LARGO_NACIONAL = 9
+# Máximo de dígitos de un número E.164
+LARGO_E164 = 15
+# Dígitos mínimos para tratar una búsqueda como teléfono
+MIN_DIGITOS_TELEFONO = 4
+# Largo de las columnas de clave de búsqueda
+LARGO_CLAVE = 255
+
+_PARECE_TELEFONO = re.compile(r'^\+?[\d\s().-]+$')
+
+
+def clave_busqueda(texto):
+    """
+    Clave de búsqueda de un texto: minúsculas, sin tildes, sin puntuación y
+    con espacios simples ("Peñalolén, Av. Grecia #12" -> "penalolen av grecia 12").
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return ' '.join(texto.split())[:LARGO_CLAVE]
+
+
+def filtro_prefijo(campo, prefijo):
+    """
+    Q de los valores de ``campo`` que empiezan por ``prefijo``: un rango que
+    usa su índice. ``campo`` debe compararse byte a byte (CharFieldBinario).
+    """
+    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+    return Q(**{f'{campo}__gte': prefijo, f'{campo}__lt': siguiente})
+
+
+def _digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def normalizar_telefono(telefono, codigo_pais=None):
+    """
+    Teléfono en E.164 solo con dígitos: '+56 9 1234 5678', '912345678' y
+    '0056912345678' -> '56912345678'. Un número sin código de país recibe
+    ``TELEFONO_CODIGO_PAIS``. '' si no tiene dígitos.
+    """
+    if codigo_pais is None:
+        codigo_pais = getattr(settings, 'TELEFONO_CODIGO_PAIS', '56')
+    texto = (telefono or '').strip()
+    digitos = _digitos(texto)
+    if not digitos:
+        return ''
+    if texto.startswith('+'):
+        pass
+    elif digitos.startswith('00'):
+        digitos = digitos[2:]
+    elif not (digitos.startswith(codigo_pais) and len(digitos) > LARGO_NACIONAL):
+        digitos = codigo_pais + digitos.lstrip('0')
+    return digitos[:LARGO_E164]
+
+
+def campos_telefono(telefono):
+    """Valores de ``telefono_normalizado`` y ``telefono_invertido`` de un teléfono."""
+    normalizado = normalizar_telefono(telefono)
+    return {'telefono_normalizado': normalizado, 'telefono_invertido': normalizado[::-1]}
+
+
+def es_telefono(texto):
+    """True si la búsqueda es un teléfono o parte de uno (solo dígitos y separadores)."""
+    texto = (texto or '').strip()
+    return bool(_PARECE_TELEFONO.match(texto)) and len(_digitos(texto)) >= MIN_DIGITOS_TELEFONO
+
+
+def filtro_telefono(texto):
+    """
+    Q para buscar un teléfono con índice: el número exacto si la búsqueda
+    tiene código de país o el largo de un número nacional, y si no, los
+    números que terminan en esos dígitos (rango sobre ``telefono_invertido``).
+    """
+    texto = texto.strip()
+    digitos = _digitos(texto)
+    if texto.startswith('+') or len(digitos) >= LARGO_NACIONAL:
+        return Q(telefono_normalizado=normalizar_telefono(texto))
+    return filtro_prefijo('telefono_invertido', digitos[::-1])
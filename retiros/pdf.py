@@ -0,0 +1,207 @@
+"""
+Generación de PDFs de GestPyLab
+
+Este módulo importa ReportLab, que por sí solo tarda más en cargar que el
+resto de la aplicación. Solo debe importarse dentro de las vistas que generan
+PDFs, nunca a nivel de módulo (ver ``retiros.benchmarks.arranque``).
+"""
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from django.http import HttpResponse
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+def fila_pdf(solicitud):
+    """
+    Columnas del PDF para una solicitud (con solicitante y zona cargados).
+    Los manifiestos guardan estas mismas columnas en ItemManifiesto.
+    """
+    return {
+        'solicitante': solicitud.solicitante.nombre,
+        'tipo': solicitud.solicitante.get_tipo_display(),
+        'zona': solicitud.solicitante.zona.nombre,
+        'direccion': solicitud.direccion_retiro,
+        'telefono': solicitud.solicitante.telefono,
+        'notas': solicitud.notas,
+    }
+
+
+def nombre_pdf(retirador=None):
+    """Nombre de archivo del PDF de lista de retiros"""
+    if retirador:
+        return f'lista_retiros_{retirador.nombre.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    return f'lista_retiros_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+
+
+def generar_pdf_lista_retiros(solicitudes, retirador=None, fecha=None):
+    """
+    Genera un PDF con la lista de retiros para un retirador específico o general.
+    
+    Args:
+        solicitudes: QuerySet de SolicitudRetiro
+        retirador: Objeto Retirador (opcional)
+        fecha: Fecha de los retiros (opcional)
+    
+    Returns:
+        HttpResponse con el PDF generado
+    """
+    # Crear respuesta HTTP
+    response = HttpResponse(content_type='application/pdf')
+    filename = nombre_pdf(retirador)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    
+    # Una sola consulta: la lista se evalúa aquí y no con count()/exists()
+    escribir_pdf_lista_retiros(response, [fila_pdf(s) for s in solicitudes], retirador, fecha)
+    
+    logger.info("PDF generado exitosamente: %s", filename)
+    return response
+
+
+def escribir_pdf_lista_retiros(destino, filas, retirador=None, fecha=None):
+    """
+    Escribe el PDF de una lista de retiros en un archivo o respuesta.
+    
+    Args:
+        destino: Objeto tipo archivo (HttpResponse, BytesIO, ...)
+        filas: Lista de dicts de fila_pdf
+        retirador: Objeto Retirador (opcional)
+        fecha: Fecha de los retiros (opcional)
+    """
+    try:
+        # Crear documento PDF
+        doc = SimpleDocTemplate(destino, pagesize=A4,
+                              rightMargin=30, leftMargin=30,
+                              topMargin=30, bottomMargin=30)
+        
+        # Contenedor para elementos del PDF
+        elements = []
+        
+        # Estilos
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#007bff'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        
+        subtitle_style = ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#6c757d'),
+            spaceAfter=20,
+            alignment=TA_CENTER
+        )
+        
+        # Título
+        titulo = "GestPyLab - Sistema de Gestión de Retiros"
+        elements.append(Paragraph(titulo, title_style))
+        
+        # Subtítulo
+        if retirador:
+            subtitulo = f"Lista de Retiros para: {retirador.nombre}"
+        else:
+            subtitulo = "Lista General de Retiros"
+        
+        if fecha:
+            subtitulo += f" - Fecha: {fecha.strftime('%d/%m/%Y')}"
+        
+        elements.append(Paragraph(subtitulo, subtitle_style))
+        elements.append(Spacer(1, 20))
+        
+        # Información adicional
+        info_text = f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}<br/>"
+        info_text += f"Total de retiros: {len(filas)}"
+        
+        info_style = ParagraphStyle(
+            'Info',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=colors.HexColor('#495057'),
+            spaceAfter=20
+        )
+        elements.append(Paragraph(info_text, info_style))
+        elements.append(Spacer(1, 10))
+        
+        # Crear tabla de datos
+        if filas:
+            # Encabezados
+            data = [['#', 'Solicitante', 'Tipo', 'Zona', 'Dirección', 'Teléfono', 'Notas']]
+            
+            # Datos
+            for idx, fila in enumerate(filas, 1):
+                data.append([
+                    str(idx),
+                    fila['solicitante'][:25],
+                    fila['tipo'][:15],
+                    fila['zona'][:15],
+                    fila['direccion'][:40] + '...' if len(fila['direccion']) > 40 else fila['direccion'],
+                    fila['telefono'],
+                    fila['notas'][:30] + '...' if len(fila['notas']) > 30 else fila['notas']
+                ])
+            
+            # Crear tabla
+            table = Table(data, colWidths=[0.5*inch, 1.5*inch, 1*inch, 1*inch, 2*inch, 1*inch, 1.5*inch])
+            
+            # Estilo de tabla
+            table.setStyle(TableStyle([
+                # Encabezado
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                
+                # Contenido
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+                ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Primera columna centrada
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                ('TOPPADDING', (0, 1), (-1, -1), 6),
+                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+                
+                # Bordes
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                
+                # Alternar colores de filas
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+            ]))
+            
+            elements.append(table)
+        else:
+            no_data_text = "No hay retiros programados para mostrar."
+            elements.append(Paragraph(no_data_text, styles['Normal']))
+        
+        # Pie de página
+        elements.append(Spacer(1, 30))
+        footer_text = "_______________________________________________<br/>"
+        footer_text += "Firma del Retirador<br/><br/>"
+        footer_text += "<i>Este documento fue generado automáticamente por GestPyLab</i>"
+        
+        footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#6c757d'),
+            alignment=TA_CENTER
+        )
+        elements.append(Paragraph(footer_text, footer_style))
+        
+        # Construir PDF
+        doc.build(elements)
+    
+    except Exception as e:
+        logger.error("Error al generar PDF: %s", e)
+        raise
@@ -0,0 +1,104 @@
+"""
+Router de base de datos para la réplica de lectura
+
+Las lecturas de los modelos de ``retiros`` se envían a la réplica solo dentro
+de ``solo_lectura`` (vistas de listas, dashboard, PDFs, búsqueda y reportes).
+Todo lo demás, y cualquier lectura después de una escritura en la misma
+petición, va al primario. ``ReplicaMiddleware`` además fija al primario las
+peticiones siguientes del mismo navegador durante unos segundos, para que el
+usuario vea lo que acaba de escribir aunque la réplica tenga retraso.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_solo_lectura = ContextVar('solo_lectura', default=False)
+_estado_peticion = ContextVar('estado_replica', default=None)
+
+
+class EstadoPeticion:
+    """
+    Estado de la petición actual respecto a la réplica.
+
+    Es mutable a propósito: el ContextVar se copia al pasar entre hilos (ASGI),
+    pero todos comparten el mismo objeto.
+    """
+
+    def __init__(self, fijado=False):
+        self.fijado = fijado
+        self.escribio = False
+
+
+def alias_replica():
+    """Alias de la réplica configurada, o None si no hay réplica."""
+    alias = getattr(settings, 'REPLICA_DB_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def solo_lectura():
+    """
+    Context manager (o decorador) que permite leer de la réplica.
+
+        @solo_lectura()
+        def lista_pendientes(request): ...
+    """
+    token = _solo_lectura.set(True)
+    try:
+        yield
+    finally:
+        _solo_lectura.reset(token)
+
+
+def _fijado_al_primario():
+    estado = _estado_peticion.get()
+    return (estado is not None and estado.fijado) or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def leer_de_replica(queryset):
+    """
+    Envía un QuerySet a la réplica si en este momento se puede.
+
+    Para servicios de solo lectura que retornan QuerySets sin evaluar: el
+    router decide al evaluar, cuando ya puede haber terminado ``solo_lectura``.
+    """
+    alias = alias_replica()
+    if alias is None or _fijado_al_primario():
+        return queryset
+    return queryset.using(alias)
+
+
+class ReplicaRouter:
+    """
+    Envía a la réplica las lecturas de ``APPS_REPLICA`` dentro de
+    ``solo_lectura``, salvo que la petición esté fijada al primario (ya
+    escribió, tiene la cookie de ``ReplicaMiddleware`` o está dentro de una
+    transacción). Sesiones y usuarios siempre se leen del primario.
+    """
+
+    APPS_REPLICA = {'retiros'}
+
+    def __init__(self, alias=None):
+        self.alias = alias or alias_replica()
+
+    def db_for_read(self, model, **hints):
+        if (
+            self.alias
+            and _solo_lectura.get()
+            and model._meta.app_label in self.APPS_REPLICA
+            and not _fijado_al_primario()
+        ):
+            return self.alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        estado = _estado_peticion.get()
+        if estado is not None:
+            estado.fijado = estado.escribio = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica tienen los mismos datos
+        return True
@@ -0,0 +1,117 @@
+"""
+Orden de recorrido de las paradas de un retirador
+
+La lista del día se ordenaba por ``hora_solicitud`` (cuándo se ingresó cada
+solicitud), lo que hace cruzar la ciudad varias veces. ``ordenar_paradas``
+calcula un orden de recorrido con una heurística rápida sobre una matriz de
+distancias precalculada: vecino más cercano y luego 2-opt (invertir tramos
+mientras el recorrido se acorte). El recorrido es abierto: no vuelve al
+punto de partida, y el primer punto es el que minimiza el total.
+
+Este módulo importa numpy: solo debe importarse dentro de las funciones que
+lo usan, nunca a nivel de módulo (ver ``retiros.benchmarks.arranque``).
+"""
+import numpy as np
+
+# Pasadas completas de 2-opt como máximo: acota el tiempo en listas grandes
+# (200 paradas convergen en menos de 10)
+MAX_PASADAS = 50
+
+RADIO_TIERRA_KM = 6371.0
+
+
+def matriz_distancias(latitudes, longitudes):
+    """
+    Distancias en km (haversine) entre todos los pares de puntos.
+
+    Returns:
+        ndarray (n, n) de float
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lng = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def matriz_por_zona(zonas):
+    """
+    Matriz de distancias cuando solo se conoce la zona de cada parada: 0 en
+    la misma zona y 1 entre zonas distintas. El recorrido agrupa las paradas
+    por zona y, dentro de cada zona, conserva el orden recibido.
+    """
+    zonas = np.asarray(zonas)
+    return (zonas[:, None] != zonas[None, :]).astype(float)
+
+
+def costo(matriz, orden):
+    """Largo del recorrido abierto ``orden`` según ``matriz``."""
+    orden = np.asarray(orden)
+    if len(orden) < 2:
+        return 0.0
+    return float(matriz[orden[:-1], orden[1:]].sum())
+
+
+def _vecino_mas_cercano(matriz):
+    n = len(matriz)
+    visitado = np.zeros(n, dtype=bool)
+    recorrido = np.empty(n, dtype=np.intp)
+    actual = n - 1
+    visitado[actual] = True
+    recorrido[0] = actual
+    for paso in range(1, n):
+        distancias = np.where(visitado, np.inf, matriz[actual])
+        # argmin toma el primer mínimo: en empates gana el orden recibido
+        actual = int(np.argmin(distancias))
+        visitado[actual] = True
+        recorrido[paso] = actual
+    return recorrido
+
+
+def _dos_opt(matriz, recorrido, max_pasadas):
+    n = len(recorrido)
+    for _ in range(max_pasadas):
+        mejoro = False
+        for i in range(1, n - 1):
+            # Para cada i se evalúan todos los j de una vez: invertir el tramo
+            # i..j cambia las aristas (i-1, i) y (j, j+1) por (i-1, j) y (i, j+1)
+            j = np.arange(i + 1, n)
+            a, b = recorrido[i - 1], recorrido[i]
+            c, d = recorrido[j], recorrido[(j + 1) % n]
+            delta = matriz[a, c] + matriz[b, d] - matriz[a, b] - matriz[c, d]
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                recorrido[i:j[k] + 1] = recorrido[i:j[k] + 1][::-1].copy()
+                mejoro = True
+        if not mejoro:
+            break
+    return recorrido
+
+
+def ordenar_paradas(matriz, max_pasadas=MAX_PASADAS):
+    """
+    Orden de recorrido de las paradas.
+
+    Se agrega un nodo ficticio a distancia 0 de todas las paradas: un ciclo
+    que pasa por él equivale a un recorrido abierto con inicio y fin libres.
+
+    Args:
+        matriz: ndarray (n, n) de distancias entre paradas
+        max_pasadas: Pasadas de 2-opt como máximo
+
+    Returns:
+        list de índices de las paradas en orden de recorrido
+    """
+    n = len(matriz)
+    if n < 3:
+        return list(range(n))
+
+    extendida = np.zeros((n + 1, n + 1))
+    extendida[:n, :n] = matriz
+    recorrido = _dos_opt(extendida, _vecino_mas_cercano(extendida), max_pasadas)
+
+    # El ciclo empieza en el nodo ficticio (índice n): se quita
+    inicio = int(np.flatnonzero(recorrido == n)[0])
+    recorrido = np.roll(recorrido, -inicio)[1:]
+    return recorrido.tolist()
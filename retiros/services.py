@@ -2,9 +2,22 @@
 Servicios de lógica de negocio para GestPyLab
 Separa la lógica de negocio de las vistas
 """
-from django.db.models import Q
+from datetime import date, time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from .models import SolicitudRetiro, Retirador, Solicitante, Zona
+from django.utils.dateparse import parse_datetime
+from .estados import (
+    ESTADOS_ABIERTOS, ESTADOS_FINALES, ConflictoVersion, TransicionInvalida, transicionar, transicionar_lote,
+)
+from .disponibilidad import calendario
+from .geo import distancia_km, en_radio, mas_cercano
+from .models import BajaSolicitud, SolicitudRetiro, Retirador, Solicitante, Zona, marca_secuencia, siguiente_secuencia
+from .normalizacion import clave_busqueda, es_telefono, filtro_prefijo, filtro_telefono
+from .routers import leer_de_replica, solo_lectura
+from .zonas import zonas_cercanas
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +31,14 @@ class SolicitudService:
         """
         Asigna automáticamente un retirador a una solicitud basándose en la zona.
         
+        Se prefiere un retirador de la zona del solicitante y, si ninguno
+        tiene capacidad ese día, uno de la zona vecina más cercana (ver
+        zonas.py), hasta ASIGNACION_DESBORDE_MINUTOS de distancia. Los
+        ausentes ese día no reciben retiros y los que trabajan parte de la
+        jornada tienen la capacidad reducida (ver disponibilidad.py). En cada
+        zona van primero los fijos y luego los complementarios; entre ellos,
+        el de punto de partida más cercano a la solicitud.
+        
         Args:
             solicitud: Objeto SolicitudRetiro
             
@@ -28,30 +49,131 @@ class SolicitudService:
             if solicitud.retirador_asignado:
                 return solicitud.retirador_asignado, "Ya tiene retirador asignado"
             
+            if solicitud.estado not in ESTADOS_ABIERTOS:
+                return None, f"La solicitud está {solicitud.estado}"
+            
             zona = solicitud.solicitante.zona
             
-            # Buscar retiradores fijos en la zona
-            retiradores = Retirador.objects.filter(
-                zonas_preferidas=zona,
-                tipo='fijo'
-            ).prefetch_related('zonas_preferidas')
+            # Zonas por cercanía desde la propia (en memoria) y sus retiradores
+            # con la carga del día (una sola consulta)
+            cercanas = zonas_cercanas(zona.id, settings.ASIGNACION_DESBORDE_MINUTOS)
+            zona_asignada, retirador = SolicitudService._elegir_retirador(
+                solicitud, cercanas,
+                SolicitudService._candidatos([zona_id for zona_id, _ in cercanas], solicitud.fecha_retiro),
+            )
             
-            if retiradores.exists():
-                retirador = retiradores.first()
-                solicitud.retirador_asignado = retirador
-                solicitud.estado = 'asignado'
-                solicitud.save()
+            if retirador:
+                transicionar(solicitud, 'asignado', retirador_asignado=retirador)
                 
-                logger.info(f"Retirador {retirador.nombre} asignado a solicitud {solicitud.id}")
+                if zona_asignada.id != zona.id:
+                    logger.info(
+                        "Retirador %s asignado a solicitud %s desde la zona vecina %s",
+                        retirador.nombre, solicitud.id, zona_asignada.nombre,
+                    )
+                    return retirador, f"Asignado a {retirador.nombre} (zona vecina {zona_asignada.nombre})"
+                logger.info("Retirador %s asignado a solicitud %s", retirador.nombre, solicitud.id)
                 return retirador, f"Asignado a {retirador.nombre}"
             else:
-                logger.warning(f"No hay retiradores disponibles en zona {zona.nombre}")
+                logger.warning("No hay retiradores disponibles en zona %s ni en sus vecinas", zona.nombre)
                 return None, f"No hay retiradores disponibles en la zona {zona.nombre}"
                 
+        except ConflictoVersion as e:
+            logger.warning("No se asignó retirador: %s", e)
+            return None, str(e)
         except Exception as e:
-            logger.error(f"Error al asignar retirador: {str(e)}")
+            logger.error("Error al asignar retirador: %s", e)
             return None, f"Error al asignar retirador: {str(e)}"
     
+    @staticmethod
+    def _candidatos(zona_ids, fecha):
+        """
+        Retiradores de las zonas dadas, como pares (Zona, Retirador), con la
+        ``carga`` de cada retirador (retiros asignados o completados de
+        ``fecha``). Un retirador aparece una vez por zona que cubre.
+        """
+        carga = SolicitudRetiro.objects.filter(
+            retirador_asignado=OuterRef('retirador_id'), fecha_retiro=fecha,
+            estado__in=['asignado', 'completado'],
+        ).order_by().values('retirador_asignado').annotate(total=Count('*')).values('total')
+        filas = Retirador.zonas_preferidas.through.objects.filter(
+            zona_id__in=zona_ids
+        ).select_related('zona', 'retirador').annotate(
+            carga=Coalesce(Subquery(carga), 0)
+        ).order_by('retirador_id', 'zona_id')
+        candidatos = []
+        for fila in filas:
+            fila.retirador.carga = fila.carga
+            candidatos.append((fila.zona, fila.retirador))
+        return candidatos
+    
+    @staticmethod
+    def _elegir_retirador(solicitud, cercanas, candidatos):
+        """
+        Entre los candidatos con capacidad ese día (según su disponibilidad,
+        consultada en memoria), el de la zona más cercana; en la misma zona,
+        fijo antes que complementario y luego el de punto de partida más
+        cercano a la solicitud (el primero en empates).
+        
+        Returns:
+            tuple: (Zona, Retirador) o (None, None)
+        """
+        minutos = dict(cercanas)
+        
+        def distancia(retirador):
+            if solicitud.latitud is None:
+                return 0.0
+            if retirador.latitud is None:
+                return float('inf')
+            return distancia_km(solicitud.latitud, solicitud.longitud, retirador.latitud, retirador.longitud)
+        
+        dia = calendario(solicitud.fecha_retiro)
+        disponibles = []
+        for zona, retirador in candidatos:
+            capacidad = dia.capacidad(retirador.id, retirador.capacidad_diaria)
+            if capacidad is None or retirador.carga < capacidad:
+                disponibles.append((zona, retirador))
+        return min(disponibles, default=(None, None), key=lambda par: (
+            minutos[par[0].id], par[1].tipo != 'fijo', distancia(par[1]), par[1].id,
+        ))
+    
+    @staticmethod
+    def retirador_mas_cercano(latitud, longitud, zona=None, tipo=None, radio_max_km=64.0):
+        """
+        Retirador con punto de partida más cercano a un punto (búsqueda por
+        celdas, ver geo.mas_cercano).
+        
+        Args:
+            latitud, longitud: Punto de referencia
+            zona: Solo retiradores que cubren esta zona (opcional)
+            tipo: 'fijo' o 'complementario' (opcional)
+            radio_max_km: Distancia máxima de búsqueda
+            
+        Returns:
+            Retirador o None
+        """
+        retiradores = Retirador.objects.all()
+        if zona is not None:
+            retiradores = retiradores.filter(zonas_preferidas=zona)
+        if tipo is not None:
+            retiradores = retiradores.filter(tipo=tipo)
+        return mas_cercano(retiradores, latitud, longitud, radio_max_km=radio_max_km)
+    
+    @staticmethod
+    def solicitudes_cercanas(latitud, longitud, radio_km, fecha=None):
+        """
+        Solicitudes abiertas de un día a ``radio_km`` o menos de un punto, de
+        la más cercana a la más lejana (índice (fecha_retiro, celda)).
+        
+        Returns:
+            list de (distancia_km, SolicitudRetiro)
+        """
+        if fecha is None:
+            fecha = timezone.now().date()
+        solicitudes = SolicitudRetiro.objects.filter(
+            fecha_retiro=fecha, estado__in=ESTADOS_ABIERTOS
+        ).select_related('solicitante', 'retirador_asignado')
+        return en_radio(leer_de_replica(solicitudes), latitud, longitud, radio_km)
+    
     @staticmethod
     def obtener_pendientes_del_dia(fecha=None):
         """
@@ -66,13 +188,13 @@ class SolicitudService:
         if fecha is None:
             fecha = timezone.now().date()
         
-        return SolicitudRetiro.objects.filter(
+        return leer_de_replica(SolicitudRetiro.objects.filter(
             Q(fecha_retiro=fecha) & Q(estado__in=['pendiente', 'asignado'])
         ).select_related(
             'solicitante',
             'solicitante__zona',
             'retirador_asignado'
-        ).order_by('retirador_asignado', 'hora_solicitud')
+        ).order_by('retirador_asignado', 'hora_solicitud'))
     
     @staticmethod
     def obtener_solicitudes_retirador(retirador, fecha=None):
@@ -89,7 +211,7 @@ class SolicitudService:
         if fecha is None:
             fecha = timezone.now().date()
         
-        return SolicitudRetiro.objects.filter(
+        return leer_de_replica(SolicitudRetiro.objects.filter(
             Q(fecha_retiro=fecha) & (
                 Q(retirador_asignado=retirador) | 
                 Q(retirador_asignado__isnull=True, 
@@ -99,7 +221,78 @@ class SolicitudService:
             'solicitante',
             'solicitante__zona',
             'retirador_asignado'
-        ).order_by('hora_solicitud')
+        ).order_by('hora_solicitud'))
+    
+    @staticmethod
+    def ordenar_ruta(solicitudes, inicio=None):
+        """
+        Ordena las solicitudes en orden de recorrido respetando el horario de
+        atención de cada solicitante (ver agenda.py y rutas.py).
+        
+        El tiempo de viaje entre dos solicitudes con coordenadas sale de la
+        distancia en km; entre dos en que a alguna le faltan, de sus zonas
+        (ver agenda.minutos_de_viaje). Sin ninguna coordenada el recorrido
+        agrupa por zona y conserva el orden recibido dentro de cada una.
+        
+        A cada solicitud se le agregan ``hora_estimada`` (inicio del retiro)
+        y ``fuera_de_horario`` (True si no se alcanza a llegar antes del
+        cierre de su horario o de la jornada).
+        
+        Args:
+            solicitudes: Iterable de SolicitudRetiro, en el orden de desempate
+                (ej: hora_solicitud)
+            inicio: Hora de llegada a la primera parada (por defecto
+                AGENDA_INICIO_JORNADA)
+            
+        Returns:
+            list de SolicitudRetiro
+        """
+        solicitudes = list(solicitudes)
+        if not solicitudes:
+            return solicitudes
+        
+        # numpy se importa solo aquí (ver retiros/rutas.py)
+        from .agenda import hora, minutos, minutos_de_viaje, programar, ventanas
+        viaje = minutos_de_viaje(
+            [s.latitud for s in solicitudes], [s.longitud for s in solicitudes],
+            [s.solicitante.zona_id for s in solicitudes],
+            settings.AGENDA_VELOCIDAD_KMH, settings.AGENDA_MINUTOS_MISMA_ZONA, settings.AGENDA_MINUTOS_ENTRE_ZONAS,
+        )
+        
+        jornada = [minutos(time.fromisoformat(h)) for h in (settings.AGENDA_INICIO_JORNADA, settings.AGENDA_FIN_JORNADA)]
+        abre, cierra = ventanas(
+            [(s.solicitante.horario_atencion_inicio, s.solicitante.horario_atencion_fin) for s in solicitudes],
+            *jornada
+        )
+        orden, atencion, a_tiempo = programar(
+            viaje, abre, cierra, settings.AGENDA_MINUTOS_RETIRO,
+            minutos(inicio) if inicio is not None else jornada[0],
+        )
+        
+        ruta = []
+        for i, minuto, puntual in zip(orden, atencion, a_tiempo):
+            solicitud = solicitudes[i]
+            solicitud.hora_estimada = hora(minuto)
+            solicitud.fuera_de_horario = not puntual
+            ruta.append(solicitud)
+        
+        fuera = sum(1 for s in ruta if s.fuera_de_horario)
+        if fuera:
+            logger.warning("%s de %s retiros quedan fuera del horario de atención", fuera, len(ruta))
+        return ruta
+    
+    @staticmethod
+    def obtener_ruta_retirador(retirador, fecha=None):
+        """
+        Solicitudes de un retirador (ver obtener_solicitudes_retirador) en
+        orden de recorrido.
+        
+        Returns:
+            list de SolicitudRetiro
+        """
+        return SolicitudService.ordenar_ruta(
+            SolicitudService.obtener_solicitudes_retirador(retirador, fecha)
+        )
     
     @staticmethod
     def marcar_como_completado(solicitud_id):
@@ -113,20 +306,113 @@ class SolicitudService:
             tuple: (success, mensaje, solicitud)
         """
         try:
-            solicitud = SolicitudRetiro.objects.get(id=solicitud_id)
-            solicitud.estado = 'completado'
-            solicitud.save()
+            solicitud = SolicitudRetiro.objects.select_related('solicitante').get(id=solicitud_id)
+            transicionar(solicitud, 'completado')
             
-            logger.info(f"Solicitud {solicitud_id} marcada como completada")
+            logger.info("Solicitud %s marcada como completada", solicitud_id)
             return True, f"Solicitud de {solicitud.solicitante.nombre} completada", solicitud
             
         except SolicitudRetiro.DoesNotExist:
-            logger.error(f"Solicitud {solicitud_id} no encontrada")
+            logger.error("Solicitud %s no encontrada", solicitud_id)
             return False, "Solicitud no encontrada", None
+        except (TransicionInvalida, ConflictoVersion) as e:
+            logger.warning("Solicitud %s no se marcó como completada: %s", solicitud_id, e)
+            return False, str(e), None
         except Exception as e:
-            logger.error(f"Error al marcar solicitud {solicitud_id} como completada: {str(e)}")
+            logger.error("Error al marcar solicitud %s como completada: %s", solicitud_id, e)
             return False, f"Error: {str(e)}", None
     
+    MAX_LOTE = 500
+
+    @staticmethod
+    def aplicar_lote_estados(eventos):
+        """
+        Aplica un lote de cambios de estado informados por un retirador (por
+        ejemplo, las completadas de una ruta hecha sin conexión).
+
+        Es idempotente: reenviar un evento ya aplicado no cambia nada. Hay un
+        solo UPDATE por estado (transicionar_lote), sin bloquear filas: si una
+        solicitud cambió entre la lectura y el UPDATE, se informa como
+        conflicto. Si hay varios eventos para un mismo id, vale el de fecha
+        más reciente.
+
+        Args:
+            eventos: lista de dicts con 'id', 'estado' y 'fecha' (ISO 8601)
+
+        Returns:
+            list de dicts con 'id', 'resultado' (aplicado, sin_cambios,
+            conflicto, no_encontrada o invalido), 'estado' final y 'mensaje'
+        """
+        invalidos = []
+        resultados = {}
+        ultimos = {}
+        for evento in eventos:
+            try:
+                solicitud_id = int(evento['id'])
+                estado = evento['estado']
+                fecha = parse_datetime(evento['fecha'])
+                if fecha is not None and timezone.is_naive(fecha):
+                    fecha = timezone.make_aware(fecha)
+            except (KeyError, TypeError, ValueError):
+                solicitud_id, estado, fecha = None, None, None
+            # Un retirador solo informa estados finales desde la app
+            if solicitud_id is None or fecha is None or estado not in ESTADOS_FINALES:
+                invalidos.append({
+                    'id': evento.get('id') if isinstance(evento, dict) else None,
+                    'resultado': 'invalido',
+                    'estado': None,
+                    'mensaje': f"Evento inválido: se espera id, estado ({', '.join(ESTADOS_FINALES)}) y fecha",
+                })
+                continue
+            if solicitud_id not in ultimos or fecha >= ultimos[solicitud_id][1]:
+                ultimos[solicitud_id] = (estado, fecha)
+
+        with transaction.atomic():
+            actuales = {
+                solicitud_id: (actual, retirador_id)
+                for solicitud_id, actual, retirador_id in SolicitudRetiro.objects.filter(
+                    id__in=ultimos
+                ).values_list('id', 'estado', 'retirador_asignado_id')
+            }
+
+            por_estado = {}
+            for solicitud_id, (estado, fecha) in ultimos.items():
+                actual = actuales.get(solicitud_id, (None,))[0]
+                if actual is None:
+                    resultado = ('no_encontrada', None, 'Solicitud no encontrada')
+                elif actual == estado:
+                    resultado = ('sin_cambios', actual, 'Ya estaba en ese estado')
+                elif actual not in ESTADOS_ABIERTOS:
+                    resultado = ('conflicto', actual, f"La solicitud ya está {actual}")
+                else:
+                    por_estado.setdefault(estado, []).append(solicitud_id)
+                    resultado = ('aplicado', estado, '')
+                resultados[solicitud_id] = dict(zip(('resultado', 'estado', 'mensaje'), resultado), id=solicitud_id)
+
+            if por_estado:
+                # Todo el lote comparte un número de secuencia
+                secuencia = siguiente_secuencia()
+                for estado, ids in por_estado.items():
+                    actualizadas = transicionar_lote(
+                        SolicitudRetiro.objects.filter(id__in=ids), estado,
+                        anteriores={solicitud_id: actuales[solicitud_id] for solicitud_id in ids},
+                        secuencia=secuencia,
+                    )
+                    perdidas = set(ids) - set(actualizadas)
+                    if perdidas:
+                        # Otro escritor cambió alguna entre la lectura y el UPDATE
+                        for solicitud_id, actual in SolicitudRetiro.objects.filter(
+                            id__in=perdidas
+                        ).values_list('id', 'estado'):
+                            resultados[solicitud_id].update(
+                                resultado='conflicto', estado=actual, mensaje=f"La solicitud ya está {actual}"
+                            )
+
+        aplicados = sum(1 for r in resultados.values() if r['resultado'] == 'aplicado')
+        conflictos = sum(1 for r in resultados.values() if r['resultado'] == 'conflicto')
+        logger.info("Lote de estados: %s eventos, %s aplicados, %s conflictos", len(eventos), aplicados, conflictos)
+        return invalidos + list(resultados.values())
+
     @staticmethod
     def validar_solicitud(solicitud_data):
         """
@@ -174,30 +460,60 @@ class SolicitanteService:
         Returns:
             QuerySet de Solicitante
         """
-        return Solicitante.objects.filter(
-            Q(email_desconocido=True) | Q(direccion_desconocida=True)
-        ).select_related('zona')
+        return leer_de_replica(Solicitante.objects.filter(datos_completos=False).select_related('zona'))
     
     @staticmethod
-    def buscar_solicitantes(query):
+    def buscar_solicitantes(query, limite=10, contiene=False):
         """
         Busca solicitantes por nombre, email, teléfono o dirección.
         
+        Una búsqueda con forma de teléfono (ver normalizacion.py) usa solo el
+        índice del teléfono normalizado: el número exacto o los que terminan
+        en esos dígitos, en el orden del índice, sin recorrer la tabla.
+        
+        El resto se compara con las claves de búsqueda (sin tildes ni
+        mayúsculas: "vina" encuentra "Viña del Mar"), solo los que empiezan
+        por la búsqueda: un rango sobre el índice de cada clave. Con
+        ``contiene`` y una búsqueda de al menos BUSQUEDA_CONTIENE_MIN_CARACTERES
+        se completan con hasta BUSQUEDA_CONTIENE_LIMITE que la contienen; esa
+        consulta no usa índice y recorre la tabla.
+        
         Args:
             query: Texto de búsqueda
+            limite: Máximo de resultados
+            contiene: Incluir coincidencias dentro del texto
             
         Returns:
-            QuerySet de Solicitante
+            list de Solicitante
         """
         if not query or len(query) < 2:
-            return Solicitante.objects.none()
-        
-        return Solicitante.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(email__icontains=query) |
-            Q(telefono__icontains=query) |
-            Q(direccion_principal__icontains=query)
-        ).select_related('zona')[:10]  # Limitar a 10 resultados
+            return []
+        
+        if es_telefono(query):
+            return list(leer_de_replica(Solicitante.objects.filter(
+                filtro_telefono(query)
+            ).select_related('zona').order_by('telefono_invertido', 'id'))[:limite])
+        
+        clave = clave_busqueda(query)
+        if not clave:
+            return []
+        
+        solicitantes = leer_de_replica(Solicitante.objects.select_related('zona'))
+        resultados = list(solicitantes.filter(
+            filtro_prefijo('nombre_busqueda', clave) |
+            filtro_prefijo('email_busqueda', clave) |
+            filtro_prefijo('direccion_busqueda', clave)
+        ).order_by('nombre_busqueda', 'id')[:limite])
+        
+        if contiene and len(clave) >= settings.BUSQUEDA_CONTIENE_MIN_CARACTERES and len(resultados) < limite:
+            resultados += solicitantes.filter(
+                Q(nombre_busqueda__contains=clave) |
+                Q(email_busqueda__contains=clave) |
+                Q(direccion_busqueda__contains=clave)
+            ).exclude(
+                pk__in=[s.pk for s in resultados]
+            ).order_by('nombre_busqueda', 'id')[:min(limite - len(resultados), settings.BUSQUEDA_CONTIENE_LIMITE)]
+        return resultados
     
     @staticmethod
     def validar_datos_solicitante(solicitante):
@@ -210,28 +526,148 @@ class SolicitanteService:
         Returns:
             tuple: (es_valido, datos_faltantes)
         """
-        datos_faltantes = []
-        
-        if solicitante.email_desconocido or not solicitante.email:
-            datos_faltantes.append('email')
-        
-        if solicitante.direccion_desconocida or not solicitante.direccion_principal:
-            datos_faltantes.append('dirección')
-        
-        if not solicitante.telefono:
-            datos_faltantes.append('teléfono')
-        
+        # Misma regla que datos_completos (REGLAS_DATOS_COMPLETOS en models.py)
+        datos_faltantes = solicitante.datos_faltantes()
         return len(datos_faltantes) == 0, datos_faltantes
 
 
+class SincronizacionService:
+    """
+    Sincronización incremental de la lista de un retirador para clientes móviles.
+
+    El token es ``"<fecha>:<marca>"``: el día de la lista y la marca de agua
+    de la secuencia (``marca_secuencia``) leída en la sincronización anterior.
+    Con un token válido solo se envían las solicitudes con secuencia igual o
+    posterior: las que están en la lista y, como eliminadas, las que salieron
+    de ella (completadas, canceladas, reasignadas a otro retirador, cuyo
+    solicitante cambió de zona o borradas). Las salidas quedan en
+    BajaSolicitud con la lista de la que salieron, así cada retirador solo
+    recibe las de la suya. Una solicitud puede repetirse en dos
+    sincronizaciones; el cliente la reemplaza. Sin token, con un token de otro
+    día o inválido (incluido el formato anterior ``"<fecha>.<n>"``), o si
+    cambiaron las zonas del retirador desde el token, se envía la lista completa.
+    """
+
+    ESTADOS_LISTA = ('pendiente', 'asignado')
+
+    @staticmethod
+    def generar_token(fecha, secuencia):
+        return f"{fecha.isoformat()}:{secuencia}"
+
+    @staticmethod
+    def parsear_token(token):
+        """
+        Returns:
+            tuple (fecha, secuencia) o None si el token no es válido
+        """
+        try:
+            fecha, secuencia = token.rsplit(':', 1)
+            return date.fromisoformat(fecha), int(secuencia)
+        except (AttributeError, ValueError):
+            return None
+
+    @staticmethod
+    def de_la_lista(retirador_id, zona_id, retirador, zonas_ids):
+        """
+        Si una solicitud con ese retirador asignado (o ninguno) y esa zona
+        corresponde a la lista del retirador, sin mirar el estado.
+        """
+        if retirador_id is not None:
+            return retirador_id == retirador.id
+        return zona_id in zonas_ids
+
+    @staticmethod
+    def en_lista(solicitud, retirador, zonas_ids):
+        """Misma regla que obtener_solicitudes_retirador, evaluada en memoria."""
+        if solicitud.estado not in SincronizacionService.ESTADOS_LISTA:
+            return False
+        return SincronizacionService.de_la_lista(
+            solicitud.retirador_asignado_id, solicitud.solicitante.zona_id, retirador, zonas_ids
+        )
+
+    @staticmethod
+    @solo_lectura()
+    def cambios_retirador(retirador, token=None, fecha=None):
+        """
+        Cambios de la lista de un retirador desde un token.
+
+        Args:
+            retirador: Objeto Retirador
+            token: Token de la sincronización anterior (opcional)
+            fecha: Fecha de la lista (por defecto hoy)
+
+        Returns:
+            dict con 'token' (para la próxima sincronización), 'completo'
+            (True si se envía la lista entera), 'solicitudes' y 'eliminadas' (ids)
+        """
+        if fecha is None:
+            fecha = timezone.now().date()
+
+        # La marca se lee antes que las filas: todo cambio que no se vea ahora
+        # tendrá secuencia >= hasta y va en la próxima sincronización
+        hasta = marca_secuencia()
+        desde = SincronizacionService.parsear_token(token)
+        completo = desde is None or desde[0] != fecha or desde[1] > hasta
+        if not completo:
+            # Zonas y su último cambio en una consulta, leídas después de la marca
+            filas = list(Retirador.objects.filter(pk=retirador.pk).values_list('zonas_secuencia', 'zonas_preferidas'))
+            zonas_ids = {zona_id for _, zona_id in filas if zona_id is not None}
+            completo = not filas or filas[0][0] >= desde[1]
+
+        if completo:
+            solicitudes = list(SolicitudService.obtener_solicitudes_retirador(retirador, fecha))
+            eliminadas = []
+        else:
+            cambios = SolicitudRetiro.objects.filter(
+                fecha_retiro=fecha, secuencia__gte=desde[1]
+            ).select_related(
+                'solicitante',
+                'solicitante__zona',
+                'retirador_asignado'
+            ).order_by('secuencia')
+
+            # Las que ya no están solo se informan si eran de la lista: por su
+            # retirador y zona actuales (completadas, canceladas) o por los
+            # anteriores (salidas registradas en BajaSolicitud)
+            solicitudes, eliminadas = [], []
+            for solicitud in cambios:
+                if SincronizacionService.en_lista(solicitud, retirador, zonas_ids):
+                    solicitudes.append(solicitud)
+                elif SincronizacionService.de_la_lista(
+                    solicitud.retirador_asignado_id, solicitud.solicitante.zona_id, retirador, zonas_ids
+                ):
+                    eliminadas.append(solicitud.id)
+            eliminadas.extend(
+                solicitud_id
+                for solicitud_id, retirador_id, zona_id in BajaSolicitud.objects.filter(
+                    fecha_retiro=fecha, secuencia__gte=desde[1]
+                ).values_list('solicitud_id', 'retirador_id', 'zona_id')
+                if (retirador_id, zona_id) == (None, None)
+                or SincronizacionService.de_la_lista(retirador_id, zona_id, retirador, zonas_ids)
+            )
+
+        return {
+            'token': SincronizacionService.generar_token(fecha, hasta),
+            'completo': completo,
+            'solicitudes': solicitudes,
+            'eliminadas': eliminadas,
+        }
+
+
 class EstadisticasService:
     """Servicio para generar estadísticas del sistema"""
     
     @staticmethod
+    @solo_lectura()
     def obtener_resumen_dashboard(fecha=None):
         """
         Obtiene el resumen de estadísticas para el dashboard.
         
+        Cada resumen de retirador indica su ``disponibilidad`` del día
+        ('disponible', 'parcial' o 'ausente', ver disponibilidad.py). A un
+        ausente solo se le cuentan las solicitudes que ya tiene asignadas:
+        las pendientes de sus zonas quedan para los demás.
+        
         Args:
             fecha: Fecha a consultar (por defecto hoy)
             
@@ -250,9 +686,7 @@ class EstadisticasService:
         total_solicitantes = Solicitante.objects.count()
         
         # Solicitantes con datos incompletos
-        solicitantes_incompletos = Solicitante.objects.filter(
-            Q(email_desconocido=True) | Q(direccion_desconocida=True)
-        ).count()
+        solicitantes_incompletos = Solicitante.objects.filter(datos_completos=False).count()
         
         # Resumen por retirador
         retiradores = Retirador.objects.prefetch_related('zonas_preferidas').all()
@@ -260,9 +694,12 @@ class EstadisticasService:
             Q(fecha_retiro=fecha) & Q(estado__in=['pendiente', 'asignado'])
         ).select_related('solicitante', 'solicitante__zona', 'retirador_asignado')
         
+        dia = calendario(fecha)
+        
         resumenes_retiradores = []
         for retirador in retiradores:
-            zonas_ids = [z.id for z in retirador.zonas_preferidas.all()]
+            disponibilidad = dia.estado(retirador.id)
+            zonas_ids = [z.id for z in retirador.zonas_preferidas.all()] if disponibilidad != 'ausente' else []
             count = sum(
                 1 for s in solicitudes_hoy 
                 if s.retirador_asignado == retirador or 
@@ -270,7 +707,8 @@ class EstadisticasService:
             )
             resumenes_retiradores.append({
                 'retirador': retirador,
-                'count': count
+                'count': count,
+                'disponibilidad': disponibilidad,
             })
         
         return {
@@ -278,10 +716,12 @@ class EstadisticasService:
             'total_solicitantes': total_solicitantes,
             'solicitantes_incompletos': solicitantes_incompletos,
             'resumenes_retiradores': resumenes_retiradores,
+            'retiradores_ausentes': sum(r['disponibilidad'] == 'ausente' for r in resumenes_retiradores),
             'fecha': fecha
         }
     
     @staticmethod
+    @solo_lectura()
     def obtener_estadisticas_zona(zona_id):
         """
         Obtiene estadísticas de una zona específica.
@@ -0,0 +1,423 @@
+"""
+Simulación de estrategias de asignación sobre el historial
+
+Antes de cambiar cómo se asignan los retiros, ``simular`` reproduce las
+solicitudes de un rango de fechas con cada estrategia y compara el balance de
+carga entre retiradores, las solicitudes que quedan sin asignar y el costo
+estimado de los recorridos.
+
+Todo se lee en una pasada (solicitudes, retiradores, zonas cubiertas y grafo
+de zonas) a arreglos de numpy; la simulación no vuelve a consultar la base de
+datos. Estrategias (``ESTRATEGIAS``), cada una aplicada día por día en el
+orden en que se ingresaron las solicitudes:
+
+- ``primero``: el primer retirador fijo de la zona, como la asignación
+  original (``.first()``); no considera la capacidad.
+- ``menos_cargado``: el retirador fijo de la zona con menos retiros ese día.
+- ``desborde``: la asignación actual (services.py): zona propia y luego
+  vecinas (zonas.py), fijos antes que complementarios, con capacidad.
+- ``lote``: todo el día a la vez, como problema de transporte entre zonas y
+  retiradores resuelto de forma exacta: la menor cantidad de minutos entre
+  zonas, con la carga de cada grupo de retiradores equivalentes repartida
+  de forma pareja.
+
+El largo de cada recorrido (retirador y día) se estima sin ordenarlo, con
+la fórmula de Beardwood-Halton-Hammersley: ``0.7124 * sqrt(n * área)``, sobre
+el rectángulo que cubren sus paradas con coordenadas.
+
+Este módulo importa numpy: solo debe importarse dentro de las funciones que
+lo usan (ver ``retiros/rutas.py``).
+"""
+from time import perf_counter
+
+import numpy as np
+
+from .geo import KM_POR_GRADO
+from .models import AdyacenciaZona, Retirador, SolicitudRetiro, Zona
+from .routers import leer_de_replica
+from .zonas import caminos_mas_cortos
+
+CONSTANTE_BHH = 0.7124
+
+# Minutos que se suman a un complementario: a igual distancia va el fijo
+PENALIZACION_COMPLEMENTARIO = 1e-3
+
+
+class Escenario:
+    """
+    Datos de la simulación como arreglos. Las solicitudes están ordenadas
+    por día y, dentro del día, por orden de ingreso.
+
+    Attributes:
+        dia, zona: Índice de día y de zona de cada solicitud
+        latitud, longitud: Coordenadas de cada solicitud (nan si no tiene)
+        cubre: bool (zonas, retiradores), zonas que cubre cada retirador
+        fijo: bool por retirador
+        capacidad: Retiros por día de cada retirador (inf sin límite)
+        costo: Minutos (zonas, retiradores) de cada zona a la zona más cercana
+            que cubre el retirador (inf si está a más de ``max_minutos``)
+    """
+
+    def __init__(self, dia, zona, latitud, longitud, cubre, fijo, capacidad, minutos_zonas, max_minutos=None,
+                 dias=None, retirador_ids=None):
+        self.dia = np.asarray(dia, dtype=np.intp)
+        self.zona = np.asarray(zona, dtype=np.intp)
+        self.latitud = np.asarray(latitud, dtype=float)
+        self.longitud = np.asarray(longitud, dtype=float)
+        self.cubre = np.asarray(cubre, dtype=bool)
+        self.fijo = np.asarray(fijo, dtype=bool)
+        self.capacidad = np.asarray(capacidad, dtype=float)
+        self.dias = dias
+        self.retirador_ids = retirador_ids
+
+        minutos_zonas = np.asarray(minutos_zonas, dtype=float)
+        if max_minutos is not None:
+            minutos_zonas = np.where(minutos_zonas <= max_minutos, minutos_zonas, np.inf)
+        # costo[z, r] = min sobre las zonas y que cubre r de minutos[z, y]
+        costo = np.where(self.cubre[None, :, :], minutos_zonas[:, :, None], np.inf).min(axis=1)
+        self.costo = costo + np.where(self.fijo, 0.0, PENALIZACION_COMPLEMENTARIO)[None, :]
+
+        # Límites de cada día en el arreglo de solicitudes
+        self.limites = np.searchsorted(self.dia, np.arange(self.dia.max() + 2 if len(self.dia) else 1))
+
+        n_zonas, n_retiradores = self.cubre.shape
+        ids = np.arange(n_retiradores)
+        self.primero_por_zona = np.array([
+            int(ids[self.cubre[z] & self.fijo][0]) if (self.cubre[z] & self.fijo).any() else -1
+            for z in range(n_zonas)
+        ], dtype=np.intp)
+        self.fijos_por_zona = [ids[self.cubre[z] & self.fijo].tolist() for z in range(n_zonas)]
+        # Preferencias de desborde: por costo, el orden de retiradores en empates
+        self.preferencias = []
+        for z in range(n_zonas):
+            alcanzables = np.flatnonzero(np.isfinite(self.costo[z]))
+            self.preferencias.append(alcanzables[np.argsort(self.costo[z, alcanzables], kind='stable')].tolist())
+
+    @property
+    def n_dias(self):
+        return len(self.limites) - 1
+
+    def del_dia(self, d):
+        return np.arange(self.limites[d], self.limites[d + 1])
+
+
+def cargar_escenario(desde, hasta, max_minutos=None, capacidad=None):
+    """
+    Lee de la base de datos, en una pasada, todo lo necesario para simular
+    las solicitudes (no canceladas) con fecha de retiro entre ``desde`` y
+    ``hasta``.
+
+    Args:
+        max_minutos: Límite del desborde a zonas vecinas (ASIGNACION_DESBORDE_MINUTOS)
+        capacidad: Capacidad diaria de los retiradores que no la tienen
+            (None: sin límite)
+
+    Returns:
+        Escenario
+    """
+    zona_ids = list(Zona.objects.order_by('id').values_list('id', flat=True))
+    indice_zona = {zona_id: i for i, zona_id in enumerate(zona_ids)}
+    cercanas = caminos_mas_cortos(
+        zona_ids, AdyacenciaZona.objects.values_list('origen_id', 'destino_id', 'minutos')
+    )
+    minutos = np.full((len(zona_ids), len(zona_ids)), np.inf)
+    for origen, destinos in cercanas.items():
+        for destino, total in destinos:
+            minutos[indice_zona[origen], indice_zona[destino]] = total
+
+    retiradores = list(Retirador.objects.order_by('id').values_list('id', 'tipo', 'capacidad_diaria'))
+    indice_retirador = {fila[0]: i for i, fila in enumerate(retiradores)}
+    cubre = np.zeros((len(zona_ids), len(retiradores)), dtype=bool)
+    for retirador_id, zona_id in Retirador.zonas_preferidas.through.objects.values_list('retirador_id', 'zona_id'):
+        cubre[indice_zona[zona_id], indice_retirador[retirador_id]] = True
+    por_defecto = np.inf if capacidad is None else capacidad
+    capacidades = [por_defecto if cap is None else cap for _, _, cap in retiradores]
+
+    filas = leer_de_replica(SolicitudRetiro.objects.filter(
+        fecha_retiro__range=(desde, hasta)
+    ).exclude(estado='cancelado').order_by('fecha_retiro', 'fecha_solicitud', 'id').values_list(
+        'fecha_retiro', 'solicitante__zona_id', 'latitud', 'longitud'
+    ))
+    fechas, zonas, latitudes, longitudes = [], [], [], []
+    for fecha, zona_id, latitud, longitud in filas.iterator(chunk_size=10_000):
+        fechas.append(fecha)
+        zonas.append(indice_zona[zona_id])
+        latitudes.append(np.nan if latitud is None else latitud)
+        longitudes.append(np.nan if longitud is None else longitud)
+
+    dias, dia = np.unique(np.array(fechas, dtype='datetime64[D]'), return_inverse=True)
+    return Escenario(
+        dia, zonas, latitudes, longitudes, cubre,
+        [tipo == 'fijo' for _, tipo, _ in retiradores], capacidades, minutos, max_minutos,
+        dias=dias, retirador_ids=[fila[0] for fila in retiradores],
+    )
+
+
+def asignar_primero(escenario, idx):
+    return escenario.primero_por_zona[escenario.zona[idx]]
+
+
+def asignar_menos_cargado(escenario, idx):
+    carga = [0] * len(escenario.fijo)
+    capacidad = escenario.capacidad.tolist()
+    asignados = np.full(len(idx), -1, dtype=np.intp)
+    for k, z in enumerate(escenario.zona[idx].tolist()):
+        candidatos = [r for r in escenario.fijos_por_zona[z] if carga[r] < capacidad[r]]
+        if candidatos:
+            r = min(candidatos, key=carga.__getitem__)
+            carga[r] += 1
+            asignados[k] = r
+    return asignados
+
+
+def asignar_desborde(escenario, idx):
+    carga = [0] * len(escenario.fijo)
+    capacidad = escenario.capacidad.tolist()
+    asignados = np.full(len(idx), -1, dtype=np.intp)
+    for k, z in enumerate(escenario.zona[idx].tolist()):
+        for r in escenario.preferencias[z]:
+            if carga[r] < capacidad[r]:
+                carga[r] += 1
+                asignados[k] = r
+                break
+    return asignados
+
+
+def _transporte(costo, demanda, oferta):
+    """
+    Problema de transporte exacto: atiende la mayor demanda posible con el
+    menor costo total, por caminos más cortos sucesivos. Las distancias se
+    calculan con Bellman-Ford vectorizado sobre la matriz (filas, columnas):
+    las aristas fila -> columna cuestan ``costo`` y las de vuelta (donde ya
+    hay flujo) ``-costo``. Con esas distancias se satura de una vez todo
+    par fila -> columna directo que sea camino más corto (primal-dual), y
+    solo si no hay ninguno se sigue un camino con retrocesos.
+
+    Args:
+        costo: ndarray (filas, columnas), inf donde no hay arista
+        demanda, oferta: Enteros por fila y por columna
+
+    Returns:
+        ndarray de enteros (filas, columnas) con el flujo
+    """
+    filas, columnas = costo.shape
+    flujo = np.zeros(costo.shape, dtype=np.intp)
+    demanda = np.asarray(demanda, dtype=np.intp).copy()
+    oferta = np.asarray(oferta, dtype=np.intp).copy()
+    rango_filas, rango_columnas = np.arange(filas), np.arange(columnas)
+    # Costo de las aristas de vuelta; solo cuenta donde hay flujo (costo finito)
+    finito = np.where(np.isfinite(costo), costo, 0.0)
+    while demanda.any():
+        dist_fila = np.where(demanda > 0, 0.0, np.inf)
+        dist_columna = np.full(columnas, np.inf)
+        # Predecesores: fila de cada columna, columna de cada fila (-1: la fuente)
+        pred_columna = np.full(columnas, -1)
+        pred_fila = np.full(filas, -1)
+        for _ in range(filas + columnas):
+            candidatos = dist_fila[:, None] + costo
+            mejor = np.argmin(candidatos, axis=0)
+            nueva = candidatos[mejor, rango_columnas]
+            mejora_columna = nueva < dist_columna - 1e-9
+            dist_columna = np.where(mejora_columna, nueva, dist_columna)
+            pred_columna = np.where(mejora_columna, mejor, pred_columna)
+
+            candidatos = np.where(flujo > 0, dist_columna[None, :] - finito, np.inf)
+            mejor = np.argmin(candidatos, axis=1)
+            nueva = candidatos[rango_filas, mejor]
+            mejora_fila = nueva < dist_fila - 1e-9
+            dist_fila = np.where(mejora_fila, nueva, dist_fila)
+            pred_fila = np.where(mejora_fila, mejor, pred_fila)
+            if not mejora_columna.any() and not mejora_fila.any():
+                break
+
+        destino = np.where(oferta > 0, dist_columna, np.inf)
+        columna = int(np.argmin(destino))
+        if not np.isfinite(destino[columna]):
+            return flujo
+
+        # Pares directos desde la fuente que son caminos más cortos
+        largo = destino[columna]
+        directos = (
+            (demanda > 0)[:, None] & (dist_fila == 0)[:, None]
+            & (np.abs(costo - largo) < 1e-9) & (np.abs(destino - largo) < 1e-9)[None, :]
+        )
+        if directos.any():
+            for i, j in zip(*np.nonzero(directos)):
+                cantidad = min(demanda[i], oferta[j])
+                if cantidad > 0:
+                    flujo[i, j] += cantidad
+                    demanda[i] -= cantidad
+                    oferta[j] -= cantidad
+            continue
+
+        # Se recorre el camino hacia atrás hasta una fila con demanda propia
+        final, cantidad = columna, int(oferta[columna])
+        avances, retrocesos = [], []
+        while True:
+            fila = int(pred_columna[columna])
+            avances.append((fila, columna))
+            anterior = int(pred_fila[fila])
+            if anterior < 0:
+                cantidad = min(cantidad, int(demanda[fila]))
+                break
+            retrocesos.append((fila, anterior))
+            cantidad = min(cantidad, int(flujo[fila, anterior]))
+            columna = anterior
+        for i, j in avances:
+            flujo[i, j] += cantidad
+        for i, j in retrocesos:
+            flujo[i, j] -= cantidad
+        demanda[fila] -= cantidad
+        oferta[final] -= cantidad
+    return flujo
+
+
+def _repartir(total, capacidades):
+    """Reparte ``total`` entre los miembros lo más parejo posible sin pasar sus capacidades."""
+    capacidades = np.asarray(capacidades, dtype=np.intp)
+    bajo, alto = 0, int(capacidades.max(initial=0))
+    # Mayor nivel L tal que sum(min(capacidad, L)) <= total
+    while bajo < alto:
+        medio = (bajo + alto + 1) // 2
+        if np.minimum(capacidades, medio).sum() <= total:
+            bajo = medio
+        else:
+            alto = medio - 1
+    cantidades = np.minimum(capacidades, bajo)
+    resto = total - int(cantidades.sum())
+    # Uno más a los primeros que aún tienen capacidad
+    con_espacio = np.flatnonzero(capacidades > bajo)[:resto]
+    cantidades[con_espacio] += 1
+    return cantidades
+
+
+def asignar_lote(escenario, idx):
+    zonas = escenario.zona[idx]
+    presentes, demanda = np.unique(zonas, return_counts=True)
+    costo = escenario.costo[presentes]
+    # Solo los retiradores que alcanzan alguna zona del día, agrupados por
+    # columna de costos: los de un grupo son intercambiables
+    utiles = np.flatnonzero(np.isfinite(costo).any(axis=0))
+    oferta = np.minimum(escenario.capacidad[utiles], len(idx)).astype(np.intp)
+    columnas, grupo = np.unique(costo[:, utiles].T, axis=0, return_inverse=True)
+    grupo = grupo.ravel()
+    flujo = _transporte(columnas.T, demanda, np.bincount(grupo, weights=oferta, minlength=len(columnas)))
+
+    # Lo de cada grupo se reparte parejo entre sus miembros, y las unidades de
+    # cada zona se entregan a los miembros en orden
+    unidad_zona, unidad_retirador = [], []
+    for g in range(len(columnas)):
+        miembros = np.flatnonzero(grupo == g)
+        cantidades = _repartir(int(flujo[:, g].sum()), oferta[miembros])
+        unidad_zona.append(np.repeat(np.arange(len(presentes)), flujo[:, g]))
+        unidad_retirador.append(np.repeat(utiles[miembros], cantidades))
+    unidad_zona = np.concatenate(unidad_zona) if unidad_zona else np.empty(0, dtype=np.intp)
+    unidad_retirador = np.concatenate(unidad_retirador) if unidad_retirador else np.empty(0, dtype=np.intp)
+
+    asignados = np.full(len(idx), -1, dtype=np.intp)
+    for fila, z in enumerate(presentes):
+        posiciones = np.flatnonzero(zonas == z)
+        retiradores = unidad_retirador[unidad_zona == fila]
+        asignados[posiciones[:len(retiradores)]] = retiradores
+    return asignados
+
+
+ESTRATEGIAS = {
+    'primero': asignar_primero,
+    'menos_cargado': asignar_menos_cargado,
+    'desborde': asignar_desborde,
+    'lote': asignar_lote,
+}
+
+
+def km_recorridos(escenario, asignados):
+    """
+    Km estimados de todos los recorridos (retirador y día), con la fórmula
+    BHH sobre las paradas con coordenadas. Vectorizado: sin bucles por grupo.
+    """
+    validas = (asignados >= 0) & np.isfinite(escenario.latitud)
+    if not validas.any():
+        return 0.0
+    n_retiradores = len(escenario.fijo)
+    grupos, grupo = np.unique(escenario.dia[validas] * n_retiradores + asignados[validas], return_inverse=True)
+    latitud, longitud = escenario.latitud[validas], escenario.longitud[validas]
+
+    def rango(valores):
+        minimo = np.full(len(grupos), np.inf)
+        maximo = np.full(len(grupos), -np.inf)
+        np.minimum.at(minimo, grupo, valores)
+        np.maximum.at(maximo, grupo, valores)
+        return maximo - minimo
+
+    alto = rango(latitud) * KM_POR_GRADO
+    ancho = rango(longitud) * KM_POR_GRADO * np.cos(np.radians(np.nanmean(latitud)))
+    paradas = np.bincount(grupo, minlength=len(grupos))
+    return float((CONSTANTE_BHH * np.sqrt(paradas * alto * ancho)).sum())
+
+
+def simular(escenario, estrategia):
+    """
+    Aplica una estrategia día por día.
+
+    Args:
+        escenario: Escenario
+        estrategia: Nombre en ESTRATEGIAS
+
+    Returns:
+        dict con ``estrategia``, ``solicitudes``, ``sin_asignar``,
+        ``sobre_capacidad`` (retiros por sobre la capacidad del retirador),
+        ``carga_max`` (máximo de un retirador en un día), ``carga_max_media``
+        (promedio por día del retirador más cargado), ``cv_carga`` (promedio
+        por día del coeficiente de variación de la carga entre los
+        retiradores con retiros), ``minutos_desborde`` (minutos entre zonas),
+        ``km_estimados`` y ``segundos``
+    """
+    funcion = ESTRATEGIAS[estrategia]
+    inicio = perf_counter()
+    asignados = np.full(len(escenario.dia), -1, dtype=np.intp)
+    for d in range(escenario.n_dias):
+        idx = escenario.del_dia(d)
+        if len(idx):
+            asignados[idx] = funcion(escenario, idx)
+    segundos = perf_counter() - inicio
+
+    n_retiradores = len(escenario.fijo)
+    hechos = asignados >= 0
+    carga = np.zeros((escenario.n_dias, n_retiradores), dtype=np.intp)
+    np.add.at(carga, (escenario.dia[hechos], asignados[hechos]), 1)
+    con_retiros = carga > 0
+    dias_activos = con_retiros.any(axis=1)
+    if dias_activos.any():
+        cargas = np.where(con_retiros, carga, np.nan)[dias_activos]
+        cv = float(np.mean(np.nanstd(cargas, axis=1) / np.nanmean(cargas, axis=1)))
+        carga_max_media = float(carga.max(axis=1)[dias_activos].mean())
+    else:
+        cv = carga_max_media = 0.0
+    costo = escenario.costo[escenario.zona[hechos], asignados[hechos]]
+
+    return {
+        'estrategia': estrategia,
+        'solicitudes': int(len(asignados)),
+        'sin_asignar': int((~hechos).sum()),
+        'sobre_capacidad': int(np.maximum(carga - escenario.capacidad[None, :], 0).sum()),
+        'carga_max': int(carga.max()) if carga.size else 0,
+        'carga_max_media': round(carga_max_media, 1),
+        'cv_carga': round(cv, 3),
+        'minutos_desborde': int(np.round(costo[np.isfinite(costo)]).sum()),
+        'km_estimados': round(km_recorridos(escenario, asignados), 1),
+        'segundos': round(segundos, 3),
+    }
+
+
+def formatear_simulacion(resultados):
+    lineas = [
+        f"{'estrategia':<15}{'sin asignar':>12}{'sobre cap.':>11}{'carga máx':>10}"
+        f"{'máx/día':>9}{'cv carga':>9}{'min desborde':>13}{'km est.':>10}{'s':>7}"
+    ]
+    for r in resultados:
+        lineas.append(
+            f"{r['estrategia']:<15}{r['sin_asignar']:>12}{r['sobre_capacidad']:>11}{r['carga_max']:>10}"
+            f"{r['carga_max_media']:>9.1f}{r['cv_carga']:>9.3f}{r['minutos_desborde']:>13}"
+            f"{r['km_estimados']:>10.1f}{r['segundos']:>7.2f}"
+        )
+    return '\n'.join(lineas)
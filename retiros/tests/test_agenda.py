@@ -0,0 +1,137 @@
+from datetime import time
+import os
+import random
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros.agenda import minutos_de_viaje, minutos_por_km, minutos_por_zona, programar, tiempos, ventanas
+from retiros.benchmarks import medir_agenda
+from retiros.rutas import matriz_distancias
+from retiros.models import Retirador, Solicitante, SolicitudRetiro, Zona
+from retiros.services import SolicitudService
+
+# Tiempo máximo para programar 200 paradas; ajustable por entorno en CI
+LIMITE_MS = float(os.environ.get('AGENDA_LIMITE_MS', '250'))
+
+NUEVE, DIECIOCHO = 9 * 60, 18 * 60
+
+
+class TiemposTests(SimpleTestCase):
+    def test_vectorizado_coincide_con_el_calculo_parada_a_parada(self):
+        rng = random.Random(3)
+        n = 25
+        viaje = np.array([[0 if i == j else rng.uniform(2, 30) for j in range(n)] for i in range(n)])
+        abre = np.array([rng.choice((NUEVE, rng.uniform(NUEVE, 15 * 60))) for _ in range(n)])
+        cierra = abre + 120
+        orden = list(range(n))
+        rng.shuffle(orden)
+
+        llegada, atencion = tiempos(orden, viaje, abre, cierra, 10, NUEVE)
+
+        reloj = NUEVE
+        for k, parada in enumerate(orden):
+            if k:
+                reloj += 10 + viaje[orden[k - 1], parada]
+            self.assertAlmostEqual(llegada[k], reloj)
+            reloj = max(reloj, abre[parada])
+            self.assertAlmostEqual(atencion[k], reloj)
+
+
+class MinutosDeViajeTests(SimpleTestCase):
+    def test_lista_mixta_usa_km_entre_paradas_con_coordenadas(self):
+        latitudes = [-33.04, None, -33.05, -33.10]
+        longitudes = [-71.60, None, -71.62, -71.55]
+        zonas = [1, 1, 2, 2]
+
+        viaje = minutos_de_viaje(latitudes, longitudes, zonas, 30, 5, 25)
+
+        con = [0, 2, 3]
+        km = minutos_por_km(matriz_distancias([latitudes[i] for i in con], [longitudes[i] for i in con]), 30)
+        np.testing.assert_allclose(viaje[np.ix_(con, con)], km)
+        # La parada sin coordenadas, por zona con todas las demás
+        self.assertEqual(list(viaje[1]), [5, 0, 25, 25])
+        self.assertEqual(list(viaje[:, 1]), [5, 0, 25, 25])
+
+    def test_sin_coordenadas_es_por_zona(self):
+        zonas = [1, 2, 1]
+        np.testing.assert_array_equal(
+            minutos_de_viaje([None] * 3, [None] * 3, zonas, 30, 5, 25), minutos_por_zona(zonas, 5, 25)
+        )
+
+
+class ProgramarTests(SimpleTestCase):
+    def test_visita_primero_la_que_cierra_temprano_aunque_este_lejos(self):
+        # Tres paradas en línea; la más lejana atiende solo hasta las 09:30
+        viaje = np.array([[0, 10, 40], [10, 0, 30], [40, 30, 0]], dtype=float)
+        abre, cierra = ventanas([None, None, (time(9), time(9, 30))], NUEVE, DIECIOCHO)
+
+        orden, atencion, a_tiempo = programar(viaje, abre, cierra, 10, NUEVE)
+
+        self.assertEqual(orden[0], 2)
+        self.assertTrue(a_tiempo.all())
+        self.assertEqual(atencion[0], NUEVE)
+
+    def test_espera_a_que_abra_y_marca_las_imposibles(self):
+        viaje = minutos_por_zona([1, 1, 1], 5, 20)
+        abre, cierra = ventanas(
+            [(time(14), time(16)), None, (time(7), time(8))], NUEVE, DIECIOCHO
+        )
+        orden, atencion, a_tiempo = programar(viaje, abre, cierra, 10, NUEVE)
+
+        por_parada = dict(zip(orden, zip(atencion, a_tiempo)))
+        self.assertEqual(por_parada[0], (14 * 60, True))
+        self.assertTrue(por_parada[1][1])
+        # Cierra antes de que empiece la jornada
+        self.assertFalse(por_parada[2][1])
+        self.assertEqual(orden[-1], 2)
+
+    def test_sin_horarios_es_el_recorrido_mas_corto(self):
+        viaje = minutos_por_zona([1, 2, 1, 3, 2, 1], 5, 20)
+        abre, cierra = ventanas([None] * 6, NUEVE, DIECIOCHO)
+        orden, _, a_tiempo = programar(viaje, abre, cierra, 10, NUEVE)
+        self.assertEqual(orden, [0, 2, 5, 1, 4, 3])
+        self.assertTrue(a_tiempo.all())
+
+    def test_200_paradas_bajo_el_limite_y_no_peor_que_el_recorrido_mas_corto(self):
+        resultado = medir_agenda(paradas=200, repeticiones=3)
+        self.assertLess(resultado['p50_ms'], LIMITE_MS)
+        self.assertLessEqual(resultado['fuera_agenda'], resultado['fuera_ruta'])
+
+
+@override_settings(AGENDA_INICIO_JORNADA='09:00', AGENDA_FIN_JORNADA='18:00', AGENDA_MINUTOS_RETIRO=10,
+                   AGENDA_MINUTOS_MISMA_ZONA=5, AGENDA_MINUTOS_ENTRE_ZONAS=20)
+class AgendaRetiradorTests(TestCase):
+    def test_ruta_del_retirador_respeta_horarios_y_marca_atrasos(self):
+        zona = Zona.objects.create(nombre='Valparaíso')
+        retirador = Retirador.objects.create(nombre='Juan Pérez')
+        hoy = timezone.now().date()
+        horarios = [None, (time(12), time(13)), None, (time(9), time(9, 5))]
+        for i, horario in enumerate(horarios):
+            inicio, fin = horario or (None, None)
+            solicitante = Solicitante.objects.create(
+                nombre=f'Solicitante {i}', telefono='+56912345678', email_desconocido=True,
+                zona=zona, direccion_principal=f'Calle {i}',
+                horario_atencion_inicio=inicio, horario_atencion_fin=fin,
+            )
+            SolicitudRetiro.objects.create(
+                solicitante=solicitante, direccion_retiro='', fecha_retiro=hoy,
+                retirador_asignado=retirador, estado='asignado',
+            )
+
+        ruta = SolicitudService.obtener_ruta_retirador(retirador, hoy)
+
+        self.assertEqual(ruta[0].solicitante.nombre, 'Solicitante 3')
+        self.assertEqual(ruta[0].hora_estimada, time(9))
+        self.assertEqual(ruta[-1].solicitante.nombre, 'Solicitante 1')
+        self.assertEqual(ruta[-1].hora_estimada, time(12))
+        self.assertFalse(any(s.fuera_de_horario for s in ruta))
+
+        # Empezando a las 10:00 ya no se alcanza la que cierra a las 09:05
+        tarde = SolicitudService.ordenar_ruta(ruta, inicio=time(10))
+        self.assertEqual([s.solicitante.nombre for s in tarde if s.fuera_de_horario], ['Solicitante 3'])
+
+        respuesta = self.client.get(reverse('lista_retirador', args=[retirador.id]))
+        self.assertContains(respuesta, '12:00')
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros.archivo import archivar_lote, historial_solicitante, leer_archivo_mes
+from retiros.models import BajaSolicitud, Solicitante, SolicitudRetiro, SolicitudRetiroArchivada, Zona
+
+
+class ArchivoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoy = timezone.now().date()
+        cls.solicitante = Solicitante.objects.create(
+            nombre='Veterinaria Central', telefono='+56912345678', email='central@example.com',
+            zona=Zona.objects.create(nombre='Valparaíso'), direccion_principal='Av. Brasil 123',
+        )
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        hace = lambda dias: self.hoy - timedelta(days=dias)
+        self.antiguas = [self._crear(hace(400), 'completado'), self._crear(hace(500), 'cancelado')]
+        self.recientes = [self._crear(hace(400), 'pendiente'), self._crear(hace(10), 'completado')]
+
+    def _crear(self, fecha_retiro, estado):
+        return SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=fecha_retiro, estado=estado
+        )
+
+    def _ids(self, solicitudes):
+        return sorted(s.id for s in solicitudes)
+
+    def test_comando_mueve_solo_finalizadas_antiguas_a_la_tabla(self):
+        call_command('archivar_solicitudes', '--dias', '365', '--lote', '1', stdout=StringIO())
+
+        self.assertEqual(sorted(SolicitudRetiro.objects.values_list('id', flat=True)), self._ids(self.recientes))
+        self.assertEqual(sorted(SolicitudRetiroArchivada.objects.values_list('id', flat=True)), self._ids(self.antiguas))
+        # No son bajas de la sincronización
+        self.assertFalse(BajaSolicitud.objects.exists())
+
+    def test_archiva_en_jsonl_comprimido_por_mes(self):
+        corte = self.hoy - timedelta(days=365)
+        while archivar_lote(corte, 1, self.directorio.name):
+            pass
+
+        archivos = sorted(p.name for p in Path(self.directorio.name).iterdir())
+        self.assertEqual(len(archivos), 2)
+        fecha = self.antiguas[0].fecha_retiro
+        filas = leer_archivo_mes(self.directorio.name, fecha.year, fecha.month)
+        self.assertEqual([(f['id'], f['fecha_retiro'], f['estado']) for f in filas],
+                         [(self.antiguas[0].id, fecha, 'completado')])
+        self.assertFalse(SolicitudRetiroArchivada.objects.exists())
+
+    def test_historial_lee_tabla_viva_archivo_y_jsonl(self):
+        corte = self.hoy - timedelta(days=450)
+        archivar_lote(corte, 10, self.directorio.name)   # la de hace 500 días, a JSONL
+        archivar_lote(self.hoy - timedelta(days=365), 10)  # la de hace 400 días, a la tabla
+
+        with override_settings(ARCHIVO_SOLICITUDES_DIR=Path(self.directorio.name)):
+            todas = historial_solicitante(self.solicitante.id, self.hoy - timedelta(days=600), self.hoy)
+            sin_rango = historial_solicitante(self.solicitante.id)
+
+        self.assertEqual([f['id'] for f in todas], [
+            self.recientes[1].id, self.recientes[0].id, self.antiguas[0].id, self.antiguas[1].id,
+        ])
+        self.assertEqual([f['archivada'] for f in todas], [False, False, True, True])
+        self.assertEqual(len(sin_rango), 3)
+
+        response = self.client.get(reverse('api_historial_solicitante', args=[self.solicitante.id]))
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_api_historial_acota_el_limite(self):
+        url = reverse('api_historial_solicitante', args=[self.solicitante.id])
+        for limite, esperado in (('-5', 1), ('0', 1), ('2', 2), ('100000', 4)):
+            with self.subTest(limite=limite):
+                response = self.client.get(url, {'limite': limite})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['count'], esperado)
+        self.assertEqual(self.client.get(url, {'limite': 'muchas'}).status_code, 400)
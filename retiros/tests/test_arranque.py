@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+
+from retiros.benchmarks import comparar_arranque, formatear_arranque, medir_arranque
+from retiros.benchmarks.arranque import parsear_importtime
+
+
+class ParsearImporttimeTests(SimpleTestCase):
+    def test_parsea_modulos_y_niveles(self):
+        salida = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   reportlab.lib\n"
+            "import time:        80 |        200 | reportlab\n"
+        )
+        self.assertEqual(parsear_importtime(salida), {
+            'reportlab.lib': (120, 120, 1),
+            'reportlab': (80, 200, 0),
+        })
+
+
+class ArranqueTests(SimpleTestCase):
+    def test_arranque_no_carga_modulos_pesados(self):
+        # Un worker no debe cargar ReportLab ni el perfilador hasta usarlos
+        resultado = medir_arranque(repeticiones=1)
+        self.assertEqual(comparar_arranque(resultado, None), [], '\n' + formatear_arranque(resultado))
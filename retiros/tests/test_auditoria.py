@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros.auditoria import agrupar_eventos, eventos_del_dia, historial
+from retiros.estados import transicionar
+from retiros.models import EventoSolicitud, Retirador, Solicitante, SolicitudRetiro, Zona
+
+
+class AuditoriaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.solicitante = Solicitante.objects.create(
+            nombre='Veterinaria Central', telefono='+56912345678', email='central@example.com',
+            zona=Zona.objects.create(nombre='Valparaíso'), direccion_principal='Av. Brasil 123',
+        )
+        cls.retirador = Retirador.objects.create(nombre='Pedro')
+
+    def _crear(self, estado='pendiente'):
+        return SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=timezone.now().date(), estado=estado
+        )
+
+    def test_historial_de_una_solicitud(self):
+        solicitud = self._crear()
+        with self.captureOnCommitCallbacks(execute=True), agrupar_eventos(usuario='ana'):
+            transicionar(solicitud, 'asignado', retirador_asignado=self.retirador)
+            transicionar(solicitud, 'completado')
+            self.assertEqual(EventoSolicitud.objects.count(), 0)
+
+        eventos = list(historial(solicitud.id))
+        self.assertEqual([e['tipo'] for e in eventos], ['asignada', 'completada'])
+        self.assertEqual(eventos[1]['estado_anterior'], 'asignado')
+        self.assertEqual({e['retirador'] for e in eventos}, {self.retirador.id})
+        self.assertEqual({e['usuario'] for e in eventos}, {'ana'})
+        self.assertEqual(len(eventos_del_dia(timezone.localdate())), 2)
+
+    def test_accion_masiva_del_admin_es_un_solo_insert(self):
+        usuario = User.objects.create_superuser('admin', 'admin@example.cl', 'clave')
+        self.client.force_login(usuario)
+        ids = [self._crear().id for _ in range(5)] + [self._crear('cancelado').id]
+
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:retiros_solicitudretiro_changelist'), {
+                'action': 'marcar_completado', '_selected_action': ids,
+            })
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "retiros_eventosolicitud"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(EventoSolicitud.objects.values_list('tipo', 'usuario').distinct()), [('completada', 'admin')]
+        )
+        self.assertEqual(EventoSolicitud.objects.count(), 5)
+
+    def test_cambios_revertidos_no_dejan_eventos(self):
+        solicitud = self._crear()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValueError), agrupar_eventos(usuario='ana'):
+                transicionar(solicitud, 'asignado', retirador_asignado=self.retirador)
+                with transaction.atomic():
+                    transicionar(solicitud, 'completado')
+                    raise ValueError
+        self.assertEqual(len(callbacks), 2)  # el evento confirmado y guardar el bloque
+        self.assertEqual(list(EventoSolicitud.objects.values_list('tipo', 'usuario')), [('asignada', 'ana')])
+
+    def test_se_conserva_al_eliminar_y_no_se_modifica(self):
+        solicitud = self._crear()
+        with self.captureOnCommitCallbacks(execute=True):
+            transicionar(solicitud, 'cancelado')
+        solicitud_id = solicitud.id
+        solicitud.delete()
+
+        evento = EventoSolicitud.objects.get(solicitud_id=solicitud_id)
+        with self.assertRaises(ValueError):
+            evento.save()
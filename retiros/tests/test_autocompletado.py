@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from retiros import autocompletado
+from retiros.models import Solicitante, Zona
+from retiros.services import SolicitanteService
+
+
+def _id(solicitante):
+    return solicitante.id
+
+
+class AutocompletadoTests(TestCase):
+    def setUp(self):
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+        nombres = ('Veterinaria Costa', 'Clínica Veterinaria Sur', 'Vet Express', 'Almacén Sol')
+        self.solicitantes = [self._solicitante(nombre) for nombre in nombres]
+
+    def _solicitante(self, nombre):
+        return Solicitante.objects.create(
+            nombre=nombre, telefono='912345678', email_desconocido=True, zona=self.zona, direccion_principal='Calle 1',
+        )
+
+    def _servicio(self, query):
+        return [s.id for s in SolicitanteService.buscar_solicitantes(query)]
+
+    def test_prefijos_mas_largos_se_filtran_en_memoria(self):
+        queries = ('veteri', 'Veterinária', 'veterinaria s', 'veter')
+        esperados = {query: self._servicio(query) for query in queries}
+        inicial = autocompletado.metricas()
+        self.assertEqual(autocompletado.buscar('veter', _id), esperados['veter'])
+
+        with self.assertNumQueries(0):
+            for query in queries:
+                with self.subTest(query=query):
+                    self.assertEqual(autocompletado.buscar(query, _id), esperados[query])
+
+        metricas = autocompletado.metricas()
+        self.assertEqual(metricas['fallos'] - inicial['fallos'], 1)
+        self.assertEqual(metricas['filtrados'] - inicial['filtrados'], 3)
+        self.assertEqual(metricas['aciertos'] - inicial['aciertos'], 1)
+
+    def test_cambios_de_solicitantes_abren_una_generacion_nueva(self):
+        self.assertEqual(len(autocompletado.buscar('vet', _id)), 2)
+
+        nuevo = self._solicitante('Vete Ya')
+        self.assertIn(nuevo.id, autocompletado.buscar('vet', _id))
+
+        Solicitante.objects.filter(pk=nuevo.pk).update(nombre='Otro Nombre')
+        self.assertNotIn(nuevo.id, autocompletado.buscar('vet', _id))
+
+        creado, = Solicitante.objects.bulk_create([Solicitante(
+            nombre='Vetusta', telefono='912345678', email_desconocido=True, zona=self.zona, direccion_principal='',
+        )])
+        self.assertIn(creado.id, autocompletado.buscar('vetu', _id))
+
+    def test_lectura_de_una_generacion_anterior_no_se_guarda(self):
+        def serializar_e_invalidar(solicitante):
+            autocompletado.invalidar()
+            return solicitante.id
+
+        autocompletado.buscar('almacen', serializar_e_invalidar)
+        with self.assertNumQueries(1):
+            autocompletado.buscar('almacen', _id)
+
+    def test_invalidacion_de_otro_proceso_por_la_cache_compartida(self):
+        autocompletado.buscar('almacen', _id)
+        with self.assertNumQueries(0):
+            autocompletado.buscar('almacen', _id)
+
+        # Otro proceso guardó un solicitante y publicó la invalidación
+        cache.incr(autocompletado.CLAVE_GENERACION)
+        with self.assertNumQueries(1):
+            autocompletado.buscar('almacen', _id)
+
+        # Las de este proceso se publican al confirmarse la transacción
+        generacion = cache.get(autocompletado.CLAVE_GENERACION)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._solicitante('Almacén Luna')
+            self.assertEqual(cache.get(autocompletado.CLAVE_GENERACION), generacion)
+        self.assertEqual(cache.get(autocompletado.CLAVE_GENERACION), generacion + 1)
+
+    @override_settings(AUTOCOMPLETADO_MAX_CANDIDATOS=2)
+    def test_con_demasiados_candidatos_usa_el_servicio(self):
+        self.assertEqual(autocompletado.buscar('vet', _id), self._servicio('vet'))
+        with self.assertNumQueries(0):
+            autocompletado.buscar('vet', _id)
+
+    def test_metricas_solo_para_staff(self):
+        url = reverse('api_metricas_autocompletado')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.client.get(reverse('api_buscar_solicitantes'), {'q': 'vet'})
+        self.client.get(reverse('api_buscar_solicitantes'), {'q': 'vet'})
+        metricas = self.client.get(url).json()
+        self.assertGreaterEqual(metricas['aciertos'], 1)
+        self.assertIn('tasa_aciertos', metricas)
@@ -0,0 +1,37 @@
+from django.test import TestCase
+
+from retiros.benchmarks import (
+    cargar_baseline,
+    comparar_con_baseline,
+    ejecutar_suite,
+    formatear_tabla,
+    sembrar_datos,
+)
+from retiros.benchmarks.suite import percentil
+
+
+class PercentilTests(TestCase):
+    def test_interpola_entre_rangos(self):
+        valores = [1, 2, 3, 4]
+        self.assertEqual(percentil(valores, 0), 1)
+        self.assertEqual(percentil(valores, 50), 2.5)
+        self.assertEqual(percentil(valores, 100), 4)
+
+
+class BenchmarkTests(TestCase):
+    escala = 'pequena'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = sembrar_datos(cls.escala)
+
+    def test_consultas_sin_regresiones_respecto_al_baseline(self):
+        # Solo las consultas: las latencias dependen de la máquina y se
+        # comparan con ``python manage.py benchmark``
+        baseline = cargar_baseline().get(self.escala)
+        self.assertTrue(baseline, f"No hay baseline para '{self.escala}' (python manage.py benchmark --actualizar-baseline)")
+
+        resultados = ejecutar_suite(self.ctx, iteraciones=1)
+        regresiones = comparar_con_baseline(resultados, baseline, tiempos=False)
+
+        self.assertEqual(regresiones, [], '\n' + formatear_tabla(resultados, baseline))
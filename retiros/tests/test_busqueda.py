@@ -0,0 +1,111 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from retiros.models import Solicitante, Zona
+from retiros.normalizacion import clave_busqueda, filtro_prefijo
+from retiros.services import SolicitanteService
+
+
+class ClaveBusquedaTests(SimpleTestCase):
+    def test_sin_tildes_mayusculas_ni_puntuacion(self):
+        self.assertEqual(clave_busqueda('Viña del  Mar'), 'vina del mar')
+        self.assertEqual(clave_busqueda('Peñalolén, Av. Grecia #12'), 'penalolen av grecia 12')
+        self.assertEqual(clave_busqueda('MARÍA.Pérez@Correo.CL'), 'maria perez correo cl')
+        self.assertEqual(clave_busqueda(None), '')
+
+
+class ClavesSolicitanteTests(TestCase):
+    def setUp(self):
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+
+    def _solicitante(self, nombre, direccion='Calle 1', email=''):
+        return Solicitante.objects.create(
+            nombre=nombre, telefono='912345678', email=email, email_desconocido=not email,
+            zona=self.zona, direccion_principal=direccion,
+        )
+
+    def _claves(self, solicitante):
+        return Solicitante.objects.values_list(
+            'nombre_busqueda', 'direccion_busqueda', 'email_busqueda',
+        ).get(pk=solicitante.pk)
+
+    def test_se_mantienen_al_guardar_y_en_cambios_masivos(self):
+        solicitante = self._solicitante('José Núñez', 'Av. Libertad 1', 'Jose@Mail.cl')
+        self.assertEqual(self._claves(solicitante), ('jose nunez', 'av libertad 1', 'jose mail cl'))
+
+        Solicitante.objects.filter(pk=solicitante.pk).update(nombre='Ñuñoa Óptica')
+        self.assertEqual(self._claves(solicitante)[0], 'nunoa optica')
+
+        Solicitante.objects.filter(pk=solicitante.pk).update(
+            direccion_principal=Concat(F('direccion_principal'), Value(', Viña del Mar')),
+        )
+        self.assertEqual(self._claves(solicitante)[1], 'av libertad 1 vina del mar')
+
+        solicitante.refresh_from_db()
+        solicitante.email = 'ÑANDÚ@mail.cl'
+        Solicitante.objects.bulk_update([solicitante], ['email'])
+        self.assertEqual(self._claves(solicitante)[2], 'nandu mail cl')
+
+        creado, = Solicitante.objects.bulk_create([Solicitante(
+            nombre='Ángela', telefono='912345678', email_desconocido=True, zona=self.zona, direccion_principal='',
+        )])
+        self.assertEqual(self._claves(creado)[0], 'angela')
+
+    def test_busca_sin_tildes_por_prefijo(self):
+        vina = self._solicitante('Restorán Costa', 'Viña del Mar 123')
+        interna = self._solicitante('Ferretería La Viña')
+        otro = self._solicitante('Almacén Sol')
+
+        self.assertEqual(SolicitanteService.buscar_solicitantes('VINA'), [vina])
+        self.assertEqual(SolicitanteService.buscar_solicitantes('almacen'), [otro])
+        self.assertEqual(SolicitanteService.buscar_solicitantes('ferreteria la'), [interna])
+
+        respuesta = self.client.get(reverse('api_buscar_solicitantes'), {'q': 'restoran'}).json()
+        self.assertEqual([r['id'] for r in respuesta['results']], [vina.id])
+
+    @override_settings(BUSQUEDA_CONTIENE_LIMITE=1)
+    def test_coincidencias_internas_solo_si_se_piden(self):
+        vina = self._solicitante('Restorán Costa', 'Viña del Mar 123')
+        interna = self._solicitante('Ferretería La Viña')
+        self._solicitante('Heladería La Viña')
+
+        self.assertEqual(SolicitanteService.buscar_solicitantes('VINA', contiene=True), [vina, interna])
+        # Búsqueda demasiado corta para recorrer la tabla
+        self.assertEqual(SolicitanteService.buscar_solicitantes('vin', contiene=True), [vina])
+
+        respuesta = self.client.get(reverse('api_buscar_solicitantes'), {'q': 'vina', 'contiene': '1'}).json()
+        self.assertEqual([r['id'] for r in respuesta['results']], [vina.id, interna.id])
+
+    def test_busqueda_por_defecto_no_recorre_la_tabla(self):
+        self._solicitante('Restorán Costa', 'Viña del Mar 123')
+        for buscar in (
+            lambda: SolicitanteService.buscar_solicitantes('ferreteria'),
+            lambda: self.client.get(reverse('api_buscar_solicitantes'), {'q': 'ferreteria'}),
+        ):
+            with CaptureQueriesContext(connection) as consultas:
+                buscar()
+            self.assertEqual(len(consultas), 1)
+            self.assertNotIn('LIKE', consultas[0]['sql'].upper())
+
+    @skipUnless(connection.vendor == 'sqlite', 'plan de consulta de SQLite')
+    def test_prefijo_usa_el_indice_de_la_clave(self):
+        plan = Solicitante.objects.filter(filtro_prefijo('nombre_busqueda', 'vin')).order_by('nombre_busqueda').explain()
+        self.assertIn('nombre_busqueda', plan)
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class OrdenBinarioTests(SimpleTestCase):
+    def test_rangos_por_prefijo_sobre_columnas_con_orden_binario(self):
+        for campo in ('nombre_busqueda', 'direccion_busqueda', 'email_busqueda', 'telefono_invertido', 'celda'):
+            with self.subTest(campo=campo):
+                field = Solicitante._meta.get_field(campo)
+                with mock.patch.object(connection, 'vendor', 'postgresql'):
+                    self.assertEqual(field.db_parameters(connection)['collation'], 'C')
+                self.assertIsNone(field.db_parameters(connection)['collation'])
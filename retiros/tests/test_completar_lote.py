@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros.models import Solicitante, SolicitudRetiro, Zona, marca_secuencia
+from retiros.services import SolicitudService
+
+
+class CompletarLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoy = timezone.now().date()
+        cls.solicitante = Solicitante.objects.create(
+            nombre='Veterinaria Central', telefono='+56912345678', email='central@example.com',
+            zona=Zona.objects.create(nombre='Valparaíso'), direccion_principal='Av. Brasil 123',
+        )
+
+    def _crear(self, estado='pendiente'):
+        return SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=self.hoy, estado=estado
+        )
+
+    def _enviar(self, *eventos, client=None):
+        return (client or self.client).post(
+            reverse('api_completar_lote'), {'eventos': list(eventos)}, content_type='application/json'
+        )
+
+    def _evento(self, solicitud, estado='completado', fecha=None):
+        return {'id': solicitud.id, 'estado': estado, 'fecha': (fecha or timezone.now()).isoformat()}
+
+    def _resultados(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {r['id']: r['resultado'] for r in response.json()['resultados']}
+
+    def test_aplica_y_es_idempotente(self):
+        a, b = self._crear(), self._crear('asignado')
+        eventos = (self._evento(a), self._evento(b, 'cancelado'))
+
+        self.assertEqual(self._resultados(self._enviar(*eventos)), {a.id: 'aplicado', b.id: 'aplicado'})
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.estado, b.estado), ('completado', 'cancelado'))
+        self.assertEqual(a.secuencia, b.secuencia)
+
+        # Reenviar el mismo lote (la app no recibió la respuesta) no cambia nada
+        secuencia = marca_secuencia()
+        self.assertEqual(self._resultados(self._enviar(*eventos)), {a.id: 'sin_cambios', b.id: 'sin_cambios'})
+        self.assertEqual(marca_secuencia(), secuencia)
+
+    def test_informa_conflictos_no_encontradas_e_invalidos(self):
+        cancelada = self._crear('cancelado')
+        response = self._enviar(
+            self._evento(cancelada),
+            {'id': 999999, 'estado': 'completado', 'fecha': timezone.now().isoformat()},
+            {'id': cancelada.id, 'estado': 'pendiente', 'fecha': timezone.now().isoformat()},
+        )
+        datos = response.json()
+        self.assertEqual([r['resultado'] for r in datos['resultados']], ['invalido', 'conflicto', 'no_encontrada'])
+        self.assertEqual(datos['conflictos'], 1)
+        cancelada.refresh_from_db()
+        self.assertEqual(cancelada.estado, 'cancelado')
+
+    def test_vale_el_evento_mas_reciente(self):
+        solicitud = self._crear()
+        ahora = timezone.now()
+        self._enviar(
+            self._evento(solicitud, 'cancelado', ahora),
+            self._evento(solicitud, 'completado', ahora - timedelta(minutes=5)),
+        )
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, 'cancelado')
+
+    def test_un_update_por_estado(self):
+        solicitudes = [self._crear() for _ in range(20)]
+        eventos = [self._evento(s) for s in solicitudes]
+        # SELECT, contador, un UPDATE y un INSERT del historial para los 20,
+        # más el SAVEPOINT/RELEASE de transaction.atomic dentro del TestCase
+        with self.assertNumQueries(6), self.captureOnCommitCallbacks(execute=True):
+            SolicitudService.aplicar_lote_estados(eventos)
+        self.assertEqual(SolicitudRetiro.objects.filter(estado='completado').count(), 20)
+
+    def test_cuerpo_invalido_y_csrf(self):
+        response = self.client.post(reverse('api_completar_lote'), 'basura', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self._enviar(self._evento(self._crear()), client=Client(enforce_csrf_checks=True))
+        self.assertEqual(response.status_code, 403)
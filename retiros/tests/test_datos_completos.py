@@ -0,0 +1,78 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+
+from retiros.models import Solicitante, Zona
+from retiros.services import EstadisticasService, SolicitanteService
+
+
+class DatosCompletosTests(TestCase):
+    def setUp(self):
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+
+    def _solicitante(self, **kwargs):
+        datos = dict(
+            nombre='Ana', telefono='+56912345678', email='ana@example.cl',
+            zona=self.zona, direccion_principal='Calle 1',
+        )
+        datos.update(kwargs)
+        return Solicitante.objects.create(**datos)
+
+    def _guardado(self, solicitante):
+        return Solicitante.objects.values_list('datos_completos', flat=True).get(pk=solicitante.pk)
+
+    def test_save_calcula_la_misma_regla_que_validar_datos(self):
+        casos = [
+            ({}, []),
+            ({'email': None, 'email_desconocido': True}, ['email']),
+            ({'direccion_principal': '', 'direccion_desconocida': True}, ['dirección']),
+            # Sin marcar como desconocida pero vacía: también falta
+            ({'direccion_principal': ''}, ['dirección']),
+        ]
+        for datos, faltantes in casos:
+            with self.subTest(datos=datos):
+                solicitante = self._solicitante(**datos)
+                self.assertEqual(self._guardado(solicitante), not faltantes)
+                self.assertEqual(
+                    SolicitanteService.validar_datos_solicitante(solicitante), (not faltantes, faltantes)
+                )
+
+    def test_update_masivo_mantiene_el_campo(self):
+        completo, incompleto = self._solicitante(), self._solicitante(email=None, email_desconocido=True)
+
+        Solicitante.objects.filter(pk=completo.pk).update(direccion_desconocida=True, direccion_principal='')
+        Solicitante.objects.filter(pk=incompleto.pk).update(email='ana@example.cl', email_desconocido=False)
+        self.assertFalse(self._guardado(completo))
+        self.assertTrue(self._guardado(incompleto))
+
+        # Valor calculado en SQL: se recalcula sobre las filas del filtro original
+        Solicitante.objects.filter(direccion_desconocida=True).update(
+            direccion_desconocida=False, direccion_principal=F('nombre'),
+        )
+        self.assertTrue(self._guardado(completo))
+
+    def test_bulk_create_y_bulk_update(self):
+        creados = Solicitante.objects.bulk_create([
+            Solicitante(nombre='A', telefono='+56912345678', email='a@example.cl', zona=self.zona,
+                        direccion_principal='Calle 1'),
+            Solicitante(nombre='B', telefono='+56912345678', email_desconocido=True, zona=self.zona,
+                        direccion_principal='Calle 2'),
+        ])
+        self.assertEqual([self._guardado(s) for s in creados], [True, False])
+
+        creados[0].email, creados[0].email_desconocido = None, True
+        Solicitante.objects.bulk_update(creados, ['email', 'email_desconocido'])
+        self.assertFalse(self._guardado(creados[0]))
+
+    def test_dashboard_y_listado_usan_el_campo(self):
+        self._solicitante()
+        self._solicitante(direccion_principal='')
+        self.assertEqual(EstadisticasService.obtener_resumen_dashboard()['solicitantes_incompletos'], 1)
+        self.assertEqual(SolicitanteService.obtener_solicitantes_incompletos().count(), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'plan de consulta de SQLite')
+    def test_conteo_de_incompletos_usa_el_indice_parcial(self):
+        plan = Solicitante.objects.filter(datos_completos=False).explain()
+        self.assertIn('solicitante_incompletos', plan)
@@ -0,0 +1,119 @@
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from retiros.disponibilidad import CLAVE_GENERACION, CalendarioDia, calendario, invalidar
+from retiros.models import DisponibilidadRetirador, Retirador, Solicitante, SolicitudRetiro, Zona
+from retiros.services import EstadisticasService, SolicitudService
+
+NUEVE, DIECIOCHO = 9 * 60, 18 * 60
+
+
+class CalendarioDiaTests(SimpleTestCase):
+    def setUp(self):
+        # Retirador 1: 10:00-11:00 y 10:30-12:00 (se fusionan) y 15:00-16:00
+        self.dia = CalendarioDia(
+            [(1, 15 * 60, 16 * 60), (1, 10 * 60, 11 * 60), (1, 10 * 60 + 30, 12 * 60), (2, 0, 24 * 60)],
+            NUEVE, DIECIOCHO,
+        )
+
+    def test_disponible_por_busqueda_en_intervalos_fusionados(self):
+        self.assertTrue(self.dia.disponible(1, 9 * 60 + 59))
+        self.assertFalse(self.dia.disponible(1, 11 * 60 + 30))
+        self.assertTrue(self.dia.disponible(1, 12 * 60))
+        self.assertFalse(self.dia.disponible(1, 15 * 60))
+        self.assertTrue(self.dia.disponible(3, 10 * 60))
+
+    def test_minutos_ausente_recorta_los_extremos(self):
+        self.assertEqual(self.dia.minutos_ausente(1, NUEVE, DIECIOCHO), 180)
+        self.assertEqual(self.dia.minutos_ausente(1, 11 * 60, 15 * 60 + 30), 90)
+        self.assertEqual(self.dia.minutos_ausente(1, 12 * 60, 15 * 60), 0)
+
+    def test_estado_y_capacidad_proporcional_a_la_jornada(self):
+        self.assertEqual(self.dia.estado(1), 'parcial')
+        self.assertEqual(self.dia.estado(2), 'ausente')
+        self.assertEqual(self.dia.estado(3), 'disponible')
+        # 6 de 9 horas libres
+        self.assertEqual(self.dia.capacidad(1, 9), 6)
+        self.assertIsNone(self.dia.capacidad(1, None))
+        self.assertEqual(self.dia.capacidad(2, None), 0)
+
+
+@override_settings(AGENDA_INICIO_JORNADA='09:00', AGENDA_FIN_JORNADA='18:00')
+class DisponibilidadAsignacionTests(TestCase):
+    def setUp(self):
+        self.addCleanup(invalidar)
+        invalidar()
+        self.hoy = timezone.now().date()
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+        self.solicitante = Solicitante.objects.create(
+            nombre='Ana', telefono='+56912345678', email_desconocido=True,
+            zona=self.zona, direccion_principal='Calle 1',
+        )
+        self.fijo = Retirador.objects.create(nombre='Fijo', capacidad_diaria=4)
+        self.complementario = Retirador.objects.create(nombre='Complementario', tipo='complementario')
+        for retirador in (self.fijo, self.complementario):
+            retirador.zonas_preferidas.add(self.zona)
+
+    def _ausencia(self, retirador, desde, hasta, **kwargs):
+        medianoche = timezone.make_aware(datetime.combine(self.hoy, time.min))
+        return DisponibilidadRetirador.objects.create(
+            retirador=retirador, inicio=medianoche + desde, fin=medianoche + hasta, **kwargs
+        )
+
+    def _asignar(self):
+        solicitud = SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=self.hoy,
+        )
+        return SolicitudService.asignar_retirador_automatico(solicitud)[0]
+
+    def test_ausente_no_recibe_retiros(self):
+        self._ausencia(self.fijo, timedelta(0), timedelta(days=1))
+        self.assertEqual(self._asignar(), self.complementario)
+
+    def test_medio_dia_reduce_la_capacidad(self):
+        # Libre de 13:30 a 18:00: la mitad de la jornada, 2 de 4 retiros
+        self._ausencia(self.fijo, timedelta(hours=8), timedelta(hours=13, minutes=30), motivo='medio_dia')
+        self.assertEqual([self._asignar() for _ in range(3)], [self.fijo, self.fijo, self.complementario])
+
+    def test_calendario_en_memoria_y_descartado_al_guardar(self):
+        calendario(self.hoy)
+        with self.assertNumQueries(0):
+            self.assertEqual(calendario(self.hoy).estado(self.fijo.id), 'disponible')
+
+        ausencia = self._ausencia(self.fijo, timedelta(0), timedelta(days=1))
+        self.assertEqual(calendario(self.hoy).estado(self.fijo.id), 'ausente')
+        ausencia.delete()
+        self.assertEqual(calendario(self.hoy).estado(self.fijo.id), 'disponible')
+
+    def test_invalidacion_de_otro_proceso_por_la_cache_compartida(self):
+        calendario(self.hoy)
+        # Otro proceso guardó una ausencia y publicó la invalidación
+        cache.incr(CLAVE_GENERACION)
+        with self.assertNumQueries(1):
+            calendario(self.hoy)
+
+        # Las de este proceso se publican al confirmarse la transacción
+        generacion = cache.get(CLAVE_GENERACION)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._ausencia(self.fijo, timedelta(0), timedelta(days=1))
+            self.assertEqual(cache.get(CLAVE_GENERACION), generacion)
+        self.assertEqual(cache.get(CLAVE_GENERACION), generacion + 1)
+
+    def test_dashboard_no_cuenta_pendientes_de_la_zona_a_un_ausente(self):
+        SolicitudRetiro.objects.create(solicitante=self.solicitante, direccion_retiro='', fecha_retiro=self.hoy)
+        SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=self.hoy,
+            retirador_asignado=self.fijo, estado='asignado',
+        )
+        self._ausencia(self.fijo, timedelta(0), timedelta(days=1))
+
+        resumen = EstadisticasService.obtener_resumen_dashboard(self.hoy)
+
+        por_retirador = {r['retirador']: r for r in resumen['resumenes_retiradores']}
+        self.assertEqual(por_retirador[self.fijo]['disponibilidad'], 'ausente')
+        self.assertEqual(por_retirador[self.fijo]['count'], 1)
+        self.assertEqual(por_retirador[self.complementario]['count'], 1)
+        self.assertEqual(resumen['retiradores_ausentes'], 1)
@@ -0,0 +1,85 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from retiros.estados import ConflictoVersion, TransicionInvalida, transicionar, transicionar_lote
+from retiros.forms import SolicitudRetiroAdminForm
+from retiros.models import Retirador, Solicitante, SolicitudRetiro, Zona
+
+
+class TransicionesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.solicitante = Solicitante.objects.create(
+            nombre='Veterinaria Central', telefono='+56912345678', email='central@example.com',
+            zona=Zona.objects.create(nombre='Valparaíso'), direccion_principal='Av. Brasil 123',
+        )
+
+    def _crear(self, estado='pendiente'):
+        return SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=timezone.now().date(), estado=estado
+        )
+
+    def test_transicionar_incrementa_la_version(self):
+        solicitud = self._crear()
+        retirador = Retirador.objects.create(nombre='Pedro')
+        transicionar(solicitud, 'asignado', retirador_asignado=retirador)
+        self.assertEqual((solicitud.estado, solicitud.version), ('asignado', 1))
+        solicitud.refresh_from_db()
+        self.assertEqual((solicitud.estado, solicitud.version, solicitud.retirador_asignado), ('asignado', 1, retirador))
+
+    def test_escritor_concurrente_recibe_conflicto(self):
+        solicitud = self._crear()
+        copia = SolicitudRetiro.objects.get(pk=solicitud.pk)
+        transicionar(solicitud, 'cancelado')
+        with self.assertRaises(ConflictoVersion):
+            transicionar(copia, 'completado')
+        copia.refresh_from_db()
+        self.assertEqual(copia.estado, 'cancelado')
+
+    def test_estados_finales_no_cambian(self):
+        with self.assertRaises(TransicionInvalida):
+            transicionar(self._crear('completado'), 'pendiente')
+
+    def test_save_y_update_tambien_invalidan_lecturas(self):
+        solicitud = self._crear()
+        copia = SolicitudRetiro.objects.get(pk=solicitud.pk)
+        solicitud.notas = 'Urgente'
+        solicitud.save()
+        SolicitudRetiro.objects.filter(pk=solicitud.pk).update(notas='Felino')
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.version, 2)
+        with self.assertRaises(ConflictoVersion):
+            transicionar(copia, 'completado')
+
+    def test_save_lee_la_nueva_version_en_el_mismo_update(self):
+        solicitud = self._crear()
+        SolicitudRetiro.objects.filter(pk=solicitud.pk).update(notas='Felino')
+        solicitud.notas = 'Urgente'
+        with self.assertNumQueries(2):  # contador y UPDATE ... RETURNING
+            solicitud.save()
+        self.assertEqual(solicitud.version, 2)
+        transicionar(solicitud, 'asignado')
+
+    def test_lote_omite_las_que_no_pueden_cambiar(self):
+        abiertas = [self._crear(), self._crear('asignado')]
+        cancelada = self._crear('cancelado')
+        # SELECT, contador, un UPDATE y un INSERT del historial
+        with self.assertNumQueries(4), self.captureOnCommitCallbacks(execute=True):
+            actualizadas = transicionar_lote(SolicitudRetiro.objects.all(), 'completado')
+        self.assertEqual(sorted(actualizadas), [s.id for s in abiertas])
+        cancelada.refresh_from_db()
+        self.assertEqual(cancelada.estado, 'cancelado')
+        self.assertEqual(
+            set(SolicitudRetiro.objects.filter(estado='completado').values_list('id', flat=True)),
+            {s.id for s in abiertas},
+        )
+
+    def test_formulario_admin_valida_la_transicion(self):
+        solicitud = self._crear('completado')
+        datos = {
+            'solicitante': self.solicitante.id, 'usar_direccion_solicitante': True, 'direccion_retiro': 'x',
+            'fecha_retiro': solicitud.fecha_retiro, 'estado': 'pendiente', 'notas': '',
+        }
+        form = SolicitudRetiroAdminForm(datos, instance=solicitud)
+        self.assertFalse(form.is_valid())
+        self.assertIn('estado', form.errors)
@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from retiros.estados import transicionar
+from retiros.models import BajaSolicitud, EventoSolicitud, SolicitudRetiro, Zona
+
+
+class GenerarDatosTests(TestCase):
+    def _generar(self, **kwargs):
+        opciones = dict(zonas=3, retiradores=4, solicitantes=20, solicitudes=60, dias=5, solicitudes_hoy=4)
+        opciones.update(kwargs)
+        call_command('generar_datos', interactive=False, stdout=StringIO(), **opciones)
+
+    def test_limpiar_vacia_tambien_las_tablas_derivadas(self):
+        self._generar()
+        with self.captureOnCommitCallbacks(execute=True):
+            transicionar(SolicitudRetiro.objects.filter(estado__in=('pendiente', 'asignado')).first(), 'cancelado')
+        SolicitudRetiro.objects.filter(estado='completado')[:1].get().delete()
+        self.assertTrue(EventoSolicitud.objects.exists())
+        self.assertTrue(BajaSolicitud.objects.exists())
+
+        self._generar(limpiar=True)
+
+        for modelo in (EventoSolicitud, BajaSolicitud):
+            self.assertFalse(modelo.objects.exists(), modelo._meta.label)
+        self.assertEqual(Zona.objects.count(), 3)
+        self.assertEqual(SolicitudRetiro.objects.count(), 64)
+
+    def test_sin_limpiar_no_pisa_datos_existentes(self):
+        Zona.objects.create(nombre='Valparaíso')
+        with self.assertRaisesMessage(CommandError, '--limpiar'):
+            self._generar()
@@ -0,0 +1,176 @@
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from retiros.geo import distancia_km, en_radio, geohash, limites, mas_cercano, normalizar_direccion, vecinas
+from retiros.geocodificacion import GeocodificadorLocal, geocodificar, geocodificar_pendientes
+from retiros.models import DireccionGeocodificada, Retirador, Solicitante, SolicitudRetiro, Zona
+from retiros.services import SolicitudService
+
+PLAZA_SOTOMAYOR = (-33.0386, -71.6273)
+PLAZA_VINA = (-33.0245, -71.5518)
+
+
+class GeohashTests(SimpleTestCase):
+    def test_geohash_conocido_y_limites_contienen_el_punto(self):
+        self.assertEqual(geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        lat_min, lat_max, lng_min, lng_max = limites(geohash(*PLAZA_SOTOMAYOR, 6))
+        self.assertTrue(lat_min <= PLAZA_SOTOMAYOR[0] < lat_max)
+        self.assertTrue(lng_min <= PLAZA_SOTOMAYOR[1] < lng_max)
+
+    def test_vecinas_son_nueve_celdas_distintas_con_la_central(self):
+        celda = geohash(*PLAZA_SOTOMAYOR, 5)
+        celdas = vecinas(celda)
+        self.assertEqual(len(celdas), 9)
+        self.assertIn(celda, celdas)
+        self.assertTrue(all(len(c) == 5 for c in celdas))
+
+    def test_normalizar_direccion(self):
+        self.assertEqual(normalizar_direccion('  Av. Brasil  #123, Valparaíso'), 'av brasil 123 valparaiso')
+
+
+class BusquedaCercanaTests(TestCase):
+    def setUp(self):
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+        self.cerca = Retirador.objects.create(nombre='Cerca', latitud=-33.0400, longitud=-71.6250)
+        self.lejos = Retirador.objects.create(nombre='Lejos', latitud=PLAZA_VINA[0], longitud=PLAZA_VINA[1])
+        Retirador.objects.create(nombre='Sin punto')
+
+    def test_en_radio_filtra_por_distancia_y_ordena(self):
+        encontrados = en_radio(Retirador.objects.all(), *PLAZA_SOTOMAYOR, radio_km=1)
+        self.assertEqual([r for _, r in encontrados], [self.cerca])
+        encontrados = en_radio(Retirador.objects.all(), *PLAZA_SOTOMAYOR, radio_km=10)
+        self.assertEqual([r for _, r in encontrados], [self.cerca, self.lejos])
+        self.assertAlmostEqual(encontrados[1][0], distancia_km(*PLAZA_SOTOMAYOR, *PLAZA_VINA))
+
+    def test_mas_cercano_amplia_el_radio(self):
+        # Desde Viña, a ~7 km del otro: el primer radio ya lo encuentra
+        self.assertEqual(mas_cercano(Retirador.objects.exclude(pk=self.lejos.pk), *PLAZA_VINA), self.cerca)
+        self.assertIsNone(mas_cercano(Retirador.objects.exclude(pk=self.lejos.pk), *PLAZA_VINA, radio_max_km=1))
+
+    def test_asignacion_elige_el_fijo_mas_cercano(self):
+        for retirador in (self.lejos, self.cerca):
+            retirador.zonas_preferidas.add(self.zona)
+        solicitante = Solicitante.objects.create(
+            nombre='Ana', telefono='+56912345678', email_desconocido=True,
+            zona=self.zona, direccion_principal='Plaza Sotomayor',
+        )
+        Solicitante.objects.filter(pk=solicitante.pk).update(latitud=PLAZA_SOTOMAYOR[0], longitud=PLAZA_SOTOMAYOR[1])
+        solicitante.refresh_from_db()
+        solicitud = SolicitudRetiro.objects.create(
+            solicitante=solicitante, direccion_retiro='', fecha_retiro=timezone.now().date(),
+        )
+        self.assertEqual(solicitud.latitud, PLAZA_SOTOMAYOR[0])
+
+        retirador, _ = SolicitudService.asignar_retirador_automatico(solicitud)
+        self.assertEqual(retirador, self.cerca)
+        cercanas = SolicitudService.solicitudes_cercanas(*PLAZA_SOTOMAYOR, radio_km=1)
+        self.assertEqual([s for _, s in cercanas], [solicitud])
+
+
+class GeocodificacionTests(TestCase):
+    def setUp(self):
+        self.geocodificador = GeocodificadorLocal({'Plaza Sotomayor': PLAZA_SOTOMAYOR, 'Plaza Viña': PLAZA_VINA})
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+
+    def _solicitante(self, direccion, **kwargs):
+        return Solicitante.objects.create(
+            nombre='Ana', telefono='+56912345678', email_desconocido=True,
+            zona=self.zona, direccion_principal=direccion, **kwargs
+        )
+
+    def test_cada_direccion_se_consulta_una_vez(self):
+        llamadas = []
+        original = self.geocodificador.geocodificar
+        self.geocodificador.geocodificar = lambda direccion: llamadas.append(direccion) or original(direccion)
+
+        for direccion in ('Plaza Sotomayor', 'plaza  sotomayor', 'Calle Inexistente', 'Calle inexistente'):
+            geocodificar(direccion, self.geocodificador)
+        self.assertEqual(llamadas, ['Plaza Sotomayor', 'Calle Inexistente'])
+        self.assertEqual(geocodificar('PLAZA SOTOMAYOR'), PLAZA_SOTOMAYOR)
+        self.assertIsNone(geocodificar('calle inexistente'))
+        self.assertEqual(DireccionGeocodificada.objects.count(), 2)
+
+    def test_pendientes_completa_solicitantes_y_solicitudes(self):
+        solicitante = self._solicitante('Plaza Sotomayor')
+        desconocida = self._solicitante('', direccion_desconocida=True)
+        hoy = timezone.now().date()
+        propia = SolicitudRetiro.objects.create(solicitante=solicitante, direccion_retiro='', fecha_retiro=hoy)
+        otra = SolicitudRetiro.objects.create(
+            solicitante=desconocida, usar_direccion_solicitante=False,
+            direccion_retiro='Plaza Viña', fecha_retiro=hoy,
+        )
+        version = otra.version
+
+        self.assertEqual(
+            geocodificar_pendientes(geocodificador=self.geocodificador), {'solicitantes': 1, 'solicitudes': 2}
+        )
+        solicitante.refresh_from_db()
+        propia.refresh_from_db()
+        otra.refresh_from_db()
+        self.assertEqual((solicitante.latitud, solicitante.longitud), PLAZA_SOTOMAYOR)
+        self.assertEqual(propia.celda, solicitante.celda)
+        self.assertEqual((otra.latitud, otra.longitud), PLAZA_VINA)
+        self.assertEqual(otra.version, version)
+        self.assertEqual(geocodificar_pendientes(geocodificador=self.geocodificador), {'solicitantes': 0, 'solicitudes': 0})
+
+    def test_pendientes_omite_las_direcciones_no_encontradas(self):
+        no_encontradas = [self._solicitante(f'Calle Inexistente {n}') for n in range(3)]
+        encontrada = self._solicitante('Plaza Viña')
+        self.assertEqual(geocodificar_pendientes(limite=2, geocodificador=self.geocodificador)['solicitantes'], 0)
+
+        llamadas = []
+        original = self.geocodificador.geocodificar
+        self.geocodificador.geocodificar = lambda direccion: llamadas.append(direccion) or original(direccion)
+        self.assertEqual(geocodificar_pendientes(limite=2, geocodificador=self.geocodificador)['solicitantes'], 1)
+        self.assertEqual(llamadas, ['Calle Inexistente 2', 'Plaza Viña'])
+        encontrada.refresh_from_db()
+        self.assertEqual((encontrada.latitud, encontrada.longitud), PLAZA_VINA)
+        self.assertTrue(all(
+            s.latitud is None for s in Solicitante.objects.filter(pk__in=[s.pk for s in no_encontradas])
+        ))
+
+    def test_cambiar_direccion_borra_las_coordenadas(self):
+        solicitante = self._solicitante('Plaza Sotomayor')
+        geocodificar_pendientes(geocodificador=self.geocodificador)
+        solicitante = Solicitante.objects.get(pk=solicitante.pk)
+        solicitante.nombre = 'Ana María'
+        solicitante.save()
+        self.assertIsNotNone(solicitante.latitud)
+
+        solicitante.direccion_principal = 'Plaza Viña'
+        solicitante.save()
+        solicitante.refresh_from_db()
+        self.assertIsNone(solicitante.latitud)
+        self.assertEqual(solicitante.celda, '')
+
+    def test_cambiar_direccion_borra_las_coordenadas_en_todas_las_escrituras(self):
+        pk = self._solicitante('Plaza Sotomayor').pk
+
+        def con_coordenadas():
+            Solicitante.objects.filter(pk=pk).update(
+                direccion_principal='Plaza Sotomayor', latitud=PLAZA_SOTOMAYOR[0], longitud=PLAZA_SOTOMAYOR[1],
+            )
+            return Solicitante.objects.get(pk=pk)
+
+        def coordenadas():
+            return Solicitante.objects.values_list('latitud', 'longitud', 'celda').get(pk=pk)
+
+        solicitante = con_coordenadas()
+        solicitante.direccion_principal = 'Plaza Viña'
+        solicitante.save(update_fields=['direccion_principal'])
+        self.assertEqual(coordenadas(), (None, None, ''))
+
+        con_coordenadas()
+        Solicitante.objects.filter(pk=pk).update(direccion_principal='Plaza Viña')
+        self.assertEqual(coordenadas(), (None, None, ''))
+
+        con_coordenadas()
+        Solicitante.objects.filter(pk=pk).update(direccion_principal=Concat(F('direccion_principal'), Value(' 1')))
+        self.assertEqual(coordenadas(), (None, None, ''))
+
+        solicitante = con_coordenadas()
+        solicitante.direccion_principal = 'Plaza Viña'
+        Solicitante.objects.bulk_update([solicitante], ['direccion_principal'])
+        self.assertEqual(coordenadas(), (None, None, ''))
@@ -0,0 +1,50 @@
+import json
+import logging
+from pathlib import Path
+import tempfile
+
+from django.test import SimpleTestCase
+
+from retiros.log import ColaHandler, FormateadorJSON
+
+
+def _registro(mensaje, *args, exc_info=None, **extra):
+    return logging.getLogger('retiros.prueba').makeRecord(
+        'retiros.prueba', logging.WARNING, __file__, 1, mensaje, args, exc_info, extra=extra,
+    )
+
+
+class FormateadorJSONTests(SimpleTestCase):
+    def test_una_linea_json_con_extra_y_excepcion(self):
+        try:
+            raise ValueError('dirección inválida')
+        except ValueError as e:
+            registro = _registro(
+                'Falló %s', 'geocodificar', exc_info=(type(e), e, e.__traceback__), metricas={'consultas': 3}
+            )
+
+        linea = FormateadorJSON().format(registro)
+
+        self.assertNotIn('\n', linea)
+        datos = json.loads(linea)
+        self.assertEqual(datos['mensaje'], 'Falló geocodificar')
+        self.assertEqual((datos['nivel'], datos['logger']), ('WARNING', 'retiros.prueba'))
+        self.assertEqual(datos['metricas'], {'consultas': 3})
+        self.assertIn('ValueError: dirección inválida', datos['excepcion'])
+
+
+class ColaHandlerTests(SimpleTestCase):
+    def test_close_escribe_lo_encolado_en_el_archivo(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        archivo = Path(directorio.name) / 'logs' / 'gestpylab.log'
+        handler = ColaHandler(archivo)
+        handler.setFormatter(FormateadorJSON())
+
+        for i in range(50):
+            handler.handle(_registro('Registro %d', i, numero=i))
+        handler.close()
+
+        lineas = archivo.read_text(encoding='utf-8').splitlines()
+        self.assertEqual([json.loads(linea)['numero'] for linea in lineas], list(range(50)))
+        self.assertEqual(json.loads(lineas[-1])['mensaje'], 'Registro 49')
@@ -0,0 +1,156 @@
+from datetime import timedelta
+from io import StringIO
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros.manifiestos import actualizar_manifiesto, desactualizado, manifiesto_vigente
+from retiros.models import Manifiesto, Retirador, Solicitante, SolicitudRetiro, Zona
+from retiros.services import SolicitudService
+
+
+class LecturasSinBaseRouter:
+    """Envía las lecturas a una base que no existe: falla si algo lee con el router."""
+
+    def db_for_read(self, model, **hints):
+        return 'replica_inexistente'
+
+
+class ManifiestoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoy = timezone.now().date()
+        cls.manana = cls.hoy + timedelta(days=1)
+        cls.zona = Zona.objects.create(nombre='Valparaíso')
+        otra_zona = Zona.objects.create(nombre='Quilpué')
+        cls.solicitante = Solicitante.objects.create(
+            nombre='Veterinaria Central', telefono='+56912345678', email='central@example.com',
+            zona=cls.zona, direccion_principal='Av. Brasil 123',
+        )
+        cls.retirador = Retirador.objects.create(nombre='Juan Pérez')
+        cls.retirador.zonas_preferidas.add(cls.zona)
+        cls.otro = Retirador.objects.create(nombre='Ana Soto')
+        cls.otro.zonas_preferidas.add(otra_zona)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _crear(self, fecha_retiro, retirador=None, **campos):
+        return SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=fecha_retiro,
+            retirador_asignado=retirador, estado='asignado' if retirador else 'pendiente', **campos,
+        )
+
+    def test_comando_genera_manifiestos_de_manana_una_vez(self):
+        asignada = self._crear(self.manana, self.retirador, notas='Canino')
+        sin_asignar = self._crear(self.manana)
+        self._crear(self.hoy, self.retirador)
+
+        salida = StringIO()
+        call_command('generar_manifiestos', stdout=salida)
+        self.assertIn('2 generados, 0 ya estaban al día', salida.getvalue())
+
+        manifiesto = Manifiesto.objects.get(retirador=self.retirador, fecha=self.manana)
+        self.assertEqual(manifiesto.total, 2)
+        self.assertEqual(
+            list(manifiesto.items.values_list('solicitud_id', 'direccion', 'notas')),
+            [(asignada.id, 'Av. Brasil 123', 'Canino'), (sin_asignar.id, 'Av. Brasil 123', '')],
+        )
+        with manifiesto.pdf.open('rb') as archivo:
+            self.assertTrue(archivo.read().startswith(b'%PDF'))
+
+        salida = StringIO()
+        call_command('generar_manifiestos', stdout=salida)
+        self.assertIn('0 generados, 2 ya estaban al día', salida.getvalue())
+
+    def test_cambios_que_dejan_desactualizado_el_manifiesto(self):
+        self._crear(self.manana, self.retirador)
+        manifiesto, _ = actualizar_manifiesto(self.retirador, self.manana)
+        self.assertFalse(desactualizado(manifiesto))
+
+        # Cambios de otro retirador, de otra zona o de otro día no le afectan
+        self._crear(self.manana, self.otro)
+        self._crear(self.hoy, self.retirador)
+        self.assertFalse(desactualizado(manifiesto))
+
+        casos = [
+            ('completada', lambda s: SolicitudRetiro.objects.filter(id=s.id).update(estado='completado')),
+            ('movida a otro día', lambda s: SolicitudRetiro.objects.filter(id=s.id).update(fecha_retiro=self.hoy)),
+            ('nueva sin asignar en su zona', lambda s: self._crear(self.manana)),
+            ('eliminada', lambda s: s.delete()),
+        ]
+        for nombre, cambio in casos:
+            with self.subTest(nombre):
+                solicitud = self._crear(self.manana, self.retirador)
+                manifiesto, _ = actualizar_manifiesto(self.retirador, self.manana, forzar=True)
+                self.assertFalse(desactualizado(manifiesto))
+                cambio(solicitud)
+                self.assertTrue(desactualizado(manifiesto))
+
+    def test_exportar_pdf_entrega_el_manifiesto_y_lo_regenera_si_cambio(self):
+        url = reverse('exportar_pdf_retirador', args=[self.retirador.id])
+        self._crear(self.hoy, self.retirador)
+        manifiesto, _ = actualizar_manifiesto(self.retirador, self.hoy)
+        with manifiesto.pdf.open('rb') as archivo:
+            contenido = archivo.read()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), contenido)
+        response.close()
+
+        self._crear(self.hoy, self.retirador)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        manifiesto.refresh_from_db()
+        self.assertEqual(manifiesto.total, 2)
+        self.assertEqual(manifiesto.items.count(), 2)
+
+    def test_manifiesto_vigente_se_revisa_en_el_primario(self):
+        self._crear(self.hoy, self.retirador)
+        manifiesto, _ = actualizar_manifiesto(self.retirador, self.hoy)
+        with override_settings(DATABASE_ROUTERS=['retiros.tests.test_manifiestos.LecturasSinBaseRouter']):
+            self.assertEqual(manifiesto_vigente(self.retirador, self.hoy), manifiesto)
+
+    def test_lista_retirador_sale_del_manifiesto_al_dia(self):
+        url = reverse('lista_retirador', args=[self.retirador.id])
+        primera = self._crear(self.hoy, self.retirador)
+        segunda = self._crear(self.hoy)
+        manifiesto, _ = actualizar_manifiesto(self.retirador, self.hoy)
+        esperada = list(manifiesto.items.values_list('solicitud_id', 'hora_estimada'))
+        self.assertEqual({solicitud_id for solicitud_id, _ in esperada}, {primera.id, segunda.id})
+
+        with mock.patch.object(SolicitudService, 'ordenar_ruta', side_effect=AssertionError('ruta al momento')):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(s.id, s.hora_estimada) for s in response.context['lista']], esperada)
+
+        # Desactualizado: se regenera y la lista incluye el cambio
+        tercera = self._crear(self.hoy, self.retirador)
+        response = self.client.get(url)
+        self.assertIn(tercera.id, [s.id for s in response.context['lista']])
+        self.assertEqual(manifiesto.items.count(), 3)
+
+    def test_lista_retirador_sin_manifiesto_ordena_al_momento(self):
+        self._crear(self.hoy, self.retirador)
+        with mock.patch.object(SolicitudService, 'ordenar_ruta', wraps=SolicitudService.ordenar_ruta) as ordenar:
+            response = self.client.get(reverse('lista_retirador', args=[self.retirador.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['lista']), 1)
+        ordenar.assert_called_once()
+
+    def test_exportar_pdf_sin_manifiesto_genera_al_momento(self):
+        self._crear(self.hoy, self.retirador)
+        response = self.client.get(reverse('exportar_pdf_retirador', args=[self.retirador.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertFalse(Manifiesto.objects.exists())
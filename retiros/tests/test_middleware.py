@@ -0,0 +1,89 @@
+from pathlib import Path
+import pstats
+import tempfile
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from retiros.middleware import InstrumentacionMiddleware, PerfiladorMiddleware
+from retiros.models import Zona
+
+
+def _vista_con_consultas(request):
+    # Dos veces el mismo SQL: una consulta duplicada
+    Zona.objects.filter(nombre='Valparaíso').exists()
+    Zona.objects.filter(nombre='Quilpué').exists()
+    Zona.objects.count()
+    return HttpResponse('ok')
+
+
+class InstrumentacionMiddlewareTests(TestCase):
+    def _pedir(self):
+        middleware = InstrumentacionMiddleware(_vista_con_consultas)
+        return middleware(RequestFactory().get('/instrumentada/'))
+
+    def test_server_timing_con_consultas_y_duplicadas(self):
+        with self.assertLogs('retiros.middleware', level='DEBUG') as logs:
+            response = self._pedir()
+
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('desc="3 consultas"', response['Server-Timing'])
+        self.assertIn('dup;desc="1 duplicadas"', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        registro, = logs.records
+        self.assertEqual(registro.levelname, 'DEBUG')
+        self.assertEqual(registro.metricas['consultas'], 3)
+        self.assertEqual(registro.metricas['consultas_duplicadas'], 1)
+        self.assertEqual((registro.metricas['metodo'], registro.metricas['ruta']), ('GET', '/instrumentada/'))
+
+    def test_sobre_el_umbral_registra_warning_con_los_sql_repetidos(self):
+        with override_settings(INSTRUMENTACION_UMBRAL_LENTO_MS=0), self.assertLogs('retiros.middleware') as logs:
+            self._pedir()
+
+        registro, = logs.records
+        self.assertEqual(registro.levelname, 'WARNING')
+        (sql, repeticiones), = registro.sql_repetidos
+        self.assertIn('retiros_zona', sql)
+        self.assertEqual(repeticiones, 2)
+
+    @override_settings(INSTRUMENTACION_SERVER_TIMING=False)
+    def test_sin_server_timing(self):
+        with self.assertLogs('retiros.middleware', level='DEBUG'):
+            self.assertNotIn('Server-Timing', self._pedir())
+
+
+class PerfiladorMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        ajustes = override_settings(PERFILADOR_HABILITADO=True, PERFILADOR_DIRECTORIO=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _pedir(self, usuario, **cabeceras):
+        request = RequestFactory().get('/lista/1/', headers=cabeceras)
+        request.user = usuario
+        return PerfiladorMiddleware(lambda request: HttpResponse('ok'))(request)
+
+    def test_staff_con_cabecera_guarda_el_perfil_y_lo_informa(self):
+        with self.assertLogs('retiros.middleware', level='INFO'):
+            response = self._pedir(User(username='staff', is_staff=True), **{'X-Perfilar': '1'})
+
+        nombre = response['X-Perfil']
+        self.assertTrue(nombre.endswith('_GET_lista_1'))
+        self.assertTrue(pstats.Stats(str(self.directorio / f'{nombre}.prof')).total_calls > 0)
+        resumen = (self.directorio / f'{nombre}.txt').read_text(encoding='utf-8')
+        self.assertTrue(resumen.startswith('GET /lista/1/\nStatus: 200\n'))
+
+    def test_sin_staff_no_perfila(self):
+        response = self._pedir(AnonymousUser(), **{'X-Perfilar': '1'})
+        self.assertNotIn('X-Perfil', response)
+        self.assertEqual(list(self.directorio.iterdir()), [])
+
+    def test_deshabilitado_se_desinstala(self):
+        with override_settings(PERFILADOR_HABILITADO=False), self.assertRaises(MiddlewareNotUsed):
+            PerfiladorMiddleware(lambda request: HttpResponse('ok'))
@@ -0,0 +1,192 @@
+"""
+Presupuestos de consultas SQL por URL y por changelist del admin.
+
+Cada caso se ejecuta con datasets de 10, 100 y 1.000 filas. El número de
+consultas no debe superar el presupuesto ni crecer con el tamaño del dataset
+(lo que indicaría un N+1). Si falla, el mensaje incluye un diff del SQL
+capturado entre el dataset más pequeño y el que falló.
+"""
+from collections import namedtuple
+import difflib
+import re
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros import urls as retiros_urls
+from retiros.benchmarks.suite import sin_logs_info
+from retiros.generador import GeneradorDatos
+from retiros.models import SolicitudRetiro
+
+TAMANOS = (10, 100, 1000)
+
+Caso = namedtuple('Caso', ['nombre', 'peticion', 'status', 'presupuesto'])
+
+
+def _get(nombre_url, *args, query=''):
+    return lambda client, ctx: client.get(reverse(nombre_url, args=[ctx[a] for a in args]) + query)
+
+
+def _solicitud_pendiente(ctx):
+    return SolicitudRetiro.objects.filter(
+        fecha_retiro=ctx['hoy'], estado__in=['pendiente', 'asignado']
+    ).order_by('id').first().id
+
+
+def _agregar_post(client, ctx):
+    return client.post(reverse('agregar_solicitud'), {
+        'solicitante': ctx['solicitante_id'],
+        'usar_direccion_solicitante': 'on',
+        'direccion_retiro': 'Av. Libertad 123',
+        'fecha_retiro': ctx['hoy'].isoformat(),
+        'estado': 'pendiente',
+    })
+
+
+def _completar_lote_post(client, ctx):
+    # Lote de hasta 50 eventos: el número de consultas no debe depender de su tamaño
+    ids = SolicitudRetiro.objects.filter(
+        fecha_retiro=ctx['hoy'], estado__in=['pendiente', 'asignado']
+    ).order_by('id').values_list('id', flat=True)[:50]
+    fecha = timezone.now().isoformat()
+    eventos = [{'id': id_, 'estado': 'completado', 'fecha': fecha} for id_ in ids]
+    return client.post(reverse('api_completar_lote'), {'eventos': eventos}, content_type='application/json')
+
+
+def _changelist(modelo):
+    return lambda client, ctx: client.get(reverse(f'admin:retiros_{modelo._meta.model_name}_changelist'))
+
+
+# Casos por nombre de URL de retiros/urls.py. Los presupuestos incluyen las
+# consultas de sesión/usuario del admin (el cliente está autenticado) y, en
+# las que escriben, el INSERT del historial (auditoria.py) con su usuario.
+# agregar_solicitud_post incluye las 2 consultas que cargan el grafo de zonas
+# (zonas.py): el generador lo descarta al sembrar, así que siempre se carga.
+# También el INSERT de su salida de la lista de la zona al asignarla
+# (BajaSolicitud, ver services.SincronizacionService).
+# home incluye la consulta que carga el calendario de disponibilidad del día
+# (disponibilidad.py), que también se descarta al sembrar.
+# api_buscar_solicitantes es la búsqueda con la caché de autocompletado vacía
+# (autocompletado.py, se descarta al sembrar): la consulta de candidatos.
+CASOS = [
+    Caso('home', _get('home'), 200, 8),
+    Caso('agregar_solicitud', _get('agregar_solicitud'), 200, 4),
+    Caso('agregar_solicitud_post', _agregar_post, 302, 13),
+    Caso('lista_pendientes', _get('lista_pendientes'), 200, 4),
+    Caso('lista_retirador', _get('lista_retirador', 'retirador_id'), 200, 5),
+    Caso('marcar_completado', lambda c, ctx: c.get(reverse('marcar_completado', args=[_solicitud_pendiente(ctx)])), 200, 3),
+    Caso('marcar_completado_post', lambda c, ctx: c.post(reverse('marcar_completado', args=[_solicitud_pendiente(ctx)])), 302, 7),
+    Caso('exportar_pdf_retirador', _get('exportar_pdf_retirador', 'retirador_id'), 200, 5),
+    Caso('exportar_pdf_general', _get('exportar_pdf_general'), 200, 3),
+    Caso('notificar_datos_faltantes', _get('notificar_datos_faltantes'), 302, 5),
+    Caso('api_buscar_solicitantes', _get('api_buscar_solicitantes', query='?q=gonz'), 200, 1),
+    Caso('api_buscar_solicitantes_telefono', _get('api_buscar_solicitantes', query='?q=5678'), 200, 3),
+    Caso('api_metricas_autocompletado', _get('api_metricas_autocompletado'), 200, 2),
+    Caso('api_obtener_solicitante', _get('api_obtener_solicitante', 'solicitante_id'), 200, 3),
+    Caso('api_historial_solicitante', _get('api_historial_solicitante', 'solicitante_id'), 200, 3),
+    Caso('api_sincronizar_retirador', _get('api_sincronizar_retirador', 'retirador_id'), 200, 4),
+    Caso('api_sincronizar_retirador_delta', lambda c, ctx: c.get(
+        reverse('api_sincronizar_retirador', args=[ctx['retirador_id']]) + f"?token={ctx['hoy'].isoformat()}:0"
+    ), 200, 5),
+    Caso('api_completar_lote_post', _completar_lote_post, 200, 9),
+] + [
+    Caso(f'admin_{modelo._meta.model_name}_changelist', _changelist(modelo), 200, 12)
+    for modelo in admin.site._registry if modelo._meta.app_label == 'retiros'
+]
+
+
+def _sembrar(n):
+    generador = GeneradorDatos(semilla=n)
+    creados = generador.generar(
+        zonas=max(2, n // 10),
+        retiradores=max(2, n // 10),
+        solicitantes=n,
+        solicitudes=n,
+        dias=5,
+        solicitudes_hoy=n,
+    )
+    return {
+        'hoy': generador.hoy,
+        'retirador_id': creados['retirador_ids'][0],
+        'solicitante_id': creados['solicitante_ids'][0],
+    }
+
+
+def _normalizar(sql):
+    """Reemplaza literales por '?' para que el diff muestre solo diferencias estructurales."""
+    sql = re.sub(r"'(?:[^']|'')*'", "'?'", sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    return re.sub(r'\((?:\?, )+\?\)', '(?, ...)', sql)
+
+
+def _agrupar(consultas):
+    """Colapsa consultas consecutivas idénticas en una línea con su número de repeticiones."""
+    lineas = []
+    for sql in map(_normalizar, consultas):
+        if lineas and lineas[-1][0] == sql:
+            lineas[-1][1] += 1
+        else:
+            lineas.append([sql, 1])
+    return [f'{sql}  (x{n})' if n > 1 else sql for sql, n in lineas]
+
+
+class PresupuestoConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = User.objects.create_superuser('admin', 'admin@example.cl', 'clave')
+        client = Client()
+        client.force_login(usuario)
+
+        # Cada tamaño se siembra dentro de un savepoint que se revierte al terminar
+        cls.capturas = {}
+        with sin_logs_info():
+            for n in TAMANOS:
+                savepoint = transaction.savepoint()
+                ctx = _sembrar(n)
+                cls.capturas[n] = {}
+                for caso in CASOS:
+                    # El historial se escribe al confirmarse la transacción (auditoria.py)
+                    with CaptureQueriesContext(connection) as capturadas, cls.captureOnCommitCallbacks(execute=True):
+                        response = caso.peticion(client, ctx)
+                    cls.capturas[n][caso.nombre] = (
+                        response.status_code,
+                        [q['sql'] for q in capturadas.captured_queries],
+                    )
+                transaction.savepoint_rollback(savepoint)
+
+    def _diff(self, caso, n_base, n):
+        base = _agrupar(self.capturas[n_base][caso.nombre][1])
+        actual = _agrupar(self.capturas[n][caso.nombre][1])
+        return '\n'.join(difflib.unified_diff(
+            base, actual, fromfile=f'{n_base} filas', tofile=f'{n} filas', lineterm='',
+        ))
+
+    def test_todas_las_urls_tienen_presupuesto(self):
+        nombres_url = {p.name for p in retiros_urls.urlpatterns}
+        nombres_casos = {caso.nombre.removesuffix('_post') for caso in CASOS}
+        self.assertEqual(nombres_url - nombres_casos, set())
+
+    def test_consultas_dentro_del_presupuesto_y_constantes(self):
+        n_base = TAMANOS[0]
+        for caso in CASOS:
+            status_base, consultas_base = self.capturas[n_base][caso.nombre]
+            for n in TAMANOS:
+                status, consultas = self.capturas[n][caso.nombre]
+                with self.subTest(caso=caso.nombre, filas=n):
+                    self.assertEqual(status, caso.status)
+                    self.assertLessEqual(
+                        len(consultas), caso.presupuesto,
+                        f"{caso.nombre}: {len(consultas)} consultas con {n} filas "
+                        f"(presupuesto {caso.presupuesto})\n{self._diff(caso, n_base, n)}",
+                    )
+                    self.assertEqual(
+                        len(consultas), len(consultas_base),
+                        f"{caso.nombre}: {len(consultas_base)} consultas con {n_base} filas y "
+                        f"{len(consultas)} con {n} filas (posible N+1)\n{self._diff(caso, n_base, n)}",
+                    )
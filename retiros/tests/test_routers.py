@@ -0,0 +1,46 @@
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from retiros.models import SolicitudRetiro
+from retiros.routers import EstadoPeticion, ReplicaRouter, _estado_peticion, solo_lectura
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter(alias='replica')
+
+    def test_lee_del_primario_fuera_de_solo_lectura(self):
+        self.assertIsNone(self.router.db_for_read(SolicitudRetiro))
+
+    def test_lee_de_la_replica_en_solo_lectura(self):
+        with solo_lectura():
+            self.assertEqual(self.router.db_for_read(SolicitudRetiro), 'replica')
+            # Sesiones y usuarios siempre del primario
+            self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_escritura_fija_la_peticion_al_primario(self):
+        estado = EstadoPeticion()
+        token = _estado_peticion.set(estado)
+        try:
+            with solo_lectura():
+                self.assertEqual(self.router.db_for_read(SolicitudRetiro), 'replica')
+                self.assertEqual(self.router.db_for_write(SolicitudRetiro), 'default')
+                self.assertIsNone(self.router.db_for_read(SolicitudRetiro))
+        finally:
+            _estado_peticion.reset(token)
+        self.assertTrue(estado.escribio)
+
+    def test_cookie_fija_la_peticion_al_primario(self):
+        token = _estado_peticion.set(EstadoPeticion(fijado=True))
+        try:
+            with solo_lectura():
+                self.assertIsNone(self.router.db_for_read(SolicitudRetiro))
+        finally:
+            _estado_peticion.reset(token)
+
+
+class ReplicaRouterTransaccionTests(TestCase):
+    def test_dentro_de_una_transaccion_lee_del_primario(self):
+        with transaction.atomic(), solo_lectura():
+            self.assertIsNone(ReplicaRouter(alias='replica').db_for_read(SolicitudRetiro))
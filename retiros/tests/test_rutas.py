@@ -0,0 +1,62 @@
+import os
+import random
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from retiros.benchmarks import medir_rutas
+from retiros.models import Retirador, Solicitante, SolicitudRetiro, Zona
+from retiros.rutas import costo, matriz_distancias, matriz_por_zona, ordenar_paradas
+from retiros.services import SolicitudService
+
+# Tiempo máximo para ordenar 200 paradas; ajustable por entorno en CI
+LIMITE_MS = float(os.environ.get('RUTAS_LIMITE_MS', '100'))
+
+
+class OrdenarParadasTests(SimpleTestCase):
+    def test_recorrido_es_permutacion_y_no_empeora_el_orden_recibido(self):
+        rng = random.Random(7)
+        for n in (0, 1, 2, 3, 30):
+            with self.subTest(paradas=n):
+                matriz = matriz_distancias(
+                    [rng.uniform(-33.1, -32.9) for _ in range(n)], [rng.uniform(-71.7, -71.4) for _ in range(n)]
+                )
+                orden = ordenar_paradas(matriz)
+                self.assertEqual(sorted(orden), list(range(n)))
+                self.assertLessEqual(costo(matriz, orden), costo(matriz, range(n)) + 1e-9)
+
+    def test_puntos_en_linea_se_recorren_en_orden(self):
+        longitudes = [-71.60, -71.50, -71.58, -71.52, -71.55]
+        orden = ordenar_paradas(matriz_distancias([-33.0] * 5, longitudes))
+        recorridas = [longitudes[i] for i in orden]
+        self.assertIn(recorridas, [sorted(longitudes), sorted(longitudes, reverse=True)])
+
+    def test_por_zona_agrupa_y_conserva_el_orden_dentro_de_cada_zona(self):
+        self.assertEqual(ordenar_paradas(matriz_por_zona([1, 2, 1, 3, 2, 1])), [0, 2, 5, 1, 4, 3])
+
+    def test_200_paradas_bajo_el_limite_y_mas_corto_que_por_hora(self):
+        resultado = medir_rutas(paradas=200, repeticiones=5)
+        self.assertLess(resultado['p50_ms'], LIMITE_MS)
+        self.assertLess(resultado['km_ruta'], resultado['km_hora_solicitud'])
+
+
+class RutaRetiradorTests(TestCase):
+    def test_lista_del_retirador_agrupa_por_zona(self):
+        zonas = [Zona.objects.create(nombre=nombre) for nombre in ('Valparaíso', 'Viña del Mar')]
+        retirador = Retirador.objects.create(nombre='Juan Pérez')
+        hoy = timezone.now().date()
+        creadas = []
+        # Ingresadas alternando zonas
+        for i in range(4):
+            solicitante = Solicitante.objects.create(
+                nombre=f'Solicitante {i}', telefono='+56912345678', email_desconocido=True,
+                zona=zonas[i % 2], direccion_principal=f'Calle {i}',
+            )
+            creadas.append(SolicitudRetiro.objects.create(
+                solicitante=solicitante, direccion_retiro='', fecha_retiro=hoy,
+                retirador_asignado=retirador, estado='asignado',
+            ))
+
+        ruta = SolicitudService.obtener_ruta_retirador(retirador, hoy)
+
+        self.assertEqual([s.id for s in ruta], [creadas[i].id for i in (0, 2, 1, 3)])
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+import itertools
+import random
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from retiros.generador import GeneradorDatos
+from retiros.models import SolicitudRetiro
+from retiros.simulacion import Escenario, _repartir, _transporte, cargar_escenario, simular
+
+INF = np.inf
+
+
+def _escenario(zonas, cubre, fijo, capacidad, minutos_zonas, max_minutos=None):
+    """Todas las solicitudes en un mismo día, en el orden de ``zonas``."""
+    n = len(zonas)
+    return Escenario([0] * n, zonas, [np.nan] * n, [np.nan] * n, cubre, fijo, capacidad, minutos_zonas, max_minutos)
+
+
+def _optimo_por_fuerza_bruta(costo, demanda, oferta):
+    """(atendidas, costo) óptimo probando cada columna (o ninguna) por unidad de demanda."""
+    unidades = [i for i, cantidad in enumerate(demanda) for _ in range(cantidad)]
+    mejor = (0, 0.0)
+    for eleccion in itertools.product(range(-1, len(oferta)), repeat=len(unidades)):
+        usadas = np.bincount([j for j in eleccion if j >= 0], minlength=len(oferta))
+        if (usadas > oferta).any() or any(j >= 0 and not np.isfinite(costo[i, j]) for i, j in zip(unidades, eleccion)):
+            continue
+        total = sum(costo[i, j] for i, j in zip(unidades, eleccion) if j >= 0)
+        atendidas = sum(j >= 0 for j in eleccion)
+        if (atendidas, -total) > (mejor[0], -mejor[1]):
+            mejor = (atendidas, total)
+    return mejor
+
+
+class TransporteTests(SimpleTestCase):
+    def test_reasigna_por_camino_con_retroceso(self):
+        # La fila 1 solo llega a la columna 0: la fila 0 debe cederla
+        costo = np.array([[1, 2], [1, INF]])
+        flujo = _transporte(costo, [1, 1], [1, 1])
+        self.assertEqual(flujo.tolist(), [[0, 1], [1, 0]])
+
+    def test_coincide_con_la_fuerza_bruta(self):
+        rng = random.Random(5)
+        for _ in range(40):
+            costo = np.array([[rng.choice((INF, 0, 1, 2, 5)) for _ in range(3)] for _ in range(3)], dtype=float)
+            demanda = [rng.randint(0, 2) for _ in range(3)]
+            oferta = [rng.randint(0, 2) for _ in range(3)]
+            flujo = _transporte(costo, demanda, oferta)
+
+            self.assertTrue((flujo.sum(axis=1) <= demanda).all())
+            self.assertTrue((flujo.sum(axis=0) <= oferta).all())
+            atendidas = int(flujo.sum())
+            total = float((np.where(flujo > 0, costo, 0) * flujo).sum())
+            self.assertEqual((atendidas, total), _optimo_por_fuerza_bruta(costo, demanda, oferta))
+
+    def test_repartir_es_parejo_y_respeta_capacidades(self):
+        self.assertEqual(_repartir(7, [1, 5, 5]).tolist(), [1, 3, 3])
+        self.assertEqual(_repartir(6, [1, 5, 5]).tolist(), [1, 3, 2])
+
+
+class EstrategiasTests(SimpleTestCase):
+    def setUp(self):
+        # Zonas A, B y C; A-B a 10 minutos, B-C a 10 y A-C fuera del límite
+        minutos = [[0, 10, 40], [10, 0, 10], [40, 10, 0]]
+        cubre = [[True, False], [True, False], [False, True]]
+        # Una solicitud de B y después una de A; el retirador 0 cubre A y B con
+        # capacidad 1, el retirador 1 cubre C
+        self.escenario = _escenario([1, 0], cubre, [True, True], [1, 5], minutos, max_minutos=20)
+
+    def test_primero_ignora_la_capacidad(self):
+        escenario = _escenario([0, 0, 0], [[True], [False]], [True], [1], [[0, INF], [INF, 0]])
+        resultado = simular(escenario, 'primero')
+        self.assertEqual(resultado['sin_asignar'], 0)
+        self.assertEqual(resultado['sobre_capacidad'], 2)
+
+    def test_desborde_respeta_la_capacidad_en_orden_de_llegada(self):
+        resultado = simular(self.escenario, 'desborde')
+        self.assertEqual(resultado['sobre_capacidad'], 0)
+        # B toma al retirador 0 y A ya no tiene a nadie a menos de 20 minutos
+        self.assertEqual(resultado['sin_asignar'], 1)
+
+    def test_lote_atiende_todo_el_dia_a_la_vez(self):
+        resultado = simular(self.escenario, 'lote')
+        self.assertEqual(resultado['sobre_capacidad'], 0)
+        self.assertEqual(resultado['sin_asignar'], 0)
+        self.assertEqual(resultado['minutos_desborde'], 10)
+
+    def test_lote_no_desborda_mas_que_desborde(self):
+        rng = random.Random(11)
+        n_zonas, n_retiradores = 6, 10
+        minutos = np.array([[abs(a - b) * 10 for b in range(n_zonas)] for a in range(n_zonas)], dtype=float)
+        cubre = np.zeros((n_zonas, n_retiradores), dtype=bool)
+        cubre[[rng.randrange(n_zonas) for _ in range(n_retiradores)], range(n_retiradores)] = True
+        zonas = [rng.randrange(n_zonas) for _ in range(40)]
+        escenario = _escenario(zonas, cubre, [rng.random() < 0.7 for _ in range(n_retiradores)],
+                               [4] * n_retiradores, minutos)
+
+        desborde, lote = simular(escenario, 'desborde'), simular(escenario, 'lote')
+        self.assertLessEqual(lote['sin_asignar'], desborde['sin_asignar'])
+        self.assertLessEqual(lote['minutos_desborde'], desborde['minutos_desborde'])
+        self.assertEqual(lote['sobre_capacidad'], 0)
+
+
+class CargarEscenarioTests(TestCase):
+    def test_lee_el_historial_en_una_pasada(self):
+        generador = GeneradorDatos(semilla=3)
+        generador.generar(zonas=4, retiradores=6, solicitantes=30, solicitudes=120, dias=10, solicitudes_hoy=5)
+        hasta = generador.hoy
+        desde = hasta - timedelta(days=10)
+
+        with self.assertNumQueries(5):
+            escenario = cargar_escenario(desde, hasta, max_minutos=60, capacidad=8)
+
+        esperadas = SolicitudRetiro.objects.filter(
+            fecha_retiro__range=(desde, hasta)
+        ).exclude(estado='cancelado').count()
+        self.assertEqual(len(escenario.dia), esperadas)
+        self.assertEqual(escenario.cubre.shape, (4, 6))
+        for estrategia in ('primero', 'menos_cargado', 'desborde', 'lote'):
+            self.assertEqual(simular(escenario, estrategia)['solicitudes'], esperadas)
+
+        salida = StringIO()
+        call_command('simular_asignacion', desde=str(desde), hasta=str(hasta), estrategia=['lote'], stdout=salida)
+        self.assertIn('lote', salida.getvalue())
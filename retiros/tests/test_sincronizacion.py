@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from retiros.estados import transicionar
+from retiros.models import Retirador, Solicitante, SolicitudRetiro, Zona
+
+
+class SincronizacionRetiradorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoy = timezone.now().date()
+        zona = Zona.objects.create(nombre='Valparaíso')
+        cls.otra_zona = Zona.objects.create(nombre='Quilpué')
+        cls.retirador = Retirador.objects.create(nombre='Pedro')
+        cls.retirador.zonas_preferidas.add(zona)
+        cls.otro = Retirador.objects.create(nombre='Juan')
+        cls.otro.zonas_preferidas.add(cls.otra_zona)
+        cls.solicitante = Solicitante.objects.create(
+            nombre='Veterinaria Central', telefono='+56912345678', email='central@example.com',
+            zona=zona, direccion_principal='Av. Brasil 123',
+        )
+        cls.asignada = cls._crear(retirador_asignado=cls.retirador, estado='asignado')
+        cls.sin_asignar = cls._crear()
+
+    @classmethod
+    def _crear(cls, **kwargs):
+        return SolicitudRetiro.objects.create(
+            solicitante=cls.solicitante, direccion_retiro='', fecha_retiro=cls.hoy, **kwargs
+        )
+
+    def _sincronizar(self, token=None, retirador=None):
+        url = reverse('api_sincronizar_retirador', args=[(retirador or self.retirador).id])
+        response = self.client.get(url, {'token': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sin_token_envia_la_lista_completa(self):
+        datos = self._sincronizar()
+        self.assertTrue(datos['completo'])
+        self.assertEqual({s['id'] for s in datos['solicitudes']}, {self.asignada.id, self.sin_asignar.id})
+        self.assertEqual(datos['eliminadas'], [])
+
+    def test_sin_cambios_no_envia_nada(self):
+        token = self._sincronizar()['token']
+        datos = self._sincronizar(token)
+        self.assertFalse(datos['completo'])
+        self.assertEqual((datos['solicitudes'], datos['eliminadas']), ([], []))
+        self.assertEqual(datos['token'], token)
+
+    def test_envia_solo_cambios_y_bajas(self):
+        token = self._sincronizar()['token']
+
+        nueva = self._crear()
+        self.asignada.estado = 'completado'
+        self.asignada.save()
+        SolicitudRetiro.objects.filter(id=self.sin_asignar.id).update(retirador_asignado=self.otro)
+        borrada = self._crear()
+        borrada_id = borrada.id
+        borrada.delete()
+
+        datos = self._sincronizar(token)
+        self.assertFalse(datos['completo'])
+        self.assertEqual([s['id'] for s in datos['solicitudes']], [nueva.id])
+        self.assertEqual(
+            sorted(datos['eliminadas']),
+            sorted([self.asignada.id, self.sin_asignar.id, borrada_id]),
+        )
+
+    def test_borrado_por_queryset_registra_las_bajas_en_bloque(self):
+        token = self._sincronizar()['token']
+        token_otro = self._sincronizar(retirador=self.otro)['token']
+        for _ in range(5):
+            self._crear(retirador_asignado=self.retirador, estado='asignado')
+
+        with self.assertNumQueries(3):
+            borradas, por_modelo = SolicitudRetiro.objects.filter(retirador_asignado=self.retirador).delete()
+        self.assertEqual((borradas, por_modelo), (6, {'retiros.SolicitudRetiro': 6}))
+
+        datos = self._sincronizar(token)
+        self.assertIn(self.asignada.id, datos['eliminadas'])
+        self.assertEqual(len(datos['eliminadas']), 6)
+        datos = self._sincronizar(token_otro, retirador=self.otro)
+        self.assertEqual(datos['eliminadas'], [])
+
+    def test_guardar_con_update_fields_tambien_se_sincroniza(self):
+        token = self._sincronizar()['token']
+        self.sin_asignar.notas = 'Canino'
+        self.sin_asignar.save(update_fields=['notas'])
+
+        datos = self._sincronizar(token)
+        self.assertEqual([s['id'] for s in datos['solicitudes']], [self.sin_asignar.id])
+        self.assertEqual(datos['solicitudes'][0]['secuencia'], self.sin_asignar.secuencia)
+
+    def test_eliminadas_solo_las_de_la_lista_del_retirador(self):
+        token = self._sincronizar()['token']
+        token_otro = self._sincronizar(retirador=self.otro)['token']
+
+        transicionar(self.asignada, 'asignado', retirador_asignado=self.otro)
+        self.sin_asignar.estado = 'cancelado'
+        self.sin_asignar.save()
+
+        datos = self._sincronizar(token)
+        self.assertEqual(datos['solicitudes'], [])
+        self.assertEqual(sorted(datos['eliminadas']), sorted([self.asignada.id, self.sin_asignar.id]))
+        datos = self._sincronizar(token_otro, retirador=self.otro)
+        self.assertEqual([s['id'] for s in datos['solicitudes']], [self.asignada.id])
+        self.assertEqual(datos['eliminadas'], [])
+
+    def test_cambio_de_zona_del_solicitante(self):
+        token = self._sincronizar()['token']
+        token_otro = self._sincronizar(retirador=self.otro)['token']
+
+        Solicitante.objects.filter(pk=self.solicitante.pk).update(zona=self.otra_zona)
+
+        datos = self._sincronizar(token)
+        self.assertEqual([s['id'] for s in datos['solicitudes']], [self.asignada.id])
+        self.assertEqual(datos['eliminadas'], [self.sin_asignar.id])
+        datos = self._sincronizar(token_otro, retirador=self.otro)
+        self.assertEqual([s['id'] for s in datos['solicitudes']], [self.sin_asignar.id])
+        self.assertEqual(datos['eliminadas'], [])
+
+        # Y de vuelta con save()
+        token_otro = datos['token']
+        solicitante = Solicitante.objects.get(pk=self.solicitante.pk)
+        solicitante.zona = self.asignada.solicitante.zona
+        solicitante.save()
+        self.assertEqual(self._sincronizar(token_otro, retirador=self.otro)['eliminadas'], [self.sin_asignar.id])
+
+    def test_cambio_de_zonas_del_retirador_envia_la_lista_completa(self):
+        token = self._sincronizar()['token']
+        self.retirador.zonas_preferidas.add(self.otra_zona)
+        datos = self._sincronizar(token)
+        self.assertTrue(datos['completo'])
+
+        token = datos['token']
+        self.assertFalse(self._sincronizar(token)['completo'])
+        self.otra_zona.retirador_set.clear()
+        self.assertTrue(self._sincronizar(token)['completo'])
+
+    def test_token_de_otro_dia_o_invalido_envia_la_lista_completa(self):
+        ayer = self.hoy - timedelta(days=1)
+        self.assertTrue(self._sincronizar(f'{ayer.isoformat()}:0')['completo'])
+        self.assertTrue(self._sincronizar('basura')['completo'])
+        # Formato anterior del token
+        self.assertTrue(self._sincronizar(f'{self.hoy.isoformat()}.0')['completo'])
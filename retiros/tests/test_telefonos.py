@@ -0,0 +1,79 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from retiros.models import Solicitante, Zona
+from retiros.normalizacion import es_telefono, filtro_telefono, normalizar_telefono
+
+
+class NormalizarTelefonoTests(SimpleTestCase):
+    def test_formatos_habituales_quedan_en_e164(self):
+        for telefono in ('+56 9 1234 5678', '912345678', '9-1234-5678', '56912345678', '0056 9 1234 5678',
+                         '(+56) 912345678'):
+            with self.subTest(telefono=telefono):
+                self.assertEqual(normalizar_telefono(telefono), '56912345678')
+        self.assertEqual(normalizar_telefono('+54 11 1234 5678'), '541112345678')
+        self.assertEqual(normalizar_telefono('sin teléfono'), '')
+
+    def test_detecta_busquedas_de_telefono(self):
+        self.assertTrue(es_telefono('5678'))
+        self.assertTrue(es_telefono('+56 9 1234'))
+        self.assertFalse(es_telefono('gonz'))
+        self.assertFalse(es_telefono('Calle 1234'))
+        self.assertFalse(es_telefono('123'))
+
+
+class TelefonoNormalizadoTests(TestCase):
+    def setUp(self):
+        self.zona = Zona.objects.create(nombre='Valparaíso')
+
+    def _solicitante(self, telefono, nombre='Ana'):
+        return Solicitante.objects.create(
+            nombre=nombre, telefono=telefono, email_desconocido=True, zona=self.zona, direccion_principal='Calle 1',
+        )
+
+    def _guardado(self, solicitante):
+        return Solicitante.objects.values_list('telefono_normalizado', 'telefono_invertido').get(pk=solicitante.pk)
+
+    def test_se_mantiene_al_guardar_y_en_cambios_masivos(self):
+        solicitante = self._solicitante('+56 9 1234 5678')
+        self.assertEqual(self._guardado(solicitante), ('56912345678', '87654321965'))
+
+        Solicitante.objects.filter(pk=solicitante.pk).update(telefono='9 8765 4321')
+        self.assertEqual(self._guardado(solicitante)[0], '56987654321')
+
+        Solicitante.objects.filter(pk=solicitante.pk).update(telefono=Concat(Value('+56 2 '), F('telefono')))
+        self.assertEqual(self._guardado(solicitante)[0], '562987654321')
+
+        creado, = Solicitante.objects.bulk_create([Solicitante(
+            nombre='Beto', telefono='912345678', email_desconocido=True, zona=self.zona, direccion_principal='Calle 2',
+        )])
+        self.assertEqual(self._guardado(creado)[0], '56912345678')
+
+    def test_api_busca_por_numero_completo_o_terminacion(self):
+        ana = self._solicitante('+56 9 1234 5678', 'Ana')
+        beto = self._solicitante('922225678', 'Beto')
+        self._solicitante('933331111', 'Carla')
+        url = reverse('api_buscar_solicitantes')
+
+        respuesta = self.client.get(url, {'q': '9 1234 5678'}).json()
+        self.assertEqual(respuesta['busqueda'], 'telefono')
+        self.assertEqual([r['id'] for r in respuesta['results']], [ana.id])
+
+        respuesta = self.client.get(url, {'q': '5678'}).json()
+        self.assertEqual({r['id'] for r in respuesta['results']}, {ana.id, beto.id})
+
+        respuesta = self.client.get(url, {'q': 'bet'}).json()
+        self.assertEqual(respuesta['busqueda'], 'texto')
+        self.assertEqual([r['id'] for r in respuesta['results']], [beto.id])
+
+    @skipUnless(connection.vendor == 'sqlite', 'plan de consulta de SQLite')
+    def test_terminacion_usa_el_indice_del_numero_invertido(self):
+        plan = Solicitante.objects.filter(filtro_telefono('5678')).order_by('telefono_invertido').explain()
+        self.assertIn('telefono_invertido', plan)
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from retiros.models import AdyacenciaZona, Retirador, Solicitante, SolicitudRetiro, Zona
+from retiros.services import SolicitudService
+from retiros.zonas import CLAVE_GENERACION, caminos_mas_cortos, zonas_cercanas
+
+
+class CaminosMasCortosTests(SimpleTestCase):
+    def test_camino_por_zona_intermedia_y_zona_aislada(self):
+        cercanas = caminos_mas_cortos([1, 2, 3, 4], [(1, 2, 10), (2, 3, 5), (3, 1, 30)])
+        self.assertEqual(cercanas[1], [(1, 0), (2, 10), (3, 15)])
+        # La adyacencia vale en ambos sentidos
+        self.assertEqual(cercanas[3], [(3, 0), (2, 5), (1, 15)])
+        self.assertEqual(cercanas[4], [(4, 0)])
+
+
+@override_settings(ASIGNACION_DESBORDE_MINUTOS=60)
+class DesbordeZonasTests(TestCase):
+    def setUp(self):
+        self.centro, self.vecina, self.lejana = (
+            Zona.objects.create(nombre=nombre) for nombre in ('Valparaíso', 'Viña del Mar', 'Quilpué')
+        )
+        AdyacenciaZona.objects.create(origen=self.centro, destino=self.vecina, minutos=15)
+        AdyacenciaZona.objects.create(origen=self.vecina, destino=self.lejana, minutos=50)
+        self.solicitante = Solicitante.objects.create(
+            nombre='Ana', telefono='+56912345678', email_desconocido=True,
+            zona=self.centro, direccion_principal='Calle 1',
+        )
+
+    def _retirador(self, nombre, zona, **kwargs):
+        retirador = Retirador.objects.create(nombre=nombre, **kwargs)
+        retirador.zonas_preferidas.add(zona)
+        return retirador
+
+    def _asignar(self):
+        solicitud = SolicitudRetiro.objects.create(
+            solicitante=self.solicitante, direccion_retiro='', fecha_retiro=timezone.now().date(),
+        )
+        return SolicitudService.asignar_retirador_automatico(solicitud)
+
+    def test_sin_retiradores_en_la_zona_asigna_en_la_vecina_mas_cercana(self):
+        self._retirador('Lejano', self.lejana)
+        vecino = self._retirador('Vecino', self.vecina)
+
+        retirador, mensaje = self._asignar()
+        self.assertEqual(retirador, vecino)
+        self.assertIn('zona vecina Viña del Mar', mensaje)
+
+    def test_capacidad_llena_desborda_y_complementario_va_antes_que_la_vecina(self):
+        fijo = self._retirador('Fijo', self.centro, capacidad_diaria=1)
+        complementario = self._retirador('Complementario', self.centro, tipo='complementario', capacidad_diaria=1)
+        vecino = self._retirador('Vecino', self.vecina)
+
+        self.assertEqual([self._asignar()[0] for _ in range(3)], [fijo, complementario, vecino])
+
+    def test_no_asigna_mas_alla_del_limite_de_minutos(self):
+        self._retirador('Lejano', self.lejana)
+        retirador, mensaje = self._asignar()
+        self.assertIsNone(retirador)
+        self.assertIn('Valparaíso', mensaje)
+
+    def test_grafo_en_memoria_se_recalcula_al_cambiar_adyacencias(self):
+        zonas_cercanas(self.centro.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(zonas_cercanas(self.centro.id), [
+                (self.centro.id, 0), (self.vecina.id, 15), (self.lejana.id, 65),
+            ])
+
+        AdyacenciaZona.objects.create(origen=self.lejana, destino=self.centro, minutos=20)
+        self.assertEqual(zonas_cercanas(self.centro.id, max_minutos=30), [
+            (self.centro.id, 0), (self.vecina.id, 15), (self.lejana.id, 20),
+        ])
+
+    def test_invalidacion_de_otro_proceso_por_la_cache_compartida(self):
+        zonas_cercanas(self.centro.id)
+        # Otro proceso cambió una adyacencia y publicó la invalidación
+        cache.incr(CLAVE_GENERACION)
+        with self.assertNumQueries(2):
+            zonas_cercanas(self.centro.id)
+
+        # Las de este proceso se publican al confirmarse la transacción
+        generacion = cache.get(CLAVE_GENERACION)
+        with self.captureOnCommitCallbacks(execute=True):
+            AdyacenciaZona.objects.create(origen=self.lejana, destino=self.centro, minutos=20)
+            self.assertEqual(cache.get(CLAVE_GENERACION), generacion)
+        self.assertEqual(cache.get(CLAVE_GENERACION), generacion + 1)
@@ -20,5 +20,9 @@ urlpatterns = [
     
     # API endpoints
     path('api/buscar-solicitantes/', api.buscar_solicitantes, name='api_buscar_solicitantes'),
+    path('api/autocompletado/metricas/', api.metricas_autocompletado, name='api_metricas_autocompletado'),
     path('api/solicitante/<int:solicitante_id>/', api.obtener_solicitante, name='api_obtener_solicitante'),
+    path('api/solicitante/<int:solicitante_id>/historial/', api.historial_solicitante, name='api_historial_solicitante'),
+    path('api/sync/retirador/<int:retirador_id>/', api.sincronizar_retirador, name='api_sincronizar_retirador'),
+    path('api/completar-lote/', api.completar_lote, name='api_completar_lote'),
 ]
@@ -1,13 +1,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db.models import Q, Count, Prefetch
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse
+from .auditoria import registrar
+from .estados import ConflictoVersion, TransicionInvalida, transicionar
 from .models import SolicitudRetiro, Retirador, Solicitante
 from .forms import SolicitudRetiroForm
-from .utils import generar_pdf_lista_retiros, enviar_notificacion_datos_faltantes
+from .manifiestos import manifiesto_vigente, ruta_manifiesto
+from .routers import solo_lectura
+from .services import EstadisticasService, SolicitudService
+from .utils import enviar_notificacion_datos_faltantes
 from django.utils import timezone
 from datetime import timedelta
 import logging
+import os
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -22,30 +28,22 @@ def agregar_solicitud(request):
             form = SolicitudRetiroForm(request.POST)
             if form.is_valid():
                 solicitud = form.save()
+                registrar([(solicitud.id, '', solicitud.retirador_asignado_id)], solicitud.estado, tipo='creada')
                 
                 # Lógica de asignación automática por zona
                 if not solicitud.retirador_asignado:
-                    zona = solicitud.solicitante.zona
-                    # Optimizado: prefetch zonas para evitar queries adicionales
-                    retiradores = Retirador.objects.filter(
-                        zonas_preferidas=zona, 
-                        tipo='fijo'
-                    ).prefetch_related('zonas_preferidas')
-                    
-                    if retiradores.exists():
-                        solicitud.retirador_asignado = retiradores.first()
-                        solicitud.estado = 'asignado'
-                        solicitud.save()
+                    retirador, mensaje = SolicitudService.asignar_retirador_automatico(solicitud)
+                    if retirador:
                         messages.success(
                             request, 
                             f'Solicitud agregada para {solicitud.solicitante.nombre}. '
-                            f'Asignada a {solicitud.retirador_asignado}.'
+                            f'Asignada a {retirador}.'
                         )
                     else:
                         messages.warning(
                             request,
                             f'Solicitud agregada para {solicitud.solicitante.nombre}, '
-                            f'pero no hay retiradores disponibles en la zona {zona.nombre}.'
+                            f'pero no se asignó retirador: {mensaje}.'
                         )
                 else:
                     messages.success(
@@ -60,10 +58,11 @@ def agregar_solicitud(request):
         return render(request, 'retiros/agregar_solicitud.html', {'form': form})
     
     except Exception as e:
-        logger.error(f"Error al agregar solicitud: {str(e)}")
+        logger.error("Error al agregar solicitud: %s", e)
         messages.error(request, 'Ocurrió un error al agregar la solicitud. Por favor, intente nuevamente.')
         return redirect('home')
 
+@solo_lectura()
 def lista_pendientes(request):
     """
     Vista optimizada para listar solicitudes pendientes del día.
@@ -90,10 +89,11 @@ def lista_pendientes(request):
         return render(request, 'retiros/lista_pendientes.html', context)
     
     except Exception as e:
-        logger.error(f"Error al listar pendientes: {str(e)}")
+        logger.error("Error al listar pendientes: %s", e)
         messages.error(request, 'Ocurrió un error al cargar las solicitudes pendientes.')
         return redirect('home')
 
+@solo_lectura()
 def lista_retirador(request, retirador_id):
     """
     Vista optimizada para listar solicitudes de un retirador específico.
@@ -107,32 +107,30 @@ def lista_retirador(request, retirador_id):
         )
         hoy = timezone.now().date()
         
-        # Optimizado: select_related para evitar N+1 queries
-        lista = SolicitudRetiro.objects.filter(
-            Q(fecha_retiro=hoy) & (
-                Q(retirador_asignado=retirador) | 
-                Q(retirador_asignado__isnull=True, solicitante__zona__in=retirador.zonas_preferidas.all())
-            ) & Q(estado__in=['pendiente', 'asignado'])
-        ).select_related(
-            'solicitante',
-            'solicitante__zona',
-            'retirador_asignado'
-        ).order_by('hora_solicitud')
+        # Lista precalculada por generar_manifiestos si está al día (ver
+        # retiros/manifiestos.py); si no, en orden de recorrido al momento
+        # (ver retiros/agenda.py)
+        manifiesto = manifiesto_vigente(retirador, hoy)
+        lista = ruta_manifiesto(manifiesto) if manifiesto is not None else None
+        if lista is None:
+            lista = SolicitudService.obtener_ruta_retirador(retirador, hoy)
         
         context = {
             'retirador': retirador,
             'lista': lista,
             'hoy': hoy,
-            'total': lista.count()
+            'total': len(lista),
+            'fuera_de_horario': sum(1 for sol in lista if sol.fuera_de_horario),
         }
         
         return render(request, 'retiros/lista_retirador.html', context)
     
     except Exception as e:
-        logger.error(f"Error al listar solicitudes del retirador {retirador_id}: {str(e)}")
+        logger.error("Error al listar solicitudes del retirador %s: %s", retirador_id, e)
         messages.error(request, 'Ocurrió un error al cargar la lista del retirador.')
         return redirect('home')
 
+@solo_lectura()
 def home(request):
     """
     Vista optimizada del dashboard principal.
@@ -141,51 +139,23 @@ def home(request):
     try:
         hoy = timezone.now().date()
         
-        # Optimizado: Una sola query para contar pendientes
-        total_pendientes = SolicitudRetiro.objects.filter(
-            Q(fecha_retiro=hoy) & Q(estado__in=['pendiente', 'asignado'])
-        ).count()
-        
-        # Optimizado: prefetch_related para zonas de retiradores
-        retiradores = Retirador.objects.prefetch_related('zonas_preferidas').all()
-        
-        # Optimizado: Usar annotate para contar en una sola query
-        # Preparamos las solicitudes del día con select_related
-        solicitudes_hoy = SolicitudRetiro.objects.filter(
-            Q(fecha_retiro=hoy) & Q(estado__in=['pendiente', 'asignado'])
-        ).select_related('solicitante', 'solicitante__zona', 'retirador_asignado')
-        
-        resúmenes = []
-        for r in retiradores:
-            # Filtrar en Python para evitar queries adicionales
-            zonas_ids = [z.id for z in r.zonas_preferidas.all()]
-            count = sum(
-                1 for s in solicitudes_hoy 
-                if s.retirador_asignado == r or 
-                (s.retirador_asignado is None and s.solicitante.zona_id in zonas_ids)
-            )
-            resúmenes.append({'retirador': r, 'count': count})
-        
-        # Total solicitantes registrados
-        total_solicitantes = Solicitante.objects.count()
-        
-        # Solicitantes con datos incompletos
-        solicitantes_incompletos = Solicitante.objects.filter(
-            Q(email_desconocido=True) | Q(direccion_desconocida=True)
-        ).count()
+        # Pendientes, solicitantes y resumen por retirador con su
+        # disponibilidad del día (una consulta por agregado, ver services.py)
+        resumen = EstadisticasService.obtener_resumen_dashboard(hoy)
         
         context = {
-            'total_pendientes': total_pendientes,
-            'resúmenes': resúmenes,
-            'total_solicitantes': total_solicitantes,
-            'solicitantes_incompletos': solicitantes_incompletos,
+            'total_pendientes': resumen['total_pendientes'],
+            'resúmenes': resumen['resumenes_retiradores'],
+            'retiradores_ausentes': resumen['retiradores_ausentes'],
+            'total_solicitantes': resumen['total_solicitantes'],
+            'solicitantes_incompletos': resumen['solicitantes_incompletos'],
             'hoy': hoy,
         }
         
         return render(request, 'retiros/home.html', context)
     
     except Exception as e:
-        logger.error(f"Error en dashboard home: {str(e)}")
+        logger.error("Error en dashboard home: %s", e)
         messages.error(request, 'Ocurrió un error al cargar el dashboard.')
         # Retornar contexto mínimo para evitar crash
         return render(request, 'retiros/home.html', {
@@ -202,13 +172,23 @@ def marcar_completado(request, solicitud_id):
     Puede ser llamada vía POST o AJAX.
     """
     try:
-        solicitud = get_object_or_404(SolicitudRetiro, id=solicitud_id)
+        # select_related: los mensajes y la confirmación usan estas relaciones
+        solicitud = get_object_or_404(
+            SolicitudRetiro.objects.select_related('solicitante__zona', 'retirador_asignado'),
+            id=solicitud_id
+        )
         
         if request.method == 'POST':
-            solicitud.estado = 'completado'
-            solicitud.save()
+            try:
+                transicionar(solicitud, 'completado')
+            except (TransicionInvalida, ConflictoVersion) as e:
+                logger.warning("Solicitud %s no se marcó como completada: %s", solicitud_id, e)
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'success': False, 'error': str(e)}, status=409)
+                messages.error(request, f'No se pudo completar la solicitud: {e}.')
+                return redirect(request.META.get('HTTP_REFERER', 'lista_pendientes'))
             
-            logger.info(f"Solicitud {solicitud_id} marcada como completada")
+            logger.info("Solicitud %s marcada como completada", solicitud_id)
             
             # Si es AJAX, retornar JSON
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -228,7 +208,7 @@ def marcar_completado(request, solicitud_id):
         })
     
     except Exception as e:
-        logger.error(f"Error al marcar solicitud {solicitud_id} como completada: {str(e)}")
+        logger.error("Error al marcar solicitud %s como completada: %s", solicitud_id, e)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
@@ -239,37 +219,37 @@ def marcar_completado(request, solicitud_id):
         messages.error(request, 'Ocurrió un error al marcar la solicitud como completada.')
         return redirect('lista_pendientes')
 
+@solo_lectura()
 def exportar_pdf_retirador(request, retirador_id):
     """
     Exporta la lista de retiros de un retirador específico a PDF.
     """
     try:
-        retirador = get_object_or_404(
-            Retirador.objects.prefetch_related('zonas_preferidas'),
-            id=retirador_id
-        )
+        # Las zonas se usan como subconsulta: no hace falta prefetch
+        retirador = get_object_or_404(Retirador, id=retirador_id)
         hoy = timezone.now().date()
         
-        # Obtener solicitudes del retirador
-        solicitudes = SolicitudRetiro.objects.filter(
-            Q(fecha_retiro=hoy) & (
-                Q(retirador_asignado=retirador) | 
-                Q(retirador_asignado__isnull=True, solicitante__zona__in=retirador.zonas_preferidas.all())
-            ) & Q(estado__in=['pendiente', 'asignado'])
-        ).select_related(
-            'solicitante',
-            'solicitante__zona',
-            'retirador_asignado'
-        ).order_by('hora_solicitud')
+        # PDF precalculado por generar_manifiestos (ver retiros/manifiestos.py)
+        manifiesto = manifiesto_vigente(retirador, hoy)
+        if manifiesto is not None:
+            return FileResponse(
+                manifiesto.pdf.open('rb'), as_attachment=True,
+                filename=os.path.basename(manifiesto.pdf.name), content_type='application/pdf',
+            )
+        
+        # Sin manifiesto: se genera al momento, en orden de recorrido
+        solicitudes = SolicitudService.obtener_ruta_retirador(retirador, hoy)
         
-        # Generar PDF
+        # Generar PDF (ReportLab se importa solo aquí; ver retiros/pdf.py)
+        from .pdf import generar_pdf_lista_retiros
         return generar_pdf_lista_retiros(solicitudes, retirador, hoy)
     
     except Exception as e:
-        logger.error(f"Error al exportar PDF del retirador {retirador_id}: {str(e)}")
+        logger.error("Error al exportar PDF del retirador %s: %s", retirador_id, e)
         messages.error(request, 'Ocurrió un error al generar el PDF.')
         return redirect('lista_retirador', retirador_id=retirador_id)
 
+@solo_lectura()
 def exportar_pdf_general(request):
     """
     Exporta la lista general de retiros pendientes a PDF.
@@ -286,11 +266,12 @@ def exportar_pdf_general(request):
             'retirador_asignado'
         ).order_by('retirador_asignado', 'hora_solicitud')
         
-        # Generar PDF
+        # Generar PDF (ReportLab se importa solo aquí; ver retiros/pdf.py)
+        from .pdf import generar_pdf_lista_retiros
         return generar_pdf_lista_retiros(solicitudes, None, hoy)
     
     except Exception as e:
-        logger.error(f"Error al exportar PDF general: {str(e)}")
+        logger.error("Error al exportar PDF general: %s", e)
         messages.error(request, 'Ocurrió un error al generar el PDF.')
         return redirect('lista_pendientes')
 
@@ -300,9 +281,7 @@ def notificar_datos_faltantes(request):
     """
     try:
         # Obtener solicitantes con datos incompletos
-        solicitantes = Solicitante.objects.filter(
-            Q(email_desconocido=True) | Q(direccion_desconocida=True)
-        ).select_related('zona')
+        solicitantes = Solicitante.objects.filter(datos_completos=False).select_related('zona')
         
         # Enviar notificaciones
         resultado = enviar_notificacion_datos_faltantes(solicitantes)
@@ -315,6 +294,6 @@ def notificar_datos_faltantes(request):
         return redirect('home')
     
     except Exception as e:
-        logger.error(f"Error al notificar datos faltantes: {str(e)}")
+        logger.error("Error al notificar datos faltantes: %s", e)
         messages.error(request, 'Ocurrió un error al procesar las notificaciones.')
         return redirect('home')
@@ -0,0 +1,101 @@
+"""
+Grafo de zonas vecinas
+
+``AdyacenciaZona`` define qué zonas son vecinas y cuántos minutos hay entre
+ellas. Cuando una zona no tiene retiradores con capacidad, la asignación
+automática busca en las zonas más cercanas según el camino más corto del
+grafo (una zona puede estar a dos o más saltos).
+
+Los caminos más cortos entre todos los pares se calculan de una vez (Dijkstra
+desde cada zona: el grafo tiene decenas de nodos) y quedan en memoria del
+proceso. Para cada zona se guarda la lista de zonas alcanzables ordenada por
+minutos, así cada solicitud consulta su lista sin recorrer el grafo. La caché
+se descarta al guardar o eliminar una zona o adyacencia en este proceso y, en
+los demás, al confirmarse la transacción (invalidacion.py). Además se
+descarta a los ``ZONAS_CACHE_SEGUNDOS``.
+"""
+import heapq
+import threading
+from time import monotonic
+
+from django.conf import settings
+
+from . import invalidacion
+from .models import AdyacenciaZona, Zona
+
+# Clave del contador de invalidaciones en la caché de Django
+CLAVE_GENERACION = 'retiros:zonas:generacion'
+
+_lock = threading.Lock()
+_cache = {'vence': 0.0, 'compartida': None, 'cercanas': None}
+
+
+def caminos_mas_cortos(zona_ids, aristas):
+    """
+    Minutos del camino más corto entre cada par de zonas conectadas.
+
+    Args:
+        zona_ids: Iterable de ids de zonas
+        aristas: Iterable de (origen_id, destino_id, minutos), en ambos sentidos
+
+    Returns:
+        dict {zona_id: list de (zona_id, minutos)} ordenada por minutos, que
+        empieza por la misma zona (0 minutos)
+    """
+    vecinas = {zona_id: {} for zona_id in zona_ids}
+    for origen, destino, minutos in aristas:
+        for a, b in ((origen, destino), (destino, origen)):
+            if a in vecinas and b in vecinas:
+                vecinas[a][b] = min(minutos, vecinas[a].get(b, minutos))
+
+    cercanas = {}
+    for inicio in vecinas:
+        distancias = {inicio: 0}
+        pendientes = [(0, inicio)]
+        while pendientes:
+            minutos, zona = heapq.heappop(pendientes)
+            if minutos > distancias[zona]:
+                continue
+            for vecina, tramo in vecinas[zona].items():
+                total = minutos + tramo
+                if total < distancias.get(vecina, float('inf')):
+                    distancias[vecina] = total
+                    heapq.heappush(pendientes, (total, vecina))
+        cercanas[inicio] = sorted(distancias.items(), key=lambda par: (par[1], par[0]))
+    return cercanas
+
+
+def _cargar():
+    zona_ids = list(Zona.objects.values_list('id', flat=True))
+    aristas = AdyacenciaZona.objects.values_list('origen_id', 'destino_id', 'minutos')
+    return caminos_mas_cortos(zona_ids, aristas)
+
+
+def zonas_cercanas(zona_id, max_minutos=None):
+    """
+    Zonas alcanzables desde ``zona_id``, de la más cercana a la más lejana,
+    empezando por ella misma. Sin consultas mientras la caché esté vigente.
+
+    Returns:
+        list de (zona_id, minutos)
+    """
+    compartida = invalidacion.generacion(CLAVE_GENERACION)
+    with _lock:
+        if _cache['cercanas'] is None or monotonic() >= _cache['vence'] or compartida != _cache['compartida']:
+            _cache['cercanas'] = _cargar()
+            _cache['compartida'] = compartida
+            _cache['vence'] = monotonic() + getattr(settings, 'ZONAS_CACHE_SEGUNDOS', 300)
+        cercanas = _cache['cercanas'].get(zona_id, [(zona_id, 0)])
+    if max_minutos is not None:
+        cercanas = [par for par in cercanas if par[1] <= max_minutos]
+    return cercanas
+
+
+def invalidar():
+    """
+    Descarta la caché: la próxima consulta recalcula los caminos. Los demás
+    procesos la descartan al confirmarse la transacción del cambio.
+    """
+    with _lock:
+        _cache['cercanas'] = None
+    invalidacion.publicar(CLAVE_GENERACION)